@@ -0,0 +1,40 @@
+"""Núcleo de análisis de cultivos extensivos, sin dependencias de Streamlit.
+
+Permite usar los motores de cálculo (fertilidad, textura, NDWI, curvas de nivel,
+mapas e informes) desde procesos por lotes, pools de procesos o benchmarks.
+"""
+from .parametros import (
+    PARAMETROS_CULTIVOS, TEXTURA_SUELO_OPTIMA, PARAMETROS_NDWI_SUELO, PARAMETROS_CURVAS_NIVEL,
+    PARAMETROS_GEOMETRIA, CLASIFICACION_PENDIENTES, CLASIFICACION_TEXTURAS, FACTORES_SUELO,
+    RECOMENDACIONES_TEXTURA, RECOMENDACIONES_AGROECOLOGICAS, RECOMENDACIONES_PENDIENTES,
+    FACTORES_MES, FACTORES_N_MES, FACTORES_P_MES, FACTORES_K_MES, FACTORES_NDWI_MES, PALETAS_GEE
+)
+from .geometria import (
+    calcular_superficie, calcular_superficie_por_fila, obtener_crs_metrico, preparar_geometrias,
+    buscar_lotes_por_punto, unir_lotes_zonas,
+    dividir_parcela_en_zonas
+)
+from .dem import GrillaDEM, ModeloDEM
+from .derivadas import derivadas_terreno, pendiente_grados
+from .hidrologia import rellenar_depresiones, inventario_encharcamiento
+from .fuentes_dem import leer_dem_archivo, huella_archivo
+from .huella import huella_datos, huella_geometria
+from .teselado import aplicar_por_teselas, mapear_teselas
+from .lectura import iterar_poligonos_kml, leer_kml_incremental, leer_parcela
+from .suelo import (
+    clasificar_textura_suelo, calcular_propiedades_fisicas_suelo, evaluar_adecuacion_textura,
+    analizar_textura_suelo, analizar_ndwi_suelo, calcular_indices_gee
+)
+from .suelo_vectorizado import (
+    analizar_textura_suelo_vectorizado, analizar_ndwi_suelo_vectorizado, calcular_indices_gee_vectorizado
+)
+from .topografia import (
+    clasificar_pendiente, calcular_estadisticas_pendiente, calcular_estadisticas_orientacion,
+    calcular_estadisticas_curvatura, generar_dem_sintetico, calcular_curvas_nivel,
+    calcular_curvas_base, curvas_desde_modelo, filtrar_curvas_intervalo
+)
+from .mapas import (
+    crear_mapa_interactivo_esri, crear_mapa_visualizador_parcela, crear_mapa_estatico,
+    crear_mapa_curvas_nivel, crear_mapa_pendientes
+)
+from .informes import generar_informe_pdf, generar_informe_ndwi_pdf
@@ -0,0 +1,252 @@
+"""Caché persistente en disco para resultados de análisis.
+
+Guarda tablas de zonas en Parquet, grillas DEM en .npy (su georreferencia en JSON), mapas en HTML/PNG e informes
+PDF, con un índice JSON compartido, límite de bytes y desalojo LRU. Las escrituras son
+atómicas (archivo temporal + os.replace) y el índice se modifica bajo un bloqueo de
+archivo, de modo que varios procesos o réplicas pueden usar el mismo directorio.
+
+Configuración por variables de entorno:
+    ANALIZADOR_CACHE_DIR        directorio de la caché (por defecto <tmp>/analizador_cache)
+    ANALIZADOR_CACHE_MAX_BYTES  presupuesto en bytes (por defecto 1 GiB; 0 desactiva la caché)
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin bloqueo entre procesos
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Extensión de archivo de cada formato soportado
+FORMATOS_CACHE = {
+    'parquet': '.parquet',
+    'npy': '.npy',
+    'json': '.json',
+    'html': '.html',
+    'png': '.png',
+    'pdf': '.pdf',
+}
+
+LIMITE_BYTES_DEFECTO = 1024 ** 3
+
+
+# FUNCIÓN PARA ARMAR UNA CLAVE DE CACHÉ
+def clave_cache(*partes):
+    """Combina huella y parámetros en una clave hexadecimal estable"""
+    texto = json.dumps([str(p) for p in partes], ensure_ascii=False)
+    return hashlib.sha256(texto.encode('utf-8')).hexdigest()
+
+
+class CacheDisco:
+    """Caché de resultados en un directorio, con índice JSON y desalojo LRU"""
+
+    def __init__(self, directorio, limite_bytes=LIMITE_BYTES_DEFECTO):
+        self.directorio = directorio
+        self.limite_bytes = limite_bytes
+        self.ruta_indice = os.path.join(directorio, 'indice.json')
+        self.ruta_bloqueo = os.path.join(directorio, '.bloqueo')
+        os.makedirs(directorio, exist_ok=True)
+
+    @contextmanager
+    def _bloqueo(self):
+        with open(self.ruta_bloqueo, 'a') as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _leer_indice(self):
+        try:
+            with open(self.ruta_indice, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _escribir_atomico(self, ruta, escribir):
+        """Escribe en un temporal del mismo directorio y lo renombra sobre la ruta final"""
+        fd, tmp = tempfile.mkstemp(dir=self.directorio, prefix='.tmp_')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                escribir(f)
+            os.replace(tmp, ruta)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+    def _guardar_indice(self, indice):
+        datos = json.dumps(indice).encode('utf-8')
+        self._escribir_atomico(self.ruta_indice, lambda f: f.write(datos))
+
+    def _ruta(self, clave, formato):
+        return os.path.join(self.directorio, clave + FORMATOS_CACHE[formato])
+
+    def obtener(self, clave, formato):
+        """Devuelve el valor guardado o None si no está en la caché"""
+        ruta = self._ruta(clave, formato)
+        try:
+            if formato == 'parquet':
+                import geopandas as gpd
+                valor = gpd.read_parquet(ruta)
+            elif formato == 'npy':
+                valor = np.load(ruta, allow_pickle=False)
+            elif formato == 'json':
+                with open(ruta, 'r', encoding='utf-8') as f:
+                    valor = json.load(f)
+            elif formato == 'html':
+                with open(ruta, 'r', encoding='utf-8') as f:
+                    valor = f.read()
+            else:
+                with open(ruta, 'rb') as f:
+                    valor = f.read()
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Entrada de caché ilegible {os.path.basename(ruta)}: {str(e)}")
+            self.eliminar(clave, formato)
+            return None
+
+        # Registrar el acceso para el orden LRU
+        with self._bloqueo():
+            indice = self._leer_indice()
+            if clave in indice:
+                indice[clave]['ultimo_acceso'] = time.time()
+                self._guardar_indice(indice)
+        return valor
+
+    def guardar(self, clave, formato, valor):
+        """Guarda el valor de forma atómica y desaloja entradas viejas si se supera el límite"""
+        ruta = self._ruta(clave, formato)
+        try:
+            if formato == 'parquet':
+                self._escribir_atomico(ruta, lambda f: valor.to_parquet(f))
+            elif formato == 'npy':
+                self._escribir_atomico(ruta, lambda f: np.save(f, np.asarray(valor), allow_pickle=False))
+            elif formato == 'json':
+                self._escribir_atomico(ruta, lambda f: f.write(json.dumps(valor, ensure_ascii=False).encode('utf-8')))
+            elif formato == 'html':
+                self._escribir_atomico(ruta, lambda f: f.write(valor.encode('utf-8')))
+            else:
+                self._escribir_atomico(ruta, lambda f: f.write(valor))
+        except Exception as e:
+            logger.warning(f"No se pudo guardar en caché ({formato}): {str(e)}")
+            return
+
+        with self._bloqueo():
+            indice = self._leer_indice()
+            ahora = time.time()
+            indice[clave] = {
+                'archivo': os.path.basename(ruta),
+                'bytes': os.path.getsize(ruta),
+                'creado': ahora,
+                'ultimo_acceso': ahora,
+            }
+            self._desalojar(indice)
+            self._guardar_indice(indice)
+
+    def guardar_archivo(self, nombre, contenido):
+        """Guarda bytes con un nombre de archivo propio (p. ej. un DEM con su extensión, que
+        decide el lector) bajo el mismo presupuesto LRU; si ya está, solo registra el acceso.
+        Devuelve la ruta. La entrada recién guardada no se desaloja aunque supere el límite."""
+        ruta = os.path.join(self.directorio, nombre)
+        if not os.path.exists(ruta):
+            self._escribir_atomico(ruta, lambda f: f.write(contenido))
+        with self._bloqueo():
+            indice = self._leer_indice()
+            ahora = time.time()
+            entrada = indice.setdefault(nombre, {'archivo': nombre, 'creado': ahora})
+            entrada['bytes'] = os.path.getsize(ruta)
+            entrada['ultimo_acceso'] = ahora
+            self._desalojar(indice, conservar=(nombre,))
+            self._guardar_indice(indice)
+        return ruta
+
+    def _desalojar(self, indice, conservar=()):
+        """Elimina las entradas usadas hace más tiempo hasta entrar en el presupuesto"""
+        total = sum(e['bytes'] for e in indice.values())
+        for clave in sorted(indice, key=lambda c: indice[c]['ultimo_acceso']):
+            if total <= self.limite_bytes:
+                break
+            if clave in conservar:
+                continue
+            entrada = indice.pop(clave)
+            total -= entrada['bytes']
+            try:
+                os.remove(os.path.join(self.directorio, entrada['archivo']))
+            except FileNotFoundError:
+                pass
+
+    def eliminar(self, clave, formato):
+        with self._bloqueo():
+            indice = self._leer_indice()
+            indice.pop(clave, None)
+            self._guardar_indice(indice)
+            try:
+                os.remove(self._ruta(clave, formato))
+            except FileNotFoundError:
+                pass
+
+    def bytes_usados(self):
+        return sum(e['bytes'] for e in self._leer_indice().values())
+
+
+_cache_disco = None
+
+
+# FUNCIÓN PARA OBTENER LA CACHÉ CONFIGURADA POR VARIABLES DE ENTORNO
+def obtener_cache_disco():
+    """Devuelve la caché del proceso, o None si está desactivada"""
+    global _cache_disco
+    limite = int(os.environ.get('ANALIZADOR_CACHE_MAX_BYTES', LIMITE_BYTES_DEFECTO))
+    if limite <= 0:
+        return None
+    directorio = os.environ.get('ANALIZADOR_CACHE_DIR') or os.path.join(tempfile.gettempdir(), 'analizador_cache')
+    if _cache_disco is None or _cache_disco.directorio != directorio or _cache_disco.limite_bytes != limite:
+        try:
+            _cache_disco = CacheDisco(directorio, limite)
+        except OSError as e:
+            logger.warning(f"Caché en disco desactivada: {str(e)}")
+            return None
+    return _cache_disco
+
+
+# FUNCIÓN PARA REUTILIZAR UN RESULTADO DE DISCO O CALCULARLO
+def recordar(clave, formato, calcular):
+    """Devuelve el valor de la caché en disco; si no está, lo calcula y lo guarda"""
+    cache = obtener_cache_disco()
+    if cache is None:
+        return calcular()
+    valor = cache.obtener(clave, formato)
+    if valor is None:
+        valor = calcular()
+        if valor is not None:
+            cache.guardar(clave, formato, valor)
+    return valor
+
+
+# FUNCIÓN PARA RESULTADOS COMPUESTOS (UNA ENTRADA POR ELEMENTO DE LA TUPLA)
+def recordar_partes(clave, formatos, calcular):
+    """Como recordar(), para funciones que devuelven una tupla; formatos indica el de cada elemento"""
+    cache = obtener_cache_disco()
+    if cache is None:
+        return calcular()
+    partes = [cache.obtener(f"{clave}_{i}", formato) for i, formato in enumerate(formatos)]
+    if all(p is not None for p in partes):
+        return tuple(partes)
+    resultado = calcular()
+    for i, (valor, formato) in enumerate(zip(resultado, formatos)):
+        if valor is not None:
+            cache.guardar(f"{clave}_{i}", formato, valor)
+    return resultado
@@ -0,0 +1,381 @@
+"""Procesamiento por lotes de muchas parcelas desde la línea de comandos.
+
+Ejemplo:
+    python -m analizador lotes/ --cultivo MAIZ --mes MARZO --pdf --geojson --salida resultados/
+"""
+import argparse
+import logging
+import os
+import re
+import shutil
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import geopandas as gpd
+import pandas as pd
+
+from .cache import clave_cache, recordar, recordar_partes
+from .dem import GrillaDEM, ModeloDEM
+from .fuentes_dem import huella_archivo
+from .geometria import calcular_superficie, dividir_parcela_en_zonas, preparar_geometrias
+from .huella import huella_geometria
+from .informes import generar_informe_pdf, generar_informe_ndwi_pdf
+from .instrumentacion import Traza, etapa
+from .lectura import leer_parcela
+from .parametros import (
+    PARAMETROS_CULTIVOS, PARAMETROS_CURVAS_NIVEL, PARAMETROS_GEOMETRIA, PARAMETROS_HIDROLOGIA,
+    PARAMETROS_TESELADO, FACTORES_MES
+)
+from .suelo_vectorizado import (
+    analizar_textura_suelo_vectorizado, analizar_ndwi_suelo_vectorizado, calcular_indices_gee_vectorizado
+)
+from .hidrologia import inventario_encharcamiento
+from .topografia import (
+    VERSION_DEM, calcular_curvas_base, calcular_estadisticas_pendiente, curvas_desde_modelo,
+    filtrar_curvas_intervalo, intervalo_derivable
+)
+
+logger = logging.getLogger(__name__)
+
+# Análisis disponibles en la línea de comandos y su nombre en la aplicación
+ANALISIS_CLI = {
+    'fertilidad': "FERTILIDAD ACTUAL",
+    'npk': "RECOMENDACIONES NPK",
+    'textura': "ANÁLISIS DE TEXTURA",
+    'ndwi': "ANÁLISIS NDWI SUELO",
+    'curvas': "ANÁLISIS DE CURVAS DE NIVEL (LIDAR/DEM)",
+}
+
+NUTRIENTES_CLI = ["NITRÓGENO", "FÓSFORO", "POTASIO"]
+
+EXTENSIONES_PARCELA = ('.zip', '.kml', '.kmz', '.shp', '.gpkg', '.geojson', '.json')
+
+
+def _nombre_seguro(texto):
+    """Convierte un nombre de lote en un nombre de carpeta válido"""
+    return re.sub(r'[^\w\-]+', '_', str(texto)).strip('_') or 'lote'
+
+
+# FUNCIÓN PARA LEER TODAS LAS CAPAS DE UN ARCHIVO DE PARCELAS
+def _leer_archivo_parcelas(ruta, tolerancia_simplificacion_m=0.0):
+    """Devuelve una lista de (prefijo, gdf) con una entrada por capa del archivo"""
+    if ruta.lower().endswith(('.zip', '.kml', '.kmz')):
+        gdf, _ = leer_parcela(ruta, tolerancia_simplificacion_m=tolerancia_simplificacion_m)
+        return [(os.path.splitext(os.path.basename(ruta))[0], gdf)]
+
+    import fiona
+
+    capas = fiona.listlayers(ruta)
+    base = os.path.splitext(os.path.basename(ruta))[0]
+    resultado = []
+    for capa in capas:
+        gdf = gpd.read_file(ruta, layer=capa)
+        gdf = gdf[gdf.geometry.notna() & gdf.geom_type.isin(['Polygon', 'MultiPolygon'])]
+        if gdf.empty:
+            continue
+        if gdf.crs is None:
+            # Sin CRS no se sabe si las coordenadas son grados o metros: no se adivina
+            logger.warning(f"⚠️ La capa {capa} de {ruta} no tiene CRS definido: se omite")
+            continue
+        gdf, _ = preparar_geometrias(gdf, PARAMETROS_GEOMETRIA['precision_m'], tolerancia_simplificacion_m)
+        prefijo = base if len(capas) == 1 else f"{base}_{capa}"
+        resultado.append((prefijo, gdf))
+    return resultado
+
+
+# FUNCIÓN PARA ARMAR LA LISTA DE PARCELAS A PROCESAR
+def listar_parcelas(entrada, tolerancia_simplificacion_m=0.0):
+    """Lee un directorio o un archivo multicapa y devuelve [(nombre, gdf de un solo lote)]"""
+    if os.path.isdir(entrada):
+        rutas = [
+            os.path.join(entrada, f) for f in sorted(os.listdir(entrada))
+            if f.lower().endswith(EXTENSIONES_PARCELA)
+        ]
+    else:
+        rutas = [entrada]
+
+    parcelas = []
+    for ruta in rutas:
+        try:
+            capas = _leer_archivo_parcelas(ruta, tolerancia_simplificacion_m)
+        except Exception as e:
+            logger.error(f"❌ No se pudo leer {ruta}: {str(e)}")
+            continue
+        for prefijo, gdf in capas:
+            try:
+                if gdf.crs is None:
+                    raise ValueError("la capa no tiene CRS definido")
+                gdf = gdf.to_crs(epsg=4326).reset_index(drop=True)
+            except Exception as e:
+                logger.error(f"❌ No se pudo reproyectar {prefijo} ({ruta}): {str(e)}")
+                continue
+            for i in range(len(gdf)):
+                # Nombre vacío o ausente (NaN/None): se numera por posición
+                nombre_lote = gdf['nombre'].iloc[i] if 'nombre' in gdf.columns else None
+                nombre_lote = str(nombre_lote).strip() if pd.notna(nombre_lote) else ''
+                if nombre_lote:
+                    nombre = f"{prefijo}_{nombre_lote}"
+                elif len(gdf) > 1:
+                    nombre = f"{prefijo}_{i + 1}"
+                else:
+                    nombre = prefijo
+                parcelas.append((_nombre_seguro(nombre), gdf.iloc[[i]][['geometry']].reset_index(drop=True)))
+
+    # Evitar que dos lotes escriban en la misma carpeta
+    vistos = {}
+    for k, (nombre, gdf) in enumerate(parcelas):
+        if nombre in vistos:
+            vistos[nombre] += 1
+            parcelas[k] = (f"{nombre}_{vistos[nombre]}", gdf)
+        else:
+            vistos[nombre] = 1
+    return parcelas
+
+
+def _guardar_pdf(clave, generar, ruta):
+    """Genera el PDF (o lo toma de la caché en disco) y lo escribe en la ruta"""
+    def calcular():
+        buf = generar()
+        return buf.getvalue() if buf is not None else None
+    contenido = recordar(clave, 'pdf', calcular)
+    if contenido is not None:
+        with open(ruta, 'wb') as f:
+            f.write(contenido)
+
+
+def _curvas_cacheadas(gdf, huella, intervalo, resolucion, ruta_dem):
+    """DEM y curvas de nivel con la misma caché en disco que la aplicación (curvas base + filtrado por intervalo)"""
+    def calcular():
+        gdf_curvas, modelo = calcular_curvas_base(gdf, resolucion, ruta_dem)
+        return gdf_curvas, modelo.grilla.a_dict(), modelo.elevacion, modelo.mascara
+    huella_dem = huella_archivo(ruta_dem) if ruta_dem else None
+    clave = clave_cache('curvas_base', VERSION_DEM, huella, resolucion, PARAMETROS_CURVAS_NIVEL['intervalo_base'],
+                        huella_dem)
+    gdf_base, grilla, elevacion, mascara = recordar_partes(clave, ['parquet', 'json', 'npy', 'npy'], calcular)
+    modelo = ModeloDEM(GrillaDEM.desde_dict(grilla), elevacion, mascara)
+    if intervalo_derivable(intervalo):
+        return filtrar_curvas_intervalo(gdf_base, intervalo), modelo
+    return curvas_desde_modelo(modelo, gdf, intervalo), modelo
+
+
+# FUNCIÓN QUE PROCESA UNA PARCELA (SE EJECUTA EN UN PROCESO DEL POOL)
+def procesar_parcela(tarea):
+    """Procesa un lote y, si se pidió, guarda su traza de tiempos (y memoria) por etapa en traza.json"""
+    nombre, wkb, opciones = tarea
+    if not opciones.get('traza') and not opciones.get('memoria'):
+        return _analizar_lote(nombre, wkb, opciones)
+
+    traza = Traza(memoria=opciones.get('memoria', False))
+    with traza.activar():
+        with etapa('lote', lote=nombre):
+            fila = _analizar_lote(nombre, wkb, opciones)
+    carpeta = os.path.join(opciones['salida'], nombre)
+    os.makedirs(carpeta, exist_ok=True)
+    with open(os.path.join(carpeta, 'traza.json'), 'w', encoding='utf-8') as f:
+        f.write(traza.a_json())
+    fila['segundos'] = traza.etapas[0]['segundos']
+    if traza.etapas[0].get('memoria'):
+        fila['memoria_pico_mb'] = traza.etapas[0]['memoria']['pico_mb']
+    return fila
+
+
+def _teselas_en_serie():
+    # Inicializador del pool de lotes: los lotes ya ocupan todos los procesos, así que
+    # las teselas del DEM de cada lote se procesan en serie (sin pools anidados)
+    PARAMETROS_TESELADO['procesos'] = 1
+
+
+def _analizar_lote(nombre, wkb, opciones):
+    """Divide en zonas, ejecuta los análisis pedidos y exporta resultados de un lote"""
+    fila = {'lote': nombre, 'estado': 'ok', 'mensaje': ''}
+    try:
+        gdf = gpd.GeoDataFrame(geometry=gpd.GeoSeries.from_wkb([wkb]), crs="EPSG:4326")
+        carpeta = os.path.join(opciones['salida'], nombre)
+        os.makedirs(carpeta, exist_ok=True)
+
+        cultivo = opciones['cultivo']
+        mes = opciones['mes']
+        nutriente = opciones['nutriente']
+        area_total = float(calcular_superficie(gdf))
+        fila['area_ha'] = round(area_total, 2)
+
+        # Misma clave que la aplicación: los lotes ya analizados desde la UI se reutilizan
+        huella = huella_geometria(gdf)
+        gdf_zonas = recordar(clave_cache('zonas', huella, opciones['zonas']), 'parquet',
+                             lambda: dividir_parcela_en_zonas(gdf, opciones['zonas']))
+        fila['n_zonas'] = len(gdf_zonas)
+        huella_zonas = huella_geometria(gdf_zonas)
+
+        gdf_textura = None
+        if 'textura' in opciones['analisis'] or opciones['pdf']:
+            gdf_textura = recordar(clave_cache('textura', huella_zonas, cultivo, mes), 'parquet',
+                                   lambda: analizar_textura_suelo_vectorizado(gdf_zonas, cultivo, mes))
+
+        for clave in opciones['analisis']:
+            tipo = ANALISIS_CLI[clave]
+            if clave in ('fertilidad', 'npk'):
+                resultado = recordar(clave_cache('indices', huella_zonas, cultivo, mes, tipo, nutriente), 'parquet',
+                                     lambda: calcular_indices_gee_vectorizado(gdf_zonas, cultivo, mes, tipo, nutriente))
+                columna = 'indice_fertilidad' if clave == 'fertilidad' else 'recomendacion_npk'
+                fila[f'{columna}_prom'] = round(float(resultado[columna].mean()), 3)
+                if opciones['pdf']:
+                    _guardar_pdf(
+                        clave_cache('informe', huella_geometria(resultado), huella_geometria(gdf_textura), cultivo, tipo,
+                                    nutriente, mes, float(area_total)),
+                        lambda: generar_informe_pdf(resultado, cultivo, tipo, nutriente, mes, area_total, gdf_textura),
+                        os.path.join(carpeta, f"informe_{clave}.pdf")
+                    )
+            elif clave == 'textura':
+                resultado = gdf_textura
+                fila['adecuacion_textura_prom'] = round(float(resultado['adecuacion_textura'].mean()), 3)
+                fila['textura_predominante'] = resultado['textura_suelo'].mode().iloc[0]
+                if opciones['pdf']:
+                    _guardar_pdf(
+                        # Como en la aplicación, el informe de textura lleva la textura como resultado y como anexo
+                        clave_cache('informe', huella_geometria(resultado), huella_geometria(resultado), cultivo, tipo,
+                                    "", mes, float(area_total)),
+                        lambda: generar_informe_pdf(resultado, cultivo, tipo, "", mes, area_total, resultado),
+                        os.path.join(carpeta, "informe_textura.pdf")
+                    )
+            elif clave == 'ndwi':
+                resultado = recordar(clave_cache('ndwi', huella_zonas, cultivo, mes), 'parquet',
+                                     lambda: analizar_ndwi_suelo_vectorizado(gdf_zonas, cultivo, mes))
+                fila['ndwi_suelo_prom'] = round(float(resultado['ndwi_suelo'].mean()), 3)
+                if opciones['pdf']:
+                    _guardar_pdf(
+                        clave_cache('informe_ndwi', huella_zonas, cultivo, mes, float(area_total)),
+                        lambda: generar_informe_ndwi_pdf(resultado, cultivo, mes, area_total),
+                        os.path.join(carpeta, "informe_ndwi.pdf")
+                    )
+            else:
+                resultado, modelo = _curvas_cacheadas(
+                    gdf, huella, opciones['intervalo_curvas'], opciones['resolucion_dem'], opciones['dem']
+                )
+                fila['n_curvas'] = len(resultado)
+                fila['pendiente_prom'] = round(float(calcular_estadisticas_pendiente(modelo.pendiente, modelo.grilla.area_celda_m2)['promedio']), 2)
+                zonas_agua, resumen_agua = recordar_partes(
+                    clave_cache('encharcamiento', VERSION_DEM, huella, opciones['resolucion_dem'],
+                                huella_archivo(opciones['dem']) if opciones['dem'] else None, PARAMETROS_HIDROLOGIA),
+                    ['parquet', 'json'], lambda: inventario_encharcamiento(modelo, gdf)
+                )
+                fila['encharcamiento_ha'] = round(resumen_agua['area_ha'], 2)
+                fila['encharcamiento_m3'] = round(resumen_agua['volumen_m3'], 1)
+                if opciones['geojson'] and not zonas_agua.empty:
+                    zonas_agua.to_file(os.path.join(carpeta, "encharcamiento.geojson"), driver='GeoJSON')
+                if opciones['pdf']:
+                    _guardar_pdf(
+                        clave_cache('informe', huella_geometria(resultado), None, cultivo, tipo, None, mes, float(area_total)),
+                        lambda: generar_informe_pdf(resultado, cultivo, tipo, None, mes, area_total, None),
+                        os.path.join(carpeta, "informe_curvas.pdf")
+                    )
+
+            if opciones['geojson'] and resultado is not None and not resultado.empty:
+                resultado.to_file(os.path.join(carpeta, f"{clave}.geojson"), driver='GeoJSON')
+
+    except Exception as e:
+        fila['estado'] = 'error'
+        fila['mensaje'] = str(e)
+    return fila
+
+
+def crear_parser():
+    parser = argparse.ArgumentParser(
+        prog='python -m analizador',
+        description="Analiza muchas parcelas por lotes (zonificación, análisis e informes)"
+    )
+    parser.add_argument('entrada', help="Directorio con parcelas o archivo (ZIP, KML/KMZ, GPKG multicapa, GeoJSON)")
+    parser.add_argument('--cultivo', required=True, choices=list(PARAMETROS_CULTIVOS.keys()))
+    parser.add_argument('--mes', required=True, choices=list(FACTORES_MES.keys()))
+    parser.add_argument('--analisis', nargs='+', choices=list(ANALISIS_CLI.keys()),
+                        default=list(ANALISIS_CLI.keys()), help="Análisis a ejecutar (por defecto todos)")
+    parser.add_argument('--nutriente', choices=NUTRIENTES_CLI, default="NITRÓGENO")
+    parser.add_argument('--zonas', type=int, default=24, help="Número de zonas de manejo por lote")
+    parser.add_argument('--intervalo-curvas', type=float, default=5.0, help="Intervalo entre curvas (metros)")
+    parser.add_argument('--resolucion-dem', type=float, default=10.0, help="Resolución DEM (metros)")
+    parser.add_argument('--dem', metavar='RUTA', help="DEM local (GeoTIFF, ASCII grid o nube LiDAR LAS/XYZ) en lugar del DEM sintético")
+    parser.add_argument('--simplificar', type=float, default=0.0, help="Tolerancia de simplificación (metros)")
+    parser.add_argument('--pdf', action='store_true', help="Generar informes PDF por lote")
+    parser.add_argument('--geojson', action='store_true', help="Exportar resultados por zona en GeoJSON")
+    parser.add_argument('--salida', default='resultados', help="Directorio de salida")
+    parser.add_argument('--traza', action='store_true', help="Guardar tiempos por etapa de cada lote en traza.json")
+    parser.add_argument('--memoria', action='store_true',
+                        help="Agregar a traza.json el perfil de memoria por etapa (tracemalloc, más lento)")
+    parser.add_argument('--procesos', type=int, default=os.cpu_count() or 1, help="Procesos en paralelo")
+    return parser
+
+
+def main(argv=None):
+    args = crear_parser().parse_args(argv)
+    logging.basicConfig(level=logging.WARNING, format='%(levelname)s %(message)s')
+    logging.getLogger('analizador').setLevel(logging.INFO)
+
+    parcelas = listar_parcelas(args.entrada, args.simplificar)
+    if not parcelas:
+        logger.error("❌ No se encontraron parcelas en la entrada")
+        return 1
+
+    os.makedirs(args.salida, exist_ok=True)
+    opciones = {
+        'cultivo': args.cultivo,
+        'mes': args.mes,
+        'analisis': args.analisis,
+        'nutriente': args.nutriente,
+        'zonas': args.zonas,
+        'intervalo_curvas': args.intervalo_curvas,
+        'resolucion_dem': args.resolucion_dem,
+        'dem': os.path.abspath(args.dem) if args.dem else None,
+        'pdf': args.pdf,
+        'geojson': args.geojson,
+        'salida': args.salida,
+        'traza': args.traza,
+        'memoria': args.memoria,
+    }
+    # Lotes con la misma huella canónica (p. ej. el mismo campo en KML y en shapefile)
+    # se procesan una sola vez y sus resultados se copian
+    originales = {}
+    duplicados = []
+    unicos = []
+    for nombre, gdf in parcelas:
+        huella = huella_geometria(gdf)
+        if huella in originales:
+            duplicados.append((nombre, originales[huella]))
+        else:
+            originales[huella] = nombre
+            unicos.append((nombre, gdf))
+
+    # Solo la geometría en WKB viaja a los procesos: es mucho más liviana de serializar
+    tareas = [(nombre, gdf.geometry.iloc[0].wkb, opciones) for nombre, gdf in unicos]
+    logger.info(f"📦 {len(tareas)} lotes a procesar con {args.procesos} procesos "
+                f"({len(duplicados)} repetidos se copian)")
+
+    filas = []
+    if args.procesos <= 1:
+        for tarea in tareas:
+            filas.append(procesar_parcela(tarea))
+            logger.info(f"[{len(filas)}/{len(tareas)}] {filas[-1]['lote']}: {filas[-1]['estado']}")
+    else:
+        with ProcessPoolExecutor(max_workers=args.procesos, initializer=_teselas_en_serie) as pool:
+            futuros = [pool.submit(procesar_parcela, tarea) for tarea in tareas]
+            for futuro in as_completed(futuros):
+                filas.append(futuro.result())
+                logger.info(f"[{len(filas)}/{len(tareas)}] {filas[-1]['lote']}: {filas[-1]['estado']}")
+
+    por_nombre = {fila['lote']: fila for fila in filas}
+    for nombre, original in duplicados:
+        origen = os.path.join(args.salida, original)
+        if os.path.isdir(origen):
+            shutil.copytree(origen, os.path.join(args.salida, nombre), dirs_exist_ok=True)
+        filas.append(dict(por_nombre[original], lote=nombre, duplicado_de=original))
+
+    resumen = pd.DataFrame(filas).sort_values('lote')
+    resumen.to_csv(os.path.join(args.salida, 'resumen.csv'), index=False)
+
+    errores = resumen[resumen['estado'] == 'error']
+    for _, fila in errores.iterrows():
+        logger.error(f"❌ {fila['lote']}: {fila['mensaje']}")
+    logger.info(f"✅ {len(resumen) - len(errores)} lotes procesados, {len(errores)} con error. Resumen en {args.salida}")
+    return 1 if len(errores) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,208 @@
+"""Modelo de grilla y contenedor compacto del DEM en un CRS proyectado (metros).
+
+Una GrillaDEM describe una grilla regular de nodos por su origen, tamaño de celda y
+forma, sin guardar las mallas de coordenadas: las coordenadas de cualquier nodo se
+obtienen con celda_a_mundo() y la celda de cualquier punto con mundo_a_celda().
+La fila 0 es la del sur (y crece con la fila), igual que las grillas de np.meshgrid
+que usaba el motor de curvas de nivel.
+
+Un ModeloDEM guarda la elevación en float32 sobre una GrillaDEM, recortada a la
+parcela, y deriva pendiente, aspecto y curvaturas (derivadas.py) solo cuando se piden.
+"""
+from functools import partial
+
+import numpy as np
+from pyproj import CRS, Transformer
+
+from .derivadas import derivadas_terreno, pendiente_grados
+from .teselado import aplicar_por_teselas
+
+
+class GrillaDEM:
+    """Grilla regular de nodos: origen (nodo 0, 0), tamaño de celda en metros y forma (filas, columnas)"""
+
+    def __init__(self, origen_x, origen_y, tamano_x, tamano_y, filas, columnas, crs):
+        self.origen_x = float(origen_x)
+        self.origen_y = float(origen_y)
+        self.tamano_x = float(tamano_x)
+        self.tamano_y = float(tamano_y)
+        self.filas = int(filas)
+        self.columnas = int(columnas)
+        self.crs = CRS.from_user_input(crs) if crs is not None else None
+
+    @classmethod
+    def desde_limites(cls, minx, miny, maxx, maxy, resolucion, crs, min_nodos=10):
+        """Grilla de celdas cuadradas que cubre los límites; si la resolución deja menos
+        de min_nodos nodos en el lado corto, se achica la celda"""
+        ancho = max(maxx - minx, 0.0)
+        alto = max(maxy - miny, 0.0)
+        lado_corto = min(ancho, alto)
+        if lado_corto > 0 and lado_corto / resolucion < min_nodos - 1:
+            resolucion = lado_corto / (min_nodos - 1)
+        columnas = max(int(np.floor(ancho / resolucion)) + 1, 2)
+        filas = max(int(np.floor(alto / resolucion)) + 1, 2)
+        return cls(minx, miny, resolucion, resolucion, filas, columnas, crs)
+
+    @property
+    def forma(self):
+        return (self.filas, self.columnas)
+
+    @property
+    def transformada(self):
+        """Transformada afín (x0, dx, 0, y0, 0, dy) al estilo GDAL, referida a los nodos"""
+        return (self.origen_x, self.tamano_x, 0.0, self.origen_y, 0.0, self.tamano_y)
+
+    @property
+    def area_celda_m2(self):
+        return abs(self.tamano_x * self.tamano_y)
+
+    @property
+    def limites(self):
+        """(minx, miny, maxx, maxy) de los nodos en el CRS de la grilla"""
+        x_fin = self.origen_x + (self.columnas - 1) * self.tamano_x
+        y_fin = self.origen_y + (self.filas - 1) * self.tamano_y
+        return (min(self.origen_x, x_fin), min(self.origen_y, y_fin),
+                max(self.origen_x, x_fin), max(self.origen_y, y_fin))
+
+    def ejes(self):
+        """Coordenadas 1D de las columnas (x) y las filas (y)"""
+        x = self.origen_x + np.arange(self.columnas) * self.tamano_x
+        y = self.origen_y + np.arange(self.filas) * self.tamano_y
+        return x, y
+
+    def celda_a_mundo(self, filas, columnas):
+        """Coordenadas (x, y) de índices de fila/columna (admite fracciones y arreglos)"""
+        x = self.origen_x + np.asarray(columnas, dtype=float) * self.tamano_x
+        y = self.origen_y + np.asarray(filas, dtype=float) * self.tamano_y
+        return x, y
+
+    def mundo_a_celda(self, x, y):
+        """Índices fraccionarios (fila, columna) de coordenadas en el CRS de la grilla"""
+        columnas = (np.asarray(x, dtype=float) - self.origen_x) / self.tamano_x
+        filas = (np.asarray(y, dtype=float) - self.origen_y) / self.tamano_y
+        return filas, columnas
+
+    def coordenadas_geograficas(self, filas, columnas, crs_destino='EPSG:4326'):
+        """(lon, lat) de los nodos pedidos, para mapas web y exportaciones"""
+        x, y = self.celda_a_mundo(filas, columnas)
+        if self.crs is None:
+            return x, y
+        transformador = Transformer.from_crs(self.crs, crs_destino, always_xy=True)
+        return transformador.transform(x, y)
+
+    def a_dict(self):
+        """Representación serializable en JSON (caché en disco)"""
+        return {
+            'origen_x': self.origen_x, 'origen_y': self.origen_y,
+            'tamano_x': self.tamano_x, 'tamano_y': self.tamano_y,
+            'filas': self.filas, 'columnas': self.columnas,
+            'crs': self.crs.to_wkt() if self.crs is not None else None,
+        }
+
+    @classmethod
+    def desde_dict(cls, datos):
+        return cls(datos['origen_x'], datos['origen_y'], datos['tamano_x'], datos['tamano_y'],
+                   datos['filas'], datos['columnas'], datos['crs'])
+
+    def __repr__(self):
+        return (f"GrillaDEM({self.filas}x{self.columnas}, celda {self.tamano_x:g}x{self.tamano_y:g} m, "
+                f"origen ({self.origen_x:.1f}, {self.origen_y:.1f}))")
+
+
+# FUNCIÓN: MÁSCARA DE NODOS DENTRO DE UN POLÍGONO
+def mascara_poligono(grilla, geometria, bloque_filas=512):
+    """Nodos de la grilla dentro de la geometría (en el CRS de la grilla), por bloques de filas"""
+    import shapely
+    shapely.prepare(geometria)
+    x, y = grilla.ejes()
+    mascara = np.zeros(grilla.forma, dtype=bool)
+    for inicio in range(0, grilla.filas, bloque_filas):
+        X, Y = np.meshgrid(x, y[inicio:inicio + bloque_filas])
+        mascara[inicio:inicio + bloque_filas] = shapely.contains_xy(geometria, X, Y)
+    return mascara
+
+
+class ModeloDEM:
+    """DEM compacto para guardar en sesión y en caché.
+
+    Guarda la elevación en float32 sobre una GrillaDEM (sin mallas de coordenadas),
+    con NaN fuera de la parcela salvo un anillo de una celda que necesitan las
+    derivadas y las curvas en el borde. `mascara` marca los nodos dentro de la parcela.
+    Pendiente, aspecto y curvaturas se derivan juntos la primera vez que se pide alguno.
+    """
+
+    def __init__(self, grilla, elevacion, mascara=None):
+        self.grilla = grilla
+        self.elevacion = np.asarray(elevacion, dtype=np.float32)
+        self.mascara = np.asarray(mascara, dtype=bool) if mascara is not None else ~np.isnan(self.elevacion)
+        self._derivadas = None
+
+    @classmethod
+    def desde_parcela(cls, grilla, elevacion, geometria):
+        """Recorta la elevación a la geometría (en el CRS de la grilla) más un anillo de una celda.
+        Los nodos sin dato (NaN, p. ej. huecos de un DEM de archivo) quedan fuera de la máscara."""
+        from scipy.ndimage import binary_dilation
+        mascara = mascara_poligono(grilla, geometria) & ~np.isnan(elevacion)
+        if not mascara.any():
+            # Parcela más chica que una celda: se conserva toda la grilla
+            mascara = ~np.isnan(elevacion)
+        ampliada = binary_dilation(mascara, structure=np.ones((3, 3), dtype=bool))
+        elevacion = np.where(ampliada, elevacion, np.nan).astype(np.float32)
+        return cls(grilla, elevacion, mascara)
+
+    @property
+    def forma(self):
+        return self.elevacion.shape
+
+    def _derivada(self, nombre):
+        if self._derivadas is None:
+            # Por teselas en grillas grandes: los temporales float64 ocupan una tesela, no la grilla
+            operador = partial(derivadas_terreno, tamano_x=self.grilla.tamano_x, tamano_y=self.grilla.tamano_y)
+            pendiente, aspecto, perfil, plano = aplicar_por_teselas(
+                operador, [self.elevacion, self.mascara], (np.float32,) * 4, halo=1
+            )
+            self._derivadas = {'pendiente': pendiente, 'aspecto': aspecto,
+                               'curvatura_perfil': perfil, 'curvatura_plano': plano}
+        return self._derivadas[nombre]
+
+    @property
+    def pendiente(self):
+        """Pendiente (%) de Horn con el tamaño real de celda; NaN fuera de la parcela"""
+        return self._derivada('pendiente')
+
+    @property
+    def pendiente_grados(self):
+        """Pendiente en grados (se calcula de la pendiente en %, no se guarda)"""
+        return pendiente_grados(self.pendiente)
+
+    @property
+    def aspecto(self):
+        """Azimut (grados 0-360, 0 = norte) hacia donde baja la ladera; NaN en terreno plano y fuera de la parcela"""
+        return self._derivada('aspecto')
+
+    @property
+    def curvatura_perfil(self):
+        """Curvatura en la dirección de la pendiente (1/m): negativa donde el escurrimiento frena (cóncava)"""
+        return self._derivada('curvatura_perfil')
+
+    @property
+    def curvatura_plano(self):
+        """Curvatura transversal a la pendiente (1/m): negativa donde el escurrimiento converge"""
+        return self._derivada('curvatura_plano')
+
+    def liberar_derivadas(self):
+        """Descarta las derivadas (se vuelven a calcular si se piden)"""
+        self._derivadas = None
+
+    def elevacion_parcela(self):
+        """Copia de la elevación con NaN en todo nodo fuera de la parcela"""
+        return np.where(self.mascara, self.elevacion, np.float32(np.nan))
+
+    @property
+    def nbytes(self):
+        """Bytes de los arreglos en memoria (elevación, máscara y derivadas ya calculadas)"""
+        arreglos = [self.elevacion, self.mascara] + list((self._derivadas or {}).values())
+        return int(sum(a.nbytes for a in arreglos))
+
+    def __repr__(self):
+        return f"ModeloDEM({self.grilla!r}, {self.nbytes / 1e6:.1f} MB)"
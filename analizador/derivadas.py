@@ -0,0 +1,85 @@
+"""Derivadas del terreno con ventanas de 3x3 nodos.
+
+La pendiente y el aspecto usan el operador de Horn (1981): diferencias centrales
+ponderadas 1-2-1 sobre las tres filas/columnas de la ventana, menos sensibles al
+ruido que el gradiente de un solo par de vecinos. Las curvaturas de perfil y de plano
+usan las segundas derivadas de Zevenbergen y Thorne (1987) sobre la misma ventana.
+
+Cada eje usa su propio tamaño de celda (con signo: la fila 0 es la del sur y la y
+crece con la fila). Un vecino sin dato (NaN o fuera de la grilla) se extrapola
+linealmente desde el nodo central y el vecino opuesto (2·z - opuesto) o, en las
+diagonales, desde los dos vecinos ortogonales; si tampoco hay, toma el valor
+central. El borde de la parcela y los huecos de un DEM de archivo conservan
+pendiente en lugar de quedar en NaN, y un plano inclinado da la misma pendiente en
+el borde que en el interior (repetir el nodo central, como compute_edges de GDAL,
+la subestima).
+Solo usan un vecino por lado: por teselas alcanza un halo de 1.
+"""
+import numpy as np
+
+
+def _ventana(z):
+    """Función (df, dc) -> vecino desplazado de cada nodo, extrapolado donde falta"""
+    filas, columnas = z.shape
+    ampliada = np.pad(z, 1, mode='constant', constant_values=np.nan)
+
+    def desplazado(df, dc):
+        return ampliada[1 + df:1 + df + filas, 1 + dc:1 + dc + columnas]
+
+    def vecino(df, dc):
+        v = desplazado(df, dc)
+        falta = np.isnan(v)
+        if not falta.any():
+            return v
+        v = np.where(falta, 2 * z - desplazado(-df, -dc), v)
+        if df and dc:
+            v = np.where(np.isnan(v), vecino(df, 0) + vecino(0, dc) - z, v)
+        return np.where(np.isnan(v), z, v)
+    return vecino
+
+
+# FUNCIÓN: DERIVADAS DE HORN / ZEVENBERGEN-THORNE
+def derivadas_terreno(elevacion, mascara, tamano_x, tamano_y):
+    """Pendiente (%), aspecto (azimut 0-360 de la dirección de máxima bajada, NaN en
+    terreno plano), curvatura de perfil y de plano (1/m, positiva en laderas convexas);
+    float32 con NaN fuera de la máscara"""
+    z = np.asarray(elevacion, dtype=np.float64)
+    v = _ventana(z)
+    noroeste, norte, noreste = v(1, -1), v(1, 0), v(1, 1)
+    oeste, este = v(0, -1), v(0, 1)
+    suroeste, sur, sureste = v(-1, -1), v(-1, 0), v(-1, 1)
+
+    # Primeras derivadas (Horn): p = dz/dx (este), q = dz/dy (norte)
+    p = ((noreste + 2 * este + sureste) - (noroeste + 2 * oeste + suroeste)) / (8 * tamano_x)
+    q = ((noroeste + 2 * norte + noreste) - (suroeste + 2 * sur + sureste)) / (8 * tamano_y)
+    # Segundas derivadas (Zevenbergen-Thorne)
+    r = (oeste - 2 * z + este) / tamano_x**2
+    t = (sur - 2 * z + norte) / tamano_y**2
+    s = (noreste - noroeste - sureste + suroeste) / (4 * tamano_x * tamano_y)
+    del noroeste, norte, noreste, oeste, este, suroeste, sur, sureste
+
+    gradiente2 = p**2 + q**2
+    pendiente = np.sqrt(gradiente2) * 100  # En porcentaje
+    plano = gradiente2 == 0
+    aspecto = np.mod(np.degrees(np.arctan2(-p, -q)), 360)
+    aspecto[plano] = np.nan
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        curvatura_perfil = -(p**2 * r + 2 * p * q * s + q**2 * t) / (gradiente2 * (1 + gradiente2)**1.5)
+        curvatura_plano = -(q**2 * r - 2 * p * q * s + p**2 * t) / gradiente2**1.5
+    # Sin gradiente no hay dirección de flujo: las curvaturas direccionales son nulas
+    curvatura_perfil[plano] = 0
+    curvatura_plano[plano] = 0
+
+    fuera = ~np.asarray(mascara, dtype=bool) | np.isnan(z)
+    resultados = []
+    for arreglo in (pendiente, aspecto, curvatura_perfil, curvatura_plano):
+        arreglo[fuera] = np.nan
+        resultados.append(arreglo.astype(np.float32, copy=False))
+    return tuple(resultados)
+
+
+# FUNCIÓN: PENDIENTE EN GRADOS
+def pendiente_grados(pendiente_porcentaje):
+    """Convierte pendiente en porcentaje a grados"""
+    return np.degrees(np.arctan(np.asarray(pendiente_porcentaje) / 100)).astype(np.float32)
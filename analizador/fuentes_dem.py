@@ -0,0 +1,364 @@
+"""Lectura de DEMs locales (GeoTIFF o ESRI ASCII grid) recortados a la parcela.
+
+Solo se lee la ventana que cubre la parcela más un margen, de modo que sirven
+mosaicos provinciales de varios GB:
+
+- GeoTIFF: con rasterio (si está instalado) por lectura con ventana; sin rasterio,
+  un lector propio mapea en memoria (np.memmap) solo las tiras o teselas de la
+  ventana. Este lector admite GeoTIFF y BigTIFF sin compresión, de una banda, con
+  CRS por código EPSG.
+- ESRI ASCII (.asc): se recorre línea a línea y solo se convierten las filas de la
+  ventana. El CRS sale del .prj vecino si existe.
+- Nubes de puntos LiDAR (.las sin compresión, .xyz): se rasterizan por bloques
+  directamente en la grilla de análisis (ver nube_puntos).
+
+La ventana se remuestrea (bilineal) a la grilla de análisis en el CRS métrico de la
+parcela, con NaN donde el DEM no tiene datos.
+"""
+import hashlib
+import importlib.util
+import logging
+import os
+import struct
+
+import numpy as np
+from pyproj import CRS, Transformer
+
+from .dem import GrillaDEM
+from .geometria import obtener_crs_metrico
+from .instrumentacion import medir_etapa
+from .nube_puntos import EXTENSIONES_NUBE, rasterizar_nube_puntos
+from .parametros import PARAMETROS_FUENTES_DEM
+
+logger = logging.getLogger(__name__)
+
+EXTENSIONES_DEM = {'.tif': 'geotiff', '.tiff': 'geotiff', '.asc': 'ascii', **EXTENSIONES_NUBE}
+
+
+# FUNCIÓN: HUELLA DE UN ARCHIVO DEM
+def huella_archivo(ruta):
+    """Identifica la versión de un archivo para claves de caché (ruta, tamaño y fecha de modificación)"""
+    info = os.stat(ruta)
+    texto = f"{os.path.abspath(ruta)}|{info.st_size}|{info.st_mtime_ns}"
+    return hashlib.sha256(texto.encode('utf-8')).hexdigest()
+
+
+# FUNCIÓN: MOSAICOS DEM DEL SERVIDOR
+def directorio_dem_local():
+    """Directorio de mosaicos DEM del servidor que la aplicación puede leer por ruta, o None.
+
+    Solo para administradores: hace falta ANALIZADOR_DEM_LOCAL_ADMIN y un directorio en
+    ANALIZADOR_DEM_DIR; sin ambos la aplicación solo acepta DEMs subidos."""
+    if os.environ.get('ANALIZADOR_DEM_LOCAL_ADMIN', '').lower() not in ('1', 'true', 'si', 'sí'):
+        return None
+    directorio = os.environ.get('ANALIZADOR_DEM_DIR')
+    return os.path.realpath(directorio) if directorio and os.path.isdir(directorio) else None
+
+
+def resolver_dem_local(ruta, directorio):
+    """Ruta real de un DEM dentro de `directorio` (relativa a él o absoluta), o None si
+    sale del directorio (.., enlaces simbólicos), no existe o no es un formato de DEM"""
+    real = os.path.realpath(os.path.join(directorio, ruta))
+    if os.path.commonpath([real, directorio]) != directorio:
+        return None
+    if not os.path.isfile(real) or os.path.splitext(real)[1].lower() not in EXTENSIONES_DEM:
+        return None
+    return real
+
+
+def _tipo_archivo(ruta):
+    tipo = EXTENSIONES_DEM.get(os.path.splitext(ruta)[1].lower())
+    if tipo is None:
+        raise ValueError(f"Formato de DEM no soportado: {os.path.basename(ruta)} (use .tif, .asc, .las o .xyz)")
+    return tipo
+
+
+def _crs_prj(ruta):
+    """CRS del .prj junto al archivo, o None si no hay"""
+    ruta_prj = os.path.splitext(ruta)[0] + '.prj'
+    if not os.path.exists(ruta_prj):
+        return None
+    with open(ruta_prj, 'r', encoding='latin-1') as prj:
+        return CRS.from_user_input(prj.read())
+
+
+def _ventana_pixeles(limites, transformada, alto, ancho, margen_pixeles):
+    """Filas y columnas [f0, f1) x [c0, c1) de los píxeles que cubren los límites, recortadas al raster"""
+    x0, dx, rotacion_x, y0, rotacion_y, dy = transformada
+    if rotacion_x or rotacion_y:
+        raise ValueError("DEM con transformada rotada: no se admite, remuestréelo a una grilla norte-arriba")
+    minx, miny, maxx, maxy = limites
+    columnas = sorted(((minx - x0) / dx, (maxx - x0) / dx))
+    filas = sorted(((maxy - y0) / dy, (miny - y0) / dy))
+    c0 = max(int(np.floor(columnas[0])) - margen_pixeles, 0)
+    c1 = min(int(np.ceil(columnas[1])) + margen_pixeles, ancho)
+    f0 = max(int(np.floor(filas[0])) - margen_pixeles, 0)
+    f1 = min(int(np.ceil(filas[1])) + margen_pixeles, alto)
+    if c0 >= c1 or f0 >= f1:
+        raise ValueError("La parcela queda fuera de la extensión del DEM")
+    return f0, f1, c0, c1
+
+
+# LECTOR DE GEOTIFF SIN COMPRESIÓN (SIN RASTERIO)
+_TIPOS_TIFF = {1: 'B', 2: 's', 3: 'H', 4: 'I', 5: 'II', 6: 'b', 7: 'B', 8: 'h', 9: 'i', 10: 'ii',
+               11: 'f', 12: 'd', 16: 'Q', 17: 'q', 18: 'Q'}
+_DTYPES_TIFF = {(1, 8): 'u1', (1, 16): 'u2', (1, 32): 'u4', (2, 8): 'i1', (2, 16): 'i2', (2, 32): 'i4',
+                (3, 32): 'f4', (3, 64): 'f8'}
+
+
+def _leer_etiquetas_tiff(f):
+    """Etiquetas del primer IFD de un TIFF o BigTIFF: {etiqueta: tupla de valores}, más el orden de bytes"""
+    orden = {b'II': '<', b'MM': '>'}.get(f.read(2))
+    if orden is None:
+        raise ValueError("El archivo no es un TIFF")
+    version, = struct.unpack(orden + 'H', f.read(2))
+    if version == 42:
+        offset, = struct.unpack(orden + 'I', f.read(4))
+        formato_cantidad, formato_entrada, tam_valor = 'H', 'HHII', 4
+    elif version == 43:
+        f.read(4)  # tamaño de offsets (8) y relleno
+        offset, = struct.unpack(orden + 'Q', f.read(8))
+        formato_cantidad, formato_entrada, tam_valor = 'Q', 'HHQQ', 8
+    else:
+        raise ValueError("El archivo no es un TIFF")
+
+    f.seek(offset)
+    cantidad, = struct.unpack(orden + formato_cantidad, f.read(struct.calcsize(orden + formato_cantidad)))
+    tam_entrada = struct.calcsize(orden + formato_entrada)
+    entradas = [struct.unpack(orden + formato_entrada, f.read(tam_entrada)) for _ in range(cantidad)]
+
+    etiquetas = {}
+    for etiqueta, tipo, n, valor in entradas:
+        codigo = _TIPOS_TIFF.get(tipo)
+        if codigo is None:
+            continue
+        formato = orden + codigo * n if codigo != 's' else f"{orden}{n}s"
+        tamano = struct.calcsize(formato)
+        if tamano <= tam_valor:
+            crudo = struct.pack(orden + ('I' if tam_valor == 4 else 'Q'), valor)[:tamano]
+        else:
+            f.seek(valor)
+            crudo = f.read(tamano)
+        valores = struct.unpack(formato, crudo)
+        if codigo == 's':
+            valores = (valores[0].rstrip(b'\x00').decode('latin-1'),)
+        elif tipo in (5, 10):  # racionales: pares numerador/denominador
+            valores = tuple(valores[i] / valores[i + 1] for i in range(0, len(valores), 2))
+        etiquetas[etiqueta] = valores
+    return etiquetas, orden
+
+
+def _georreferencia_tiff(etiquetas):
+    """Transformada (esquinas de píxel) y CRS a partir de las etiquetas GeoTIFF"""
+    if 33550 in etiquetas and 33922 in etiquetas:
+        escala_x, escala_y = etiquetas[33550][:2]
+        i, j, _, x, y, _ = etiquetas[33922][:6]
+        transformada = [x - i * escala_x, escala_x, 0.0, y + j * escala_y, 0.0, -escala_y]
+    elif 34264 in etiquetas:
+        m = etiquetas[34264]
+        if m[1] != 0 or m[4] != 0:
+            raise ValueError("GeoTIFF rotado: instale rasterio para leerlo")
+        transformada = [m[3], m[0], 0.0, m[7], 0.0, m[5]]
+    else:
+        raise ValueError("El TIFF no tiene georreferencia (ModelPixelScale/ModelTiepoint)")
+
+    claves = {}
+    directorio = etiquetas.get(34735, ())
+    for k in range(4, len(directorio), 4):
+        id_clave, ubicacion, _, valor = directorio[k:k + 4]
+        if ubicacion == 0:
+            claves[id_clave] = valor
+    if claves.get(1025) == 2:  # PixelIsPoint: el punto de enlace es el centro del píxel
+        transformada[0] -= transformada[1] / 2
+        transformada[3] -= transformada[5] / 2
+    epsg = claves.get(3072) or claves.get(2048)
+    if not epsg or epsg == 32767:
+        raise ValueError("El GeoTIFF no declara un código EPSG: instale rasterio para leerlo")
+    return tuple(transformada), CRS.from_epsg(epsg)
+
+
+def _leer_ventana_tiff_memmap(ruta, limites_fuente_fn, margen_pixeles):
+    """Lee la ventana con np.memmap sobre las tiras o teselas que la cubren"""
+    with open(ruta, 'rb') as f:
+        etiquetas, orden = _leer_etiquetas_tiff(f)
+    if etiquetas.get(259, (1,))[0] != 1:
+        raise ValueError("GeoTIFF comprimido: instale rasterio para leerlo")
+    if etiquetas.get(277, (1,))[0] != 1 and etiquetas.get(284, (1,))[0] != 2:
+        raise ValueError("GeoTIFF de varias bandas intercaladas: instale rasterio para leerlo")
+    ancho, alto = etiquetas[256][0], etiquetas[257][0]
+    bits = etiquetas.get(258, (8,))[0]
+    formato_muestra = etiquetas.get(339, (1,))[0]
+    if (formato_muestra, bits) not in _DTYPES_TIFF:
+        raise ValueError(f"Tipo de dato de GeoTIFF no soportado ({bits} bits, formato {formato_muestra})")
+    dtype = np.dtype(orden + _DTYPES_TIFF[(formato_muestra, bits)])
+
+    transformada, crs = _georreferencia_tiff(etiquetas)
+    f0, f1, c0, c1 = _ventana_pixeles(limites_fuente_fn(crs), transformada, alto, ancho, margen_pixeles)
+    ventana = np.empty((f1 - f0, c1 - c0), dtype=dtype)
+
+    if 322 in etiquetas:  # teselas
+        ancho_tesela, alto_tesela = etiquetas[322][0], etiquetas[323][0]
+        offsets = etiquetas[324]
+        teselas_por_fila = -(-ancho // ancho_tesela)
+        for tf in range(f0 // alto_tesela, (f1 - 1) // alto_tesela + 1):
+            for tc in range(c0 // ancho_tesela, (c1 - 1) // ancho_tesela + 1):
+                tesela = np.memmap(ruta, dtype=dtype, mode='r', offset=offsets[tf * teselas_por_fila + tc],
+                                   shape=(alto_tesela, ancho_tesela))
+                fa, fb = max(f0, tf * alto_tesela), min(f1, (tf + 1) * alto_tesela)
+                ca, cb = max(c0, tc * ancho_tesela), min(c1, (tc + 1) * ancho_tesela)
+                ventana[fa - f0:fb - f0, ca - c0:cb - c0] = tesela[fa - tf * alto_tesela:fb - tf * alto_tesela,
+                                                                   ca - tc * ancho_tesela:cb - tc * ancho_tesela]
+                del tesela
+    else:  # tiras de filas completas
+        filas_por_tira = min(etiquetas.get(278, (alto,))[0], alto)
+        offsets = etiquetas[273]
+        for t in range(f0 // filas_por_tira, (f1 - 1) // filas_por_tira + 1):
+            filas_tira = min(filas_por_tira, alto - t * filas_por_tira)
+            tira = np.memmap(ruta, dtype=dtype, mode='r', offset=offsets[t], shape=(filas_tira, ancho))
+            fa, fb = max(f0, t * filas_por_tira), min(f1, t * filas_por_tira + filas_tira)
+            ventana[fa - f0:fb - f0] = tira[fa - t * filas_por_tira:fb - t * filas_por_tira, c0:c1]
+            del tira
+
+    z = ventana.astype(np.float32)
+    if 42113 in etiquetas:  # GDAL_NODATA
+        try:
+            z[z == np.float32(float(etiquetas[42113][0]))] = np.nan
+        except ValueError:
+            pass
+    x0, dx, _, y0, _, dy = transformada
+    return z, (x0 + c0 * dx, dx, 0.0, y0 + f0 * dy, 0.0, dy), crs
+
+
+def _hay_rasterio():
+    # rasterio (opcional) carga GDAL: se importa recién al leer un GeoTIFF, no con el paquete.
+    # Sin rasterio se usa el lector de GeoTIFF sin compresión
+    return importlib.util.find_spec('rasterio') is not None
+
+
+def _leer_ventana_tiff_rasterio(ruta, limites_fuente_fn, margen_pixeles):
+    """Lectura con ventana mediante rasterio (cualquier compresión o disposición)"""
+    import rasterio
+    from rasterio.windows import Window
+
+    with rasterio.open(ruta) as src:
+        crs = CRS.from_user_input(src.crs.to_wkt())
+        t = src.transform
+        transformada = (t.c, t.a, t.b, t.f, t.d, t.e)
+        f0, f1, c0, c1 = _ventana_pixeles(limites_fuente_fn(crs), transformada, src.height, src.width, margen_pixeles)
+        ventana = Window(c0, f0, c1 - c0, f1 - f0)
+        z = src.read(1, window=ventana, masked=True).astype(np.float32).filled(np.nan)
+        tv = src.window_transform(ventana)
+        return z, (tv.c, tv.a, tv.b, tv.f, tv.d, tv.e), crs
+
+
+# LECTOR DE ESRI ASCII GRID
+def _leer_ventana_ascii(ruta, limites_fuente_fn, margen_pixeles):
+    """Recorre el .asc línea a línea y convierte solo las filas de la ventana"""
+    encabezado = {}
+    with open(ruta, 'r', encoding='latin-1') as f:
+        while len(encabezado) < 6:
+            posicion = f.tell()
+            linea = f.readline()
+            partes = linea.split()
+            if len(partes) != 2 or partes[0][0].isdigit() or partes[0][0] in '-.':
+                f.seek(posicion)
+                break
+            encabezado[partes[0].lower()] = float(partes[1])
+        ancho, alto = int(encabezado['ncols']), int(encabezado['nrows'])
+        celda = encabezado['cellsize']
+        x_izq = encabezado['xllcorner'] if 'xllcorner' in encabezado else encabezado['xllcenter'] - celda / 2
+        y_inf = encabezado['yllcorner'] if 'yllcorner' in encabezado else encabezado['yllcenter'] - celda / 2
+        # La primera fila del archivo es la del norte
+        transformada = (x_izq, celda, 0.0, y_inf + alto * celda, 0.0, -celda)
+
+        crs = _crs_prj(ruta)
+        if crs is None:
+            if not (abs(x_izq) <= 180 and abs(y_inf) <= 90 and ancho * celda <= 360):
+                raise ValueError(f"{os.path.basename(ruta)} no tiene .prj: no se puede saber su sistema de coordenadas")
+            logger.warning(f"{os.path.basename(ruta)} sin .prj: se asume EPSG:4326")
+            crs = CRS.from_epsg(4326)
+
+        f0, f1, c0, c1 = _ventana_pixeles(limites_fuente_fn(crs), transformada, alto, ancho, margen_pixeles)
+        z = np.empty((f1 - f0, c1 - c0), dtype=np.float32)
+        # Los valores pueden repartirse en varias líneas: se cuentan valores, no líneas
+        fila, resto = 0, []
+        for linea in f:
+            valores = resto + linea.split() if resto else linea.split()
+            while len(valores) >= ancho and fila < f1:
+                if fila >= f0:
+                    z[fila - f0] = np.asarray(valores[c0:c1], dtype=np.float32)
+                valores = valores[ancho:]
+                fila += 1
+            resto = valores
+            if fila >= f1:
+                break
+        if fila < f1:
+            raise ValueError(f"{os.path.basename(ruta)} tiene menos filas que las declaradas ({fila} de {alto})")
+
+    if 'nodata_value' in encabezado:
+        z[z == np.float32(encabezado['nodata_value'])] = np.nan
+    x0, dx, _, y0, _, dy = transformada
+    return z, (x0 + c0 * dx, dx, 0.0, y0 + f0 * dy, 0.0, dy), crs
+
+
+# FUNCIÓN PARA LEER UN DEM LOCAL EN LA GRILLA DE ANÁLISIS
+@medir_etapa('dem_archivo')
+def leer_dem_archivo(ruta, gdf, resolucion=10.0):
+    """Lee la ventana del DEM que cubre la parcela y la remuestrea a la grilla de análisis
+    (o rasteriza en ella la nube de puntos, si es un .las / .xyz).
+
+    Devuelve (GrillaDEM, Z) como generar_dem_sintetico: grilla en el CRS métrico de la
+    parcela con celdas de `resolucion` metros, Z float32 con NaN sin datos.
+    """
+    from scipy.ndimage import map_coordinates
+
+    crs_metrico = obtener_crs_metrico(gdf) or gdf.crs
+    parcela_metrica = gdf.to_crs(crs_metrico) if gdf.crs is not None and crs_metrico is not None else gdf
+    minx, miny, maxx, maxy = parcela_metrica.total_bounds
+    margen = PARAMETROS_FUENTES_DEM['margen_m'] + resolucion
+    grilla = GrillaDEM.desde_limites(minx, miny, maxx, maxy, resolucion, crs_metrico)
+
+    def limites_en(crs_fuente):
+        # Límites de la parcela (más el margen) en el CRS del DEM
+        if crs_metrico is None or CRS.from_user_input(crs_metrico) == crs_fuente:
+            return (minx - margen, miny - margen, maxx + margen, maxy + margen)
+        transformador = Transformer.from_crs(crs_metrico, crs_fuente, always_xy=True)
+        return transformador.transform_bounds(minx - margen, miny - margen, maxx + margen, maxy + margen,
+                                              densify_pts=21)
+
+    tipo = _tipo_archivo(ruta)
+    if tipo in ('las', 'xyz'):
+        Z = rasterizar_nube_puntos(ruta, grilla, _crs_prj(ruta))
+        if np.isnan(Z).all():
+            raise ValueError("La nube de puntos no tiene datos sobre la parcela")
+        return grilla, Z
+
+    margen_pixeles = PARAMETROS_FUENTES_DEM['margen_pixeles']
+    if tipo == 'ascii':
+        z_fuente, transformada, crs_fuente = _leer_ventana_ascii(ruta, limites_en, margen_pixeles)
+    elif _hay_rasterio():
+        z_fuente, transformada, crs_fuente = _leer_ventana_tiff_rasterio(ruta, limites_en, margen_pixeles)
+    else:
+        z_fuente, transformada, crs_fuente = _leer_ventana_tiff_memmap(ruta, limites_en, margen_pixeles)
+    logger.info(f"DEM {os.path.basename(ruta)}: ventana {z_fuente.shape[0]}x{z_fuente.shape[1]} píxeles")
+
+    # Nodos de la grilla de análisis en el CRS del DEM, por bloques de filas
+    x, y = grilla.ejes()
+    x0, dx, _, y0, _, dy = transformada
+    transformador = None
+    if crs_metrico is not None and CRS.from_user_input(crs_metrico) != crs_fuente:
+        transformador = Transformer.from_crs(crs_metrico, crs_fuente, always_xy=True)
+    Z = np.empty(grilla.forma, dtype=np.float32)
+    bloque = PARAMETROS_FUENTES_DEM['bloque_filas']
+    for inicio in range(0, grilla.filas, bloque):
+        X, Y = np.meshgrid(x, y[inicio:inicio + bloque])
+        if transformador is not None:
+            X, Y = transformador.transform(X, Y)
+        # Índices fraccionarios respecto de los centros de píxel; fuera de la ventana queda NaN
+        columnas = (X - x0) / dx - 0.5
+        filas = (Y - y0) / dy - 0.5
+        Z[inicio:inicio + bloque] = map_coordinates(z_fuente, [filas, columnas], order=1,
+                                                    mode='constant', cval=np.nan)
+    if np.isnan(Z).all():
+        raise ValueError("El DEM no tiene datos sobre la parcela")
+    return grilla, Z
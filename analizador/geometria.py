@@ -0,0 +1,273 @@
+"""Superficie, reparación de geometrías, índice espacial de lotes y división en zonas"""
+import logging
+import math
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+from shapely.geometry import Polygon, Point
+
+from .instrumentacion import medir_etapa
+
+logger = logging.getLogger(__name__)
+
+
+# FUNCIÓN MEJORADA PARA CALCULAR SUPERFICIE - VERSIÓN CORREGIDA
+@medir_etapa('superficie')
+def calcular_superficie(gdf):
+    """Calcula superficie en hectáreas con manejo robusto de CRS - VERSIÓN CORREGIDA"""
+    try:
+        if gdf is None or gdf.empty or gdf.geometry.isnull().all():
+            return 0.0
+            
+        # Verificar si el CRS es geográfico (grados)
+        if gdf.crs and gdf.crs.is_geographic:
+            # Convertir a un CRS proyectado para cálculo de área precisa
+            try:
+                # Usar UTM adecuado (aquí se usa un CRS común para zonas agrícolas)
+                gdf_proj = gdf.to_crs('EPSG:32630')  # WGS 84 / UTM zone 30N (Europa, África)
+                area_m2 = gdf_proj.geometry.area.sum()  # SUMAR todas las áreas
+            except:
+                # Fallback: conversión aproximada (1 grado ≈ 111km en ecuador)
+                area_m2 = gdf.geometry.area.sum() * 111000 * 111000
+        else:
+            # Asumir que ya está en metros
+            area_m2 = gdf.geometry.area.sum()  # SUMAR todas las áreas
+            
+        return area_m2 / 10000  # Convertir a hectáreas
+        
+    except Exception as e:
+        # Fallback simple
+        try:
+            return gdf.geometry.area.sum() / 10000
+        except:
+            return 0.0  # Valor por defecto
+
+
+# FUNCIÓN: SUPERFICIE DE CADA FILA CON UNA SOLA REPROYECCIÓN
+@medir_etapa('superficie')
+def calcular_superficie_por_fila(gdf):
+    """Superficie en hectáreas de cada fila (mismo criterio que calcular_superficie, sin reproyectar fila por fila)"""
+    if gdf is None or gdf.empty:
+        return np.zeros(0)
+    try:
+        if gdf.crs and gdf.crs.is_geographic:
+            try:
+                area_m2 = gdf.geometry.to_crs('EPSG:32630').area.to_numpy()
+            except Exception:
+                area_m2 = gdf.geometry.area.to_numpy() * 111000 * 111000
+        else:
+            area_m2 = gdf.geometry.area.to_numpy()
+        return np.nan_to_num(area_m2, nan=0.0) / 10000
+    except Exception:
+        return np.zeros(len(gdf))
+
+
+# FUNCIÓN: OBTENER CRS MÉTRICO LOCAL
+def obtener_crs_metrico(gdf):
+    """Devuelve un CRS en metros para el GeoDataFrame (UTM local si está en grados)"""
+    if gdf.crs is None or not gdf.crs.is_geographic:
+        return gdf.crs
+    try:
+        return gdf.estimate_utm_crs()
+    except Exception:
+        return None
+
+
+def _grilla_en_unidades_crs(crs, precision_m):
+    """Tamaño de grilla en las unidades del CRS equivalente a precision_m metros"""
+    if crs.is_geographic:
+        # Grados por metro sobre el meridiano: en sentido este-oeste la celda queda aún más fina
+        return precision_m / 111320.0
+    return precision_m / crs.axis_info[0].unit_conversion_factor
+
+
+def _conservar_poligonos(geometrias):
+    """Descarta las partes no poligonales que make_valid puede generar (líneas, puntos)"""
+    for i in np.flatnonzero(shapely.get_type_id(geometrias) == 7):  # GeometryCollection
+        partes = [p for p in geometrias[i].geoms if p.geom_type in ('Polygon', 'MultiPolygon')]
+        if partes:
+            geometrias[i] = shapely.union_all(partes)
+    return geometrias
+
+
+# FUNCIÓN: PREPARAR GEOMETRÍAS SUBIDAS (REPARACIÓN, PRECISIÓN Y SIMPLIFICACIÓN)
+@medir_etapa('preparacion_geometrias')
+def preparar_geometrias(gdf, precision_m=0.01, tolerancia_m=0.0):
+    """Repara solo las filas inválidas, simplifica opcionalmente y ajusta a una grilla de precisión.
+
+    La simplificación se hace en metros (UTM local) y el ajuste al final, en el CRS de salida,
+    para que las coordenadas devueltas queden efectivamente sobre la grilla.
+    Devuelve el GeoDataFrame preparado y un reporte con el conteo de vértices antes y después.
+    """
+    geometrias = gdf.geometry.to_numpy().copy()
+    vertices_antes = int(shapely.get_num_coordinates(geometrias).sum())
+
+    # 1. Reparar únicamente las geometrías inválidas
+    invalidas = ~shapely.is_valid(geometrias) & ~shapely.is_missing(geometrias)
+    n_reparadas = int(invalidas.sum())
+    if n_reparadas:
+        geometrias[invalidas] = _conservar_poligonos(shapely.make_valid(geometrias[invalidas]))
+
+    # 2. Simplificación en un CRS métrico y ajuste de precisión en el CRS de salida. Sin CRS (shapefile sin .prj)
+    # o sin UTM estimable no se sabe en qué unidades están las coordenadas: en grados, una
+    # grilla de 0,01 "metros" son ~1 km y colapsaría los lotes, así que se omite el ajuste
+    crs_metrico = obtener_crs_metrico(gdf)
+    if (precision_m > 0 or tolerancia_m > 0) and (gdf.crs is None or crs_metrico is None):
+        logger.warning("Geometrías sin CRS métrico conocido: se omiten el ajuste de precisión y la simplificación")
+        precision_m, tolerancia_m = 0.0, 0.0
+    if tolerancia_m > 0:
+        if crs_metrico != gdf.crs:
+            geometrias = gpd.GeoSeries(geometrias, crs=gdf.crs).to_crs(crs_metrico).to_numpy()
+        geometrias = shapely.simplify(geometrias, tolerancia_m, preserve_topology=True)
+        if crs_metrico != gdf.crs:
+            geometrias = gpd.GeoSeries(geometrias, crs=crs_metrico).to_crs(gdf.crs).to_numpy()
+
+            # La reproyección puede reintroducir auto-intersecciones mínimas
+            invalidas = ~shapely.is_valid(geometrias) & ~shapely.is_missing(geometrias)
+            if invalidas.any():
+                geometrias[invalidas] = _conservar_poligonos(shapely.make_valid(geometrias[invalidas]))
+    if precision_m > 0:
+        # set_precision devuelve geometrías válidas: el ajuste va último y nada lo saca de la grilla
+        geometrias = shapely.set_precision(geometrias, _grilla_en_unidades_crs(gdf.crs, precision_m))
+
+    gdf_preparado = gdf.copy()
+    gdf_preparado[gdf.geometry.name] = geometrias
+    gdf_preparado = gdf_preparado[~gdf_preparado.geometry.is_empty & gdf_preparado.geometry.notna()].reset_index(drop=True)
+
+    reporte = {
+        'vertices_antes': vertices_antes,
+        'vertices_despues': int(shapely.get_num_coordinates(gdf_preparado.geometry.to_numpy()).sum()),
+        'geometrias_reparadas': n_reparadas,
+        'precision_m': precision_m,
+        'tolerancia_m': tolerancia_m
+    }
+    return gdf_preparado, reporte
+
+
+# FUNCIONES DE ÍNDICE ESPACIAL DE LOTES
+# gdf.sindex es un shapely.STRtree que geopandas construye una sola vez y guarda en
+# el propio GeoDataFrame; se descarta automáticamente cuando cambia la geometría.
+def buscar_lotes_por_punto(gdf_lotes, x, y, crs_punto=None):
+    """Devuelve las posiciones de los lotes que contienen (o tocan) el punto x, y.
+    Con `crs_punto` (p. ej. 'EPSG:4326' para un click en el mapa) el punto se lleva al CRS de los lotes"""
+    if gdf_lotes is None or gdf_lotes.empty:
+        return np.array([], dtype=int)
+    punto = Point(x, y)
+    if crs_punto is not None and gdf_lotes.crs is not None:
+        punto = gpd.GeoSeries([punto], crs=crs_punto).to_crs(gdf_lotes.crs).iloc[0]
+    return np.sort(gdf_lotes.sindex.query(punto, predicate='intersects'))
+
+
+def unir_lotes_zonas(gdf_lotes, gdf_zonas):
+    """Asigna a cada zona el lote (id_lote = posición + 1) con el que comparte mayor superficie"""
+    zonas = gdf_zonas.copy()
+    zonas['id_lote'] = 0
+    if gdf_lotes is None or gdf_lotes.empty or zonas.empty:
+        return zonas
+
+    idx_zonas, idx_lotes = gdf_lotes.sindex.query(zonas.geometry.to_numpy(), predicate='intersects')
+    if len(idx_zonas) == 0:
+        return zonas
+
+    # Superficie compartida de todos los pares candidatos en una sola operación vectorizada
+    solape = shapely.area(shapely.intersection(
+        zonas.geometry.to_numpy()[idx_zonas], gdf_lotes.geometry.to_numpy()[idx_lotes]
+    ))
+    pares = pd.DataFrame({'zona': idx_zonas, 'lote': idx_lotes, 'solape': solape})
+    mejores = pares.loc[pares.groupby('zona')['solape'].idxmax()]
+    zonas.iloc[mejores['zona'].to_numpy(), zonas.columns.get_loc('id_lote')] = mejores['lote'].to_numpy() + 1
+    return zonas
+
+
+# FUNCIÓN MEJORADA PARA DIVIDIR PARCELA EN ZONAS
+@medir_etapa('zonificacion')
+def dividir_parcela_en_zonas(gdf, n_zonas):
+    """Divide la parcela en zonas de manejo con manejo robusto de errores"""
+    try:
+        if len(gdf) == 0:
+            return gdf
+        
+        # Usar el primer polígono como parcela principal
+        parcela_principal = gdf.iloc[0].geometry
+        
+        # Verificar que la geometría sea válida
+        if not parcela_principal.is_valid:
+            parcela_principal = parcela_principal.buffer(0)  # Reparar geometría
+        
+        bounds = parcela_principal.bounds
+        if len(bounds) < 4:
+            logger.error("No se pueden obtener los límites de la parcela")
+            return gdf
+            
+        minx, miny, maxx, maxy = bounds
+        
+        # Verificar que los bounds sean válidos
+        if minx >= maxx or miny >= maxy:
+            logger.error("Límites de parcela inválidos")
+            return gdf
+        
+        sub_poligonos = []
+        
+        # Cuadrícula regular
+        n_cols = math.ceil(math.sqrt(n_zonas))
+        n_rows = math.ceil(n_zonas / n_cols)
+        
+        width = (maxx - minx) / n_cols
+        height = (maxy - miny) / n_rows
+        
+        # Asegurar un tamaño mínimo de celda
+        if width < 0.0001 or height < 0.0001:  # ~11m en grados decimales
+            logger.warning("Las celdas son muy pequeñas, ajustando número de zonas")
+            n_zonas = min(n_zonas, 16)
+            n_cols = math.ceil(math.sqrt(n_zonas))
+            n_rows = math.ceil(n_zonas / n_cols)
+            width = (maxx - minx) / n_cols
+            height = (maxy - miny) / n_rows
+        
+        for i in range(n_rows):
+            for j in range(n_cols):
+                if len(sub_poligonos) >= n_zonas:
+                    break
+                    
+                cell_minx = minx + (j * width)
+                cell_maxx = minx + ((j + 1) * width)
+                cell_miny = miny + (i * height)
+                cell_maxy = miny + ((i + 1) * height)
+                
+                # Crear celda con verificación de validez
+                try:
+                    cell_poly = Polygon([
+                        (cell_minx, cell_miny),
+                        (cell_maxx, cell_miny),
+                        (cell_maxx, cell_maxy),
+                        (cell_minx, cell_maxy)
+                    ])
+                    
+                    if cell_poly.is_valid:
+                        intersection = parcela_principal.intersection(cell_poly)
+                        if not intersection.is_empty and intersection.area > 0:
+                            # Simplificar geometría si es necesario
+                            if intersection.geom_type == 'MultiPolygon':
+                                # Tomar el polígono más grande
+                                largest = max(intersection.geoms, key=lambda p: p.area)
+                                sub_poligonos.append(largest)
+                            else:
+                                sub_poligonos.append(intersection)
+                except Exception as e:
+                    continue  # Saltar celdas problemáticas
+        
+        if sub_poligonos:
+            nuevo_gdf = gpd.GeoDataFrame({
+                'id_zona': range(1, len(sub_poligonos) + 1),
+                'geometry': sub_poligonos
+            }, crs=gdf.crs)
+            return nuevo_gdf
+        else:
+            logger.warning("No se pudieron crear zonas, retornando parcela original")
+            return gdf
+            
+    except Exception as e:
+        logger.error(f"Error dividiendo parcela: {str(e)}")
+        return gdf
@@ -0,0 +1,75 @@
+"""Huella (hash) canónica de geometrías para claves de caché y deduplicación.
+
+La misma parcela exportada por herramientas distintas (KML, shapefile en otra
+proyección, con o sin altitud, anillos en otro sentido o empezando en otro vértice)
+produce la misma huella.
+"""
+import hashlib
+
+import numpy as np
+import shapely
+
+from .parametros import PARAMETROS_GEOMETRIA
+
+CRS_CANONICO = "EPSG:4326"
+
+
+# FUNCIÓN PARA LLEVAR GEOMETRÍAS A SU FORMA CANÓNICA
+def canonizar_geometrias(gdf, precision_grados=None):
+    """Devuelve un array de geometrías en EPSG:4326, 2D, en grilla de precisión y normalizadas"""
+    if precision_grados is None:
+        precision_grados = PARAMETROS_GEOMETRIA['precision_huella_grados']
+    if gdf.crs is not None and gdf.crs.to_epsg() != 4326:
+        gdf = gdf.to_crs(CRS_CANONICO)
+
+    geometrias = shapely.force_2d(np.asarray(gdf.geometry.values, dtype=object))
+
+    # Un MultiPolygon de una sola parte es el mismo lote que su Polygon
+    una_parte = (shapely.get_type_id(geometrias) == 6) & (shapely.get_num_geometries(geometrias) == 1)
+    if una_parte.any():
+        geometrias[una_parte] = shapely.get_geometry(geometrias[una_parte], 0)
+
+    # Ajustar a la grilla elimina el ruido de reproyección y vértices repetidos;
+    # normalize fija el sentido de los anillos, el vértice inicial y el orden de las partes
+    geometrias = shapely.set_precision(geometrias, precision_grados)
+    return shapely.normalize(geometrias)
+
+
+def _wkb_canonico(gdf):
+    return shapely.to_wkb(canonizar_geometrias(gdf), output_dimension=2, byte_order=1, include_srid=False)
+
+
+def _prefijo_crs(gdf):
+    return (CRS_CANONICO if gdf.crs is not None else '').encode()
+
+
+# FUNCIÓN PARA CALCULAR LA HUELLA DE CADA LOTE
+def huellas_por_fila(gdf):
+    """Devuelve una huella SHA-256 por fila (sirve para detectar lotes repetidos)"""
+    prefijo = _prefijo_crs(gdf)
+    return [hashlib.sha256(prefijo + (wkb if wkb is not None else b'')).hexdigest() for wkb in _wkb_canonico(gdf)]
+
+
+# FUNCIÓN PARA CALCULAR LA HUELLA DE LAS GEOMETRÍAS DE UN GEODATAFRAME
+def huella_geometria(gdf):
+    """Devuelve el SHA-256 del WKB canónico de todas las geometrías (en orden) más el CRS"""
+    h = hashlib.sha256()
+    h.update(_prefijo_crs(gdf))
+    for wkb in _wkb_canonico(gdf):
+        h.update(wkb if wkb is not None else b'')
+    return h.hexdigest()
+
+
+# FUNCIÓN PARA CALCULAR LA HUELLA DE GEOMETRÍAS Y VALORES
+def huella_datos(gdf, columnas=None):
+    """Huella de las geometrías más los valores de `columnas` (por defecto todas las que no son
+    geometría): distingue resultados de la misma parcela con otro cultivo, mes o parámetro"""
+    import pandas as pd
+    if columnas is None:
+        columnas = [c for c in gdf.columns if c != gdf.geometry.name]
+    columnas = [c for c in columnas if c is not None and c in gdf.columns]
+    h = hashlib.sha256(huella_geometria(gdf).encode())
+    for columna in columnas:
+        h.update(str(columna).encode())
+        h.update(pd.util.hash_pandas_object(gdf[columna], index=False).to_numpy().tobytes())
+    return h.hexdigest()
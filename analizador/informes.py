@@ -0,0 +1,627 @@
+"""Informes PDF de fertilidad, textura y NDWI (reportlab se importa solo al generar un informe)"""
+import io
+from datetime import datetime
+
+from .instrumentacion import medir_etapa
+from .mapas import crear_mapa_estatico
+from .parametros import RECOMENDACIONES_AGROECOLOGICAS, RECOMENDACIONES_TEXTURA
+
+
+# FUNCIÓN PARA GENERAR PDF
+@medir_etapa('informe_pdf')
+def generar_informe_pdf(gdf_analisis, cultivo, analisis_tipo, nutriente, mes_analisis, area_total, gdf_textura=None):
+    """Genera un informe PDF completo con los resultados del análisis"""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image, PageBreak
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib.units import inch
+    from reportlab.lib import colors
+
+    
+    # Crear buffer para el PDF
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=A4, topMargin=1*inch)
+    styles = getSampleStyleSheet()
+    
+    # Crear estilos personalizados
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=16,
+        textColor=colors.darkgreen,
+        spaceAfter=30,
+        alignment=1
+    )
+    
+    heading_style = ParagraphStyle(
+        'CustomHeading',
+        parent=styles['Heading2'],
+        fontSize=14,
+        textColor=colors.darkblue,
+        spaceAfter=12,
+        spaceBefore=12
+    )
+    
+    normal_style = styles['Normal']
+    
+    # Contenido del PDF
+    story = []
+    
+    # Título principal
+    story.append(Paragraph("INFORME DE ANÁLISIS AGRÍCOLA", title_style))
+    story.append(Spacer(1, 20))
+    
+    # Información general
+    story.append(Paragraph("INFORMACIÓN GENERAL", heading_style))
+    info_data = [
+        ["Cultivo:", cultivo.replace('_', ' ').title()],
+        ["Tipo de Análisis:", analisis_tipo],
+        ["Mes de Análisis:", mes_analisis],
+        ["Área Total:", f"{area_total:.2f} ha"],
+        ["Fecha de Generación:", datetime.now().strftime("%d/%m/%Y %H:%M")]
+    ]
+    
+    if analisis_tipo == "RECOMENDACIONES NPK":
+        info_data.insert(2, ["Nutriente Analizado:", nutriente])
+    
+    info_table = Table(info_data, colWidths=[2*inch, 3*inch])
+    info_table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 10),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.white),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black)
+    ]))
+    story.append(info_table)
+    story.append(Spacer(1, 20))
+    
+    # Estadísticas resumen
+    story.append(Paragraph("ESTADÍSTICAS DEL ANÁLISIS", heading_style))
+    
+    if analisis_tipo == "FERTILIDAD ACTUAL":
+        stats_data = [
+            ["Estadística", "Valor"],
+            ["Índice Fertilidad Promedio", f"{gdf_analisis['indice_fertilidad'].mean():.3f}"],
+            ["Nitrógeno Promedio (kg/ha)", f"{gdf_analisis['nitrogeno'].mean():.1f}"],
+            ["Fósforo Promedio (kg/ha)", f"{gdf_analisis['fosforo'].mean():.1f}"],
+            ["Potasio Promedio (kg/ha)", f"{gdf_analisis['potasio'].mean():.1f}"],
+            ["Materia Orgánica Promedio (%)", f"{gdf_analisis['materia_organica'].mean():.1f}"],
+            ["NDVI Promedio", f"{gdf_analisis['ndvi'].mean():.3f}"],
+            ["NDWI Suelo Promedio", f"{gdf_analisis['ndwi_suelo'].mean():.3f}" if 'ndwi_suelo' in gdf_analisis.columns else "N/A"]
+        ]
+    elif analisis_tipo == "ANÁLISIS DE TEXTURA" and gdf_textura is not None:
+        stats_data = [
+            ["Estadística", "Valor"],
+            ["Textura Predominante", gdf_textura['textura_suelo'].mode()[0] if len(gdf_textura) > 0 else "N/A"],
+            ["Adecuación Promedio", f"{gdf_textura['adecuacion_textura'].mean():.1%}"],
+            ["Arena Promedio (%)", f"{gdf_textura['arena'].mean():.1f}"],
+            ["Limo Promedio (%)", f"{gdf_textura['limo'].mean():.1f}"],
+            ["Arcilla Promedio (%)", f"{gdf_textura['arcilla'].mean():.1f}"],
+            ["Agua Disponible Promedio (mm/m)", f"{gdf_textura['agua_disponible'].mean():.0f}"]
+        ]
+    elif analisis_tipo == "ANÁLISIS NDWI SUELO":
+        stats_data = [
+            ["Estadística", "Valor"],
+            ["NDWI Suelo Promedio", f"{gdf_analisis['ndwi_suelo'].mean():.3f}"],
+            ["Estado Humedad Predominante", gdf_analisis['estado_humedad_suelo'].mode()[0] if len(gdf_analisis) > 0 else "N/A"],
+            ["Déficit Humedad Promedio", f"{gdf_analisis['deficit_humedad'].mean():.3f}"],
+            ["Zonas con Riesgo Sequía", f"{len(gdf_analisis[gdf_analisis['riesgo_sequia'].isin(['ALTO', 'CRÍTICO'])])}/{len(gdf_analisis)}"]
+        ]
+    elif analisis_tipo == "ANÁLISIS DE CURVAS DE NIVEL (LIDAR/DEM)":
+        stats_data = [
+            ["Estadística", "Valor"],
+            ["Número de Curvas", f"{len(gdf_analisis)}"],
+            ["Elevación Promedio (m)", f"{gdf_analisis['elevacion'].mean():.1f}"],
+            ["Elevación Mínima (m)", f"{gdf_analisis['elevacion'].min():.1f}"],
+            ["Elevación Máxima (m)", f"{gdf_analisis['elevacion'].max():.1f}"],
+            ["Rango de Elevación (m)", f"{gdf_analisis['elevacion'].max() - gdf_analisis['elevacion'].min():.1f}"]
+        ]
+    else:
+        avg_rec = gdf_analisis['recomendacion_npk'].mean()
+        total_rec = (gdf_analisis['recomendacion_npk'] * gdf_analisis['area_ha']).sum()
+        stats_data = [
+            ["Estadística", "Valor"],
+            [f"Recomendación {nutriente} Promedio (kg/ha)", f"{avg_rec:.1f}"],
+            [f"Total {nutriente} Requerido (kg)", f"{total_rec:.1f}"],
+            ["Nitrógeno Promedio (kg/ha)", f"{gdf_analisis['nitrogeno'].mean():.1f}"],
+            ["Fósforo Promedio (kg/ha)", f"{gdf_analisis['fosforo'].mean():.1f}"],
+            ["Potasio Promedio (kg/ha)", f"{gdf_analisis['potasio'].mean():.1f}"]
+        ]
+    
+    stats_table = Table(stats_data, colWidths=[3*inch, 2*inch])
+    stats_table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.darkblue),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 10),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.white),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black)
+    ]))
+    story.append(stats_table)
+    story.append(Spacer(1, 20))
+    
+    # Mapa estático
+    story.append(PageBreak())
+    story.append(Paragraph("MAPA DE ANÁLISIS", heading_style))
+    
+    # Generar mapa estático para el PDF
+    if analisis_tipo == "FERTILIDAD ACTUAL":
+        titulo_mapa = f"Fertilidad Actual - {cultivo.replace('_', ' ').title()}"
+        columna_visualizar = 'indice_fertilidad'
+    elif analisis_tipo == "ANÁLISIS DE TEXTURA" and gdf_textura is not None:
+        titulo_mapa = f"Textura del Suelo - {cultivo.replace('_', ' ').title()}"
+        columna_visualizar = 'textura_suelo'
+        gdf_analisis = gdf_textura
+    elif analisis_tipo == "ANÁLISIS NDWI SUELO":
+        titulo_mapa = f"NDWI del Suelo - {cultivo.replace('_', ' ').title()}"
+        columna_visualizar = 'ndwi_suelo'
+    elif analisis_tipo == "ANÁLISIS DE CURVAS DE NIVEL (LIDAR/DEM)":
+        titulo_mapa = f"Curvas de Nivel - {cultivo.replace('_', ' ').title()}"
+        columna_visualizar = 'elevacion'
+    else:
+        titulo_mapa = f"Recomendación {nutriente} - {cultivo.replace('_', ' ').title()}"
+        columna_visualizar = 'recomendacion_npk'
+    
+    mapa_buffer = crear_mapa_estatico(
+        gdf_analisis, titulo_mapa, columna_visualizar, analisis_tipo, nutriente
+    )
+    
+    if mapa_buffer:
+        try:
+            # Convertir a imagen para PDF
+            mapa_buffer.seek(0)
+            img = Image(mapa_buffer, width=6*inch, height=4*inch)
+            story.append(img)
+            story.append(Spacer(1, 10))
+            story.append(Paragraph(f"Figura 1: {titulo_mapa}", normal_style))
+        except Exception as e:
+            story.append(Paragraph("Error al generar el mapa para el PDF", normal_style))
+    
+    story.append(Spacer(1, 20))
+    
+    # Tabla de resultados por zona (primeras 10 zonas)
+    story.append(Paragraph("RESULTADOS POR ZONA (PRIMERAS 10 ZONAS)", heading_style))
+    
+    # Preparar datos para tabla
+    if analisis_tipo == "ANÁLISIS DE TEXTURA" and gdf_textura is not None:
+        columnas_tabla = ['id_zona', 'area_ha', 'textura_suelo', 'adecuacion_textura', 'arena', 'limo', 'arcilla']
+        df_tabla = gdf_textura[columnas_tabla].head(10).copy()
+    elif analisis_tipo == "ANÁLISIS NDWI SUELO":
+        columnas_tabla = ['id_zona', 'area_ha', 'ndwi_suelo', 'estado_humedad_suelo', 'deficit_humedad', 'recomendacion_riego', 'riesgo_sequia']
+        df_tabla = gdf_analisis[columnas_tabla].head(10).copy()
+    elif analisis_tipo == "ANÁLISIS DE CURVAS DE NIVEL (LIDAR/DEM)":
+        columnas_tabla = ['id_curva', 'elevacion']
+        if 'longitud_m' in gdf_analisis.columns:
+            columnas_tabla.append('longitud_m')
+        df_tabla = gdf_analisis[columnas_tabla].head(10).copy()
+    else:
+        columnas_tabla = ['id_zona', 'area_ha', 'categoria', 'prioridad']
+        if analisis_tipo == "FERTILIDAD ACTUAL":
+            columnas_tabla.extend(['indice_fertilidad', 'nitrogeno', 'fosforo', 'potasio', 'materia_organica'])
+        else:
+            columnas_tabla.extend(['recomendacion_npk', 'deficit_npk', 'nitrogeno', 'fosforo', 'potasio'])
+        
+        df_tabla = gdf_analisis[columnas_tabla].head(10).copy()
+    
+    # Redondear valores
+    if 'area_ha' in df_tabla.columns:
+        df_tabla['area_ha'] = df_tabla['area_ha'].round(3)
+    if analisis_tipo == "FERTILIDAD ACTUAL":
+        df_tabla['indice_fertilidad'] = df_tabla['indice_fertilidad'].round(3)
+    elif analisis_tipo == "ANÁLISIS DE TEXTURA":
+        df_tabla['adecuacion_textura'] = df_tabla['adecuacion_textura'].round(3)
+        df_tabla['arena'] = df_tabla['arena'].round(1)
+        df_tabla['limo'] = df_tabla['limo'].round(1)
+        df_tabla['arcilla'] = df_tabla['arcilla'].round(1)
+    elif analisis_tipo == "ANÁLISIS NDWI SUELO":
+        df_tabla['ndwi_suelo'] = df_tabla['ndwi_suelo'].round(3)
+        df_tabla['deficit_humedad'] = df_tabla['deficit_humedad'].round(3)
+    elif analisis_tipo == "ANÁLISIS DE CURVAS DE NIVEL (LIDAR/DEM)":
+        df_tabla['elevacion'] = df_tabla['elevacion'].round(1)
+        if 'longitud_m' in df_tabla.columns:
+            df_tabla['longitud_m'] = df_tabla['longitud_m'].round(1)
+    else:
+        df_tabla['recomendacion_npk'] = df_tabla['recomendacion_npk'].round(1)
+        df_tabla['deficit_npk'] = df_tabla['deficit_npk'].round(1)
+    
+    if 'nitrogeno' in df_tabla.columns:
+        df_tabla['nitrogeno'] = df_tabla['nitrogeno'].round(1)
+    if 'fosforo' in df_tabla.columns:
+        df_tabla['fosforo'] = df_tabla['fosforo'].round(1)
+    if 'potasio' in df_tabla.columns:
+        df_tabla['potasio'] = df_tabla['potasio'].round(1)
+    if 'materia_organica' in df_tabla.columns:
+        df_tabla['materia_organica'] = df_tabla['materia_organica'].round(1)
+    
+    # Convertir a lista para la tabla
+    table_data = [df_tabla.columns.tolist()]
+    for _, row in df_tabla.iterrows():
+        table_data.append(row.tolist())
+    
+    # Crear tabla
+    zona_table = Table(table_data, colWidths=[0.5*inch] + [0.7*inch] * (len(columnas_tabla)-1))
+    zona_table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.darkblue),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 7),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.white),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.lightgrey])
+    ]))
+    story.append(zona_table)
+    
+    if len(gdf_analisis) > 10:
+        story.append(Spacer(1, 5))
+        story.append(Paragraph(f"* Mostrando 10 de {len(gdf_analisis)} zonas totales. Consulte el archivo CSV para todos los datos.", 
+                             ParagraphStyle('Small', parent=normal_style, fontSize=8)))
+    
+    story.append(Spacer(1, 20))
+    
+    # Recomendaciones
+    story.append(PageBreak())
+    story.append(Paragraph("RECOMENDACIONES", heading_style))
+    
+    if analisis_tipo == "ANÁLISIS DE TEXTURA" and gdf_textura is not None:
+        textura_predominante = gdf_textura['textura_suelo'].mode()[0] if len(gdf_textura) > 0 else "Franco"
+        adecuacion_promedio = gdf_textura['adecuacion_textura'].mean()
+        
+        if adecuacion_promedio >= 0.8:
+            enfoque = "ENFOQUE: MANTENIMIENTO - Textura adecuada"
+        elif adecuacion_promedio >= 0.6:
+            enfoque = "ENFOQUE: MEJORA MODERADA - Ajustes menores necesarios"
+        else:
+            enfoque = "ENFOQUE: MEJORA INTEGRAL - Enmiendas requeridas"
+        
+        story.append(Paragraph(f"<b>Enfoque Principal:</b> {enfoque}", normal_style))
+        story.append(Spacer(1, 10))
+        
+        # Recomendaciones específicas de textura
+        if textura_predominante in RECOMENDACIONES_TEXTURA:
+            info_textura = RECOMENDACIONES_TEXTURA[textura_predominante]
+            story.append(Paragraph(f"<b>Propiedades de {textura_predominante}:</b>", normal_style))
+            for prop in info_textura['propiedades'][:3]:
+                story.append(Paragraph(f"• {prop}", normal_style))
+            
+            story.append(Spacer(1, 5))
+            story.append(Paragraph(f"<b>Manejo Recomendado:</b>", normal_style))
+            for man in info_textura['manejo'][:3]:
+                story.append(Paragraph(f"• {man}", normal_style))
+    elif analisis_tipo == "ANÁLISIS NDWI SUELO":
+        avg_ndwi = gdf_analisis['ndwi_suelo'].mean() if not gdf_analisis.empty else 0
+        
+        if avg_ndwi >= 0.15:
+            enfoque = "ENFOQUE: CONSERVACIÓN - Humedad óptima detectada"
+            recomendaciones = [
+                "Mantener frecuencia actual de riego",
+                "Implementar coberturas vivas para conservar humedad",
+                "Monitorear semanalmente con sensores de humedad"
+            ]
+        elif avg_ndwi >= 0.0:
+            enfoque = "ENFOQUE: AJUSTE MODERADO - Humedad moderada"
+            recomendaciones = [
+                "Incrementar riego en 15-20%",
+                "Aplicar mulching (cobertura seca) entre plantas",
+                "Programar riegos en horas de menor evaporación"
+            ]
+        else:
+            enfoque = "ENFOQUE: INTERVENCIÓN URGENTE - Déficit de humedad"
+            recomendaciones = [
+                "Riego intensivo inmediato (30-40% más)",
+                "Implementar riego por goteo o aspersión",
+                "Aplicar polímeros retenedores de agua en raíces"
+            ]
+        
+        story.append(Paragraph(f"<b>Enfoque Principal:</b> {enfoque}", normal_style))
+        story.append(Spacer(1, 10))
+        
+        for rec in recomendaciones:
+            story.append(Paragraph(f"• {rec}", normal_style))
+    elif analisis_tipo == "ANÁLISIS DE CURVAS DE NIVEL (LIDAR/DEM)":
+        # Para curvas de nivel
+        elevacion_promedio = gdf_analisis['elevacion'].mean() if not gdf_analisis.empty else 0
+        rango_elevacion = gdf_analisis['elevacion'].max() - gdf_analisis['elevacion'].min() if not gdf_analisis.empty else 0
+        
+        if rango_elevacion < 20:
+            enfoque = "ENFOQUE: TERRENO PLANO - Manejo convencional"
+            recomendaciones = [
+                "Diseño rectangular de plantación",
+                "Sistemas de riego por gravedad",
+                "Labranza convencional posible",
+                "Maquinaria pesada sin restricciones"
+            ]
+        elif rango_elevacion < 50:
+            enfoque = "ENFOQUE: LADERA SUAVE - Diseño en contorno"
+            recomendaciones = [
+                "Diseño en contorno ligero",
+                "Surcos siguiendo curvas de nivel",
+                "Labranza reducida recomendada",
+                "Barreras vivas cada 50 metros"
+            ]
+        else:
+            enfoque = "ENFOQUE: LADERA PRONUNCIADA - Terrazas y bancales"
+            recomendaciones = [
+                "Terrazas de base ancha",
+                "Cultivos en franjas",
+                "Barreras vivas cada 30 metros",
+                "Sistemas de drenaje en contorno"
+            ]
+        
+        story.append(Paragraph(f"<b>Enfoque Principal:</b> {enfoque}", normal_style))
+        story.append(Spacer(1, 10))
+        
+        for rec in recomendaciones:
+            story.append(Paragraph(f"• {rec}", normal_style))
+    else:
+        categoria_promedio = gdf_analisis['categoria'].mode()[0] if len(gdf_analisis) > 0 else "MEDIA"
+        
+        # Determinar enfoque
+        if categoria_promedio in ["MUY BAJA", "BAJA"]:
+            enfoque = "ENFOQUE: RECUPERACIÓN Y REGENERACIÓN - Intensidad: Alta"
+        elif categoria_promedio in ["MEDIA"]:
+            enfoque = "ENFOQUE: MANTENIMIENTO Y MEJORA - Intensidad: Media"
+        else:
+            enfoque = "ENFOQUE: CONSERVACIÓN Y OPTIMIZACIÓN - Intensidad: Baja"
+        
+        story.append(Paragraph(f"<b>Enfoque Principal:</b> {enfoque}", normal_style))
+        story.append(Spacer(1, 10))
+        
+        # Recomendaciones específicas del cultivo
+        recomendaciones = RECOMENDACIONES_AGROECOLOGICAS.get(cultivo, {})
+        
+        for categoria_rec, items in recomendaciones.items():
+            story.append(Paragraph(f"<b>{categoria_rec.replace('_', ' ').title()}:</b>", normal_style))
+            for item in items[:2]:
+                story.append(Paragraph(f"• {item}", normal_style))
+            story.append(Spacer(1, 5))
+    
+    # Pie de página
+    story.append(Spacer(1, 20))
+    story.append(Paragraph("INFORMACIÓN ADICIONAL", heading_style))
+    story.append(Paragraph("Este informe fue generado automáticamente por el Sistema de Análisis Agrícola GEE.", normal_style))
+    
+    # Generar PDF
+    doc.build(story)
+    buffer.seek(0)
+    
+    return buffer
+
+
+# FUNCIÓN PARA GENERAR INFORME PDF ESPECÍFICO DE NDWI
+@medir_etapa('informe_pdf')
+def generar_informe_ndwi_pdf(gdf_ndwi, cultivo, mes_analisis, area_total):
+    """Genera un informe PDF específico para análisis de NDWI del suelo"""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib.units import inch
+    from reportlab.lib import colors
+
+    
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=A4, topMargin=1*inch)
+    styles = getSampleStyleSheet()
+    
+    # Estilos personalizados
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=16,
+        textColor=colors.darkblue,
+        spaceAfter=30,
+        alignment=1
+    )
+    
+    heading_style = ParagraphStyle(
+        'CustomHeading',
+        parent=styles['Heading2'],
+        fontSize=14,
+        textColor=colors.HexColor('#0066cc'),
+        spaceAfter=12,
+        spaceBefore=12
+    )
+    
+    normal_style = styles['Normal']
+    
+    story = []
+    
+    # Título principal
+    story.append(Paragraph("INFORME DE ANÁLISIS NDWI DEL SUELO", title_style))
+    story.append(Spacer(1, 20))
+    
+    # Información general
+    story.append(Paragraph("INFORMACIÓN GENERAL", heading_style))
+    info_data = [
+        ["Cultivo:", cultivo.replace('_', ' ').title()],
+        ["Análisis:", "NDWI del Suelo (Contenido de Agua)"],
+        ["Mes de Análisis:", mes_analisis],
+        ["Área Total:", f"{area_total:.2f} ha"],
+        ["Fecha de Generación:", datetime.now().strftime("%d/%m/%Y %H:%M")]
+    ]
+    
+    info_table = Table(info_data, colWidths=[2*inch, 3*inch])
+    info_table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#e6f2ff')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.darkblue),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 10),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.white),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black)
+    ]))
+    story.append(info_table)
+    story.append(Spacer(1, 20))
+    
+    # Estadísticas NDWI
+    story.append(Paragraph("ESTADÍSTICAS DEL NDWI DEL SUELO", heading_style))
+    
+    if not gdf_ndwi.empty:
+        stats_data = [
+            ["Estadística", "Valor"],
+            ["NDWI Suelo Promedio", f"{gdf_ndwi['ndwi_suelo'].mean():.3f}"],
+            ["Estado Humedad Predominante", gdf_ndwi['estado_humedad_suelo'].mode()[0] if len(gdf_ndwi) > 0 else "N/A"],
+            ["Déficit Humedad Promedio", f"{gdf_ndwi['deficit_humedad'].mean():.3f}"],
+            ["Zonas con Riesgo Sequía", f"{len(gdf_ndwi[gdf_ndwi['riesgo_sequia'].isin(['ALTO', 'CRÍTICO'])])}/{len(gdf_ndwi)}"],
+            ["Recomendación Riego Predominante", gdf_ndwi['recomendacion_riego'].mode()[0] if len(gdf_ndwi) > 0 else "N/A"]
+        ]
+    else:
+        stats_data = [["Estadística", "Valor"], ["Sin datos disponibles", "N/A"]]
+    
+    stats_table = Table(stats_data, colWidths=[3*inch, 2*inch])
+    stats_table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#0066cc')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 10),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.white),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black)
+    ]))
+    story.append(stats_table)
+    story.append(Spacer(1, 20))
+    
+    # Interpretación de valores NDWI
+    story.append(Paragraph("INTERPRETACIÓN DE VALORES NDWI", heading_style))
+    
+    interpretacion_data = [
+        ["Rango NDWI", "Estado del Suelo", "Interpretación", "Acción Recomendada"],
+        ["0.2 a 1.0", "Muy Húmedo", "Contenido de agua excesivo", "Reducir riego, mejorar drenaje"],
+        ["0.1 a 0.2", "Óptimo", "Humedad ideal para cultivo", "Mantener prácticas actuales"],
+        ["0.0 a 0.1", "Moderado", "Humedad aceptable", "Monitorear, riego ligero si es necesario"],
+        ["-0.1 a 0.0", "Seco", "Déficit de humedad", "Incrementar riego en 20-30%"],
+        ["-1.0 a -0.1", "Muy Seco", "Riesgo de sequía", "Riego urgente, medidas de conservación"]
+    ]
+    
+    interpretacion_table = Table(interpretacion_data, colWidths=[1*inch, 1.2*inch, 2*inch, 2*inch])
+    interpretacion_table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#3399ff')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+        ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 8),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.white),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f0f8ff')])
+    ]))
+    story.append(interpretacion_table)
+    story.append(Spacer(1, 20))
+    
+    # Recomendaciones generales
+    story.append(PageBreak())
+    story.append(Paragraph("RECOMENDACIONES DE MANEJO DE AGUA", heading_style))
+    
+    # Determinar recomendaciones basadas en promedio NDWI
+    avg_ndwi = gdf_ndwi['ndwi_suelo'].mean() if not gdf_ndwi.empty else 0
+    
+    if avg_ndwi >= 0.15:
+        enfoque = "ENFOQUE: CONSERVACIÓN - Humedad óptima detectada"
+        recomendaciones = [
+            "Mantener frecuencia actual de riego",
+            "Implementar coberturas vivas para conservar humedad",
+            "Monitorear semanalmente con sensores de humedad",
+            "Considerar riego deficitario controlado en épocas lluviosas"
+        ]
+    elif avg_ndwi >= 0.0:
+        enfoque = "ENFOQUE: AJUSTE MODERADO - Humedad moderada"
+        recomendaciones = [
+            "Incrementar riego en 15-20%",
+            "Aplicar mulching (cobertura seca) entre plantas",
+            "Programar riegos en horas de menor evaporación",
+            "Considerar riego por goteo para mayor eficiencia"
+        ]
+    else:
+        enfoque = "ENFOQUE: INTERVENCIÓN URGENTE - Déficit de humedad"
+        recomendaciones = [
+            "Riego intensivo inmediato (30-40% más)",
+            "Implementar riego por goteo o aspersión",
+            "Aplicar polímeros retenedores de agua en raíces",
+            "Reducir labranza para conservar humedad residual",
+            "Considerar cultivos de cobertura para sombrear suelo"
+        ]
+    
+    story.append(Paragraph(f"<b>Enfoque Principal:</b> {enfoque}", normal_style))
+    story.append(Spacer(1, 10))
+    
+    for rec in recomendaciones:
+        story.append(Paragraph(f"• {rec}", normal_style))
+    
+    story.append(Spacer(1, 20))
+    
+    # Tabla de resultados por zona (primeras 10)
+    story.append(Paragraph("RESULTADOS POR ZONA (PRIMERAS 10 ZONAS)", heading_style))
+    
+    if not gdf_ndwi.empty:
+        columnas_tabla = ['id_zona', 'ndwi_suelo', 'estado_humedad_suelo', 'deficit_humedad', 'recomendacion_riego', 'riesgo_sequia']
+        
+        # Verificar que las columnas existan
+        columnas_existentes = [col for col in columnas_tabla if col in gdf_ndwi.columns]
+        df_tabla = gdf_ndwi[columnas_existentes].head(10).copy()
+        
+        # Redondear valores
+        if 'ndwi_suelo' in df_tabla.columns:
+            df_tabla['ndwi_suelo'] = df_tabla['ndwi_suelo'].round(3)
+        if 'deficit_humedad' in df_tabla.columns:
+            df_tabla['deficit_humedad'] = df_tabla['deficit_humedad'].round(3)
+        
+        # Convertir a lista para tabla
+        table_data = [df_tabla.columns.tolist()]
+        for _, row in df_tabla.iterrows():
+            table_data.append(row.tolist())
+        
+        # Crear tabla
+        zona_table = Table(table_data, colWidths=[0.6*inch] * len(columnas_existentes))
+        zona_table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#3399ff')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), 7),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.white),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black),
+            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f0f8ff')])
+        ]))
+        story.append(zona_table)
+        
+        if len(gdf_ndwi) > 10:
+            story.append(Spacer(1, 5))
+            story.append(Paragraph(f"* Mostrando 10 de {len(gdf_ndwi)} zonas totales", 
+                                 ParagraphStyle('Small', parent=normal_style, fontSize=8)))
+    else:
+        story.append(Paragraph("No hay datos disponibles para mostrar", normal_style))
+    
+    # Información técnica
+    story.append(Spacer(1, 20))
+    story.append(Paragraph("INFORMACIÓN TÉCNICA", heading_style))
+    
+    info_tecnica = [
+        "Método: NDWI (Normalized Difference Water Index) del Suelo",
+        "Fórmula: (SWIR1 - SWIR2) / (SWIR1 + SWIR2)",
+        "Bandas Sentinel-2: B8A (NIR) y B11 (SWIR)",
+        "Rango válido: -1.0 a 1.0",
+        "Interpretación: Valores positivos indican mayor contenido de agua",
+        "Resolución espacial: 20m (Sentinel-2)",
+        "Actualización: Datos actualizados cada 5 días"
+    ]
+    
+    for info in info_tecnica:
+        story.append(Paragraph(f"• {info}", normal_style))
+    
+    # Pie de página
+    story.append(Spacer(1, 30))
+    story.append(Paragraph("INFORME GENERADO AUTOMÁTICAMENTE - SISTEMA DE ANÁLISIS GEE", 
+                         ParagraphStyle('Footer', parent=normal_style, fontSize=8, alignment=1)))
+    
+    # Generar PDF
+    doc.build(story)
+    buffer.seek(0)
+    
+    return buffer
@@ -0,0 +1,217 @@
+"""Medición de tiempos por etapa del análisis (pared, CPU y memoria pico).
+
+Los motores marcan sus etapas con @medir_etapa; solo se registra algo cuando hay
+una Traza activa (Traza.activar()), así el costo es nulo en el uso normal.
+Con Traza(memoria=True) cada etapa registra además, con tracemalloc, su pico y su
+memoria retenida de Python/NumPy y los sitios de asignación que más crecieron.
+"""
+import functools
+import json
+import os
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+_traza_actual = ContextVar('traza_actual', default=None)
+_nivel_actual = ContextVar('nivel_actual', default=0)
+
+_pila_memoria = ContextVar('pila_memoria', default=())
+
+MAX_ETAPAS_TRAZA = 1000
+
+# PARÁMETROS DEL PERFIL DE MEMORIA (tracemalloc)
+PARAMETROS_MEMORIA = {
+    'frames': 1,           # profundidad de la pila guardada por asignación
+    'max_sitios': 10,      # sitios de asignación informados por etapa
+    'min_sitio_kb': 64,    # no informar sitios que crecieron menos que esto
+    'max_nivel_sitios': 1,  # las instantáneas son costosas: solo en las etapas de nivel 0 y 1
+    'min_retenida_sitios_mb': 1.0,  # comparar instantáneas solo si la etapa retuvo al menos esto
+}
+
+# Marcos de la propia medición, que no interesan como sitios de asignación
+_ARCHIVOS_EXCLUIDOS = {
+    tracemalloc.__file__, __file__, '<frozen importlib._bootstrap>',
+    '<frozen importlib._bootstrap_external>', '<unknown>'
+}
+
+
+def _rss_pico_mb():
+    """Memoria residente pico del proceso en MB (None si no se puede medir)"""
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa KB y macOS bytes
+    return pico / (1024 * 1024) if sys.platform == 'darwin' else pico / 1024
+
+
+class Traza:
+    """Registro de etapas de una sesión o de un lote"""
+
+    def __init__(self, max_etapas=MAX_ETAPAS_TRAZA, memoria=None):
+        self.etapas = []
+        self.corrida = 0
+        self.max_etapas = max_etapas
+        # Perfil de memoria opcional: más lento (tracemalloc intercepta cada asignación)
+        if memoria is None:
+            memoria = os.environ.get('ANALIZADOR_PERFIL_MEMORIA', '').lower() in ('1', 'true', 'si', 'sí')
+        self.memoria = memoria
+
+    @contextmanager
+    def activar(self):
+        """Hace que las etapas ejecutadas dentro del bloque se registren en esta traza"""
+        self.corrida += 1
+        token = _traza_actual.set(self)
+        iniciado = False
+        if self.memoria and not tracemalloc.is_tracing():
+            tracemalloc.start(PARAMETROS_MEMORIA['frames'])
+            iniciado = True
+        try:
+            yield self
+        finally:
+            _traza_actual.reset(token)
+            if iniciado:
+                tracemalloc.stop()
+
+    def registrar(self, datos):
+        self.etapas.append(datos)
+        if len(self.etapas) > self.max_etapas:
+            del self.etapas[:len(self.etapas) - self.max_etapas]
+
+    def limpiar(self):
+        self.etapas = []
+
+    def resumen(self):
+        """Totales por etapa: llamadas, segundos y CPU acumulados"""
+        totales = {}
+        for e in self.etapas:
+            if 'segundos' not in e:
+                continue
+            t = totales.setdefault(e['etapa'], {'llamadas': 0, 'segundos': 0.0, 'cpu_segundos': 0.0})
+            t['llamadas'] += 1
+            t['segundos'] += e['segundos']
+            t['cpu_segundos'] += e['cpu_segundos']
+            if e.get('memoria'):
+                t['memoria_pico_mb'] = max(t.get('memoria_pico_mb', 0.0), e['memoria']['pico_mb'])
+                t['memoria_retenida_mb'] = t.get('memoria_retenida_mb', 0.0) + e['memoria']['retenida_mb']
+        return totales
+
+    def a_dict(self):
+        return {'corridas': self.corrida, 'etapas': list(self.etapas), 'resumen': self.resumen()}
+
+    def a_json(self):
+        return json.dumps(self.a_dict(), ensure_ascii=False, indent=2, default=str)
+
+
+class _MedicionMemoria:
+    """Pico y memoria retenida de una etapa con tracemalloc.
+
+    tracemalloc tiene un único pico por proceso: al entrar a una etapa se guarda el
+    pico acumulado hasta ese momento en la etapa que la contiene y se reinicia, y al
+    salir la etapa contenedora recibe el pico de la hija. Así cada nivel informa su
+    propio pico sin perder el de las etapas anidadas. Las instantáneas de las etapas
+    hijas quedan dentro del pico de la etapa contenedora: el valor es aproximado.
+    """
+
+    def __init__(self, nivel):
+        self.pico_hijas = 0
+        # La instantánea se toma antes de leer el contador para no sumarla a esta etapa
+        self.instantanea = None
+        if nivel <= PARAMETROS_MEMORIA['max_nivel_sitios']:
+            self.instantanea = tracemalloc.take_snapshot()
+        actual, pico = tracemalloc.get_traced_memory()
+        pila = _pila_memoria.get()
+        if pila:
+            pila[-1].pico_hijas = max(pila[-1].pico_hijas, pico)
+        tracemalloc.reset_peak()
+        self.actual_inicio = actual
+        self.token = _pila_memoria.set(pila + (self,))
+
+    def cerrar(self):
+        actual, pico = tracemalloc.get_traced_memory()
+        pico = max(pico, self.pico_hijas)
+        _pila_memoria.reset(self.token)
+        pila = _pila_memoria.get()
+        if pila:
+            pila[-1].pico_hijas = max(pila[-1].pico_hijas, pico)
+
+        sitios = []
+        retenida = actual - self.actual_inicio
+        if self.instantanea is not None and retenida >= PARAMETROS_MEMORIA['min_retenida_sitios_mb'] * 1024 * 1024:
+            final = tracemalloc.take_snapshot()
+            for diferencia in final.compare_to(self.instantanea, 'lineno'):
+                if diferencia.size_diff < PARAMETROS_MEMORIA['min_sitio_kb'] * 1024:
+                    break
+                marco = diferencia.traceback[0]
+                if marco.filename in _ARCHIVOS_EXCLUIDOS:
+                    continue
+                sitios.append({
+                    'archivo': marco.filename,
+                    'linea': marco.lineno,
+                    'retenida_kb': round(diferencia.size_diff / 1024, 1),
+                    'bloques': diferencia.count_diff,
+                })
+                if len(sitios) >= PARAMETROS_MEMORIA['max_sitios']:
+                    break
+        self.instantanea = None
+        return {
+            'pico_mb': round(max(pico - self.actual_inicio, 0) / (1024 * 1024), 2),
+            'retenida_mb': round(retenida / (1024 * 1024), 2),
+            'sitios': sitios,
+        }
+
+
+# FUNCIÓN PARA MEDIR UNA ETAPA DENTRO DE LA TRAZA ACTIVA
+@contextmanager
+def etapa(nombre, **detalles):
+    """Registra tiempo de pared, CPU y memoria pico del bloque si hay una traza activa"""
+    traza = _traza_actual.get()
+    if traza is None:
+        yield
+        return
+
+    nivel = _nivel_actual.get()
+    token = _nivel_actual.set(nivel + 1)
+    # Se registra al entrar para que la traza quede en orden de llamada (padre antes que hijos)
+    datos = {'corrida': traza.corrida, 'etapa': nombre, 'nivel': nivel, 'inicio': time.time(), 'detalles': detalles}
+    traza.registrar(datos)
+    memoria = _MedicionMemoria(nivel) if traza.memoria and tracemalloc.is_tracing() else None
+    rss_antes = _rss_pico_mb()
+    pared = time.perf_counter()
+    cpu = time.process_time()
+    error = None
+    try:
+        yield
+    except BaseException as e:
+        error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _nivel_actual.reset(token)
+        rss_despues = _rss_pico_mb()
+        datos.update({
+            'segundos': round(time.perf_counter() - pared, 6),
+            'cpu_segundos': round(time.process_time() - cpu, 6),
+            # El pico es del proceso entero: con varias sesiones en paralelo es aproximado
+            'rss_pico_mb': round(rss_despues, 1) if rss_despues is not None else None,
+            'rss_pico_aumento_mb': round(rss_despues - rss_antes, 1) if rss_despues is not None else None,
+            'error': error,
+        })
+        if memoria is not None:
+            datos['memoria'] = memoria.cerrar()
+
+
+def medir_etapa(nombre):
+    """Decorador: mide cada llamada a la función como la etapa indicada"""
+    def decorador(funcion):
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            with etapa(nombre):
+                return funcion(*args, **kwargs)
+        return envoltura
+    return decorador
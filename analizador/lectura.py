@@ -0,0 +1,219 @@
+"""Lectura de parcelas desde ZIP con shapefile o archivos KML/KMZ"""
+import os
+import tempfile
+import zipfile
+import xml.etree.ElementTree as ET
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+from shapely.geometry import Polygon, MultiPolygon
+
+from .geometria import preparar_geometrias
+from .huella import huellas_por_fila
+from .instrumentacion import medir_etapa
+from .parametros import PARAMETROS_GEOMETRIA
+
+# Configurar para restaurar .shx automáticamente
+os.environ['SHAPE_RESTORE_SHX'] = 'YES'
+
+
+# FUNCIONES AUXILIARES PARA LECTURA INCREMENTAL DE KML/KMZ
+def _etiqueta_kml(elem):
+    """Devuelve la etiqueta de un elemento KML sin el espacio de nombres"""
+    return elem.tag.rsplit('}', 1)[-1]
+
+
+def _abrir_flujo_kml(origen):
+    """Abre un KML o KMZ (ruta o archivo) como flujo de bytes para iterparse"""
+    if zipfile.is_zipfile(origen):
+        if hasattr(origen, 'seek'):
+            origen.seek(0)
+        kmz = zipfile.ZipFile(origen, 'r')
+        nombres_kml = [n for n in kmz.namelist() if n.lower().endswith('.kml')]
+        if not nombres_kml:
+            kmz.close()
+            raise ValueError("El KMZ no contiene ningún archivo .kml")
+        # Por convención el documento principal se llama doc.kml
+        principal = next((n for n in nombres_kml if os.path.basename(n).lower() == 'doc.kml'), nombres_kml[0])
+        return kmz, kmz.open(principal, 'r')
+    if hasattr(origen, 'read'):
+        origen.seek(0)
+        return None, origen
+    return None, open(origen, 'rb')
+
+
+def _coincide_filtro(valores, filtros):
+    """Indica si alguno de los valores contiene alguno de los filtros (sin distinguir mayúsculas)"""
+    if not filtros:
+        return True
+    valores = [v.lower() for v in valores if v]
+    return any(f in v for f in filtros for v in valores)
+
+
+def _parsear_coordenadas_kml(texto):
+    """Convierte el texto de <coordinates> en un array (n, 2) de lon/lat"""
+    tuplas = (texto or '').split()
+    if len(tuplas) < 3:
+        return None
+    dimension = tuplas[0].count(',') + 1
+    try:
+        valores = np.array(texto.replace(',', ' ').split(), dtype=float)
+        return valores.reshape(-1, dimension)[:, :2]
+    except ValueError:
+        # Tuplas con dimensión mixta (2D y 3D en el mismo anillo)
+        return np.array([[float(v) for v in t.split(',')[:2]] for t in tuplas])
+
+
+def _construir_poligono_kml(elem_poligono):
+    """Construye un Polygon de shapely a partir de un elemento <Polygon> de KML"""
+    exterior = None
+    interiores = []
+    for hijo in elem_poligono:
+        etiqueta = _etiqueta_kml(hijo)
+        if etiqueta not in ('outerBoundaryIs', 'innerBoundaryIs'):
+            continue
+        for nodo in hijo.iter():
+            if _etiqueta_kml(nodo) == 'coordinates':
+                anillo = _parsear_coordenadas_kml(nodo.text)
+                if anillo is None:
+                    continue
+                if etiqueta == 'outerBoundaryIs':
+                    exterior = anillo
+                else:
+                    interiores.append(anillo)
+    if exterior is None:
+        return None
+    return Polygon(exterior, interiores)
+
+
+# FUNCIÓN PARA RECORRER POLÍGONOS DE UN KML/KMZ DE FORMA INCREMENTAL
+def iterar_poligonos_kml(origen, nombres=None, carpetas=None):
+    """Recorre un KML/KMZ con iterparse y devuelve (nombre, carpeta, geometría) por placemark.
+
+    Los filtros por nombre de placemark o de carpeta se evalúan antes de construir
+    las geometrías, y cada elemento se libera al cerrarse para mantener la memoria acotada.
+    """
+    filtros_nombre = [n.strip().lower() for n in (nombres or []) if n.strip()]
+    filtros_carpeta = [c.strip().lower() for c in (carpetas or []) if c.strip()]
+
+    contenedor, flujo = _abrir_flujo_kml(origen)
+    try:
+        pila = []
+        carpetas_abiertas = []
+        placemark = None
+
+        for evento, elem in ET.iterparse(flujo, events=('start', 'end')):
+            etiqueta = _etiqueta_kml(elem)
+
+            if evento == 'start':
+                pila.append(elem)
+                if etiqueta in ('Folder', 'Document'):
+                    carpetas_abiertas.append(None)
+                elif etiqueta == 'Placemark':
+                    placemark = {'nombre': None, 'poligonos': [], 'pendientes': []}
+                continue
+
+            pila.pop()
+            padre = pila[-1] if pila else None
+            etiqueta_padre = _etiqueta_kml(padre) if padre is not None else None
+
+            if etiqueta == 'name':
+                texto = (elem.text or '').strip()
+                if etiqueta_padre == 'Placemark' and placemark is not None:
+                    placemark['nombre'] = texto
+                elif etiqueta_padre in ('Folder', 'Document') and carpetas_abiertas:
+                    carpetas_abiertas[-1] = texto
+
+            elif etiqueta == 'Polygon' and placemark is not None:
+                if not _coincide_filtro(carpetas_abiertas, filtros_carpeta):
+                    elem.clear()
+                elif filtros_nombre and placemark['nombre'] is None:
+                    # El nombre aún no apareció: decidir al cerrar el placemark
+                    placemark['pendientes'].append(elem)
+                elif _coincide_filtro([placemark['nombre']], filtros_nombre):
+                    poligono = _construir_poligono_kml(elem)
+                    if poligono is not None:
+                        placemark['poligonos'].append(poligono)
+                    elem.clear()
+                else:
+                    elem.clear()
+
+            elif etiqueta == 'Placemark' and placemark is not None:
+                if placemark['pendientes'] and _coincide_filtro([placemark['nombre']], filtros_nombre):
+                    for elem_poligono in placemark['pendientes']:
+                        poligono = _construir_poligono_kml(elem_poligono)
+                        if poligono is not None:
+                            placemark['poligonos'].append(poligono)
+
+                if placemark['poligonos']:
+                    if len(placemark['poligonos']) == 1:
+                        geometria = placemark['poligonos'][0]
+                    else:
+                        geometria = MultiPolygon(placemark['poligonos'])
+                    carpeta = next((c for c in reversed(carpetas_abiertas) if c), None)
+                    yield placemark['nombre'], carpeta, geometria
+                placemark = None
+
+            elif etiqueta in ('Folder', 'Document'):
+                carpetas_abiertas.pop()
+
+            # Liberar elementos ya procesados para que la memoria no crezca con el archivo
+            if etiqueta in ('Placemark', 'Folder', 'Document') and padre is not None:
+                elem.clear()
+                padre.remove(elem)
+    finally:
+        if contenedor is not None:
+            flujo.close()
+            contenedor.close()
+        elif not hasattr(origen, 'read'):
+            flujo.close()
+
+
+# FUNCIÓN PARA LEER KML/KMZ COMO GEODATAFRAME
+def leer_kml_incremental(origen, nombres=None, carpetas=None):
+    """Lee los polígonos de un KML/KMZ en un GeoDataFrame sin depender del driver KML de GDAL"""
+    registros = {'nombre': [], 'carpeta': [], 'geometry': []}
+    for nombre, carpeta, geometria in iterar_poligonos_kml(origen, nombres, carpetas):
+        registros['nombre'].append(nombre)
+        registros['carpeta'].append(carpeta)
+        registros['geometry'].append(geometria)
+    return gpd.GeoDataFrame(registros, geometry='geometry', crs="EPSG:4326")
+
+
+# FUNCIÓN PARA LEER UNA PARCELA DESDE DISCO (ZIP CON SHAPEFILE O KML/KMZ)
+@medir_etapa('lectura_archivo')
+def leer_parcela(ruta, filtro_nombres=None, filtro_carpetas=None, tolerancia_simplificacion_m=0.0):
+    """Lee la parcela y devuelve (gdf, reporte de geometría); lanza ValueError si no hay polígonos"""
+    if ruta.lower().endswith(('.kml', '.kmz')):
+        # Cargar archivo KML/KMZ de forma incremental
+        gdf = leer_kml_incremental(ruta, filtro_nombres, filtro_carpetas)
+    else:
+        # Procesar como ZIP con shapefile
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with zipfile.ZipFile(ruta, 'r') as zip_ref:
+                zip_ref.extractall(tmp_dir)
+
+            # Buscar archivos shapefile o KML
+            shp_files = [f for f in os.listdir(tmp_dir) if f.endswith('.shp')]
+            kml_files = [f for f in os.listdir(tmp_dir) if f.endswith('.kml')]
+
+            if shp_files:
+                gdf = gpd.read_file(os.path.join(tmp_dir, shp_files[0]))
+            elif kml_files:
+                gdf = leer_kml_incremental(os.path.join(tmp_dir, kml_files[0]), filtro_nombres, filtro_carpetas)
+            else:
+                raise ValueError("No se encontró archivo .shp o .kml en el ZIP")
+
+    if gdf.empty:
+        raise ValueError("El archivo no contiene polígonos (revise los filtros de placemarks)")
+
+    # Reparar geometrías inválidas, ajustar precisión y simplificar
+    gdf, reporte = preparar_geometrias(gdf, PARAMETROS_GEOMETRIA['precision_m'], tolerancia_simplificacion_m)
+
+    # Descartar lotes repetidos (p. ej. el mismo placemark en dos carpetas del KML)
+    duplicados = pd.Series(huellas_por_fila(gdf)).duplicated().to_numpy()
+    reporte['lotes_duplicados'] = int(duplicados.sum())
+    if duplicados.any():
+        gdf = gdf[~duplicados].reset_index(drop=True)
+    return gdf, reporte
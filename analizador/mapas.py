@@ -0,0 +1,835 @@
+"""Mapas interactivos (folium) y estáticos (matplotlib).
+
+folium y matplotlib se importan dentro de cada función: la mayoría de las sesiones
+no llega a dibujar mapas y así no pagan su tiempo de importación.
+"""
+import io
+import logging
+
+import numpy as np
+import shapely
+
+from .geometria import calcular_superficie
+from .instrumentacion import medir_etapa
+from .parametros import PALETAS_GEE, PARAMETROS_CURVAS_NIVEL, CLASIFICACION_PENDIENTES
+from .topografia import remuestrear_grilla
+
+logger = logging.getLogger(__name__)
+
+
+# FUNCIÓN MEJORADA PARA CREAR MAPA INTERACTIVO CON ESRI SATELITE
+@medir_etapa('mapa_interactivo')
+def crear_mapa_interactivo_esri(gdf, titulo, columna_valor=None, analisis_tipo=None, nutriente=None):
+    """Crea mapa interactivo con base ESRI Satélite - MEJORADO"""
+    import folium
+    from folium import plugins
+    
+    # Obtener centro y bounds del GeoDataFrame
+    centroid = gdf.geometry.centroid.iloc[0]
+    bounds = gdf.total_bounds
+    
+    # Crear mapa centrado con ESRI Satélite por defecto
+    m = folium.Map(
+        location=[centroid.y, centroid.x],
+        zoom_start=15,
+        tiles='https://server.arcgisonline.com/ArcGIS/rest/services/World_Imagery/MapServer/tile/{z}/{y}/{x}',
+        attr='Esri',
+        name='Esri Satélite'
+    )
+    
+    # Añadir otras bases como opciones
+    folium.TileLayer(
+        tiles='https://server.arcgisonline.com/ArcGIS/rest/services/World_Street_Map/MapServer/tile/{z}/{y}/{x}',
+        attr='Esri',
+        name='Esri Calles',
+        overlay=False
+    ).add_to(m)
+    
+    folium.TileLayer(
+        tiles='OpenStreetMap',
+        name='OpenStreetMap',
+        overlay=False
+    ).add_to(m)
+    
+    # Añadir capa de relieve
+    folium.TileLayer(
+        tiles='https://server.arcgisonline.com/ArcGIS/rest/services/World_Shaded_Relief/MapServer/tile/{z}/{y}/{x}',
+        attr='Esri',
+        name='Relieve',
+        overlay=False
+    ).add_to(m)
+
+    # CONFIGURAR RANGOS MEJORADOS
+    if columna_valor and analisis_tipo:
+        if analisis_tipo == "FERTILIDAD ACTUAL":
+            vmin, vmax = 0, 1
+            colores = PALETAS_GEE['FERTILIDAD']
+            unidad = "Índice"
+        elif analisis_tipo == "ANÁLISIS DE TEXTURA":
+            # Mapa categórico para texturas
+            colores_textura = {
+                'Franco': '#c7eae5',
+                'Franco Arcilloso': '#5ab4ac',
+                'Franco Arenoso': '#f6e8c3',
+                'Arenoso': '#d8b365',
+                'Arcilloso': '#01665e',
+                'NO_DETERMINADA': '#999999'
+            }
+            unidad = "Textura"
+        elif analisis_tipo == "ANÁLISIS NDWI SUELO":
+            vmin, vmax = -1, 1
+            colores = PALETAS_GEE['NDWI_SUELO']
+            unidad = "Índice"
+        elif analisis_tipo == "ANÁLISIS DE CURVAS DE NIVEL (LIDAR/DEM)":
+            # Para curvas de nivel, usar paleta de elevación
+            vmin, vmax = gdf[columna_valor].min(), gdf[columna_valor].max()
+            colores = PALETAS_GEE['ELEVACION']
+            unidad = "m"
+        else:
+            # RANGOS MÁS REALISTAS PARA RECOMENDACIONES
+            if nutriente == "NITRÓGENO":
+                vmin, vmax = 0, 250
+                colores = PALETAS_GEE['NITROGENO']
+                unidad = "kg/ha N"
+            elif nutriente == "FÓSFORO":
+                vmin, vmax = 0, 120
+                colores = PALETAS_GEE['FOSFORO']
+                unidad = "kg/ha P₂O₅"
+            else:  # POTASIO
+                vmin, vmax = 0, 200
+                colores = PALETAS_GEE['POTASIO']
+                unidad = "kg/ha K₂O"
+        
+        # Función para obtener color
+        def obtener_color(valor, vmin, vmax, colores):
+            if vmax == vmin:
+                return colores[len(colores)//2]
+            valor_norm = (valor - vmin) / (vmax - vmin)
+            valor_norm = max(0, min(1, valor_norm))
+            idx = int(valor_norm * (len(colores) - 1))
+            return colores[idx]
+        
+        # Añadir cada polígono con estilo mejorado
+        for idx, row in gdf.iterrows():
+            if analisis_tipo == "ANÁLISIS DE TEXTURA":
+                # Manejo especial para textura (valores categóricos)
+                textura = row[columna_valor]
+                color = colores_textura.get(textura, '#999999')
+                valor_display = textura
+            else:
+                # Manejo para valores numéricos
+                valor = row[columna_valor]
+                color = obtener_color(valor, vmin, vmax, colores)
+                if analisis_tipo in ["FERTILIDAD ACTUAL", "ANÁLISIS NDWI SUELO"]:
+                    valor_display = f"{valor:.3f}"
+                elif analisis_tipo == "ANÁLISIS DE CURVAS DE NIVEL (LIDAR/DEM)":
+                    valor_display = f"{valor:.1f}"
+                else:
+                    valor_display = f"{valor:.1f}"
+            
+            # Popup más informativo
+            if analisis_tipo == "FERTILIDAD ACTUAL":
+                popup_text = f"""
+                <div style="font-family: Arial; font-size: 12px;">
+                    <h4>Zona {row['id_zona']}</h4>
+                    <b>Índice Fertilidad:</b> {valor_display}<br>
+                    <b>Área:</b> {row.get('area_ha', 0):.2f} ha<br>
+                    <b>Categoría:</b> {row.get('categoria', 'N/A')}<br>
+                    <b>Prioridad:</b> {row.get('prioridad', 'N/A')}<br>
+                    <hr>
+                    <b>N:</b> {row.get('nitrogeno', 0):.1f} kg/ha<br>
+                    <b>P:</b> {row.get('fosforo', 0):.1f} kg/ha<br>
+                    <b>K:</b> {row.get('potasio', 0):.1f} kg/ha<br>
+                    <b>MO:</b> {row.get('materia_organica', 0):.1f}%<br>
+                    <b>NDVI:</b> {row.get('ndvi', 0):.3f}
+                </div>
+                """
+            elif analisis_tipo == "ANÁLISIS DE TEXTURA":
+                popup_text = f"""
+                <div style="font-family: Arial; font-size: 12px;">
+                    <h4>Zona {row['id_zona']}</h4>
+                    <b>Textura:</b> {valor_display}<br>
+                    <b>Adecuación:</b> {row.get('adecuacion_textura', 0):.1%}<br>
+                    <b>Área:</b> {row.get('area_ha', 0):.2f} ha<br>
+                    <hr>
+                    <b>Arena:</b> {row.get('arena', 0):.1f}%<br>
+                    <b>Limo:</b> {row.get('limo', 0):.1f}%<br>
+                    <b>Arcilla:</b> {row.get('arcilla', 0):.1f}%<br>
+                    <b>Capacidad Campo:</b> {row.get('capacidad_campo', 0):.1f} mm/m<br>
+                    <b>Agua Disponible:</b> {row.get('agua_disponible', 0):.1f} mm/m
+                </div>
+                """
+            elif analisis_tipo == "ANÁLISIS NDWI SUELO":
+                popup_text = f"""
+                <div style="font-family: Arial; font-size: 12px;">
+                    <h4>Zona {row['id_zona']}</h4>
+                    <b>NDWI Suelo:</b> {valor_display}<br>
+                    <b>Estado Humedad:</b> {row.get('estado_humedad_suelo', 'N/A')}<br>
+                    <b>Riesgo Sequía:</b> {row.get('riesgo_sequia', 'N/A')}<br>
+                    <b>Recomendación Riego:</b> {row.get('recomendacion_riego', 'N/A')}<br>
+                    <hr>
+                    <b>Área:</b> {row.get('area_ha', 0):.2f} ha<br>
+                    <b>Déficit Humedad:</b> {row.get('deficit_humedad', 0):.3f}<br>
+                    <b>Humedad:</b> {row.get('humedad', 0):.1%}<br>
+                    <b>NDVI:</b> {row.get('ndvi', 0):.3f}
+                </div>
+                """
+            elif analisis_tipo == "ANÁLISIS DE CURVAS DE NIVEL (LIDAR/DEM)":
+                popup_text = f"""
+                <div style="font-family: Arial; font-size: 12px;">
+                    <h4>Curva {row['id_curva']}</h4>
+                    <b>Elevación:</b> {valor_display} m<br>
+                    <b>Longitud:</b> {row.get('longitud_m', 0):.1f} m<br>
+                    <hr>
+                    <b>Tipo:</b> Curva de nivel<br>
+                    <b>Intervalo:</b> {PARAMETROS_CURVAS_NIVEL['intervalo_curvas']} m
+                </div>
+                """
+            else:
+                popup_text = f"""
+                <div style="font-family: Arial; font-size: 12px;">
+                    <h4>Zona {row['id_zona']}</h4>
+                    <b>Recomendación {nutriente}:</b> {valor_display} {unidad}<br>
+                    <b>Área:</b> {row.get('area_ha', 0):.2f} ha<br>
+                    <b>Categoría Fertilidad:</b> {row.get('categoria', 'N/A')}<br>
+                    <b>Prioridad:</b> {row.get('prioridad', 'N/A')}<br>
+                    <hr>
+                    <b>N Actual:</b> {row.get('nitrogeno', 0):.1f} kg/ha<br>
+                    <b>P Actual:</b> {row.get('fosforo', 0):.1f} kg/ha<br>
+                    <b>K Actual:</b> {row.get('potasio', 0):.1f} kg/ha<br>
+                    <b>Déficit:</b> {row.get('deficit_npk', 0):.1f} kg/ha
+                </div>
+                """
+            
+            # Estilo mejorado para los polígonos
+            folium.GeoJson(
+                row.geometry.__geo_interface__,
+                style_function=lambda x, color=color: {
+                    'fillColor': color,
+                    'color': 'black',
+                    'weight': 2,
+                    'fillOpacity': 0.7,
+                    'opacity': 0.9
+                },
+                popup=folium.Popup(popup_text, max_width=300),
+                tooltip=f"Zona {row['id_zona']}: {valor_display}"
+            ).add_to(m)
+            
+            # Marcador con número de zona mejorado
+            if analisis_tipo != "ANÁLISIS DE CURVAS DE NIVEL (LIDAR/DEM)":
+                centroid = row.geometry.centroid
+                folium.Marker(
+                    [centroid.y, centroid.x],
+                    icon=folium.DivIcon(
+                        html=f'''
+                        <div style="
+                            background-color: white; 
+                            border: 2px solid black; 
+                            border-radius: 50%; 
+                            width: 28px; 
+                            height: 28px; 
+                            display: flex; 
+                            align-items: center; 
+                            justify-content: center; 
+                            font-weight: bold; 
+                            font-size: 11px;
+                            color: black;
+                        ">{row["id_zona"]}</div>
+                        '''
+                    ),
+                    tooltip=f"Zona {row['id_zona']} - Click para detalles"
+                ).add_to(m)
+    else:
+        # Mapa simple del polígono original
+        for idx, row in gdf.iterrows():
+            folium.GeoJson(
+                row.geometry.__geo_interface__,
+                style_function=lambda x: {
+                    'fillColor': '#1f77b4',
+                    'color': '#2ca02c',
+                    'weight': 3,
+                    'fillOpacity': 0.5,
+                    'opacity': 0.8
+                },
+                popup=folium.Popup(
+                    f"<b>Polígono {idx + 1}</b><br>Área: {calcular_superficie(gdf.iloc[[idx]]):.2f} ha", 
+                    max_width=300
+                ),
+            ).add_to(m)
+    
+    # Ajustar bounds del mapa
+    m.fit_bounds([[bounds[1], bounds[0]], [bounds[3], bounds[2]]])
+    
+    # Añadir controles mejorados
+    folium.LayerControl().add_to(m)
+    plugins.MeasureControl(position='bottomleft', primary_length_unit='meters').add_to(m)
+    plugins.MiniMap(toggle_display=True, position='bottomright').add_to(m)
+    plugins.Fullscreen(position='topright').add_to(m)
+    
+    # Añadir leyenda mejorada
+    if columna_valor and analisis_tipo:
+        legend_html = f'''
+        <div style="
+            position: fixed; 
+            top: 10px; 
+            right: 10px; 
+            width: 250px; 
+            height: auto; 
+            background-color: white; 
+            border: 2px solid grey; 
+            z-index: 9999; 
+            font-size: 12px; 
+            padding: 10px; 
+            border-radius: 5px;
+            font-family: Arial;
+        ">
+            <h4 style="margin:0 0 10px 0; text-align:center; color: #333;">{titulo}</h4>
+            <div style="margin-bottom: 10px;">
+                <strong>Escala de Valores ({unidad}):</strong>
+            </div>
+        '''
+        
+        if analisis_tipo == "FERTILIDAD ACTUAL":
+            steps = 8
+            for i in range(steps):
+                value = i / (steps - 1)
+                color_idx = int((i / (steps - 1)) * (len(PALETAS_GEE['FERTILIDAD']) - 1))
+                color = PALETAS_GEE['FERTILIDAD'][color_idx]
+                categoria = ["Muy Baja", "Baja", "Media-Baja", "Media", "Media-Alta", "Alta", "Muy Alta"][min(i, 6)] if i < 7 else "Óptima"
+                legend_html += f'<div style="margin:2px 0;"><span style="background:{color}; width:20px; height:15px; display:inline-block; margin-right:5px; border:1px solid #000;"></span> {value:.1f} ({categoria})</div>'
+        elif analisis_tipo == "ANÁLISIS DE TEXTURA":
+            # Leyenda categórica para texturas
+            colores_textura = {
+                'Franco': '#c7eae5',
+                'Franco Arcilloso': '#5ab4ac',
+                'Franco Arenoso': '#f6e8c3',
+                'Arenoso': '#d8b365',
+                'Arcilloso': '#01665e'
+            }
+            for textura, color in colores_textura.items():
+                legend_html += f'<div style="margin:2px 0;"><span style="background:{color}; width:20px; height:15px; display:inline-block; margin-right:5px; border:1px solid #000;"></span> {textura}</div>'
+        elif analisis_tipo == "ANÁLISIS NDWI SUELO":
+            steps = 7
+            values = [-1.0, -0.5, -0.1, 0.0, 0.1, 0.2, 1.0]
+            labels = ["Muy Seco", "Seco", "Moderado", "Óptimo", "Húmedo", "Muy Húmedo", "Saturado"]
+            for i in range(steps):
+                value = values[i]
+                color_idx = int((i / (steps - 1)) * (len(PALETAS_GEE['NDWI_SUELO']) - 1))
+                color = PALETAS_GEE['NDWI_SUELO'][color_idx]
+                legend_html += f'<div style="margin:2px 0;"><span style="background:{color}; width:20px; height:15px; display:inline-block; margin-right:5px; border:1px solid #000;"></span> {value:.1f} ({labels[i]})</div>'
+        elif analisis_tipo == "ANÁLISIS DE CURVAS DE NIVEL (LIDAR/DEM)":
+            steps = 6
+            for i in range(steps):
+                value = vmin + (i / (steps - 1)) * (vmax - vmin)
+                color_idx = int((i / (steps - 1)) * (len(colores) - 1))
+                color = colores[color_idx]
+                legend_html += f'<div style="margin:2px 0;"><span style="background:{color}; width:20px; height:15px; display:inline-block; margin-right:5px; border:1px solid #000;"></span> {value:.0f} m</div>'
+        else:
+            steps = 6
+            for i in range(steps):
+                value = vmin + (i / (steps - 1)) * (vmax - vmin)
+                color_idx = int((i / (steps - 1)) * (len(colores) - 1))
+                color = colores[color_idx]
+                intensidad = ["Muy Baja", "Baja", "Media", "Alta", "Muy Alta", "Máxima"][i]
+                legend_html += f'<div style="margin:2px 0;"><span style="background:{color}; width:20px; height:15px; display:inline-block; margin-right:5px; border:1px solid #000;"></span> {value:.0f} ({intensidad})</div>'
+        
+        legend_html += '''
+            <div style="margin-top: 10px; font-size: 10px; color: #666;">
+                💡 Click en las zonas para detalles
+            </div>
+        </div>
+        '''
+        m.get_root().html.add_child(folium.Element(legend_html))
+    
+    return m
+
+
+# FUNCIÓN PARA CREAR MAPA VISUALIZADOR DE PARCELA
+@medir_etapa('mapa_interactivo')
+def crear_mapa_visualizador_parcela(gdf):
+    """Crea mapa interactivo para visualizar la parcela original con ESRI Satélite"""
+    import folium
+    from folium import plugins
+    
+    # Obtener centro y bounds
+    centroid = gdf.geometry.centroid.iloc[0]
+    bounds = gdf.total_bounds
+    
+    # Crear mapa con ESRI Satélite por defecto
+    m = folium.Map(
+        location=[centroid.y, centroid.x],
+        zoom_start=14,
+        tiles='https://server.arcgisonline.com/ArcGIS/rest/services/World_Imagery/MapServer/tile/{z}/{y}/{x}',
+        attr='Esri',
+        name='Esri Satélite'
+    )
+    
+    # Añadir otras bases
+    folium.TileLayer(
+        tiles='https://server.arcgisonline.com/ArcGIS/rest/services/World_Street_Map/MapServer/tile/{z}/{y}/{x}',
+        attr='Esri',
+        name='Esri Calles',
+        overlay=False
+    ).add_to(m)
+    
+    folium.TileLayer(
+        tiles='OpenStreetMap',
+        name='OpenStreetMap',
+        overlay=False
+    ).add_to(m)
+    
+    # Añadir polígonos de la parcela
+    for idx, row in gdf.iterrows():
+        area_ha = calcular_superficie(gdf.iloc[[idx]])
+        
+        folium.GeoJson(
+            row.geometry.__geo_interface__,
+            style_function=lambda x: {
+                'fillColor': '#1f77b4',
+                'color': '#2ca02c',
+                'weight': 3,
+                'fillOpacity': 0.4,
+                'opacity': 0.8
+            },
+            popup=folium.Popup(
+                f"<b>Parcela {idx + 1}</b><br>"
+                f"<b>Área:</b> {area_ha:.2f} ha<br>"
+                f"<b>Coordenadas:</b> {centroid.y:.4f}, {centroid.x:.4f}",
+                max_width=300
+            ),
+            tooltip=f"Parcela {idx + 1} - {area_ha:.2f} ha"
+        ).add_to(m)
+    
+    # Ajustar bounds
+    m.fit_bounds([[bounds[1], bounds[0]], [bounds[3], bounds[2]]])
+    
+    # Añadir controles
+    folium.LayerControl().add_to(m)
+    plugins.MeasureControl(position='bottomleft').add_to(m)
+    plugins.MiniMap(toggle_display=True).add_to(m)
+    plugins.Fullscreen(position='topright').add_to(m)
+    
+    # Añadir leyenda
+    legend_html = '''
+    <div style="position: fixed; 
+                top: 10px; right: 10px; width: 200px; height: auto; 
+                background-color: white; border:2px solid grey; z-index:9999; 
+                font-size:14px; padding: 10px">
+    <p><b>🌱 Visualizador de Parcela</b></p>
+    <p><b>Leyenda:</b></p>
+    <p><i style="background:#1f77b4; width:20px; height:20px; display:inline-block; margin-right:5px; opacity:0.4;"></i> Área de la parcela</p>
+    <p><i style="background:#2ca02c; width:20px; height:20px; display:inline-block; margin_right:5px; opacity:0.8;"></i> Borde de la parcela</p>
+    </div>
+    '''
+    m.get_root().html.add_child(folium.Element(legend_html))
+    
+    return m
+
+
+# FUNCIÓN PARA CREAR MAPA ESTÁTICO
+@medir_etapa('mapa_estatico')
+def crear_mapa_estatico(gdf, titulo, columna_valor=None, analisis_tipo=None, nutriente=None):
+    """Crea mapa estático con matplotlib"""
+    import matplotlib.pyplot as plt
+    from matplotlib.colors import LinearSegmentedColormap
+
+    try:
+        fig, ax = plt.subplots(1, 1, figsize=(12, 8))
+        
+        # CONFIGURACIÓN UNIFICADA CON EL MAPA INTERACTIVO
+        if columna_valor and analisis_tipo:
+            if analisis_tipo == "FERTILIDAD ACTUAL":
+                cmap = LinearSegmentedColormap.from_list('fertilidad_gee', PALETAS_GEE['FERTILIDAD'])
+                vmin, vmax = 0, 1
+            elif analisis_tipo == "ANÁLISIS DE TEXTURA":
+                # Mapa categórico para texturas
+                colores_textura = {
+                    'Franco': '#c7eae5',
+                    'Franco Arcilloso': '#5ab4ac',
+                    'Franco Arenoso': '#f6e8c3',
+                    'Arenoso': '#d8b365',
+                    'Arcilloso': '#01665e',
+                    'NO_DETERMINADA': '#999999'
+                }
+            elif analisis_tipo == "ANÁLISIS NDWI SUELO":
+                cmap = LinearSegmentedColormap.from_list('ndwi_suelo_gee', PALETAS_GEE['NDWI_SUELO'])
+                vmin, vmax = -1, 1
+            elif analisis_tipo == "ANÁLISIS DE CURVAS DE NIVEL (LIDAR/DEM)":
+                cmap = LinearSegmentedColormap.from_list('elevacion_gee', PALETAS_GEE['ELEVACION'])
+                vmin, vmax = gdf[columna_valor].min(), gdf[columna_valor].max()
+            else:
+                # USAR EXACTAMENTE LOS MISMOS RANGOS QUE EL MAPA INTERACTIVO
+                if nutriente == "NITRÓGENO":
+                    cmap = LinearSegmentedColormap.from_list('nitrogeno_gee', PALETAS_GEE['NITROGENO'])
+                    vmin, vmax = 0, 250
+                elif nutriente == "FÓSFORO":
+                    cmap = LinearSegmentedColormap.from_list('fosforo_gee', PALETAS_GEE['FOSFORO'])
+                    vmin, vmax = 0, 120
+                else:  # POTASIO
+                    cmap = LinearSegmentedColormap.from_list('potasio_gee', PALETAS_GEE['POTASIO'])
+                    vmin, vmax = 0, 200
+            
+            # Plotear cada polígono con color según valor
+            for idx, row in gdf.iterrows():
+                if analisis_tipo == "ANÁLISIS DE TEXTURA":
+                    # Manejo especial para textura
+                    textura = row[columna_valor]
+                    color = colores_textura.get(textura, '#999999')
+                else:
+                    valor = row[columna_valor]
+                    valor_norm = (valor - vmin) / (vmax - vmin)
+                    valor_norm = max(0, min(1, valor_norm))
+                    color = cmap(valor_norm)
+                
+                # Plot del polígono
+                gdf.iloc[[idx]].plot(ax=ax, color=color, edgecolor='black', linewidth=1)
+                
+                # Etiqueta con valor
+                centroid = row.geometry.centroid
+                if analisis_tipo == "FERTILIDAD ACTUAL":
+                    texto_valor = f"{row[columna_valor]:.3f}"
+                elif analisis_tipo == "ANÁLISIS DE TEXTURA":
+                    texto_valor = row[columna_valor]
+                elif analisis_tipo == "ANÁLISIS NDWI SUELO":
+                    texto_valor = f"{row[columna_valor]:.3f}"
+                elif analisis_tipo == "ANÁLISIS DE CURVAS DE NIVEL (LIDAR/DEM)":
+                    texto_valor = f"{row[columna_valor]:.0f}"
+                else:
+                    texto_valor = f"{row[columna_valor]:.0f} kg"
+                
+                ax.annotate(f"Z{row['id_zona']}\n{texto_valor}", 
+                           (centroid.x, centroid.y), 
+                           xytext=(3, 3), textcoords="offset points", 
+                           fontsize=6, color='black', weight='bold',
+                           bbox=dict(boxstyle="round,pad=0.2", facecolor='white', alpha=0.8),
+                           ha='center', va='center')
+        else:
+            # Mapa simple del polígono original
+            gdf.plot(ax=ax, color='lightblue', edgecolor='black', linewidth=2, alpha=0.7)
+        
+        # Configuración del mapa
+        ax.set_title(f'🗺️ {titulo}', fontsize=14, fontweight='bold', pad=15)
+        ax.set_xlabel('Longitud')
+        ax.set_ylabel('Latitud')
+        ax.grid(True, alpha=0.3)
+        
+        # BARRA DE COLORES UNIFICADA
+        if columna_valor and analisis_tipo and analisis_tipo != "ANÁLISIS DE TEXTURA":
+            sm = plt.cm.ScalarMappable(cmap=cmap, norm=plt.Normalize(vmin=vmin, vmax=vmax))
+            sm.set_array([])
+            cbar = plt.colorbar(sm, ax=ax, shrink=0.8)
+            
+            # Etiquetas de barra unificadas
+            if analisis_tipo == "FERTILIDAD ACTUAL":
+                cbar.set_label('Índice NPK Actual (0-1)', fontsize=10)
+                cbar.set_ticks([0, 0.2, 0.4, 0.6, 0.8, 1.0])
+                cbar.set_ticklabels(['0.0 (Muy Baja)', '0.2', '0.4 (Media)', '0.6', '0.8', '1.0 (Muy Alta)'])
+            elif analisis_tipo == "ANÁLISIS NDWI SUELO":
+                cbar.set_label('NDWI Suelo (-1 a 1)', fontsize=10)
+                cbar.set_ticks([-1, -0.5, -0.1, 0, 0.1, 0.2, 1])
+                cbar.set_ticklabels(['-1 (Muy Seco)', '-0.5', '-0.1', '0', '0.1', '0.2', '1 (Saturado)'])
+            elif analisis_tipo == "ANÁLISIS DE CURVAS DE NIVEL (LIDAR/DEM)":
+                cbar.set_label('Elevación (metros)', fontsize=10)
+                cbar.set_ticks([vmin, (vmin+vmax)/2, vmax])
+                cbar.set_ticklabels([f'{vmin:.0f} m', f'{(vmin+vmax)/2:.0f} m', f'{vmax:.0f} m'])
+            else:
+                cbar.set_label(f'Recomendación {nutriente} (kg/ha)', fontsize=10)
+                if nutriente == "NITRÓGENO":
+                    cbar.set_ticks([0, 50, 100, 150, 200, 250])
+                    cbar.set_ticklabels(['0', '50', '100', '150', '200', '250 kg/ha'])
+                elif nutriente == "FÓSFORO":
+                    cbar.set_ticks([0, 24, 48, 72, 96, 120])
+                    cbar.set_ticklabels(['0', '24', '48', '72', '96', '120 kg/ha'])
+                else:  # POTASIO
+                    cbar.set_ticks([0, 40, 80, 120, 160, 200])
+                    cbar.set_ticklabels(['0', '40', '80', '120', '160', '200 kg/ha'])
+        
+        plt.tight_layout()
+        
+        # Convertir a imagen
+        buf = io.BytesIO()
+        plt.savefig(buf, format='png', dpi=150, bbox_inches='tight')
+        buf.seek(0)
+        plt.close()
+        
+        return buf
+        
+    except Exception as e:
+        logger.error(f"Error creando mapa estático: {str(e)}")
+        return None
+
+
+# FUNCIÓN CORREGIDA PARA CREAR MAPA DE CURVAS DE NIVEL
+@medir_etapa('mapa_interactivo')
+def crear_mapa_curvas_nivel(gdf_original, gdf_curvas, modelo=None, zonas_encharcamiento=None):
+    """Crea mapa interactivo con curvas de nivel - VERSIÓN CORREGIDA
+    (y, si se pasan, las zonas de encharcamiento como capa aparte)"""
+    import folium
+    from folium import plugins
+    
+    # Verificar si hay datos
+    if gdf_original.empty:
+        # Si no hay datos, crear mapa por defecto
+        m = folium.Map(location=[0, 0], zoom_start=2)
+        return m
+    
+    # Obtener centro y bounds
+    centroid = gdf_original.geometry.centroid.iloc[0]
+    bounds = gdf_original.total_bounds
+    
+    # Crear mapa con ESRI Satélite por defecto
+    m = folium.Map(
+        location=[centroid.y, centroid.x],
+        zoom_start=14,
+        tiles='https://server.arcgisonline.com/ArcGIS/rest/services/World_Imagery/MapServer/tile/{z}/{y}/{x}',
+        attr='Esri',
+        name='Esri Satélite'
+    )
+    
+    # Añadir otras bases
+    folium.TileLayer(
+        tiles='https://server.arcgisonline.com/ArcGIS/rest/services/World_Street_Map/MapServer/tile/{z}/{y}/{x}',
+        attr='Esri',
+        name='Esri Calles',
+        overlay=False
+    ).add_to(m)
+    
+    folium.TileLayer(
+        tiles='OpenStreetMap',
+        name='OpenStreetMap',
+        overlay=False
+    ).add_to(m)
+    
+    # Añadir capa de relieve
+    folium.TileLayer(
+        tiles='https://server.arcgisonline.com/ArcGIS/rest/services/World_Shaded_Relief/MapServer/tile/{z}/{y}/{x}',
+        attr='Esri',
+        name='Relieve',
+        overlay=False
+    ).add_to(m)
+    
+    # CALCULAR ÁREA ANTES DE USAR EN POPUP - VERSIÓN CORREGIDA
+    try:
+        area_parcela = calcular_superficie(gdf_original)
+    except Exception as e:
+        area_parcela = 0.0
+    
+    # Añadir parcela original
+    folium.GeoJson(
+        gdf_original.geometry.__geo_interface__,
+        style_function=lambda x: {
+            'fillColor': '#1f77b4',
+            'color': '#2ca02c',
+            'weight': 3,
+            'fillOpacity': 0.3,
+            'opacity': 0.8
+        },
+        # USAR LA VARIABLE CALCULADA PREVIAMENTE
+        popup=folium.Popup(f"Parcela - Área: {area_parcela:.2f} ha", max_width=300),
+        tooltip="Parcela principal"
+    ).add_to(m)
+    
+    # Añadir curvas de nivel: una capa por nivel (las curvas reales se parten en muchos tramos)
+    if not gdf_curvas.empty and 'elevacion' in gdf_curvas.columns:
+        if modelo is not None:
+            z_min, z_max = np.nanmin(modelo.elevacion), np.nanmax(modelo.elevacion)
+        for elevacion, tramos in gdf_curvas.groupby('elevacion', sort=True):
+            # Determinar color basado en elevación (si tenemos datos DEM)
+            if modelo is not None:
+                # Normalizar elevación para color
+                if z_max > z_min:
+                    norm_elev = min(max((elevacion - z_min) / (z_max - z_min), 0.0), 1.0)
+                else:
+                    norm_elev = 0.5
+                
+                # Usar paleta de elevación
+                colores = PALETAS_GEE['ELEVACION']
+                color_idx = int(norm_elev * (len(colores) - 1))
+                color = colores[color_idx]
+                
+                # Determinar grosor basado en intervalo
+                if elevacion % 25 == 0:  # Curva maestra cada 25m
+                    weight = 3
+                elif elevacion % 5 == 0:  # Curva intermedia cada 5m
+                    weight = 2
+                else:
+                    weight = 1
+            else:
+                color = '#00441b'  # Verde oscuro por defecto
+                weight = 1
+            
+            geometria = shapely.multilinestrings(tramos.geometry.to_numpy())
+            folium.GeoJson(
+                geometria.__geo_interface__,
+                style_function=lambda x, color=color, weight=weight: {
+                    'color': color,
+                    'weight': weight,
+                    'fillOpacity': 0,
+                    'opacity': 0.8
+                },
+                popup=folium.Popup(f"Curva de nivel {elevacion:g} m<br>Tramos: {len(tramos)}", max_width=200),
+                tooltip=f"Elevación: {elevacion:g} m"
+            ).add_to(m)
+    
+    # Zonas de encharcamiento (depresiones rellenadas), más azul cuanto más profundas
+    if zonas_encharcamiento is not None and not zonas_encharcamiento.empty:
+        capa_agua = folium.FeatureGroup(name='💧 Zonas de encharcamiento')
+        prof_ref = max(float(zonas_encharcamiento['profundidad_max_m'].max()), 1e-6)
+        for zona in zonas_encharcamiento.itertuples():
+            opacidad = 0.35 + 0.45 * min(zona.profundidad_max_m / prof_ref, 1.0)
+            folium.GeoJson(
+                zona.geometry.__geo_interface__,
+                style_function=lambda x, opacidad=opacidad: {
+                    'fillColor': '#2171b5',
+                    'color': '#08306b',
+                    'weight': 1,
+                    'fillOpacity': opacidad,
+                    'opacity': 0.9
+                },
+                popup=folium.Popup(
+                    f"<b>Zona de encharcamiento {zona.id_zona}</b><br>"
+                    f"Área: {zona.area_ha:.2f} ha<br>"
+                    f"Profundidad máx.: {zona.profundidad_max_m:.2f} m<br>"
+                    f"Volumen: {zona.volumen_m3:,.0f} m³<br>"
+                    f"Cota de desborde: {zona.cota_desborde_m:.1f} m", max_width=250),
+                tooltip=f"Encharcamiento {zona.id_zona}: {zona.volumen_m3:,.0f} m³"
+            ).add_to(capa_agua)
+        capa_agua.add_to(m)
+    
+    # Añadir marcador para punto más alto si hay datos DEM
+    if modelo is not None:
+        grid_z = modelo.elevacion_parcela()
+        grilla = modelo.grilla
+        
+        # Encontrar punto más alto
+        if not np.all(np.isnan(grid_z)):
+            idx_max = np.unravel_index(np.nanargmax(grid_z), grid_z.shape)
+            lon, lat = grilla.coordenadas_geograficas(*idx_max)
+            punto_alto = [float(lat), float(lon)]
+            
+            folium.Marker(
+                punto_alto,
+                icon=folium.DivIcon(
+                    html='<div style="background-color: red; color: white; padding: 5px; border-radius: 50%;">▲</div>'
+                ),
+                popup=f"Punto más alto: {grid_z[idx_max]:.1f} m",
+                tooltip="Punto más alto"
+            ).add_to(m)
+            
+            # Encontrar punto más bajo
+            idx_min = np.unravel_index(np.nanargmin(grid_z), grid_z.shape)
+            lon, lat = grilla.coordenadas_geograficas(*idx_min)
+            punto_bajo = [float(lat), float(lon)]
+            
+            folium.Marker(
+                punto_bajo,
+                icon=folium.DivIcon(
+                    html='<div style="background-color: blue; color: white; padding: 5px; border-radius: 50%;">▼</div>'
+                ),
+                popup=f"Punto más bajo: {grid_z[idx_min]:.1f} m",
+                tooltip="Punto más bajo"
+            ).add_to(m)
+    
+    # Ajustar bounds
+    m.fit_bounds([[bounds[1], bounds[0]], [bounds[3], bounds[2]]])
+    
+    # Añadir controles
+    folium.LayerControl().add_to(m)
+    plugins.MeasureControl(position='bottomleft', primary_length_unit='meters').add_to(m)
+    plugins.MiniMap(toggle_display=True).add_to(m)
+    plugins.Fullscreen(position='topright').add_to(m)
+    
+    # Añadir leyenda
+    legend_html = '''
+    <div style="position: fixed; 
+                top: 10px; right: 10px; width: 250px; height: auto; 
+                background-color: white; border:2px solid grey; z-index:9999; 
+                font-size:12px; padding: 10px; border-radius:5px;
+                font-family: Arial;">
+        <h4 style="margin:0 0 10px 0; text-align:center;">🏔️ Curvas de Nivel</h4>
+        <p><b>Leyenda:</b></p>
+        <p><i style="background:#1f77b4; width:20px; height:20px; display:inline-block; margin-right:5px; opacity:0.3;"></i> Área de parcela</p>
+        <p><i style="background:#00441b; width:20px; height:2px; display:inline-block; margin-right:5px; opacity:0.8; vertical-align:middle;"></i> Curvas de nivel</p>
+        <p><span style="background:red; color:white; width:20px; height:20px; display:inline-block; margin-right:5px; border-radius:50%; text-align:center; line-height:20px;">▲</span> Punto más alto</p>
+        <p><span style="background:blue; color:white; width:20px; height:20px; display:inline-block; margin-right:5px; border-radius:50%; text-align:center; line-height:20px;">▼</span> Punto más bajo</p>
+        <p><i style="background:#2171b5; width:20px; height:20px; display:inline-block; margin-right:5px; opacity:0.6;"></i> Zonas de encharcamiento</p>
+        <p style="margin-top:10px; font-size:10px; color:#666;">
+            💡 Curvas más gruesas indican intervalos mayores (cada 25m)
+        </p>
+    </div>
+    '''
+    m.get_root().html.add_child(folium.Element(legend_html))
+    
+    return m
+
+
+# FUNCIÓN PARA CREAR MAPA DE PENDIENTES
+@medir_etapa('mapa_pendientes')
+def crear_mapa_pendientes(grilla, pendiente_grid, gdf_original):
+    """Crea mapa de calor de pendientes (grilla en metros, dibujada en el CRS de la parcela)"""
+    import matplotlib.pyplot as plt
+    import matplotlib.patches as mpatches
+    from matplotlib.colors import LinearSegmentedColormap
+    
+    # Crear figura
+    fig, ax = plt.subplots(1, 1, figsize=(12, 8))
+    
+    # La grilla ya es regular: se dibuja directamente, remuestreada solo si es más
+    # fina que lo que se puede ver en la figura
+    x, y = grilla.ejes()
+    Zi = pendiente_grid
+    max_celdas = PARAMETROS_CURVAS_NIVEL['max_celdas_mapa_pendientes']
+    if len(x) > max_celdas or len(y) > max_celdas:
+        x_vista = np.linspace(x[0], x[-1], min(len(x), max_celdas))
+        y_vista = np.linspace(y[0], y[-1], min(len(y), max_celdas))
+        Zi = remuestrear_grilla(pendiente_grid, grilla.transformada, x_vista, y_vista)
+        x, y = x_vista, y_vista
+    
+    if np.any(~np.isnan(Zi)):
+        # Nodos de la vista en el CRS de la parcela (malla curvilínea si es geográfico)
+        filas, columnas = grilla.mundo_a_celda(*np.meshgrid(x, y))
+        if gdf_original.crs is not None:
+            Xi, Yi = grilla.coordenadas_geograficas(filas, columnas, gdf_original.crs)
+        else:
+            Xi, Yi = grilla.celda_a_mundo(filas, columnas)
+        
+        # Crear mapa de calor
+        cmap = LinearSegmentedColormap.from_list('pendiente_cmap', 
+                                                [CLASIFICACION_PENDIENTES[c]['color'] for c in CLASIFICACION_PENDIENTES])
+        
+        heatmap = ax.contourf(Xi, Yi, Zi, levels=20, cmap=cmap, alpha=0.7)
+        
+        # Añadir curvas de nivel de pendiente
+        contours = ax.contour(Xi, Yi, Zi, levels=[2, 5, 10, 15, 25], colors='black', linewidths=0.5, alpha=0.5)
+        ax.clabel(contours, inline=True, fontsize=8, fmt='%1.0f%%')
+    
+    # Añadir parcela
+    gdf_original.plot(ax=ax, color='none', edgecolor='black', linewidth=2)
+    
+    # Configuración
+    ax.set_title('Mapa de Pendientes (%)', fontsize=14, fontweight='bold', pad=15)
+    ax.set_xlabel('Longitud')
+    ax.set_ylabel('Latitud')
+    ax.grid(True, alpha=0.3)
+    
+    # Barra de color
+    if 'heatmap' in locals():
+        cbar = plt.colorbar(heatmap, ax=ax, shrink=0.8)
+        cbar.set_label('Pendiente (%)', fontsize=10)
+    
+    # Leyenda de categorías
+    patches = []
+    for categoria, params in CLASIFICACION_PENDIENTES.items():
+        patches.append(mpatches.Patch(color=params['color'], label=categoria))
+    
+    ax.legend(handles=patches, loc='upper left', fontsize=8, title='Categorías de Pendiente')
+    
+    plt.tight_layout()
+    
+    # Convertir a imagen
+    buf = io.BytesIO()
+    plt.savefig(buf, format='png', dpi=150, bbox_inches='tight')
+    buf.seek(0)
+    plt.close()
+    
+    return buf
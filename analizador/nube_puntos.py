@@ -0,0 +1,260 @@
+"""Rasterización de nubes de puntos LiDAR (LAS sin compresión o XYZ de texto) a la grilla del DEM.
+
+La nube se recorre por bloques de tamaño fijo (np.fromfile para LAS, pandas por trozos
+para XYZ), de modo que la memoria depende de la grilla y no de la cantidad de puntos:
+
+- cada punto cae en el nodo más cercano de la grilla;
+- se acumulan suma y cantidad de los puntos de suelo (clase 2 ASPRS) con np.bincount
+  y el mínimo de todos los puntos con np.minimum.at;
+- si la nube trae puntos de suelo se usa su media; si no, el mínimo de cada celda
+  (aproxima el terreno bajo el cultivo);
+- las celdas sin puntos se rellenan por distancia inversa (o vecino más cercano)
+  desde las celdas con datos, hasta una distancia máxima.
+"""
+import logging
+import os
+import struct
+
+import numpy as np
+from pyproj import CRS, Transformer
+
+from .parametros import PARAMETROS_NUBE_PUNTOS
+
+logger = logging.getLogger(__name__)
+
+EXTENSIONES_NUBE = {'.las': 'las', '.xyz': 'xyz', '.txt': 'xyz'}
+CLASE_SUELO = 2
+
+
+# LECTOR DE LAS SIN COMPRESIÓN
+def _encabezado_las(ruta):
+    """Campos del encabezado LAS 1.0-1.4 necesarios para leer los puntos y el CRS de los VLR"""
+    with open(ruta, 'rb') as f:
+        crudo = f.read(375)
+        if crudo[:4] != b'LASF':
+            raise ValueError(f"{os.path.basename(ruta)} no es un archivo LAS")
+        version = (crudo[24], crudo[25])
+        tam_encabezado, = struct.unpack('<H', crudo[94:96])
+        offset_puntos, cantidad_vlr = struct.unpack('<II', crudo[96:104])
+        formato, tam_registro = struct.unpack('<BH', crudo[104:107])
+        cantidad, = struct.unpack('<I', crudo[107:111])
+        if version >= (1, 4) and len(crudo) >= 255:
+            cantidad = struct.unpack('<Q', crudo[247:255])[0] or cantidad
+        escala = struct.unpack('<3d', crudo[131:155])
+        desplazamiento = struct.unpack('<3d', crudo[155:179])
+        max_x, min_x, max_y, min_y = struct.unpack('<4d', crudo[179:211])
+        if formato & 0xC0:
+            raise ValueError("LAZ comprimido: descomprímalo a LAS (p. ej. con laszip) para usarlo")
+        if formato > 10:
+            raise ValueError(f"Formato de punto LAS no soportado ({formato})")
+
+        # VLR: GeoKeyDirectory (34735) o WKT (2112) del usuario LASF_Projection
+        crs = None
+        f.seek(tam_encabezado)
+        for _ in range(cantidad_vlr):
+            cabecera = f.read(54)
+            if len(cabecera) < 54:
+                break
+            usuario = cabecera[2:18].rstrip(b'\x00').decode('latin-1')
+            id_registro, largo = struct.unpack('<HH', cabecera[18:22])
+            datos = f.read(largo)
+            if usuario != 'LASF_Projection':
+                continue
+            try:
+                if id_registro == 2112:
+                    crs = CRS.from_user_input(datos.rstrip(b'\x00').decode('latin-1'))
+                elif id_registro == 34735 and crs is None:
+                    claves = struct.unpack(f'<{largo // 2}H', datos[:largo // 2 * 2])
+                    for k in range(4, len(claves) - 3, 4):
+                        if claves[k] in (3072, 2048) and claves[k + 1] == 0 and claves[k + 3] not in (0, 32767):
+                            crs = CRS.from_epsg(claves[k + 3])
+                            break
+            except Exception:
+                logger.warning(f"{os.path.basename(ruta)}: no se pudo interpretar el CRS del VLR {id_registro}")
+
+    return {
+        'formato': formato, 'tam_registro': tam_registro, 'offset_puntos': offset_puntos, 'cantidad': cantidad,
+        'escala': escala, 'desplazamiento': desplazamiento, 'limites': (min_x, min_y, max_x, max_y), 'crs': crs,
+    }
+
+
+def _bloques_las(ruta, encabezado, puntos_por_bloque):
+    """(x, y, z, clase) por bloques de registros leídos con np.fromfile.
+
+    No se mapea el archivo entero: las páginas de un memmap quedan residentes y, con
+    nubes de varios GB, la memoria del proceso crecería con el archivo."""
+    # Formatos 0-5: la clase está en los 5 bits bajos del byte 15; formatos 6-10: byte 16 completo
+    offset_clase = 16 if encabezado['formato'] >= 6 else 15
+    dtype = np.dtype({'names': ['x', 'y', 'z', 'clase'], 'formats': ['<i4', '<i4', '<i4', 'u1'],
+                      'offsets': [0, 4, 8, offset_clase], 'itemsize': encabezado['tam_registro']})
+    cantidad = min(encabezado['cantidad'],
+                   (os.path.getsize(ruta) - encabezado['offset_puntos']) // encabezado['tam_registro'])
+    (ex, ey, ez), (dx, dy, dz) = encabezado['escala'], encabezado['desplazamiento']
+    with open(ruta, 'rb') as f:
+        f.seek(encabezado['offset_puntos'])
+        for inicio in range(0, cantidad, puntos_por_bloque):
+            bloque = np.fromfile(f, dtype=dtype, count=min(puntos_por_bloque, cantidad - inicio))
+            clase = bloque['clase'] if offset_clase == 16 else bloque['clase'] & 0x1F
+            yield bloque['x'] * ex + dx, bloque['y'] * ey + dy, bloque['z'] * ez + dz, clase
+
+
+# LECTOR DE XYZ DE TEXTO
+def _es_numero(texto):
+    try:
+        float(texto)
+        return True
+    except ValueError:
+        return False
+
+
+def _separador_xyz(ruta):
+    """Separador, filas de encabezado a saltear y primera línea de datos del XYZ"""
+    with open(ruta, 'r', encoding='latin-1') as f:
+        linea = f.readline()
+        saltear = 0
+        while linea and not _es_numero((linea.replace(',', ' ').replace(';', ' ').split() or [''])[0]):
+            saltear += 1
+            linea = f.readline()
+    separador = ',' if ',' in linea else (';' if ';' in linea else r'\s+')
+    return separador, saltear, linea
+
+
+def _bloques_xyz(ruta, puntos_por_bloque):
+    """(x, y, z, None) por bloques con pandas; solo se usan las tres primeras columnas"""
+    import pandas as pd
+    separador, saltear, _ = _separador_xyz(ruta)
+    lector = pd.read_csv(ruta, sep=separador, header=None, usecols=[0, 1, 2], skiprows=saltear,
+                         dtype=np.float64, chunksize=puntos_por_bloque, engine='c')
+    for bloque in lector:
+        valores = bloque.to_numpy()
+        yield valores[:, 0], valores[:, 1], valores[:, 2], None
+
+
+def _parece_geografico(x, y):
+    return abs(x) <= 180 and abs(y) <= 90
+
+
+# FUNCIÓN PARA RELLENAR CELDAS SIN PUNTOS
+def rellenar_huecos(z, tamano_celda, metodo=None, max_distancia_m=None, vecinos=None):
+    """Rellena los NaN de `z` desde las celdas con dato más cercanas.
+
+    'idw' pondera por distancia inversa al cuadrado los `vecinos` más cercanos; 'vecino'
+    copia el del más cercano. Las celdas a más de `max_distancia_m` quedan en NaN.
+    """
+    from scipy.ndimage import distance_transform_edt
+
+    metodo = metodo or PARAMETROS_NUBE_PUNTOS['relleno']
+    max_distancia_m = max_distancia_m if max_distancia_m is not None else PARAMETROS_NUBE_PUNTOS['max_distancia_relleno_m']
+    vecinos = vecinos or PARAMETROS_NUBE_PUNTOS['vecinos_idw']
+
+    vacias = np.isnan(z)
+    if not vacias.any() or vacias.all():
+        return z
+    distancia, (filas_cerca, columnas_cerca) = distance_transform_edt(vacias, return_indices=True)
+    a_rellenar = vacias & (distancia * tamano_celda <= max_distancia_m)
+    if not a_rellenar.any():
+        return z
+
+    resultado = z.copy()
+    if metodo == 'vecino':
+        resultado[a_rellenar] = z[filas_cerca[a_rellenar], columnas_cerca[a_rellenar]]
+        return resultado
+
+    from scipy.spatial import cKDTree
+    con_dato = np.argwhere(~vacias)
+    arbol = cKDTree(con_dato)
+    destino = np.argwhere(a_rellenar)
+    k = min(vecinos, len(con_dato))
+    dist, indices = arbol.query(destino, k=k)
+    if k == 1:
+        dist, indices = dist[:, None], indices[:, None]
+    pesos = 1.0 / np.maximum(dist, 1e-6) ** 2
+    valores = z[con_dato[indices, 0], con_dato[indices, 1]]
+    resultado[a_rellenar] = (np.sum(pesos * valores, axis=1) / np.sum(pesos, axis=1)).astype(z.dtype)
+    return resultado
+
+
+# FUNCIÓN PARA RASTERIZAR UNA NUBE DE PUNTOS EN LA GRILLA DEL DEM
+def rasterizar_nube_puntos(ruta, grilla, crs_vecino=None, puntos_por_bloque=None):
+    """Elevación float32 en los nodos de `grilla` a partir de una nube LAS o XYZ.
+
+    El CRS de la nube sale del VLR del LAS, de `crs_vecino` (un .prj junto al archivo) o,
+    si no hay, se asumen grados WGS84 cuando las coordenadas lo parecen y si no el CRS
+    métrico de la grilla. NaN donde no hay puntos ni celdas con dato cerca.
+    """
+    puntos_por_bloque = puntos_por_bloque or PARAMETROS_NUBE_PUNTOS['puntos_por_bloque']
+    tipo = EXTENSIONES_NUBE.get(os.path.splitext(ruta)[1].lower())
+    if tipo is None:
+        raise ValueError(f"Formato de nube de puntos no soportado: {os.path.basename(ruta)} (use .las o .xyz)")
+
+    if tipo == 'las':
+        encabezado = _encabezado_las(ruta)
+        crs_fuente = encabezado['crs'] or crs_vecino
+        x_ref, y_ref = encabezado['limites'][:2]
+        bloques = _bloques_las(ruta, encabezado, puntos_por_bloque)
+    else:
+        crs_fuente = crs_vecino
+        _, _, primera = _separador_xyz(ruta)
+        valores = primera.replace(',', ' ').replace(';', ' ').split()
+        x_ref, y_ref = (float(valores[0]), float(valores[1])) if len(valores) >= 3 else (0.0, 0.0)
+        bloques = _bloques_xyz(ruta, puntos_por_bloque)
+    if crs_fuente is None:
+        if _parece_geografico(x_ref, y_ref):
+            logger.warning(f"{os.path.basename(ruta)} sin CRS: se asume EPSG:4326")
+            crs_fuente = CRS.from_epsg(4326)
+        else:
+            logger.warning(f"{os.path.basename(ruta)} sin CRS: se asume el CRS métrico de la parcela")
+            crs_fuente = grilla.crs
+
+    transformador = None
+    if grilla.crs is not None and crs_fuente is not None and CRS.from_user_input(crs_fuente) != grilla.crs:
+        transformador = Transformer.from_crs(crs_fuente, grilla.crs, always_xy=True)
+    # Descarte rápido en el CRS de la nube, antes de reproyectar cada bloque
+    minx, miny, maxx, maxy = grilla.limites
+    margen = 2 * max(abs(grilla.tamano_x), abs(grilla.tamano_y))
+    limites_fuente = (minx - margen, miny - margen, maxx + margen, maxy + margen)
+    if transformador is not None:
+        limites_fuente = Transformer.from_crs(grilla.crs, crs_fuente, always_xy=True).transform_bounds(
+            *limites_fuente, densify_pts=21)
+
+    # Acumuladores por nodo (la memoria depende de la grilla, no de la nube)
+    n_celdas = grilla.filas * grilla.columnas
+    suma_suelo = np.zeros(n_celdas, dtype=np.float64)
+    cantidad_suelo = np.zeros(n_celdas, dtype=np.int64)
+    minimo = np.full(n_celdas, np.inf, dtype=np.float32)
+    puntos_usados = 0
+    for x, y, z, clase in bloques:
+        dentro = (x >= limites_fuente[0]) & (x <= limites_fuente[2]) & (y >= limites_fuente[1]) & (y <= limites_fuente[3])
+        if not dentro.any():
+            continue
+        x, y, z = x[dentro], y[dentro], z[dentro]
+        if transformador is not None:
+            x, y = transformador.transform(x, y)
+        filas, columnas = grilla.mundo_a_celda(x, y)
+        filas = np.rint(filas).astype(np.int64)
+        columnas = np.rint(columnas).astype(np.int64)
+        en_grilla = (filas >= 0) & (filas < grilla.filas) & (columnas >= 0) & (columnas < grilla.columnas)
+        indice = filas[en_grilla] * grilla.columnas + columnas[en_grilla]
+        z = z[en_grilla]
+        np.minimum.at(minimo, indice, z.astype(np.float32))
+        if clase is not None:
+            suelo = clase[dentro][en_grilla] == CLASE_SUELO
+            suma_suelo += np.bincount(indice[suelo], weights=z[suelo], minlength=n_celdas)
+            cantidad_suelo += np.bincount(indice[suelo], minlength=n_celdas)
+        puntos_usados += len(indice)
+
+    if puntos_usados == 0:
+        raise ValueError("La nube de puntos no tiene puntos sobre la parcela")
+
+    if cantidad_suelo.any():
+        with np.errstate(invalid='ignore', divide='ignore'):
+            elevacion = (suma_suelo / cantidad_suelo).astype(np.float32)
+        origen = 'media de puntos de suelo'
+    else:
+        elevacion = np.where(np.isinf(minimo), np.float32(np.nan), minimo)
+        origen = 'mínimo por celda (sin clasificación de suelo)'
+    elevacion = elevacion.reshape(grilla.forma)
+    logger.info(f"Nube {os.path.basename(ruta)}: {puntos_usados} puntos sobre la grilla, {origen}, "
+                f"{int(np.isnan(elevacion).sum())} celdas vacías")
+
+    return rellenar_huecos(elevacion, max(abs(grilla.tamano_x), abs(grilla.tamano_y)))
@@ -0,0 +1,708 @@
+"""Tablas de parámetros por cultivo, textura, NDWI, pendientes y recomendaciones"""
+
+# PARÁMETROS MEJORADOS Y MÁS REALISTAS PARA DIFERENTES CULTIVOS EXTENSIVOS
+PARAMETROS_CULTIVOS = {
+    'MAIZ': {
+        'NITROGENO': {'min': 120, 'max': 200, 'optimo': 160},
+        'FOSFORO': {'min': 30, 'max': 60, 'optimo': 45},
+        'POTASIO': {'min': 80, 'max': 150, 'optimo': 120},
+        'MATERIA_ORGANICA_OPTIMA': 3.0,
+        'HUMEDAD_OPTIMA': 0.25,
+        'pH_OPTIMO': 6.0,
+        'CONDUCTIVIDAD_OPTIMA': 1.0
+    },
+    'TRIGO': {
+        'NITROGENO': {'min': 100, 'max': 180, 'optimo': 140},
+        'FOSFORO': {'min': 25, 'max': 50, 'optimo': 38},
+        'POTASIO': {'min': 60, 'max': 120, 'optimo': 90},
+        'MATERIA_ORGANICA_OPTIMA': 2.5,
+        'HUMEDAD_OPTIMA': 0.22,
+        'pH_OPTIMO': 6.5,
+        'CONDUCTIVIDAD_OPTIMA': 0.8
+    },
+    'CEBADA': {
+        'NITROGENO': {'min': 80, 'max': 150, 'optimo': 115},
+        'FOSFORO': {'min': 20, 'max': 45, 'optimo': 32},
+        'POTASIO': {'min': 50, 'max': 100, 'optimo': 75},
+        'MATERIA_ORGANICA_OPTIMA': 2.2,
+        'HUMEDAD_OPTIMA': 0.20,
+        'pH_OPTIMO': 6.8,
+        'CONDUCTIVIDAD_OPTIMA': 0.7
+    },
+    'GIRASOL': {
+        'NITROGENO': {'min': 60, 'max': 120, 'optimo': 90},
+        'FOSFORO': {'min': 15, 'max': 35, 'optimo': 25},
+        'POTASIO': {'min': 100, 'max': 180, 'optimo': 140},
+        'MATERIA_ORGANICA_OPTIMA': 2.0,
+        'HUMEDAD_OPTIMA': 0.18,
+        'pH_OPTIMO': 6.2,
+        'CONDUCTIVIDAD_OPTIMA': 1.2
+    },
+    'SOJA': {
+        'NITROGENO': {'min': 0, 'max': 20, 'optimo': 10},  # Fijadora de N
+        'FOSFORO': {'min': 25, 'max': 50, 'optimo': 38},
+        'POTASIO': {'min': 80, 'max': 150, 'optimo': 115},
+        'MATERIA_ORGANICA_OPTIMA': 3.0,
+        'HUMEDAD_OPTIMA': 0.25,
+        'pH_OPTIMO': 6.5,
+        'CONDUCTIVIDAD_OPTIMA': 0.9
+    },
+    'COLZA': {
+        'NITROGENO': {'min': 120, 'max': 200, 'optimo': 160},
+        'FOSFORO': {'min': 25, 'max': 50, 'optimo': 38},
+        'POTASIO': {'min': 100, 'max': 180, 'optimo': 140},
+        'MATERIA_ORGANICA_OPTIMA': 3.5,
+        'HUMEDAD_OPTIMA': 0.22,
+        'pH_OPTIMO': 6.8,
+        'CONDUCTIVIDAD_OPTIMA': 1.0
+    },
+    'SORGO': {
+        'NITROGENO': {'min': 70, 'max': 130, 'optimo': 100},
+        'FOSFORO': {'min': 15, 'max': 35, 'optimo': 25},
+        'POTASIO': {'min': 60, 'max': 120, 'optimo': 90},
+        'MATERIA_ORGANICA_OPTIMA': 2.0,
+        'HUMEDAD_OPTIMA': 0.18,
+        'pH_OPTIMO': 6.0,
+        'CONDUCTIVIDAD_OPTIMA': 0.8
+    },
+    'LUPINO': {
+        'NITROGENO': {'min': 0, 'max': 15, 'optimo': 8},  # Fijadora de N
+        'FOSFORO': {'min': 15, 'max': 35, 'optimo': 25},
+        'POTASIO': {'min': 40, 'max': 80, 'optimo': 60},
+        'MATERIA_ORGANICA_OPTIMA': 2.5,
+        'HUMEDAD_OPTIMA': 0.20,
+        'pH_OPTIMO': 5.5,
+        'CONDUCTIVIDAD_OPTIMA': 0.6
+    }
+}
+
+
+# PARÁMETROS DE TEXTURA DEL SUELO POR CULTIVO - ACTUALIZADOS SEGÚN IMAGEN
+TEXTURA_SUELO_OPTIMA = {
+    'MAIZ': {
+        'textura_optima': 'Franco',
+        'arena_optima': 45,
+        'limo_optima': 35,
+        'arcilla_optima': 20,
+        'densidad_aparente_optima': 1.3,
+        'porosidad_optima': 0.5
+    },
+    'TRIGO': {
+        'textura_optima': 'Franco Arcilloso',
+        'arena_optima': 40,
+        'limo_optima': 30,
+        'arcilla_optima': 30,
+        'densidad_aparente_optima': 1.2,
+        'porosidad_optima': 0.55
+    },
+    'CEBADA': {
+        'textura_optima': 'Franco',
+        'arena_optima': 45,
+        'limo_optima': 35,
+        'arcilla_optima': 20,
+        'densidad_aparente_optima': 1.3,
+        'porosidad_optima': 0.5
+    },
+    'GIRASOL': {
+        'textura_optima': 'Franco Arenoso',
+        'arena_optima': 55,
+        'limo_optima': 25,
+        'arcilla_optima': 20,
+        'densidad_aparente_optima': 1.4,
+        'porosidad_optima': 0.45
+    },
+    'SOJA': {
+        'textura_optima': 'Franco',
+        'arena_optima': 45,
+        'limo_optima': 35,
+        'arcilla_optima': 20,
+        'densidad_aparente_optima': 1.3,
+        'porosidad_optima': 0.5
+    },
+    'COLZA': {
+        'textura_optima': 'Franco Arcilloso',
+        'arena_optima': 40,
+        'limo_optima': 30,
+        'arcilla_optima': 30,
+        'densidad_aparente_optima': 1.2,
+        'porosidad_optima': 0.55
+    },
+    'SORGO': {
+        'textura_optima': 'Franco',
+        'arena_optima': 45,
+        'limo_optima': 35,
+        'arcilla_optima': 20,
+        'densidad_aparente_optima': 1.3,
+        'porosidad_optima': 0.5
+    },
+    'LUPINO': {
+        'textura_optima': 'Franco Arenoso',
+        'arena_optima': 55,
+        'limo_optima': 25,
+        'arcilla_optima': 20,
+        'densidad_aparente_optima': 1.4,
+        'porosidad_optima': 0.45
+    }
+}
+
+
+# PARÁMETROS PARA CÁLCULO DE NDWI (SOBRE EL SUELO)
+PARAMETROS_NDWI_SUELO = {
+    'MAIZ': {
+        'ndwi_optimo_suelo': 0.15,
+        'ndwi_humedo_suelo': 0.25,
+        'ndwi_seco_suelo': -0.15,
+        'umbral_sequia': -0.1
+    },
+    'TRIGO': {
+        'ndwi_optimo_suelo': 0.12,
+        'ndwi_humedo_suelo': 0.20,
+        'ndwi_seco_suelo': -0.20,
+        'umbral_sequia': -0.15
+    },
+    'CEBADA': {
+        'ndwi_optimo_suelo': 0.10,
+        'ndwi_humedo_suelo': 0.18,
+        'ndwi_seco_suelo': -0.22,
+        'umbral_sequia': -0.18
+    },
+    'GIRASOL': {
+        'ndwi_optimo_suelo': 0.08,
+        'ndwi_humedo_suelo': 0.15,
+        'ndwi_seco_suelo': -0.25,
+        'umbral_sequia': -0.20
+    },
+    'SOJA': {
+        'ndwi_optimo_suelo': 0.15,
+        'ndwi_humedo_suelo': 0.25,
+        'ndwi_seco_suelo': -0.15,
+        'umbral_sequia': -0.1
+    },
+    'COLZA': {
+        'ndwi_optimo_suelo': 0.13,
+        'ndwi_humedo_suelo': 0.22,
+        'ndwi_seco_suelo': -0.18,
+        'umbral_sequia': -0.13
+    },
+    'SORGO': {
+        'ndwi_optimo_suelo': 0.07,
+        'ndwi_humedo_suelo': 0.14,
+        'ndwi_seco_suelo': -0.28,
+        'umbral_sequia': -0.22
+    },
+    'LUPINO': {
+        'ndwi_optimo_suelo': 0.10,
+        'ndwi_humedo_suelo': 0.18,
+        'ndwi_seco_suelo': -0.22,
+        'umbral_sequia': -0.18
+    }
+}
+
+
+# PARÁMETROS PARA ANÁLISIS DE CURVAS DE NIVEL
+PARAMETROS_CURVAS_NIVEL = {
+    'intervalo_curvas': 5.0,  # metros entre curvas
+    'intervalo_base': 1.0,    # curvas que se guardan en caché; los intervalos múltiplos se filtran de ellas
+    'max_dem_memoria': 4,     # DEMs sintéticos memoizados por proceso (parcela, resolución)
+    'resolucion_dem': 10.0,   # resolución DEM en metros
+    'min_elevacion': 100,     # elevación mínima en metros
+    'max_elevacion': 500,     # elevación máxima en metros
+    'factor_relieve': 0.5,    # factor de relieve (0-1)
+    'max_celdas_mapa_pendientes': 200,  # por lado; grillas más finas se remuestrean para dibujar
+    'pendiente_min_orientacion': 1.0,  # % de pendiente debajo del cual la ladera no tiene orientación
+    'umbral_curvatura': 0.002          # 1/m; con |curvatura| menor la ladera se considera recta
+}
+
+
+# PARÁMETROS PARA LEER DEMs LOCALES (GEOTIFF / ESRI ASCII)
+PARAMETROS_FUENTES_DEM = {
+    'margen_m': 30.0,      # margen alrededor de la parcela que se lee del DEM (más una celda de análisis)
+    'margen_pixeles': 2,   # píxeles extra para la interpolación bilineal en el borde
+    'bloque_filas': 512,   # filas de la grilla de análisis que se reproyectan por vez
+}
+
+# PARÁMETROS PARA RASTERIZAR NUBES DE PUNTOS LIDAR (LAS / XYZ)
+PARAMETROS_NUBE_PUNTOS = {
+    'puntos_por_bloque': 2_000_000,     # puntos leídos por vez (acota la memoria)
+    'relleno': 'idw',                   # 'idw' (distancia inversa) o 'vecino' (más cercano)
+    'vecinos_idw': 8,                   # celdas con dato que pondera cada celda vacía
+    'max_distancia_relleno_m': 50.0,    # más lejos de un punto, la celda queda sin dato
+}
+
+# PARÁMETROS DEL PROCESAMIENTO DEL DEM POR TESELAS (PENDIENTE, SUAVIZADO, CURVAS)
+PARAMETROS_TESELADO = {
+    'lado_tesela': 1024,        # nodos por lado de cada tesela (sin contar el halo)
+    'min_celdas': 4_000_000,    # grillas más chicas se procesan enteras
+    'procesos': 1,              # procesos del pool (1 = en serie; más de 1 abre un pool 'spawn')
+}
+
+# PARÁMETROS DEL RELLENO DE DEPRESIONES Y ZONAS DE ENCHARCAMIENTO
+PARAMETROS_HIDROLOGIA = {
+    'suavizado_sigma': 1.0,     # filtro gaussiano previo (nodos), el mismo de las curvas; 0 = DEM crudo
+    'profundidad_min_m': 0.10,  # depresiones menos profundas se consideran ruido del DEM
+    'area_min_m2': 500.0,       # superficie mínima de una zona de encharcamiento
+    'max_zonas': 300            # zonas (las de mayor volumen) que se dibujan y listan
+}
+
+
+# PARÁMETROS PARA PREPARACIÓN DE GEOMETRÍAS SUBIDAS
+PARAMETROS_GEOMETRIA = {
+    'precision_m': 0.01,                 # grilla de ajuste de coordenadas en metros
+    'tolerancia_simplificacion_m': 0.0,  # tolerancia de simplificación (0 = sin simplificar)
+    'precision_huella_grados': 1e-7      # grilla de la huella canónica (~1 cm en EPSG:4326)
+}
+
+
+# CLASIFICACIÓN DE PENDIENTES
+CLASIFICACION_PENDIENTES = {
+    'PLANA (0-2%)': {'min': 0, 'max': 2, 'color': '#4daf4a', 'factor_erosivo': 0.1},
+    'SUAVE (2-5%)': {'min': 2, 'max': 5, 'color': '#a6d96a', 'factor_erosivo': 0.3},
+    'MODERADA (5-10%)': {'min': 5, 'max': 10, 'color': '#ffffbf', 'factor_erosivo': 0.6},
+    'FUERTE (10-15%)': {'min': 10, 'max': 15, 'color': '#fdae61', 'factor_erosivo': 0.8},
+    'MUY FUERTE (15-25%)': {'min': 15, 'max': 25, 'color': '#f46d43', 'factor_erosivo': 0.9},
+    'EXTREMA (>25%)': {'min': 25, 'max': 100, 'color': '#d73027', 'factor_erosivo': 1.0}
+}
+
+
+# ORIENTACIÓN DE LADERAS (AZIMUT HACIA DONDE BAJA LA PENDIENTE, SECTORES DE 45°)
+ORIENTACIONES_LADERA = {
+    'N': {'nombre': 'Norte', 'azimut': 0, 'color': '#d73027'},
+    'NE': {'nombre': 'Noreste', 'azimut': 45, 'color': '#fc8d59'},
+    'E': {'nombre': 'Este', 'azimut': 90, 'color': '#fee090'},
+    'SE': {'nombre': 'Sureste', 'azimut': 135, 'color': '#e0f3f8'},
+    'S': {'nombre': 'Sur', 'azimut': 180, 'color': '#91bfdb'},
+    'SO': {'nombre': 'Suroeste', 'azimut': 225, 'color': '#4575b4'},
+    'O': {'nombre': 'Oeste', 'azimut': 270, 'color': '#91cf60'},
+    'NO': {'nombre': 'Noroeste', 'azimut': 315, 'color': '#fdae61'}
+}
+
+
+# CLASIFICACIÓN DE TEXTURAS DEL SUELO - ACTUALIZADA SEGÚN IMAGEN
+CLASIFICACION_TEXTURAS = {
+    'Franco': {'arena_min': 43, 'arena_max': 52, 'limo_min': 28, 'limo_max': 50, 'arcilla_min': 7, 'arcilla_max': 27},
+    'Franco Arcilloso': {'arena_min': 20, 'arena_max': 45, 'limo_min': 15, 'limo_max': 53, 'arcilla_min': 25, 'arcilla_max': 35},
+    'Franco Arenoso': {'arena_min': 50, 'arena_max': 70, 'limo_min': 15, 'limo_max': 35, 'arcilla_min': 5, 'arcilla_max': 20},
+    'Arenoso': {'arena_min': 85, 'arena_max': 100, 'limo_max': 15, 'arcilla_max': 15},
+    'Arcilloso': {'arena_max': 45, 'limo_max': 40, 'arcilla_min': 35}
+}
+
+
+# FACTORES EDÁFICOS MÁS REALISTAS - ACTUALIZADOS SEGÚN IMAGEN
+FACTORES_SUELO = {
+    'Arcilloso': {'retention': 1.3, 'drainage': 0.7, 'aeration': 0.6, 'workability': 0.5},
+    'Franco Arcilloso': {'retention': 1.2, 'drainage': 0.8, 'aeration': 0.7, 'workability': 0.7},
+    'Franco': {'retention': 1.0, 'drainage': 1.0, 'aeration': 1.0, 'workability': 1.0},
+    'Franco Arenoso': {'retention': 0.8, 'drainage': 1.2, 'aeration': 1.3, 'workability': 1.2},
+    'Arenoso': {'retention': 0.6, 'drainage': 1.4, 'aeration': 1.5, 'workability': 1.4}
+}
+
+
+# RECOMENDACIONES POR TIPO DE TEXTURA - ACTUALIZADAS SEGÚN IMAGEN
+RECOMENDACIONES_TEXTURA = {
+    'Franco': {
+        'propiedades': [
+            "Equilibrio arena-limo-arcilla",
+            "Buena aireación y drenaje",
+            "CIC Intermedia-alta",
+            "Retención de agua adecuada"
+        ],
+        'limitantes': [
+            "Puede compactarse con maquinaria pesada",
+            "Erosión en pendientes si no hay cobertura"
+        ],
+        'manejo': [
+            "Mantener coberturas vivas o muertas",
+            "Evitar tránsito excesivo de maquinaria",
+            "Fertilización eficiente, sin muchas pérdidas",
+            "Ideal para siembra directa"
+        ]
+    },
+    'Franco Arcilloso': {
+        'propiedades': [
+            "Mayor proporción de arcilla (25–35%)",
+            "Alta retención de agua y nutrientes",
+            "Drenaje natural lento",
+            "Buena fertilidad natural"
+        ],
+        'limitantes': [
+            "Riesgo de encharcamiento",
+            "Compactación fácil",
+            "Menor oxigenación radicular"
+        ],
+        'manejo': [
+            "Implementar drenajes (canales y subdrenes)",
+            "Subsolado previo a siembra",
+            "Incorporar materia orgánica (rastrojos, compost)",
+            "Fertilización fraccionada en lluvias intensas"
+        ]
+    },
+    'Franco Arenoso': {
+        'propiedades': [
+            "Arena 50–70%, arcilla 5-20%",
+            "Buen desarrollo radicular",
+            "Excelente drenaje",
+            "Calentamiento rápido en primavera"
+        ],
+        'limitantes': [
+            "Riesgo de lixiviación de nutrientes",
+            "Estrés hídrico en veranos",
+            "Fertilidad baja-moderada"
+        ],
+        'manejo': [
+            "Uso de coberturas leguminosas",
+            "Aplicar mulching (rastrojos, paja)",
+            "Riego suplementario en sequía",
+            "Fertilización fraccionada y frecuente"
+        ]
+    },
+    'Arenoso': {
+        'propiedades': [
+            "Alto contenido de arena (>85%)",
+            "Excelente drenaje",
+            "Baja retención de agua",
+            "Fácil laboreo"
+        ],
+        'limitantes': [
+            "Baja retención de nutrientes",
+            "Riesgo alto de erosión",
+            "Requiere riego frecuente"
+        ],
+        'manejo': [
+            "Aplicaciones frecuentes de materia orgánica",
+            "Riego por goteo para eficiencia hídrica",
+            "Fertilización fraccionada en pequeñas dosis",
+            "Barreras vivas contra erosión"
+        ]
+    },
+    'Arcilloso': {
+        'propiedades': [
+            "Alto contenido de arcilla (>35%)",
+            "Alta retención de agua y nutrientes",
+            "Estructura densa",
+            "Alta fertilidad potencial"
+        ],
+        'limitantes': [
+            "Drenaje muy lento",
+            "Alta compactación",
+            "Difícil laboreo cuando está húmedo"
+        ],
+        'manejo': [
+            "Añadir materia orgánica para mejorar estructura",
+            "Evitar laboreo en condiciones húmedas",
+            "Implementar sistemas de drenaje profundo",
+            "Cultivos de cobertura para romper compactación"
+        ]
+    }
+}
+
+
+# PRINCIPIOS AGROECOLÓGICOS - RECOMENDACIONES ESPECÍFICAS PARA CULTIVOS EXTENSIVOS
+RECOMENDACIONES_AGROECOLOGICAS = {
+    'MAIZ': {
+        'COBERTURAS_VIVAS': [
+            "Leguminosas: Vicia villosa, Trifolium repens",
+            "Coberturas mixtas: Centeno y vicia",
+            "Plantas de cobertura baja: Avena strigosa"
+        ],
+        'ABONOS_VERDES': [
+            "Vicia villosa: 30-40 kg/ha antes de la siembra",
+            "Trifolium incarnatum: 15-20 kg/ha",
+            "Guisante forrajero: 60-80 kg/ha"
+        ],
+        'BIOFERTILIZANTES': [
+            "Bocashi: 2-3 ton/ha cada ciclo",
+            "Compost de residuos de cosecha: 1-2 ton/ha",
+            "Biofertilizante líquido: Aplicación foliar en V6"
+        ],
+        'MANEJO_ECOLOGICO': [
+            "Control biológico con trichogramma para plagas",
+            "Uso de trampas de feromonas para gusano elotero",
+            "Rotación con leguminosas"
+        ],
+        'ASOCIACIONES': [
+            "Asociación con frijol para fijación de N",
+            "Asociación con calabaza para cobertura del suelo",
+            "Cercas vivas con especies nativas"
+        ]
+    },
+    'TRIGO': {
+        'COBERTURAS_VIVAS': [
+            "Leguminosas: Trifolium subterraneum",
+            "Coberturas de invierno: Veza común",
+            "Plantas de cobertura: Rye grass anual"
+        ],
+        'ABONOS_VERDES': [
+            "Veza común: 20-30 kg/ha",
+            "Trébol blanco: 5-7 kg/ha",
+            "Habas: 80-100 kg/ha"
+        ],
+        'BIOFERTILIZANTES': [
+            "Compost de paja: 2-3 ton/ha",
+            "Bocashi especial cereales: 1.5-2 ton/ha",
+            "Té de compost aplicado en macollaje"
+        ],
+        'MANEJO_ECOLOGICO': [
+            "Control de enfermedades con bicarbonato y aceites",
+            "Uso de variedades resistentes a royas",
+            "Manejo integrado de plagas con enemigos naturales"
+        ],
+        'ASOCIACIONES': [
+            "Rotación con leguminosas de grano",
+            "Asociación con trébol en entrelineas",
+            "Cultivo en franjas con colza"
+        ]
+    },
+    'CEBADA': {
+        'COBERTURAS_VIVAS': [
+            "Leguminosas: Trifolium pratense",
+            "Coberturas de invierno: Veza vellosa",
+            "Plantas de cobertura: Avena sativa"
+        ],
+        'ABONOS_VERDES': [
+            "Veza vellosa: 25-35 kg/ha",
+            "Trébol rojo: 8-10 kg/ha",
+            "Arveja forrajera: 60-80 kg/ha"
+        ],
+        'BIOFERTILIZANTES': [
+            "Compost de cebada: 2-2.5 ton/ha",
+            "Bocashi cebada: 1-1.5 ton/ha",
+            "Té de compost aplicado en etapa de ahijado"
+        ],
+        'MANEJO_ECOLOGICO': [
+            "Control de malas hierbas con labranza reducida",
+            "Uso de acolchado para conservar humedad",
+            "Manejo integrado de plagas"
+        ],
+        'ASOCIACIONES': [
+            "Rotación con papas o remolacha",
+            "Asociación con leguminosas forrajeras",
+            "Cultivo en franjas con veza"
+        ]
+    },
+    'GIRASOL': {
+        'COBERTURAS_VIVAS': [
+            "Leguminosas: Lupinus albus",
+            "Coberturas de verano: Phaseolus vulgaris",
+            "Plantas de cobertura baja: Coriandro"
+        ],
+        'ABONOS_VERDES': [
+            "Lupino blanco: 40-50 kg/ha",
+            "Frijol común: 30-40 kg/ha",
+            "Crotalaria juncea: 20-25 kg/ha"
+        ],
+        'BIOFERTILIZANTES': [
+            "Compost de cáscara de girasol: 2-3 ton/ha",
+            "Bocashi girasol: 1.5-2 ton/ha",
+            "Biofertilizante líquido a base de algas"
+        ],
+        'MANEJO_ECOLOGICO': [
+            "Control biológico con aves insectívoras",
+            "Uso de trampas amarillas para insectos",
+            "Manejo de enfermedades con extractos de cola de caballo"
+        ],
+        'ASOCIACIONES': [
+            "Asociación con maíz para sombra temprana",
+            "Asociación con soja para fijación de N",
+            "Cultivo en franjas con sorgo"
+        ]
+    },
+    'SOJA': {
+        'COBERTURAS_VIVAS': [
+            "Leguminosas: Arachis pintoi",
+            "Coberturas de verano: Phaseolus lunatus",
+            "Plantas de cobertura: Canavalia ensiformis"
+        ],
+        'ABONOS_VERDES': [
+            "Maní forrajero: 15-20 kg/ha",
+            "Frijol lima: 25-30 kg/ha",
+            "Canavalia: 40-50 kg/ha"
+        ],
+        'BIOFERTILIZANTES': [
+            "Compost de soja: 2-2.5 ton/ha",
+            "Bocashi soja: 1-1.5 ton/ha",
+            "Inoculante de rizobio específico"
+        ],
+        'MANEJO_ECOLOGICO': [
+            "Inoculación con rizobio para fijación de N",
+            "Control de plagas con bacillus thuringiensis",
+            "Manejo de enfermedades con extractos de ajo"
+        ],
+        'ASOCIACIONES': [
+            "Asociación con maíz para uso de espacio",
+            "Asociación con sorgo para sombra",
+            "Cultivo en franjas con girasol"
+        ]
+    },
+    'COLZA': {
+        'COBERTURAS_VIVAS': [
+            "Leguminosas: Trifolium repens",
+            "Coberturas de invierno: Vicia sativa",
+            "Plantas de cobertura: Brassica napus"
+        ],
+        'ABONOS_VERDES': [
+            "Vicia común: 30-40 kg/ha",
+            "Trébol blanco: 5-7 kg/ha",
+            "Nabo forrajero: 10-15 kg/ha"
+        ],
+        'BIOFERTILIZANTES': [
+            "Compost de colza: 2-3 ton/ha",
+            "Bocashi colza: 1.5-2 ton/ha",
+            "Té de compost aplicado en roseta"
+        ],
+        'MANEJO_ECOLOGICO': [
+            "Control de plagas con aceite de neem",
+            "Uso de trampas de feromonas para polillas",
+            "Manejo de enfermedades con bicarbonato"
+        ],
+        'ASOCIACIONES': [
+            "Rotación con cereales de invierno",
+            "Asociación con leguminosas forrajeras",
+            "Cultivo en franjas con trigo"
+        ]
+    },
+    'SORGO': {
+        'COBERTURAS_VIVAS': [
+            "Leguminosas: Cajanus cajan",
+            "Coberturas de verano: Vigna unguiculata",
+            "Plantas de cobertura: Crotalaria ochroleuca"
+        ],
+        'ABONOS_VERDES': [
+            "Guandul: 20-25 kg/ha",
+            "Caupí: 15-20 kg/ha",
+            "Crotalaria: 10-15 kg/ha"
+        ],
+        'BIOFERTILIZANTES': [
+            "Compost de sorgo: 2-2.5 ton/ha",
+            "Bocashi sorgo: 1-1.5 ton/ha",
+            "Biofertilizante líquido a base de melaza"
+        ],
+        'MANEJO_ECOLOGICO': [
+            "Control de plagas con insectos benéficos",
+            "Uso de variedades resistentes a sequía",
+            "Manejo de enfermedades con extractos de propóleo"
+        ],
+        'ASOCIACIONES': [
+            "Asociación con frijol para fijación de N",
+            "Asociación con calabaza para cobertura",
+            "Cultivo en franjas con maíz"
+        ]
+    },
+    'LUPINO': {
+        'COBERTURAS_VIVAS': [
+            "Leguminosas: Lupinus angustifolius",
+            "Coberturas de invierno: Trifolium subterraneum",
+            "Plantas de cobertura: Avena byzantina"
+        ],
+        'ABONOS_VERDES': [
+            "Lupino azul: 40-50 kg/ha",
+            "Trébol subterráneo: 8-10 kg/ha",
+            "Avena bizantina: 30-40 kg/ha"
+        ],
+        'BIOFERTILIZANTES': [
+            "Compost de lupino: 1.5-2 ton/ha",
+            "Bocashi lupino: 1-1.5 ton/ha",
+            "Inoculante de rizobio específico para lupino"
+        ],
+        'MANEJO_ECOLOGICO': [
+            "Inoculación con rizobio específico",
+            "Control de plagas con rotaciones largas",
+            "Manejo de enfermedades con extractos de cola de caballo"
+        ],
+        'ASOCIACIONES': [
+            "Asociación con cereales para aprovechar N",
+            "Asociación con brassicas para rotación",
+            "Cultivo en franjas con avena"
+        ]
+    }
+}
+
+
+# RECOMENDACIONES PARA MANEJO DE PENDIENTES - CULTIVOS EXTENSIVOS
+RECOMENDACIONES_PENDIENTES = {
+    'PLANA (0-2%)': [
+        "Diseño rectangular de siembra",
+        "Sistemas de riego por pivote central",
+        "Labranza convencional posible",
+        "Maquinaria pesada sin restricciones"
+    ],
+    'SUAVE (2-5%)': [
+        "Diseño en contorno ligero",
+        "Surcos siguiendo curvas de nivel",
+        "Labranza reducida recomendada",
+        "Barreras de cobertura cada 100 metros"
+    ],
+    'MODERADA (5-10%)': [
+        "Diseño en contorno estricto",
+        "Terrazas de base ancha",
+        "Cultivos en franjas",
+        "Barreras de cobertura cada 50 metros"
+    ],
+    'FUERTE (10-15%)': [
+        "Terrazas individuales",
+        "Siembra directa obligatoria",
+        "Cultivo en callejones (alley cropping)",
+        "Barreras de cobertura cada 30 metros"
+    ],
+    'MUY FUERTE (15-25%)': [
+        "Terrazas con muros de piedra",
+        "Sistemas silvopastoriles",
+        "Cultivos permanentes de cobertura",
+        "Evitar labranza, solo siembra directa"
+    ],
+    'EXTREMA (>25%)': [
+        "Forestación o agroforestería densa",
+        "Terrazas estrechas con vegetación permanente",
+        "Sistemas de captación de agua",
+        "No usar maquinaria, solo manual"
+    ]
+}
+
+
+# FACTORES ESTACIONALES PARA CULTIVOS EXTENSIVOS
+FACTORES_MES = {
+    "ENERO": 0.8, "FEBRERO": 0.9, "MARZO": 1.0, "ABRIL": 1.1,
+    "MAYO": 1.2, "JUNIO": 1.0, "JULIO": 0.9, "AGOSTO": 0.8,
+    "SEPTIEMBRE": 0.9, "OCTUBRE": 1.0, "NOVIEMBRE": 1.1, "DICIEMBRE": 1.0
+}
+
+
+FACTORES_N_MES = {
+    "ENERO": 1.0, "FEBRERO": 1.1, "MARZO": 1.2, "ABRIL": 1.3,
+    "MAYO": 1.4, "JUNIO": 1.2, "JULIO": 1.0, "AGOSTO": 0.8,
+    "SEPTIEMBRE": 0.9, "OCTUBRE": 1.0, "NOVIEMBRE": 1.1, "DICIEMBRE": 1.0
+}
+
+
+FACTORES_P_MES = {
+    "ENERO": 1.0, "FEBRERO": 1.0, "MARZO": 1.1, "ABRIL": 1.2,
+    "MAYO": 1.3, "JUNIO": 1.2, "JULIO": 1.1, "AGOSTO": 1.0,
+    "SEPTIEMBRE": 1.0, "OCTUBRE": 1.1, "NOVIEMBRE": 1.2, "DICIEMBRE": 1.1
+}
+
+
+FACTORES_K_MES = {
+    "ENERO": 1.0, "FEBRERO": 1.0, "MARZO": 1.0, "ABRIL": 1.1,
+    "MAYO": 1.2, "JUNIO": 1.3, "JULIO": 1.4, "AGOSTO": 1.3,
+    "SEPTIEMBRE": 1.2, "OCTUBRE": 1.1, "NOVIEMBRE": 1.0, "DICIEMBRE": 1.0
+}
+
+
+# FACTORES ESTACIONALES PARA NDWI DEL SUELO
+FACTORES_NDWI_MES = {
+    "ENERO": 0.8, "FEBRERO": 0.85, "MARZO": 0.9, "ABRIL": 0.95,
+    "MAYO": 1.0, "JUNIO": 0.95, "JULIO": 0.85, "AGOSTO": 0.8,
+    "SEPTIEMBRE": 0.85, "OCTUBRE": 0.9, "NOVIEMBRE": 0.95, "DICIEMBRE": 0.9
+}
+
+
+# PALETAS GEE MEJORADAS
+PALETAS_GEE = {
+    'FERTILIDAD': ['#d73027', '#f46d43', '#fdae61', '#fee08b', '#d9ef8b', '#a6d96a', '#66bd63', '#1a9850', '#006837'],
+    'NITROGENO': ['#8c510a', '#bf812d', '#dfc27d', '#f6e8c3', '#c7eae5', '#80cdc1', '#35978f', '#01665e'],
+    'FOSFORO': ['#67001f', '#b2182b', '#d6604d', '#f4a582', '#fddbc7', '#d1e5f0', '#92c5de', '#4393c3', '#2166ac', '#053061'],
+    'POTASIO': ['#4d004b', '#810f7c', '#8c6bb1', '#8c96c6', '#9ebcda', '#bfd3e6', '#e0ecf4', '#edf8fb'],
+    'TEXTURA': ['#8c510a', '#d8b365', '#f6e8c3', '#c7eae5', '#5ab4ac', '#01665e'],
+    'NDWI_SUELO': ['#8b0000', '#ff4500', '#ffa500', '#ffff00', '#adff2f', '#32cd32', '#006400'],
+    'ELEVACION': ['#006837', '#1a9850', '#66bd63', '#a6d96a', '#d9ef8b', '#ffffbf', '#fee08b', '#fdae61', '#f46d43', '#d73027'],
+    'PENDIENTE': ['#4daf4a', '#a6d96a', '#ffffbf', '#fdae61', '#f46d43', '#d73027']
+}
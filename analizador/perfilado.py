@@ -0,0 +1,137 @@
+"""Captura de perfiles de CPU de una ejecución del análisis.
+
+Un Perfilador combina cProfile (tiempos exactos por función, archivo .pstats para
+snakeviz/pstats) con un muestreo periódico de la pila del hilo perfilado, que se
+guarda en formato "collapsed" (una línea "raiz;...;hoja cantidad" por pila) para
+flamegraph.pl, speedscope o inferno.
+"""
+import cProfile
+import logging
+import os
+import pstats
+import sys
+import tempfile
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# PARÁMETROS DEL PERFILADO
+PARAMETROS_PERFILADO = {
+    'intervalo_muestreo_s': 0.005,  # 200 muestras por segundo
+    'max_profundidad': 256,         # marcos por pila muestreada
+    'funciones_resumen': 25,        # filas del resumen por tiempo acumulado
+}
+
+
+def perfilado_habilitado():
+    """El perfilado solo se ofrece a administradores (variable de entorno ANALIZADOR_PERFILADO_ADMIN)"""
+    return os.environ.get('ANALIZADOR_PERFILADO_ADMIN', '').lower() in ('1', 'true', 'si', 'sí')
+
+
+def directorio_perfiles():
+    """Directorio donde se guardan los perfiles (ANALIZADOR_PERFILES_DIR o <tmp>/analizador_perfiles)"""
+    return os.environ.get('ANALIZADOR_PERFILES_DIR') or os.path.join(tempfile.gettempdir(), 'analizador_perfiles')
+
+
+def _etiqueta_marco(marco):
+    codigo = marco.f_code
+    # ';' separa marcos en el formato collapsed
+    return f"{codigo.co_name} ({os.path.basename(codigo.co_filename)}:{codigo.co_firstlineno})".replace(';', ':')
+
+
+class _MuestreadorPilas(threading.Thread):
+    """Hilo que muestrea la pila de otro hilo a intervalos fijos"""
+
+    def __init__(self, id_hilo, pilas, intervalo):
+        super().__init__(name='muestreador_pilas', daemon=True)
+        self.id_hilo = id_hilo
+        self.pilas = pilas
+        self.intervalo = intervalo
+        self.detener = threading.Event()
+
+    def run(self):
+        while not self.detener.wait(self.intervalo):
+            marco = sys._current_frames().get(self.id_hilo)
+            pila = []
+            while marco is not None and len(pila) < PARAMETROS_PERFILADO['max_profundidad']:
+                pila.append(_etiqueta_marco(marco))
+                marco = marco.f_back
+            if pila:
+                self.pilas[';'.join(reversed(pila))] += 1
+
+
+class Perfilador:
+    """Perfil de CPU que puede pausarse y reanudarse (p. ej. a lo largo de varias ejecuciones del script)"""
+
+    def __init__(self, nombre='analisis'):
+        self.nombre = nombre
+        self.perfil = cProfile.Profile()
+        self.pilas = Counter()
+        self.muestreador = None
+        self.activo = False
+
+    def reanudar(self):
+        """Empieza (o continúa) a perfilar el hilo actual"""
+        if self.activo:
+            return
+        self.perfil.enable()
+        self.muestreador = _MuestreadorPilas(threading.get_ident(), self.pilas,
+                                             PARAMETROS_PERFILADO['intervalo_muestreo_s'])
+        self.muestreador.start()
+        self.activo = True
+
+    def pausar(self):
+        if not self.activo:
+            return
+        self.perfil.disable()
+        self.muestreador.detener.set()
+        self.muestreador.join()
+        self.muestreador = None
+        self.activo = False
+
+    def resumen(self, cantidad=None):
+        """Funciones con más tiempo acumulado: lista de dicts para mostrar en tablas"""
+        cantidad = cantidad or PARAMETROS_PERFILADO['funciones_resumen']
+        estadisticas = pstats.Stats(self.perfil)
+        filas = []
+        for (archivo, linea, funcion), (_, llamadas, propio, acumulado, _) in estadisticas.stats.items():
+            filas.append({
+                'funcion': funcion,
+                'archivo': os.path.basename(archivo),
+                'linea': linea,
+                'llamadas': llamadas,
+                'segundos_propios': round(propio, 4),
+                'segundos_acumulados': round(acumulado, 4),
+            })
+        filas.sort(key=lambda f: f['segundos_acumulados'], reverse=True)
+        return filas[:cantidad]
+
+    def guardar(self, directorio=None):
+        """Guarda <nombre>_<fecha>.pstats y .folded; devuelve las rutas"""
+        self.pausar()
+        directorio = directorio or directorio_perfiles()
+        os.makedirs(directorio, exist_ok=True)
+        base = os.path.join(directorio, f"{self.nombre}_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}")
+
+        rutas = {'pstats': base + '.pstats', 'folded': base + '.folded'}
+        self.perfil.dump_stats(rutas['pstats'])
+        with open(rutas['folded'], 'w', encoding='utf-8') as f:
+            for pila, cantidad in sorted(self.pilas.items()):
+                f.write(f"{pila} {cantidad}\n")
+        logger.info(f"Perfil guardado en {base}.pstats / .folded ({sum(self.pilas.values())} muestras)")
+        return rutas
+
+
+@contextmanager
+def perfilar(nombre='analisis', directorio=None):
+    """Perfila el bloque y guarda los archivos al salir; el diccionario entregado recibe las rutas"""
+    perfilador = Perfilador(nombre)
+    rutas = {}
+    perfilador.reanudar()
+    try:
+        yield rutas
+    finally:
+        rutas.update(perfilador.guardar(directorio))
@@ -0,0 +1,672 @@
+"""Análisis de textura, NDWI del suelo y fertilidad NPK por zona"""
+import numpy as np
+
+from .geometria import calcular_superficie
+from .instrumentacion import medir_etapa
+from .parametros import (
+    PARAMETROS_CULTIVOS, TEXTURA_SUELO_OPTIMA, PARAMETROS_NDWI_SUELO,
+    FACTORES_MES, FACTORES_N_MES, FACTORES_P_MES, FACTORES_K_MES, FACTORES_NDWI_MES
+)
+
+
+# FUNCIÓN: CLASIFICAR TEXTURA DEL SUELO - ACTUALIZADA SEGÚN IMAGEN
+def clasificar_textura_suelo(arena, limo, arcilla):
+    """Clasifica la textura del suelo según los rangos de la imagen"""
+    try:
+        # Normalizar porcentajes a 100%
+        total = arena + limo + arcilla
+        if total == 0:
+            return "NO_DETERMINADA"
+        
+        arena_norm = (arena / total) * 100
+        limo_norm = (limo / total) * 100
+        arcilla_norm = (arcilla / total) * 100
+        
+        # Clasificación según los rangos de la imagen
+        if arcilla_norm >= 35:
+            return "Arcilloso"
+        elif arcilla_norm >= 25 and arcilla_norm <= 35 and arena_norm >= 20 and arena_norm <= 45:
+            return "Franco Arcilloso"
+        elif arena_norm >= 50 and arena_norm <= 70 and arcilla_norm >= 5 and arcilla_norm <= 20:
+            return "Franco Arenoso"
+        elif arcilla_norm >= 7 and arcilla_norm <= 27 and arena_norm >= 43 and arena_norm <= 52:
+            return "Franco"
+        elif arena_norm >= 85:
+            return "Arenoso"
+        else:
+            return "Franco"  # Por defecto
+        
+    except Exception as e:
+        return "NO_DETERMINADA"
+
+
+# Valores base según textura (mm/m) - AJUSTADOS SEGÚN IMAGEN
+PROPIEDADES_BASE_TEXTURA = {
+    'Arcilloso': {'cc': 380, 'pm': 220, 'da': 1.35, 'porosidad': 0.45, 'kh': 0.1, 'aireacion': 0.6, 'drenaje': 0.3},
+    'Franco Arcilloso': {'cc': 320, 'pm': 160, 'da': 1.25, 'porosidad': 0.53, 'kh': 0.5, 'aireacion': 0.7, 'drenaje': 0.6},
+    'Franco': {'cc': 280, 'pm': 120, 'da': 1.2, 'porosidad': 0.55, 'kh': 1.5, 'aireacion': 1.0, 'drenaje': 1.0},
+    'Franco Arenoso': {'cc': 200, 'pm': 80, 'da': 1.4, 'porosidad': 0.47, 'kh': 5.0, 'aireacion': 1.4, 'drenaje': 1.3},
+    'Arenoso': {'cc': 150, 'pm': 60, 'da': 1.5, 'porosidad': 0.43, 'kh': 10.0, 'aireacion': 1.5, 'drenaje': 1.5}
+}
+
+
+# FUNCIÓN: CALCULAR PROPIEDADES FÍSICAS DEL SUELO - ACTUALIZADA SEGÚN IMAGEN
+def calcular_propiedades_fisicas_suelo(textura, materia_organica):
+    """Calcula propiedades físicas del suelo basadas en textura y MO"""
+    propiedades = {
+        'capacidad_campo': 0.0,
+        'punto_marchitez': 0.0,
+        'agua_disponible': 0.0,
+        'densidad_aparente': 0.0,
+        'porosidad': 0.0,
+        'conductividad_hidraulica': 0.0,
+        'aireacion': 0.0,
+        'drenaje': 0.0
+    }
+    
+    base_propiedades = PROPIEDADES_BASE_TEXTURA
+    
+    if textura in base_propiedades:
+        base = base_propiedades[textura]
+        
+        # Ajustar por materia orgánica (cada 1% de MO mejora propiedades)
+        factor_mo = 1.0 + (materia_organica * 0.05)
+        
+        propiedades['capacidad_campo'] = base['cc'] * factor_mo
+        propiedades['punto_marchitez'] = base['pm'] * factor_mo
+        propiedades['agua_disponible'] = (base['cc'] - base['pm']) * factor_mo
+        propiedades['densidad_aparente'] = base['da'] / factor_mo
+        propiedades['porosidad'] = min(0.65, base['porosidad'] * factor_mo)
+        propiedades['conductividad_hidraulica'] = base['kh'] * factor_mo
+        propiedades['aireacion'] = min(1.0, base['aireacion'] * factor_mo)
+        propiedades['drenaje'] = min(2.0, base['drenaje'] * factor_mo)
+    
+    return propiedades
+
+
+# FUNCIÓN: EVALUAR ADECUACIÓN DE TEXTURA - ACTUALIZADA
+def evaluar_adecuacion_textura(textura_actual, cultivo):
+    """Evalúa qué tan adecuada es la textura para el cultivo específico"""
+    textura_optima = TEXTURA_SUELO_OPTIMA[cultivo]['textura_optima']
+    
+    if textura_actual == textura_optima:
+        return "ÓPTIMA", 1.0
+    elif textura_actual == "NO_DETERMINADA":
+        return "NO_DETERMINADA", 0
+    
+    # Matriz de compatibilidad basada en propiedades similares
+    compatibilidad = {
+        'Franco': {'Franco Arcilloso': 0.8, 'Franco Arenoso': 0.7, 'Arcilloso': 0.4, 'Arenoso': 0.6},
+        'Franco Arcilloso': {'Franco': 0.8, 'Franco Arenoso': 0.6, 'Arcilloso': 0.9, 'Arenoso': 0.4},
+        'Franco Arenoso': {'Franco': 0.7, 'Franco Arcilloso': 0.6, 'Arcilloso': 0.5, 'Arenoso': 0.8},
+        'Arcilloso': {'Franco': 0.4, 'Franco Arcilloso': 0.9, 'Franco Arenoso': 0.5, 'Arenoso': 0.2},
+        'Arenoso': {'Franco': 0.6, 'Franco Arcilloso': 0.4, 'Franco Arenoso': 0.8, 'Arcilloso': 0.2}
+    }
+    
+    if textura_actual in compatibilidad and textura_optima in compatibilidad[textura_actual]:
+        puntaje = compatibilidad[textura_actual][textura_optima]
+        if puntaje >= 0.8:
+            return "MUY ADECUADA", puntaje
+        elif puntaje >= 0.6:
+            return "ADECUADA", puntaje
+        elif puntaje >= 0.4:
+            return "MODERADA", puntaje
+        else:
+            return "LIMITANTE", puntaje
+    
+    return "LIMITANTE", 0.3
+
+
+# FUNCIÓN: ANÁLISIS DE TEXTURA DEL SUELO
+@medir_etapa('analisis_textura')
+def analizar_textura_suelo(gdf, cultivo, mes_analisis):
+    """Realiza análisis completo de textura del suelo"""
+    
+    params_textura = TEXTURA_SUELO_OPTIMA[cultivo]
+    zonas_gdf = gdf.copy()
+    
+    # Inicializar columnas para textura
+    zonas_gdf['area_ha'] = 0.0
+    zonas_gdf['arena'] = 0.0
+    zonas_gdf['limo'] = 0.0
+    zonas_gdf['arcilla'] = 0.0
+    zonas_gdf['textura_suelo'] = "NO_DETERMINADA"
+    zonas_gdf['adecuacion_textura'] = 0.0
+    zonas_gdf['categoria_adecuacion'] = "NO_DETERMINADA"
+    zonas_gdf['capacidad_campo'] = 0.0
+    zonas_gdf['punto_marchitez'] = 0.0
+    zonas_gdf['agua_disponible'] = 0.0
+    zonas_gdf['densidad_aparente'] = 0.0
+    zonas_gdf['porosidad'] = 0.0
+    zonas_gdf['conductividad_hidraulica'] = 0.0
+    zonas_gdf['aireacion'] = 0.0
+    zonas_gdf['drenaje'] = 0.0
+    
+    for idx, row in zonas_gdf.iterrows():
+        try:
+            # Calcular área
+            area_ha = calcular_superficie(zonas_gdf.iloc[[idx]])
+            
+            # Obtener centroide
+            if hasattr(row.geometry, 'centroid'):
+                centroid = row.geometry.centroid
+            else:
+                centroid = row.geometry.representative_point()
+            
+            # Semilla para reproducibilidad
+            seed_value = abs(hash(f"{centroid.x:.6f}_{centroid.y:.6f}_{cultivo}_textura")) % (2**32)
+            rng = np.random.RandomState(seed_value)
+            
+            # Normalizar coordenadas para variabilidad espacial
+            lat_norm = (centroid.y + 90) / 180 if centroid.y else 0.5
+            lon_norm = (centroid.x + 180) / 360 if centroid.x else 0.5
+            
+            # SIMULAR COMPOSICIÓN GRANULOMÉTRICA SEGÚN IMAGEN
+            variabilidad_local = 0.15 + 0.7 * (lat_norm * lon_norm)
+            
+            # Valores óptimos para el cultivo
+            arena_optima = params_textura['arena_optima']
+            limo_optima = params_textura['limo_optima']
+            arcilla_optima = params_textura['arcilla_optima']
+            
+            # Simular composición basada en textura óptima del cultivo
+            base_arena = arena_optima
+            base_limo = limo_optima
+            base_arcilla = arcilla_optima
+            
+            # Ajustar según variabilidad local
+            arena = max(5, min(95, rng.normal(
+                base_arena * (0.8 + 0.4 * variabilidad_local),
+                base_arena * 0.15
+            )))
+            
+            limo = max(5, min(95, rng.normal(
+                base_limo * (0.7 + 0.6 * variabilidad_local),
+                base_limo * 0.2
+            )))
+            
+            arcilla = max(5, min(95, rng.normal(
+                base_arcilla * (0.75 + 0.5 * variabilidad_local),
+                base_arcilla * 0.15
+            )))
+            
+            # Normalizar a 100%
+            total = arena + limo + arcilla
+            arena = (arena / total) * 100
+            limo = (limo / total) * 100
+            arcilla = (arcilla / total) * 100
+            
+            # Clasificar textura según imagen
+            textura = clasificar_textura_suelo(arena, limo, arcilla)
+            
+            # Evaluar adecuación para el cultivo
+            categoria_adecuacion, puntaje_adecuacion = evaluar_adecuacion_textura(textura, cultivo)
+            
+            # Simular materia orgánica para propiedades físicas
+            materia_organica = max(1.0, min(8.0, rng.normal(3.0, 1.0)))
+            
+            # Calcular propiedades físicas
+            propiedades_fisicas = calcular_propiedades_fisicas_suelo(textura, materia_organica)
+            
+            # Asignar valores al GeoDataFrame
+            zonas_gdf.loc[idx, 'area_ha'] = area_ha
+            zonas_gdf.loc[idx, 'arena'] = arena
+            zonas_gdf.loc[idx, 'limo'] = limo
+            zonas_gdf.loc[idx, 'arcilla'] = arcilla
+            zonas_gdf.loc[idx, 'textura_suelo'] = textura
+            zonas_gdf.loc[idx, 'adecuacion_textura'] = puntaje_adecuacion
+            zonas_gdf.loc[idx, 'categoria_adecuacion'] = categoria_adecuacion
+            zonas_gdf.loc[idx, 'capacidad_campo'] = propiedades_fisicas['capacidad_campo']
+            zonas_gdf.loc[idx, 'punto_marchitez'] = propiedades_fisicas['punto_marchitez']
+            zonas_gdf.loc[idx, 'agua_disponible'] = propiedades_fisicas['agua_disponible']
+            zonas_gdf.loc[idx, 'densidad_aparente'] = propiedades_fisicas['densidad_aparente']
+            zonas_gdf.loc[idx, 'porosidad'] = propiedades_fisicas['porosidad']
+            zonas_gdf.loc[idx, 'conductividad_hidraulica'] = propiedades_fisicas['conductividad_hidraulica']
+            zonas_gdf.loc[idx, 'aireacion'] = propiedades_fisicas['aireacion']
+            zonas_gdf.loc[idx, 'drenaje'] = propiedades_fisicas['drenaje']
+            
+        except Exception as e:
+            # Valores por defecto en caso de error
+            zonas_gdf.loc[idx, 'area_ha'] = calcular_superficie(zonas_gdf.iloc[[idx]])
+            zonas_gdf.loc[idx, 'arena'] = params_textura['arena_optima']
+            zonas_gdf.loc[idx, 'limo'] = params_textura['limo_optima']
+            zonas_gdf.loc[idx, 'arcilla'] = params_textura['arcilla_optima']
+            zonas_gdf.loc[idx, 'textura_suelo'] = params_textura['textura_optima']
+            zonas_gdf.loc[idx, 'adecuacion_textura'] = 1.0
+            zonas_gdf.loc[idx, 'categoria_adecuacion'] = "ÓPTIMA"
+            
+            # Propiedades físicas por defecto
+            propiedades_default = calcular_propiedades_fisicas_suelo(params_textura['textura_optima'], 3.0)
+            for prop, valor in propiedades_default.items():
+                zonas_gdf.loc[idx, prop] = valor
+    
+    return zonas_gdf
+
+
+# FUNCIÓN ESPECÍFICA PARA ANÁLISIS DE NDWI DEL SUELO
+@medir_etapa('analisis_ndwi')
+def analizar_ndwi_suelo(gdf, cultivo, mes_analisis):
+    """Realiza análisis específico del NDWI del suelo (contenido de agua en el suelo)"""
+    
+    params_ndwi = PARAMETROS_NDWI_SUELO[cultivo]
+    zonas_gdf = gdf.copy()
+    
+    # Inicializar columnas específicas para NDWI del suelo
+    zonas_gdf['ndwi_suelo'] = 0.0
+    zonas_gdf['estado_humedad_suelo'] = "MEDIO"
+    zonas_gdf['deficit_humedad'] = 0.0
+    zonas_gdf['recomendacion_riego'] = "NINGUNA"
+    zonas_gdf['riesgo_sequia'] = "BAJO"
+    
+    factor_ndwi_mes = FACTORES_NDWI_MES[mes_analisis]
+    
+    for idx, row in zonas_gdf.iterrows():
+        try:
+            # Calcular área
+            area_ha = calcular_superficie(zonas_gdf.iloc[[idx]])
+            
+            # Obtener centroide
+            if hasattr(row.geometry, 'centroid'):
+                centroid = row.geometry.centroid
+            else:
+                centroid = row.geometry.representative_point()
+            
+            # Semilla para reproducibilidad
+            seed_value = abs(hash(f"{centroid.x:.6f}_{centroid.y:.6f}_{cultivo}_ndwi")) % (2**32)
+            rng = np.random.RandomState(seed_value)
+            
+            # Normalizar coordenadas
+            lat_norm = (centroid.y + 90) / 180 if centroid.y else 0.5
+            lon_norm = (centroid.x + 180) / 360 if centroid.x else 0.5
+            
+            # Variabilidad espacial
+            variabilidad_local = 0.3 + 0.5 * (lat_norm * lon_norm)
+            
+            # CÁLCULO DETALLADO DE NDWI DEL SUELO
+            # Usar fórmula específica para suelo: (NIR - SWIR) / (NIR + SWIR)
+            # Donde SWIR es sensible al contenido de agua en el suelo
+            
+            # Valor base según cultivo
+            base_ndwi = params_ndwi['ndwi_optimo_suelo']
+            
+            # Simular variaciones basadas en factores:
+            # 1. Topografía (pendiente afecta retención de agua)
+            variacion_topografia = rng.normal(0, 0.1) * (1 - variabilidad_local)
+            
+            # 2. Textura del suelo (si está disponible)
+            # Para simulación, usar variabilidad local
+            variacion_textura = variabilidad_local * 0.15
+            
+            # 3. Profundidad efectiva del suelo
+            variacion_profundidad = rng.random() * 0.1
+            
+            # Calcular NDWI del suelo
+            ndwi_suelo = (
+                base_ndwi + 
+                variacion_topografia + 
+                variacion_textura + 
+                variacion_profundidad
+            )
+            
+            # Aplicar factor estacional
+            ndwi_suelo *= factor_ndwi_mes
+            
+            # Agregar variabilidad aleatoria
+            ndwi_suelo += rng.normal(0, 0.03)
+            
+            # Limitar valores
+            ndwi_suelo = max(-1.0, min(1.0, ndwi_suelo))
+            
+            # Calcular déficit de humedad (cuánto falta para el óptimo)
+            deficit_humedad = max(0, params_ndwi['ndwi_optimo_suelo'] - ndwi_suelo)
+            
+            # Clasificar estado de humedad
+            if ndwi_suelo >= params_ndwi['ndwi_humedo_suelo']:
+                estado_humedad = "MUY HÚMEDO"
+                recomendacion_riego = "REDUCIR RIEGO"
+                riesgo_sequia = "NULO"
+            elif ndwi_suelo >= params_ndwi['ndwi_optimo_suelo']:
+                estado_humedad = "ÓPTIMO"
+                recomendacion_riego = "MANTENER"
+                riesgo_sequia = "BAJO"
+            elif ndwi_suelo >= params_ndwi['umbral_sequia']:
+                estado_humedad = "MODERADO"
+                recomendacion_riego = "RIEGO MODERADO"
+                riesgo_sequia = "MODERADO"
+            elif ndwi_suelo >= params_ndwi['ndwi_seco_suelo']:
+                estado_humedad = "SECO"
+                recomendacion_riego = "RIEGO URGENTE"
+                riesgo_sequia = "ALTO"
+            else:
+                estado_humedad = "MUY SECO"
+                recomendacion_riego = "RIEGO INTENSIVO"
+                riesgo_sequia = "CRÍTICO"
+            
+            # Asignar valores
+            zonas_gdf.loc[idx, 'area_ha'] = area_ha
+            zonas_gdf.loc[idx, 'ndwi_suelo'] = ndwi_suelo
+            zonas_gdf.loc[idx, 'estado_humedad_suelo'] = estado_humedad
+            zonas_gdf.loc[idx, 'deficit_humedad'] = deficit_humedad
+            zonas_gdf.loc[idx, 'recomendacion_riego'] = recomendacion_riego
+            zonas_gdf.loc[idx, 'riesgo_sequia'] = riesgo_sequia
+            
+        except Exception as e:
+            # Valores por defecto
+            zonas_gdf.loc[idx, 'area_ha'] = calcular_superficie(zonas_gdf.iloc[[idx]])
+            zonas_gdf.loc[idx, 'ndwi_suelo'] = params_ndwi['ndwi_optimo_suelo']
+            zonas_gdf.loc[idx, 'estado_humedad_suelo'] = "ÓPTIMO"
+            zonas_gdf.loc[idx, 'deficit_humedad'] = 0.0
+            zonas_gdf.loc[idx, 'recomendacion_riego'] = "MANTENER"
+            zonas_gdf.loc[idx, 'riesgo_sequia'] = "BAJO"
+    
+    return zonas_gdf
+
+
+# FUNCIÓN CORREGIDA PARA ANÁLISIS DE FERTILIDAD CON CÁLCULOS NPK PRECISOS Y NDWI DEL SUELO
+@medir_etapa('indices_fertilidad')
+def calcular_indices_gee(gdf, cultivo, mes_analisis, analisis_tipo, nutriente):
+    """Calcula índices GEE mejorados con cálculos NPK más precisos y NDWI del suelo"""
+    
+    params = PARAMETROS_CULTIVOS[cultivo]
+    params_ndwi = PARAMETROS_NDWI_SUELO[cultivo]
+    zonas_gdf = gdf.copy()
+    
+    # FACTORES ESTACIONALES MEJORADOS
+    factor_mes = FACTORES_MES[mes_analisis]
+    factor_n_mes = FACTORES_N_MES[mes_analisis]
+    factor_p_mes = FACTORES_P_MES[mes_analisis]
+    factor_k_mes = FACTORES_K_MES[mes_analisis]
+    factor_ndwi_mes = FACTORES_NDWI_MES[mes_analisis]
+    
+    # Inicializar columnas adicionales (AGREGAR NDWI_SUELO)
+    zonas_gdf['area_ha'] = 0.0
+    zonas_gdf['nitrogeno'] = 0.0
+    zonas_gdf['fosforo'] = 0.0
+    zonas_gdf['potasio'] = 0.0
+    zonas_gdf['materia_organica'] = 0.0
+    zonas_gdf['humedad'] = 0.0
+    zonas_gdf['ph'] = 0.0
+    zonas_gdf['conductividad'] = 0.0
+    zonas_gdf['ndvi'] = 0.0
+    zonas_gdf['ndwi_suelo'] = 0.0  # NUEVO: NDWI para el suelo
+    zonas_gdf['estado_humedad_suelo'] = "MEDIO"  # NUEVO: Estado de humedad
+    zonas_gdf['indice_fertilidad'] = 0.0
+    zonas_gdf['categoria'] = "MEDIA"
+    zonas_gdf['recomendacion_npk'] = 0.0
+    zonas_gdf['deficit_npk'] = 0.0
+    zonas_gdf['prioridad'] = "MEDIA"
+    
+    for idx, row in zonas_gdf.iterrows():
+        try:
+            # Calcular área
+            area_ha = calcular_superficie(zonas_gdf.iloc[[idx]])
+            
+            # Obtener centroide
+            if hasattr(row.geometry, 'centroid'):
+                centroid = row.geometry.centroid
+            else:
+                centroid = row.geometry.representative_point()
+            
+            # Semilla más estable para reproducibilidad
+            seed_value = abs(hash(f"{centroid.x:.6f}_{centroid.y:.6f}_{cultivo}")) % (2**32)
+            rng = np.random.RandomState(seed_value)
+            
+            # Normalizar coordenadas para variabilidad espacial más realista
+            lat_norm = (centroid.y + 90) / 180 if centroid.y else 0.5
+            lon_norm = (centroid.x + 180) / 360 if centroid.x else 0.5
+            
+            # SIMULACIÓN MÁS REALISTA DE PARÁMETROS DEL SUELO
+            n_optimo = params['NITROGENO']['optimo']
+            p_optimo = params['FOSFORO']['optimo']
+            k_optimo = params['POTASIO']['optimo']
+            
+            # Variabilidad espacial más pronunciada
+            variabilidad_local = 0.2 + 0.6 * (lat_norm * lon_norm)  # Mayor correlación espacial
+            
+            # Simular valores con distribución normal más realista (niveles más bajos para generar déficit)
+            nitrogeno = max(0, rng.normal(
+                n_optimo * (0.6 + 0.3 * variabilidad_local),  # REDUCIDO: 0.6 en lugar de 0.8
+                n_optimo * 0.2
+            ))
+            
+            fosforo = max(0, rng.normal(
+                p_optimo * (0.5 + 0.4 * variabilidad_local),  # REDUCIDO: 0.5 en lugar de 0.7
+                p_optimo * 0.25
+            ))
+            
+            potasio = max(0, rng.normal(
+                k_optimo * (0.55 + 0.35 * variabilidad_local),  # REDUCIDO: 0.55 en lugar de 0.75
+                k_optimo * 0.22
+            ))
+            
+            # Aplicar factores estacionales mejorados
+            nitrogeno *= factor_n_mes * (0.8 + 0.3 * rng.random())
+            fosforo *= factor_p_mes * (0.8 + 0.3 * rng.random())
+            potasio *= factor_k_mes * (0.8 + 0.3 * rng.random())
+            
+            # Parámetros adicionales del suelo simulados
+            materia_organica = max(1.0, min(8.0, rng.normal(
+                params['MATERIA_ORGANICA_OPTIMA'] * 0.7,  # REDUCIDO
+                1.0
+            )))
+            
+            humedad = max(0.1, min(0.8, rng.normal(
+                params['HUMEDAD_OPTIMA'],
+                0.1
+            )))
+            
+            ph = max(4.0, min(8.0, rng.normal(
+                params['pH_OPTIMO'],
+                0.5
+            )))
+            
+            conductividad = max(0.1, min(3.0, rng.normal(
+                params['CONDUCTIVIDAD_OPTIMA'],
+                0.3
+            )))
+            
+            # NDVI con correlación con fertilidad
+            base_ndvi = 0.3 + 0.5 * variabilidad_local
+            ndvi = max(0.1, min(0.95, rng.normal(base_ndvi, 0.1)))
+            
+            # CÁLCULO DE NDWI DEL SUELO - NUEVO
+            # NDWI para suelo se calcula con bandas SWIR (Short Wave Infrared)
+            # Fórmula: (SWIR1 - SWIR2) / (SWIR1 + SWIR2) para suelo
+            # O para Sentinel-2: (B8A - B11) / (B8A + B11)
+            
+            # Base para NDWI del suelo basada en humedad y textura
+            base_ndwi_suelo = params_ndwi['ndwi_optimo_suelo']
+            
+            # Ajustar por humedad del suelo
+            ajuste_humedad = (humedad - 0.3) * 0.5  # Ajuste basado en humedad
+            
+            # Ajustar por materia orgánica (la MO retiene agua)
+            ajuste_mo = materia_organica * 0.02
+            
+            # Ajustar por textura (asumimos que tenemos información de textura)
+            # Para simulación, usamos variabilidad espacial
+            ajuste_textura = variabilidad_local * 0.1
+            
+            # Cálculo del NDWI del suelo
+            ndwi_suelo = base_ndwi_suelo + ajuste_humedad + ajuste_mo + ajuste_textura
+            
+            # Aplicar factor estacional
+            ndwi_suelo *= factor_ndwi_mes
+            
+            # Agregar variabilidad aleatoria
+            ndwi_suelo += rng.normal(0, 0.05)
+            
+            # Limitar valores entre -1 y 1 (rango válido para NDWI)
+            ndwi_suelo = max(-1.0, min(1.0, ndwi_suelo))
+            
+            # Clasificar estado de humedad del suelo basado en NDWI
+            if ndwi_suelo >= params_ndwi['ndwi_humedo_suelo']:
+                estado_humedad = "MUY HÚMEDO"
+            elif ndwi_suelo >= params_ndwi['ndwi_optimo_suelo']:
+                estado_humedad = "ÓPTIMO"
+            elif ndwi_suelo >= params_ndwi['umbral_sequia']:
+                estado_humedad = "MODERADO"
+            elif ndwi_suelo >= params_ndwi['ndwi_seco_suelo']:
+                estado_humedad = "SECO"
+            else:
+                estado_humedad = "MUY SECO"
+            
+            # CÁLCULO MEJORADO DE ÍNDICE DE FERTILIDAD (INCLUIR NDWI DEL SUELO)
+            n_norm = max(0, min(1, nitrogeno / (n_optimo * 1.5)))  # Normalizado al 150% del óptimo
+            p_norm = max(0, min(1, fosforo / (p_optimo * 1.5)))
+            k_norm = max(0, min(1, potasio / (k_optimo * 1.5)))
+            mo_norm = max(0, min(1, materia_organica / 8.0))
+            ph_norm = max(0, min(1, 1 - abs(ph - params['pH_OPTIMO']) / 2.0))  # Óptimo en centro
+            
+            # Normalizar NDWI del suelo para índice de fertilidad (valores entre 0 y 1)
+            ndwi_suelo_norm = (ndwi_suelo + 1) / 2  # Convertir de [-1,1] a [0,1]
+            
+            # Índice compuesto mejorado - AHORA INCLUYE NDWI DEL SUELO
+            indice_fertilidad = (
+                n_norm * 0.22 +  # Reducido de 0.25
+                p_norm * 0.18 +  # Reducido de 0.20
+                k_norm * 0.18 +  # Reducido de 0.20
+                mo_norm * 0.15 +
+                ph_norm * 0.10 +
+                ndvi * 0.08 +    # Reducido de 0.10
+                ndwi_suelo_norm * 0.09  # NUEVO: Peso del NDWI del suelo
+            ) * factor_mes
+            
+            indice_fertilidad = max(0, min(1, indice_fertilidad))
+            
+            # CATEGORIZACIÓN MEJORADA
+            if indice_fertilidad >= 0.85:
+                categoria = "EXCELENTE"
+                prioridad = "BAJA"
+            elif indice_fertilidad >= 0.70:
+                categoria = "MUY ALTA"
+                prioridad = "MEDIA-BAJA"
+            elif indice_fertilidad >= 0.55:
+                categoria = "ALTA"
+                prioridad = "MEDIA"
+            elif indice_fertilidad >= 0.40:
+                categoria = "MEDIA"
+                prioridad = "MEDIA-ALTA"
+            elif indice_fertilidad >= 0.25:
+                categoria = "BAJA"
+                prioridad = "ALTA"
+            else:
+                categoria = "MUY BAJA"
+                prioridad = "URGENTE"
+            
+            # CÁLCULO CORREGIDO DE RECOMENDACIONES NPK - SIEMPRE CALCULAR
+            if nutriente == "NITRÓGENO":
+                # Cálculo realista de recomendación de Nitrógeno
+                deficit_nitrogeno = max(0, n_optimo - nitrogeno)
+                
+                # Si no hay déficit, aplicar dosis de mantenimiento (30% del óptimo)
+                if deficit_nitrogeno <= 0:
+                    deficit_nitrogeno = n_optimo * 0.3
+                
+                # Factores de ajuste más precisos:
+                factor_eficiencia = 1.4  # 40% de pérdidas por lixiviación/volatilización
+                factor_crecimiento = 1.2  # 20% adicional para crecimiento óptimo
+                factor_materia_organica = max(0.7, 1.0 - (materia_organica / 15.0))  # MO aporta N
+                factor_ndvi = 1.0 + (0.5 - ndvi) * 0.4  # NDVI bajo = más necesidad
+                
+                recomendacion = (deficit_nitrogeno * factor_eficiencia * factor_crecimiento * 
+                               factor_materia_organica * factor_ndvi)
+                
+                # Límites realistas para nitrógeno
+                recomendacion = min(recomendacion, 250)  # Máximo 250 kg/ha
+                recomendacion = max(20, recomendacion)   # Mínimo 20 kg/ha
+                
+                deficit = max(0, n_optimo - nitrogeno)
+                
+            elif nutriente == "FÓSFORO":
+                # Cálculo realista de recomendación de Fósforo
+                deficit_fosforo = max(0, p_optimo - fosforo)
+                
+                # Si no hay déficit, aplicar dosis de mantenimiento (20% del óptimo)
+                if deficit_fosforo <= 0:
+                    deficit_fosforo = p_optimo * 0.2
+                
+                # Factores de ajuste para fósforo
+                factor_eficiencia = 1.6  # Alta fijación en el suelo
+                factor_ph = 1.0
+                if ph < 5.5 or ph > 7.5:  # Fuera del rango óptimo de disponibilidad
+                    factor_ph = 1.3  # 30% más si el pH no es óptimo
+                factor_materia_organica = 1.1  # MO ayuda a la disponibilidad de P
+                
+                recomendacion = (deficit_fosforo * factor_eficiencia * 
+                               factor_ph * factor_materia_organica)
+                
+                # Límites realistas para fósforo
+                recomendacion = min(recomendacion, 120)  # Máximo 120 kg/ha P2O5
+                recomendacion = max(10, recomendacion)   # Mínimo 10 kg/ha
+                
+                deficit = max(0, p_optimo - fosforo)
+                
+            else:  # POTASIO
+                # Cálculo realista de recomendación de Potasio
+                deficit_potasio = max(0, k_optimo - potasio)
+                
+                # Si no hay déficit, aplicar dosis de mantenimiento (15% del óptimo)
+                if deficit_potasio <= 0:
+                    deficit_potasio = k_optimo * 0.15
+                
+                # Factores de ajuste para potasio
+                factor_eficiencia = 1.3  # Moderada lixiviación
+                factor_textura = 1.0
+                if materia_organica < 2.0:  # Suelos arenosos
+                    factor_textura = 1.2  # 20% más en suelos ligeros
+                factor_rendimiento = 1.0 + (0.5 - ndvi) * 0.3  # NDVI bajo = más necesidad
+                
+                recomendacion = (deficit_potasio * factor_eficiencia * 
+                               factor_textura * factor_rendimiento)
+                
+                # Límites realistas para potasio
+                recomendacion = min(recomendacion, 200)  # Máximo 200 kg/ha K2O
+                recomendacion = max(15, recomendacion)   # Mínimo 15 kg/ha
+                
+                deficit = max(0, k_optimo - potasio)
+            
+            # Ajuste final basado en la categoría de fertilidad
+            if categoria in ["MUY BAJA", "BAJA"]:
+                recomendacion *= 1.3  # 30% más en suelos de baja fertilidad
+            elif categoria in ["ALTA", "MUY ALTA", "EXCELENTE"]:
+                recomendacion *= 0.8  # 20% menos en suelos fértiles
+            
+            # Asignar valores al GeoDataFrame
+            zonas_gdf.loc[idx, 'area_ha'] = area_ha
+            zonas_gdf.loc[idx, 'nitrogeno'] = nitrogeno
+            zonas_gdf.loc[idx, 'fosforo'] = fosforo
+            zonas_gdf.loc[idx, 'potasio'] = potasio
+            zonas_gdf.loc[idx, 'materia_organica'] = materia_organica
+            zonas_gdf.loc[idx, 'humedad'] = humedad
+            zonas_gdf.loc[idx, 'ph'] = ph
+            zonas_gdf.loc[idx, 'conductividad'] = conductividad
+            zonas_gdf.loc[idx, 'ndvi'] = ndvi
+            zonas_gdf.loc[idx, 'ndwi_suelo'] = ndwi_suelo  # NUEVO
+            zonas_gdf.loc[idx, 'estado_humedad_suelo'] = estado_humedad  # NUEVO
+            zonas_gdf.loc[idx, 'indice_fertilidad'] = indice_fertilidad
+            zonas_gdf.loc[idx, 'categoria'] = categoria
+            zonas_gdf.loc[idx, 'recomendacion_npk'] = recomendacion
+            zonas_gdf.loc[idx, 'deficit_npk'] = deficit
+            zonas_gdf.loc[idx, 'prioridad'] = prioridad
+            
+        except Exception as e:
+            # Valores por defecto mejorados en caso de error (AGREGAR NDWI_SUELO)
+            zonas_gdf.loc[idx, 'area_ha'] = calcular_superficie(zonas_gdf.iloc[[idx]])
+            zonas_gdf.loc[idx, 'nitrogeno'] = params['NITROGENO']['optimo'] * 0.7
+            zonas_gdf.loc[idx, 'fosforo'] = params['FOSFORO']['optimo'] * 0.6
+            zonas_gdf.loc[idx, 'potasio'] = params['POTASIO']['optimo'] * 0.65
+            zonas_gdf.loc[idx, 'materia_organica'] = params['MATERIA_ORGANICA_OPTIMA'] * 0.7
+            zonas_gdf.loc[idx, 'humedad'] = params['HUMEDAD_OPTIMA']
+            zonas_gdf.loc[idx, 'ph'] = params['pH_OPTIMO']
+            zonas_gdf.loc[idx, 'conductividad'] = params['CONDUCTIVIDAD_OPTIMA']
+            zonas_gdf.loc[idx, 'ndvi'] = 0.5
+            zonas_gdf.loc[idx, 'ndwi_suelo'] = params_ndwi['ndwi_optimo_suelo']  # NUEVO
+            zonas_gdf.loc[idx, 'estado_humedad_suelo'] = "ÓPTIMO"  # NUEVO
+            zonas_gdf.loc[idx, 'indice_fertilidad'] = 0.4
+            zonas_gdf.loc[idx, 'categoria'] = "MEDIA"
+            zonas_gdf.loc[idx, 'recomendacion_npk'] = 50  # Valor por defecto
+            zonas_gdf.loc[idx, 'deficit_npk'] = 20  # Valor por defecto
+            zonas_gdf.loc[idx, 'prioridad'] = "MEDIA"
+    
+    return zonas_gdf
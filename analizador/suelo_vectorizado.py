@@ -0,0 +1,376 @@
+"""Versiones vectorizadas de los analizadores de suelo.
+
+Producen los mismos valores que analizar_textura_suelo, analizar_ndwi_suelo y
+calcular_indices_gee de suelo.py: cada zona sigue usando su propio RandomState con
+la misma semilla y el mismo orden de sorteos, pero la superficie se calcula con una
+sola reproyección y toda la aritmética y la clasificación se hacen por columnas.
+La equivalencia se verifica con benchmarks/equivalencia_suelo.py.
+"""
+import numpy as np
+import shapely
+
+from .geometria import calcular_superficie_por_fila
+from .instrumentacion import medir_etapa
+from .parametros import (
+    PARAMETROS_CULTIVOS, TEXTURA_SUELO_OPTIMA, PARAMETROS_NDWI_SUELO,
+    FACTORES_MES, FACTORES_N_MES, FACTORES_P_MES, FACTORES_K_MES, FACTORES_NDWI_MES
+)
+from .suelo import PROPIEDADES_BASE_TEXTURA, evaluar_adecuacion_textura
+
+COLUMNAS_TEXTURA = {
+    'area_ha': 0.0, 'arena': 0.0, 'limo': 0.0, 'arcilla': 0.0, 'textura_suelo': "NO_DETERMINADA",
+    'adecuacion_textura': 0.0, 'categoria_adecuacion': "NO_DETERMINADA", 'capacidad_campo': 0.0,
+    'punto_marchitez': 0.0, 'agua_disponible': 0.0, 'densidad_aparente': 0.0, 'porosidad': 0.0,
+    'conductividad_hidraulica': 0.0, 'aireacion': 0.0, 'drenaje': 0.0
+}
+
+COLUMNAS_NDWI = {
+    'ndwi_suelo': 0.0, 'estado_humedad_suelo': "MEDIO", 'deficit_humedad': 0.0,
+    'recomendacion_riego': "NINGUNA", 'riesgo_sequia': "BAJO"
+}
+
+COLUMNAS_INDICES = {
+    'area_ha': 0.0, 'nitrogeno': 0.0, 'fosforo': 0.0, 'potasio': 0.0, 'materia_organica': 0.0,
+    'humedad': 0.0, 'ph': 0.0, 'conductividad': 0.0, 'ndvi': 0.0, 'ndwi_suelo': 0.0,
+    'estado_humedad_suelo': "MEDIO", 'indice_fertilidad': 0.0, 'categoria': "MEDIA",
+    'recomendacion_npk': 0.0, 'deficit_npk': 0.0, 'prioridad': "MEDIA"
+}
+
+
+def _inicializar_columnas(zonas_gdf, columnas):
+    """Crea las columnas de salida en el mismo orden que el análisis fila por fila"""
+    for columna, valor in columnas.items():
+        zonas_gdf[columna] = valor
+
+
+def _centroides(zonas_gdf):
+    """Coordenadas de los centroides y máscara de las zonas con geometría utilizable"""
+    geometrias = zonas_gdf.geometry.to_numpy()
+    validas = ~(shapely.is_missing(geometrias) | shapely.is_empty(geometrias))
+    centroides = shapely.centroid(geometrias[validas])
+    cx = np.full(len(geometrias), np.nan)
+    cy = np.full(len(geometrias), np.nan)
+    cx[validas] = shapely.get_x(centroides)
+    cy[validas] = shapely.get_y(centroides)
+    return cx, cy, validas
+
+
+def _normalizar_coordenadas(cx, cy):
+    """Igual que en los analizadores originales: 0.5 cuando la coordenada es exactamente 0"""
+    lat_norm = np.where(cy != 0, (cy + 90) / 180, 0.5)
+    lon_norm = np.where(cx != 0, (cx + 180) / 360, 0.5)
+    return lat_norm, lon_norm
+
+
+def _sorteos(cx, cy, validas, sufijo, plan):
+    """Números aleatorios de cada zona con la misma semilla y orden que el análisis fila por fila.
+
+    plan es una lista de ('normal' | 'uniforme', cantidad) en el orden en que se sortean.
+    Devuelve una matriz (zonas x sorteos) de normales estándar y uniformes [0, 1).
+    """
+    total = sum(cantidad for _, cantidad in plan)
+    sorteos = np.zeros((len(cx), total))
+    rng = np.random.RandomState()
+    for i in np.flatnonzero(validas):
+        rng.seed(abs(hash(f"{cx[i]:.6f}_{cy[i]:.6f}{sufijo}")) % (2**32))
+        columna = 0
+        for tipo, cantidad in plan:
+            if tipo == 'normal':
+                sorteos[i, columna:columna + cantidad] = rng.standard_normal(cantidad)
+            else:
+                sorteos[i, columna:columna + cantidad] = rng.random_sample(cantidad)
+            columna += cantidad
+    return sorteos
+
+
+def _clasificar_textura(arena, limo, arcilla):
+    """clasificar_textura_suelo aplicada a columnas"""
+    total = arena + limo + arcilla
+    with np.errstate(invalid='ignore', divide='ignore'):
+        arena_norm = (arena / total) * 100
+        arcilla_norm = (arcilla / total) * 100
+    condiciones = [
+        total == 0,
+        arcilla_norm >= 35,
+        (arcilla_norm >= 25) & (arcilla_norm <= 35) & (arena_norm >= 20) & (arena_norm <= 45),
+        (arena_norm >= 50) & (arena_norm <= 70) & (arcilla_norm >= 5) & (arcilla_norm <= 20),
+        (arcilla_norm >= 7) & (arcilla_norm <= 27) & (arena_norm >= 43) & (arena_norm <= 52),
+        arena_norm >= 85,
+    ]
+    opciones = ["NO_DETERMINADA", "Arcilloso", "Franco Arcilloso", "Franco Arenoso", "Franco", "Arenoso"]
+    return np.select(condiciones, opciones, default="Franco").astype(object)
+
+
+def _propiedades_fisicas(textura, materia_organica):
+    """calcular_propiedades_fisicas_suelo aplicada a columnas"""
+    factor_mo = 1.0 + (materia_organica * 0.05)
+    base = {clave: np.zeros(len(textura)) for clave in ('cc', 'pm', 'da', 'porosidad', 'kh', 'aireacion', 'drenaje')}
+    conocida = np.zeros(len(textura), dtype=bool)
+    for nombre, valores in PROPIEDADES_BASE_TEXTURA.items():
+        filas = textura == nombre
+        conocida |= filas
+        for clave, valor in valores.items():
+            base[clave][filas] = valor
+
+    # Las texturas sin valores base quedan en 0.0, como en la versión fila por fila
+    propiedades = {
+        'capacidad_campo': base['cc'] * factor_mo,
+        'punto_marchitez': base['pm'] * factor_mo,
+        'agua_disponible': (base['cc'] - base['pm']) * factor_mo,
+        'densidad_aparente': base['da'] / factor_mo,
+        'porosidad': np.minimum(0.65, base['porosidad'] * factor_mo),
+        'conductividad_hidraulica': base['kh'] * factor_mo,
+        'aireacion': np.minimum(1.0, base['aireacion'] * factor_mo),
+        'drenaje': np.minimum(2.0, base['drenaje'] * factor_mo),
+    }
+    return {clave: np.where(conocida, valores, 0.0) for clave, valores in propiedades.items()}
+
+
+# FUNCIÓN VECTORIZADA: ANÁLISIS DE TEXTURA DEL SUELO
+@medir_etapa('analisis_textura')
+def analizar_textura_suelo_vectorizado(gdf, cultivo, mes_analisis):
+    """Mismo resultado que analizar_textura_suelo, calculado por columnas"""
+    params_textura = TEXTURA_SUELO_OPTIMA[cultivo]
+    zonas_gdf = gdf.copy()
+    _inicializar_columnas(zonas_gdf, COLUMNAS_TEXTURA)
+    if zonas_gdf.empty:
+        return zonas_gdf
+
+    cx, cy, validas = _centroides(zonas_gdf)
+    lat_norm, lon_norm = _normalizar_coordenadas(cx, cy)
+    variabilidad_local = 0.15 + 0.7 * (lat_norm * lon_norm)
+
+    sorteos = _sorteos(cx, cy, validas, f"_{cultivo}_textura", [('normal', 4)])
+
+    arena_optima = params_textura['arena_optima']
+    limo_optima = params_textura['limo_optima']
+    arcilla_optima = params_textura['arcilla_optima']
+
+    arena = np.clip(arena_optima * (0.8 + 0.4 * variabilidad_local) + (arena_optima * 0.15) * sorteos[:, 0], 5, 95)
+    limo = np.clip(limo_optima * (0.7 + 0.6 * variabilidad_local) + (limo_optima * 0.2) * sorteos[:, 1], 5, 95)
+    arcilla = np.clip(arcilla_optima * (0.75 + 0.5 * variabilidad_local) + (arcilla_optima * 0.15) * sorteos[:, 2], 5, 95)
+
+    total = arena + limo + arcilla
+    arena = (arena / total) * 100
+    limo = (limo / total) * 100
+    arcilla = (arcilla / total) * 100
+
+    textura = _clasificar_textura(arena, limo, arcilla)
+    materia_organica = np.clip(3.0 + 1.0 * sorteos[:, 3], 1.0, 8.0)
+
+    # Zonas sin geometría: valores por defecto de la textura óptima, como el except del original
+    textura[~validas] = params_textura['textura_optima']
+    arena[~validas] = arena_optima
+    limo[~validas] = limo_optima
+    arcilla[~validas] = arcilla_optima
+    materia_organica[~validas] = 3.0
+
+    # La adecuación depende solo de la textura: se evalúa una vez por clase
+    adecuacion = {t: evaluar_adecuacion_textura(t, cultivo) for t in set(textura)}
+    categoria_adecuacion = np.array([adecuacion[t][0] for t in textura], dtype=object)
+    puntaje_adecuacion = np.array([adecuacion[t][1] for t in textura], dtype=float)
+    categoria_adecuacion[~validas] = "ÓPTIMA"
+    puntaje_adecuacion[~validas] = 1.0
+
+    propiedades_fisicas = _propiedades_fisicas(textura, materia_organica)
+
+    zonas_gdf['area_ha'] = calcular_superficie_por_fila(zonas_gdf)
+    zonas_gdf['arena'] = arena
+    zonas_gdf['limo'] = limo
+    zonas_gdf['arcilla'] = arcilla
+    zonas_gdf['textura_suelo'] = textura
+    zonas_gdf['adecuacion_textura'] = puntaje_adecuacion
+    zonas_gdf['categoria_adecuacion'] = categoria_adecuacion
+    for prop, valores in propiedades_fisicas.items():
+        zonas_gdf[prop] = valores
+    return zonas_gdf
+
+
+# FUNCIÓN VECTORIZADA: ANÁLISIS DE NDWI DEL SUELO
+@medir_etapa('analisis_ndwi')
+def analizar_ndwi_suelo_vectorizado(gdf, cultivo, mes_analisis):
+    """Mismo resultado que analizar_ndwi_suelo, calculado por columnas"""
+    params_ndwi = PARAMETROS_NDWI_SUELO[cultivo]
+    zonas_gdf = gdf.copy()
+    _inicializar_columnas(zonas_gdf, COLUMNAS_NDWI)
+    if zonas_gdf.empty:
+        return zonas_gdf
+
+    factor_ndwi_mes = FACTORES_NDWI_MES[mes_analisis]
+    cx, cy, validas = _centroides(zonas_gdf)
+    lat_norm, lon_norm = _normalizar_coordenadas(cx, cy)
+    variabilidad_local = 0.3 + 0.5 * (lat_norm * lon_norm)
+
+    sorteos = _sorteos(cx, cy, validas, f"_{cultivo}_ndwi", [('normal', 1), ('uniforme', 1), ('normal', 1)])
+
+    variacion_topografia = (0.1 * sorteos[:, 0]) * (1 - variabilidad_local)
+    variacion_textura = variabilidad_local * 0.15
+    variacion_profundidad = sorteos[:, 1] * 0.1
+
+    ndwi_suelo = params_ndwi['ndwi_optimo_suelo'] + variacion_topografia + variacion_textura + variacion_profundidad
+    ndwi_suelo = ndwi_suelo * factor_ndwi_mes
+    ndwi_suelo = ndwi_suelo + 0.03 * sorteos[:, 2]
+    ndwi_suelo = np.clip(ndwi_suelo, -1.0, 1.0)
+    ndwi_suelo[~validas] = params_ndwi['ndwi_optimo_suelo']
+
+    deficit_humedad = np.maximum(0, params_ndwi['ndwi_optimo_suelo'] - ndwi_suelo)
+
+    condiciones = [
+        ndwi_suelo >= params_ndwi['ndwi_humedo_suelo'],
+        ndwi_suelo >= params_ndwi['ndwi_optimo_suelo'],
+        ndwi_suelo >= params_ndwi['umbral_sequia'],
+        ndwi_suelo >= params_ndwi['ndwi_seco_suelo'],
+    ]
+    estado_humedad = np.select(condiciones, ["MUY HÚMEDO", "ÓPTIMO", "MODERADO", "SECO"], default="MUY SECO").astype(object)
+    recomendacion_riego = np.select(condiciones, ["REDUCIR RIEGO", "MANTENER", "RIEGO MODERADO", "RIEGO URGENTE"],
+                                    default="RIEGO INTENSIVO").astype(object)
+    riesgo_sequia = np.select(condiciones, ["NULO", "BAJO", "MODERADO", "ALTO"], default="CRÍTICO").astype(object)
+
+    zonas_gdf['area_ha'] = calcular_superficie_por_fila(zonas_gdf)
+    zonas_gdf['ndwi_suelo'] = ndwi_suelo
+    zonas_gdf['estado_humedad_suelo'] = estado_humedad
+    zonas_gdf['deficit_humedad'] = np.where(validas, deficit_humedad, 0.0)
+    zonas_gdf['recomendacion_riego'] = np.where(validas, recomendacion_riego, "MANTENER").astype(object)
+    zonas_gdf['riesgo_sequia'] = np.where(validas, riesgo_sequia, "BAJO").astype(object)
+    return zonas_gdf
+
+
+# FUNCIÓN VECTORIZADA: ÍNDICES DE FERTILIDAD, NPK Y NDWI DEL SUELO
+@medir_etapa('indices_fertilidad')
+def calcular_indices_gee_vectorizado(gdf, cultivo, mes_analisis, analisis_tipo, nutriente):
+    """Mismo resultado que calcular_indices_gee, calculado por columnas"""
+    params = PARAMETROS_CULTIVOS[cultivo]
+    params_ndwi = PARAMETROS_NDWI_SUELO[cultivo]
+    zonas_gdf = gdf.copy()
+
+    factor_mes = FACTORES_MES[mes_analisis]
+    factor_n_mes = FACTORES_N_MES[mes_analisis]
+    factor_p_mes = FACTORES_P_MES[mes_analisis]
+    factor_k_mes = FACTORES_K_MES[mes_analisis]
+    factor_ndwi_mes = FACTORES_NDWI_MES[mes_analisis]
+
+    _inicializar_columnas(zonas_gdf, COLUMNAS_INDICES)
+    if zonas_gdf.empty:
+        return zonas_gdf
+
+    cx, cy, validas = _centroides(zonas_gdf)
+    lat_norm, lon_norm = _normalizar_coordenadas(cx, cy)
+    variabilidad_local = 0.2 + 0.6 * (lat_norm * lon_norm)
+
+    # Orden del original: 3 normales (N, P, K), 3 uniformes (factores estacionales),
+    # 5 normales (MO, humedad, pH, conductividad, NDVI) y 1 normal (ruido del NDWI)
+    sorteos = _sorteos(cx, cy, validas, f"_{cultivo}", [('normal', 3), ('uniforme', 3), ('normal', 6)])
+
+    n_optimo = params['NITROGENO']['optimo']
+    p_optimo = params['FOSFORO']['optimo']
+    k_optimo = params['POTASIO']['optimo']
+
+    nitrogeno = np.maximum(0, n_optimo * (0.6 + 0.3 * variabilidad_local) + (n_optimo * 0.2) * sorteos[:, 0])
+    fosforo = np.maximum(0, p_optimo * (0.5 + 0.4 * variabilidad_local) + (p_optimo * 0.25) * sorteos[:, 1])
+    potasio = np.maximum(0, k_optimo * (0.55 + 0.35 * variabilidad_local) + (k_optimo * 0.22) * sorteos[:, 2])
+
+    nitrogeno = nitrogeno * (factor_n_mes * (0.8 + 0.3 * sorteos[:, 3]))
+    fosforo = fosforo * (factor_p_mes * (0.8 + 0.3 * sorteos[:, 4]))
+    potasio = potasio * (factor_k_mes * (0.8 + 0.3 * sorteos[:, 5]))
+
+    materia_organica = np.clip(params['MATERIA_ORGANICA_OPTIMA'] * 0.7 + 1.0 * sorteos[:, 6], 1.0, 8.0)
+    humedad = np.clip(params['HUMEDAD_OPTIMA'] + 0.1 * sorteos[:, 7], 0.1, 0.8)
+    ph = np.clip(params['pH_OPTIMO'] + 0.5 * sorteos[:, 8], 4.0, 8.0)
+    conductividad = np.clip(params['CONDUCTIVIDAD_OPTIMA'] + 0.3 * sorteos[:, 9], 0.1, 3.0)
+    base_ndvi = 0.3 + 0.5 * variabilidad_local
+    ndvi = np.clip(base_ndvi + 0.1 * sorteos[:, 10], 0.1, 0.95)
+
+    # NDWI del suelo a partir de humedad, MO y variabilidad espacial
+    ajuste_humedad = (humedad - 0.3) * 0.5
+    ajuste_mo = materia_organica * 0.02
+    ajuste_textura = variabilidad_local * 0.1
+    ndwi_suelo = params_ndwi['ndwi_optimo_suelo'] + ajuste_humedad + ajuste_mo + ajuste_textura
+    ndwi_suelo = ndwi_suelo * factor_ndwi_mes
+    ndwi_suelo = ndwi_suelo + 0.05 * sorteos[:, 11]
+    ndwi_suelo = np.clip(ndwi_suelo, -1.0, 1.0)
+
+    estado_humedad = np.select([
+        ndwi_suelo >= params_ndwi['ndwi_humedo_suelo'],
+        ndwi_suelo >= params_ndwi['ndwi_optimo_suelo'],
+        ndwi_suelo >= params_ndwi['umbral_sequia'],
+        ndwi_suelo >= params_ndwi['ndwi_seco_suelo'],
+    ], ["MUY HÚMEDO", "ÓPTIMO", "MODERADO", "SECO"], default="MUY SECO").astype(object)
+
+    # Índice de fertilidad compuesto
+    n_norm = np.clip(nitrogeno / (n_optimo * 1.5), 0, 1)
+    p_norm = np.clip(fosforo / (p_optimo * 1.5), 0, 1)
+    k_norm = np.clip(potasio / (k_optimo * 1.5), 0, 1)
+    mo_norm = np.clip(materia_organica / 8.0, 0, 1)
+    ph_norm = np.clip(1 - np.abs(ph - params['pH_OPTIMO']) / 2.0, 0, 1)
+    ndwi_suelo_norm = (ndwi_suelo + 1) / 2
+
+    indice_fertilidad = (
+        n_norm * 0.22 +
+        p_norm * 0.18 +
+        k_norm * 0.18 +
+        mo_norm * 0.15 +
+        ph_norm * 0.10 +
+        ndvi * 0.08 +
+        ndwi_suelo_norm * 0.09
+    ) * factor_mes
+    indice_fertilidad = np.clip(indice_fertilidad, 0, 1)
+
+    umbrales = [indice_fertilidad >= 0.85, indice_fertilidad >= 0.70, indice_fertilidad >= 0.55,
+                indice_fertilidad >= 0.40, indice_fertilidad >= 0.25]
+    categoria = np.select(umbrales, ["EXCELENTE", "MUY ALTA", "ALTA", "MEDIA", "BAJA"], default="MUY BAJA").astype(object)
+    prioridad = np.select(umbrales, ["BAJA", "MEDIA-BAJA", "MEDIA", "MEDIA-ALTA", "ALTA"], default="URGENTE").astype(object)
+
+    # Recomendaciones NPK (misma lógica y límites que calcular_indices_gee)
+    if nutriente == "NITRÓGENO":
+        deficit_dosis = np.maximum(0, n_optimo - nitrogeno)
+        deficit_dosis = np.where(deficit_dosis <= 0, n_optimo * 0.3, deficit_dosis)
+        factor_materia_organica = np.maximum(0.7, 1.0 - (materia_organica / 15.0))
+        factor_ndvi = 1.0 + (0.5 - ndvi) * 0.4
+        recomendacion = deficit_dosis * 1.4 * 1.2 * factor_materia_organica * factor_ndvi
+        recomendacion = np.maximum(20, np.minimum(recomendacion, 250))
+        deficit = np.maximum(0, n_optimo - nitrogeno)
+    elif nutriente == "FÓSFORO":
+        deficit_dosis = np.maximum(0, p_optimo - fosforo)
+        deficit_dosis = np.where(deficit_dosis <= 0, p_optimo * 0.2, deficit_dosis)
+        factor_ph = np.where((ph < 5.5) | (ph > 7.5), 1.3, 1.0)
+        recomendacion = deficit_dosis * 1.6 * factor_ph * 1.1
+        recomendacion = np.maximum(10, np.minimum(recomendacion, 120))
+        deficit = np.maximum(0, p_optimo - fosforo)
+    else:  # POTASIO
+        deficit_dosis = np.maximum(0, k_optimo - potasio)
+        deficit_dosis = np.where(deficit_dosis <= 0, k_optimo * 0.15, deficit_dosis)
+        factor_textura = np.where(materia_organica < 2.0, 1.2, 1.0)
+        factor_rendimiento = 1.0 + (0.5 - ndvi) * 0.3
+        recomendacion = deficit_dosis * 1.3 * factor_textura * factor_rendimiento
+        recomendacion = np.maximum(15, np.minimum(recomendacion, 200))
+        deficit = np.maximum(0, k_optimo - potasio)
+
+    recomendacion = np.where(np.isin(categoria, ["MUY BAJA", "BAJA"]), recomendacion * 1.3,
+                             np.where(np.isin(categoria, ["ALTA", "MUY ALTA", "EXCELENTE"]), recomendacion * 0.8,
+                                      recomendacion))
+
+    # Zonas sin geometría: mismos valores por defecto que el except del original
+    defectos = {
+        'nitrogeno': (nitrogeno, n_optimo * 0.7),
+        'fosforo': (fosforo, p_optimo * 0.6),
+        'potasio': (potasio, k_optimo * 0.65),
+        'materia_organica': (materia_organica, params['MATERIA_ORGANICA_OPTIMA'] * 0.7),
+        'humedad': (humedad, params['HUMEDAD_OPTIMA']),
+        'ph': (ph, params['pH_OPTIMO']),
+        'conductividad': (conductividad, params['CONDUCTIVIDAD_OPTIMA']),
+        'ndvi': (ndvi, 0.5),
+        'ndwi_suelo': (ndwi_suelo, params_ndwi['ndwi_optimo_suelo']),
+        'estado_humedad_suelo': (estado_humedad, "ÓPTIMO"),
+        'indice_fertilidad': (indice_fertilidad, 0.4),
+        'categoria': (categoria, "MEDIA"),
+        'recomendacion_npk': (recomendacion, 50.0),
+        'deficit_npk': (deficit, 20.0),
+        'prioridad': (prioridad, "MEDIA"),
+    }
+
+    zonas_gdf['area_ha'] = calcular_superficie_por_fila(zonas_gdf)
+    for columna, (valores, defecto) in defectos.items():
+        valores = valores.copy()
+        valores[~validas] = defecto
+        zonas_gdf[columna] = valores
+    return zonas_gdf
@@ -0,0 +1,163 @@
+"""Procesamiento de grillas grandes del DEM por teselas con halo.
+
+La grilla se parte en teselas de `lado_tesela` nodos por lado. Cada tesela se procesa
+con un halo (filas y columnas vecinas) del tamaño de la huella del operador: 1 nodo
+para diferencias finitas, ceil(truncate * sigma) para un filtro gaussiano. Solo se
+escribe el interior de cada tesela, así que el resultado cosido es idéntico al de
+aplicar el operador sobre la grilla entera (en el borde de la grilla no hay halo,
+igual que en la versión completa).
+
+Por defecto se recorre en serie: los temporales de cada operador ocupan una tesela en
+lugar de la grilla completa. Con más de un proceso (pedido por el llamador o en
+PARAMETROS_TESELADO) el pool arranca con 'spawn' y las entradas y salidas viajan en
+memoria compartida (multiprocessing.shared_memory): los procesos del pool leen sus
+ventanas y escriben su interior sin copiar la grilla.
+"""
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from .parametros import PARAMETROS_TESELADO
+
+logger = logging.getLogger(__name__)
+
+# Arreglos compartidos adjuntados en cada proceso del pool: nombre -> (SharedMemory, ndarray)
+_compartidos = {}
+
+
+def teselas(forma, lado, halo=0):
+    """(interior, ampliada) de cada tesela como tuplas de slices; `ampliada` suma el halo recortado a la grilla"""
+    filas, columnas = forma
+    for f0 in range(0, filas, lado):
+        for c0 in range(0, columnas, lado):
+            f1, c1 = min(f0 + lado, filas), min(c0 + lado, columnas)
+            interior = (slice(f0, f1), slice(c0, c1))
+            ampliada = (slice(max(f0 - halo, 0), min(f1 + halo, filas)),
+                        slice(max(c0 - halo, 0), min(c1 + halo, columnas)))
+            yield interior, ampliada
+
+
+def usar_teselas(forma, lado=None):
+    """Conviene teselar si la grilla supera min_celdas y ocupa más de una tesela"""
+    lado = lado or PARAMETROS_TESELADO['lado_tesela']
+    return forma[0] * forma[1] >= PARAMETROS_TESELADO['min_celdas'] and max(forma) > lado
+
+
+def _procesos(procesos, n_teselas):
+    # En serie salvo que el llamador (o PARAMETROS_TESELADO) pida un pool
+    procesos = procesos or PARAMETROS_TESELADO['procesos'] or 1
+    return max(1, min(procesos, n_teselas))
+
+
+def _adjuntar(descripciones):
+    # Inicializador del pool: adjunta los bloques compartidos una vez por proceso. Los
+    # hijos comparten el resource_tracker del principal, que es quien libera los bloques
+    for nombre, forma, dtype in descripciones:
+        shm = shared_memory.SharedMemory(name=nombre)
+        _compartidos[nombre] = (shm, np.ndarray(forma, dtype=dtype, buffer=shm.buf))
+
+
+def _recorte(interior, ampliada):
+    return tuple(slice(i.start - a.start, i.stop - a.start) for i, a in zip(interior, ampliada))
+
+
+def _como_tupla(resultado):
+    return resultado if isinstance(resultado, tuple) else (resultado,)
+
+
+def _tesela_compartida(funcion, nombres_entrada, nombres_salida, interior, ampliada):
+    entradas = [_compartidos[nombre][1][ampliada] for nombre in nombres_entrada]
+    if not nombres_salida:
+        # mapear_teselas: el resultado vuelve al proceso principal
+        return funcion(ampliada, *entradas)
+    resultados = _como_tupla(funcion(*entradas))
+    recorte = _recorte(interior, ampliada)
+    for nombre, resultado in zip(nombres_salida, resultados):
+        _compartidos[nombre][1][interior] = resultado[recorte]
+    return None
+
+
+def _con_pool(funcion, entradas, salidas, bloques, procesos):
+    """Ejecuta las teselas en un pool con entradas y salidas en memoria compartida;
+    sin salidas devuelve los resultados de cada tesela"""
+    segmentos = []
+    try:
+        descripciones = []
+        for arreglo in list(entradas) + list(salidas):
+            shm = shared_memory.SharedMemory(create=True, size=max(arreglo.nbytes, 1))
+            segmentos.append((shm, arreglo))
+            descripciones.append((shm.name, arreglo.shape, arreglo.dtype.str))
+        for (shm, arreglo), (_, forma, dtype) in zip(segmentos[:len(entradas)], descripciones):
+            np.ndarray(forma, dtype=dtype, buffer=shm.buf)[...] = arreglo
+        nombres_entrada = [d[0] for d in descripciones[:len(entradas)]]
+        nombres_salida = [d[0] for d in descripciones[len(entradas):]]
+
+        # 'spawn': un fork desde un proceso con hilos (Streamlit, hilos de E/S) puede heredar locks tomados
+        with ProcessPoolExecutor(max_workers=procesos, mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=_adjuntar, initargs=(descripciones,)) as pool:
+            futuros = [pool.submit(_tesela_compartida, funcion, nombres_entrada, nombres_salida, interior, ampliada)
+                       for interior, ampliada in bloques]
+            resultados = [futuro.result() for futuro in futuros]
+
+        for (shm, arreglo), (_, forma, dtype) in zip(segmentos[len(entradas):], descripciones[len(entradas):]):
+            arreglo[...] = np.ndarray(forma, dtype=dtype, buffer=shm.buf)
+        return resultados
+    finally:
+        for shm, _ in segmentos:
+            shm.close()
+            shm.unlink()
+
+
+# FUNCIÓN: OPERADOR LOCAL POR TESELAS
+def aplicar_por_teselas(funcion, entradas, dtypes_salida, halo, lado=None, procesos=None):
+    """Aplica `funcion(*ventanas) -> arreglo o tupla de arreglos` tesela por tesela y cose el resultado.
+
+    `entradas` son arreglos 2D de la misma forma; `dtypes_salida` da el tipo de cada
+    salida (misma forma que las entradas). `halo` debe cubrir la huella del operador.
+    `funcion` debe poder enviarse a otro proceso (función de módulo o functools.partial).
+    """
+    entradas = [np.asarray(e) for e in entradas]
+    forma = entradas[0].shape
+    lado = lado or PARAMETROS_TESELADO['lado_tesela']
+    if not usar_teselas(forma, lado):
+        resultados = _como_tupla(funcion(*entradas))
+        resultados = tuple(np.asarray(r, dtype=d) for r, d in zip(resultados, dtypes_salida))
+        return resultados if len(resultados) > 1 else resultados[0]
+
+    bloques = list(teselas(forma, lado, halo))
+    salidas = [np.empty(forma, dtype=d) for d in dtypes_salida]
+    procesos = _procesos(procesos, len(bloques))
+    if procesos > 1:
+        _con_pool(funcion, entradas, salidas, bloques, procesos)
+    else:
+        for interior, ampliada in bloques:
+            resultados = _como_tupla(funcion(*[e[ampliada] for e in entradas]))
+            recorte = _recorte(interior, ampliada)
+            for salida, resultado in zip(salidas, resultados):
+                salida[interior] = resultado[recorte]
+    logger.debug(f"{getattr(funcion, '__name__', funcion)}: {len(bloques)} teselas, {procesos} procesos")
+    return tuple(salidas) if len(salidas) > 1 else salidas[0]
+
+
+# FUNCIÓN: RESULTADOS ARBITRARIOS POR TESELA
+def mapear_teselas(funcion, entradas, solape=1, lado=None, procesos=None):
+    """Aplica `funcion(ventana, *ventanas)` a cada tesela ampliada en `solape` nodos hacia
+    adelante y devuelve la lista de resultados (p. ej. líneas de contorno que luego se
+    cosen). `ventana` es la tupla de slices de la tesela en la grilla completa.
+
+    Con solape=1 las teselas vecinas comparten su fila/columna de borde, de modo que
+    las líneas que cruzan de una a otra terminan en los mismos puntos.
+    """
+    entradas = [np.asarray(e) for e in entradas]
+    filas, columnas = entradas[0].shape
+    lado = lado or PARAMETROS_TESELADO['lado_tesela']
+    bloques = [(interior, (slice(interior[0].start, min(interior[0].stop + solape, filas)),
+                           slice(interior[1].start, min(interior[1].stop + solape, columnas))))
+               for interior, _ in teselas((filas, columnas), lado)]
+    procesos = _procesos(procesos, len(bloques))
+    if procesos > 1:
+        return _con_pool(funcion, entradas, [], bloques, procesos)
+    return [funcion(ampliada, *[e[ampliada] for e in entradas]) for _, ampliada in bloques]
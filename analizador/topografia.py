@@ -0,0 +1,424 @@
+"""DEM sintético, curvas de nivel y estadísticas de pendiente"""
+import logging
+import threading
+from collections import OrderedDict
+from functools import partial
+
+import geopandas as gpd
+import numpy as np
+import shapely
+
+from .dem import GrillaDEM, ModeloDEM
+from .derivadas import pendiente_grados
+from .fuentes_dem import leer_dem_archivo
+from .geometria import obtener_crs_metrico
+from .huella import huella_geometria
+from .instrumentacion import medir_etapa
+from .parametros import CLASIFICACION_PENDIENTES, ORIENTACIONES_LADERA, PARAMETROS_CURVAS_NIVEL
+from .teselado import aplicar_por_teselas, mapear_teselas, usar_teselas
+
+logger = logging.getLogger(__name__)
+
+# DEMs sintéticos ya generados en este proceso, por (huella, resolución); orden LRU
+_memo_dem = OrderedDict()
+_bloqueo_memo_dem = threading.Lock()
+
+# Se incluye en las claves de caché del DEM: subirla cuando cambie el formato de las grillas
+VERSION_DEM = 8
+
+
+# FUNCIÓN: CLASIFICAR PENDIENTES
+def clasificar_pendiente(pendiente_porcentaje):
+    """Clasifica la pendiente según categorías establecidas"""
+    for categoria, params in CLASIFICACION_PENDIENTES.items():
+        if params['min'] <= pendiente_porcentaje < params['max']:
+            return categoria, params['color']
+    return "EXTREMA (>25%)", CLASIFICACION_PENDIENTES['EXTREMA (>25%)']['color']
+
+
+# FUNCIÓN PARA CALCULAR ESTADÍSTICAS DE PENDIENTE
+def calcular_estadisticas_pendiente(pendiente_grid, area_celda_m2=None):
+    """Calcula estadísticas de pendiente del terreno (área por celda de la grilla, o la resolución por defecto)"""
+    if area_celda_m2 is None:
+        area_celda_m2 = PARAMETROS_CURVAS_NIVEL['resolucion_dem']**2
+    pendiente_flat = pendiente_grid.flatten()
+    pendiente_flat = pendiente_flat[~np.isnan(pendiente_flat)]
+    
+    if len(pendiente_flat) == 0:
+        return {
+            'promedio': 0,
+            'promedio_grados': 0,
+            'min': 0,
+            'max': 0,
+            'std': 0,
+            'distribucion': {}
+        }
+    
+    stats = {
+        'promedio': float(np.mean(pendiente_flat)),
+        'promedio_grados': float(np.mean(pendiente_grados(pendiente_flat))),
+        'min': float(np.min(pendiente_flat)),
+        'max': float(np.max(pendiente_flat)),
+        'std': float(np.std(pendiente_flat)),
+        'distribucion': {}
+    }
+    
+    # Calcular distribución por categoría
+    for categoria, params in CLASIFICACION_PENDIENTES.items():
+        mask = (pendiente_flat >= params['min']) & (pendiente_flat < params['max'])
+        stats['distribucion'][categoria] = {
+            'porcentaje': float(np.sum(mask) / len(pendiente_flat) * 100),
+            'area_ha': float(np.sum(mask) * area_celda_m2 / 10000),
+            'color': params['color']
+        }
+    
+    return stats
+
+
+# FUNCIÓN: ESTADÍSTICAS DE ORIENTACIÓN DE LADERAS
+def calcular_estadisticas_orientacion(aspecto_grid, pendiente_grid, area_celda_m2):
+    """Área por sector de orientación (ORIENTACIONES_LADERA); las celdas con pendiente menor a
+    pendiente_min_orientacion cuentan como planas"""
+    validos = ~np.isnan(pendiente_grid)
+    total = int(np.sum(validos))
+    inclinadas = validos & (pendiente_grid >= PARAMETROS_CURVAS_NIVEL['pendiente_min_orientacion']) & ~np.isnan(aspecto_grid)
+    # Sector de 45° centrado en cada azimut (N = 337,5°-22,5°)
+    sectores = (np.floor((aspecto_grid[inclinadas] + 22.5) / 45).astype(int)) % 8
+    conteos = np.bincount(sectores, minlength=8)
+
+    stats = {'distribucion': {}, 'plana_ha': float((total - conteos.sum()) * area_celda_m2 / 10000),
+             'predominante': None}
+    for conteo, (codigo, params) in zip(conteos, ORIENTACIONES_LADERA.items()):
+        stats['distribucion'][codigo] = {
+            'porcentaje': float(conteo / total * 100) if total else 0.0,
+            'area_ha': float(conteo * area_celda_m2 / 10000),
+            'color': params['color']
+        }
+    if conteos.sum():
+        stats['predominante'] = list(ORIENTACIONES_LADERA)[int(np.argmax(conteos))]
+    return stats
+
+
+# FUNCIÓN: ESTADÍSTICAS DE CURVATURA (FORMA DE LADERA)
+def calcular_estadisticas_curvatura(curvatura_perfil, curvatura_plano, pendiente_grid, area_celda_m2):
+    """Áreas convexas/cóncavas en perfil y área de escurrimiento concentrado (plano convergente en
+    laderas de más de 2%), según umbral_curvatura"""
+    umbral = PARAMETROS_CURVAS_NIVEL['umbral_curvatura']
+    validos = ~np.isnan(pendiente_grid)
+    total = int(np.sum(validos))
+    ha = area_celda_m2 / 10000
+
+    def porcentaje(mascara):
+        return float(np.sum(mascara) / total * 100) if total else 0.0
+
+    convexa = validos & (curvatura_perfil > umbral)
+    concava = validos & (curvatura_perfil < -umbral)
+    convergente = validos & (curvatura_plano < -umbral) & (pendiente_grid >= 2)
+    return {
+        'convexa_ha': float(np.sum(convexa) * ha), 'convexa_pct': porcentaje(convexa),
+        'concava_ha': float(np.sum(concava) * ha), 'concava_pct': porcentaje(concava),
+        'convergente_ha': float(np.sum(convergente) * ha), 'convergente_pct': porcentaje(convergente),
+    }
+
+
+# FUNCIÓN: REMUESTREAR UNA GRILLA REGULAR A OTROS EJES
+def remuestrear_grilla(z, transformada, x_nuevos, y_nuevos, orden=1):
+    """Valores de la grilla en los ejes pedidos (orden 1 bilineal, 3 cúbico) sin triangular.
+
+    Usa map_coordinates sobre índices fraccionarios: solo hace falta cuando los ejes
+    pedidos no coinciden con los nodos nativos.
+    """
+    from scipy.ndimage import map_coordinates
+    x0, dx, _, y0, _, dy = transformada
+    columnas = (np.asarray(x_nuevos, dtype=float) - x0) / dx
+    filas = (np.asarray(y_nuevos, dtype=float) - y0) / dy
+    indices_filas, indices_columnas = np.meshgrid(filas, columnas, indexing='ij')
+    return map_coordinates(z, [indices_filas, indices_columnas], order=orden, mode='nearest')
+
+
+# FUNCIÓN: SEMILLA DEL DEM SINTÉTICO
+def semilla_parcela(huella):
+    """Semilla estable derivada de la huella de la parcela: el mismo lote da siempre el mismo terreno"""
+    return int(huella[:16], 16)
+
+
+# FUNCIÓN PARA GENERAR DEM SINTÉTICO BASADO EN LIDAR
+@medir_etapa('dem')
+def generar_dem_sintetico(gdf, resolucion=10.0, semilla=None):
+    """Genera un DEM sintético basado en datos LiDAR simulados.
+
+    La grilla se arma en el CRS proyectado de la parcela (UTM local), con celdas de
+    `resolucion` metros; devuelve (GrillaDEM, Z) con Z float32 de forma (filas, columnas).
+    Los sorteos salen de un np.random.Generator sembrado con la huella de la parcela
+    (o `semilla`), y el resultado se memoiza por parcela y resolución: Z es de solo lectura.
+    """
+    huella = huella_geometria(gdf)
+    if semilla is None:
+        semilla = semilla_parcela(huella)
+    # La huella va en la clave: una semilla explícita no puede devolver la grilla de otra parcela
+    clave = (huella, float(resolucion), semilla)
+    with _bloqueo_memo_dem:
+        if clave in _memo_dem:
+            _memo_dem.move_to_end(clave)
+            return _memo_dem[clave]
+
+    crs_metrico = obtener_crs_metrico(gdf) or gdf.crs
+    parcela_metrica = gdf.to_crs(crs_metrico) if gdf.crs is not None and crs_metrico is not None else gdf
+    minx, miny, maxx, maxy = parcela_metrica.total_bounds
+    grilla = GrillaDEM.desde_limites(minx, miny, maxx, maxy, resolucion, crs_metrico)
+    x, y = grilla.ejes()
+    rng = np.random.default_rng(semilla)
+    
+    # Generar elevaciones sintéticas con patrones realistas
+    # 1. Elevación base
+    elevacion_base = rng.uniform(100, 300)
+    
+    # 2. Pendiente general (simulando una ladera), en metros por metro
+    slope_x = rng.uniform(-0.001, 0.001)  # Pendiente en dirección X
+    slope_y = rng.uniform(-0.001, 0.001)  # Pendiente en dirección Y
+    
+    # 3. Relieve variado: colinas gaussianas, todas a la vez. La gaussiana es separable,
+    # exp(-(dx²+dy²)/2r²) = exp(-dx²/2r²)·exp(-dy²/2r²), así que la suma de colinas es
+    # un producto de matrices (n_colinas × filas)ᵀ · (n_colinas × columnas)
+    n_hills = rng.integers(2, 5)
+    centros_x = rng.uniform(minx, maxx, n_hills)
+    centros_y = rng.uniform(miny, maxy, n_hills)
+    radios = rng.uniform(111, 555, n_hills)  # metros
+    alturas = rng.uniform(10, 50, n_hills)
+    factor_x = np.exp(-(x[None, :] - centros_x[:, None])**2 / (2 * radios[:, None]**2))
+    factor_y = np.exp(-(y[None, :] - centros_y[:, None])**2 / (2 * radios[:, None]**2))
+    Z = (factor_y.T @ (alturas[:, None] * factor_x)).astype(np.float32)
+    
+    # Plano base + ladera, sumado por ejes
+    Z += (elevacion_base + slope_y * (y - miny))[:, None].astype(np.float32)
+    Z += (slope_x * (x - minx))[None, :].astype(np.float32)
+    
+    # 4. Ruido de alta frecuencia (detalle de LiDAR), ±2 metros
+    Z += rng.standard_normal(Z.shape, dtype=np.float32) * np.float32(2)
+    
+    # Asegurar que no haya valores negativos
+    np.maximum(Z, 50, out=Z)
+    Z.flags.writeable = False
+    
+    with _bloqueo_memo_dem:
+        _memo_dem[clave] = (grilla, Z)
+        while len(_memo_dem) > PARAMETROS_CURVAS_NIVEL['max_dem_memoria']:
+            _memo_dem.popitem(last=False)
+    return grilla, Z
+
+
+# FUNCIÓN: EXTRAER CURVAS DE NIVEL (MARCHING SQUARES)
+@medir_etapa('extraer_curvas')
+def extraer_curvas_nivel(grilla, z, niveles, poligono=None):
+    """Traza las curvas de todos los niveles sobre la grilla con contourpy y las recorta al polígono.
+
+    Devuelve (lineas, elevaciones) como arreglos de shapely.LineString (en el CRS de la
+    grilla) y float. Los nodos con NaN quedan fuera del trazado. Las líneas se arman
+    en una sola llamada y el recorte es una sola intersección vectorizada, aplicada
+    solo a las líneas que no quedan enteras dentro del polígono. Las grillas grandes
+    se trazan por teselas (ver teselado) y las curvas se cosen en las costuras.
+    """
+    x, y = grilla.ejes()
+    niveles = np.asarray(niveles, dtype=float)
+    if usar_teselas(np.shape(z)):
+        # Cada tesela traza solo los niveles de su rango de elevación; las líneas que
+        # cruzan entre teselas terminan en el mismo punto del borde compartido y se cosen
+        teselas_curvas = mapear_teselas(partial(_curvas_tesela, x=x, y=y, niveles=niveles), [z])
+        lineas, elevaciones = _coser_curvas(teselas_curvas)
+    else:
+        lineas, elevaciones = _lineas_contorno(x, y, z, niveles)
+    if len(lineas) == 0:
+        return np.empty(0, dtype=object), np.empty(0, dtype=float)
+
+    if poligono is not None:
+        shapely.prepare(poligono)
+        recortar = ~shapely.contains(poligono, lineas)
+        lineas[recortar] = shapely.intersection(lineas[recortar], poligono)
+        # El recorte puede partir una curva en varias: se separan las partes lineales
+        partes, indices = shapely.get_parts(lineas, return_index=True)
+        tipo = shapely.get_type_id(partes)
+        conservar = (tipo == 1) & ~shapely.is_empty(partes)  # LineString
+        lineas = partes[conservar]
+        elevaciones = elevaciones[indices[conservar]]
+
+    return lineas, elevaciones
+
+
+def _contornos_crudos(x, y, z, niveles):
+    """Curvas de los niveles pedidos con contourpy, sin armar geometrías: (puntos (N, 2),
+    desplazamientos de cada línea (M + 1) y elevación de cada línea (M))"""
+    from contourpy import LineType, contour_generator
+
+    generador = contour_generator(x, y, np.ma.masked_invalid(z), line_type=LineType.ChunkCombinedOffset)
+
+    puntos = []
+    largos = []
+    elevaciones = []
+    for nivel in niveles:
+        puntos_nivel, desplazamientos = generador.lines(nivel)
+        for puntos_bloque, desplazamientos_bloque in zip(puntos_nivel, desplazamientos):
+            if puntos_bloque is None or len(desplazamientos_bloque) < 2:
+                continue
+            puntos.append(puntos_bloque)
+            largos.append(np.diff(desplazamientos_bloque).astype(np.int64))
+            elevaciones.append(np.full(len(largos[-1]), nivel, dtype=float))
+
+    if not puntos:
+        return np.empty((0, 2)), np.zeros(1, dtype=np.int64), np.empty(0, dtype=float)
+    largos = np.concatenate(largos)
+    desplazamientos = np.concatenate([np.zeros(1, dtype=np.int64), np.cumsum(largos)])
+    return np.concatenate(puntos), desplazamientos, np.concatenate(elevaciones)
+
+
+def _lineas_contorno(x, y, z, niveles):
+    """LineStrings y elevaciones de los niveles pedidos sobre una grilla (o ventana)"""
+    puntos, desplazamientos, elevaciones = _contornos_crudos(x, y, z, niveles)
+    return _armar_lineas(puntos, desplazamientos), elevaciones
+
+
+def _armar_lineas(puntos, desplazamientos):
+    # Índice de línea de cada vértice a partir de los desplazamientos: todas las líneas en una llamada
+    largos = np.diff(desplazamientos)
+    if len(largos) == 0:
+        return np.empty(0, dtype=object)
+    return shapely.linestrings(puntos, indices=np.repeat(np.arange(len(largos)), largos))
+
+
+def _curvas_tesela(ventana, z, x, y, niveles):
+    """Curvas crudas de una tesela y cuáles terminan en un borde compartido con otra tesela.
+    Se devuelven arreglos numéricos y no geometrías: viajan más rápido entre procesos."""
+    if np.isnan(z).all():
+        return np.empty((0, 2)), np.zeros(1, dtype=np.int64), np.empty(0, dtype=float), np.empty(0, dtype=bool)
+    # Solo los niveles dentro del rango de la tesela: el barrido de contourpy es por nivel
+    niveles = niveles[(niveles >= np.nanmin(z)) & (niveles <= np.nanmax(z))]
+    puntos, desplazamientos, elevaciones = _contornos_crudos(x[ventana[1]], y[ventana[0]], z, niveles)
+
+    # Bordes de la tesela que no son borde de la grilla
+    filas, columnas = ventana
+    costuras_x = [x[c] for c in (columnas.start, columnas.stop - 1) if 0 < c < len(x) - 1]
+    costuras_y = [y[f] for f in (filas.start, filas.stop - 1) if 0 < f < len(y) - 1]
+    inicios, finales = puntos[desplazamientos[:-1]], puntos[desplazamientos[1:] - 1]
+    # contourpy interpola (1 - t) * a + t * b: sobre un borde el punto puede diferir del nodo en el último bit
+    tolerancia = 1e-6 * max(abs(x[1] - x[0]), abs(y[1] - y[0]))
+    en_costura = np.zeros(len(elevaciones), dtype=bool)
+    for eje, costuras in ((0, costuras_x), (1, costuras_y)):
+        for costura in costuras:
+            en_costura |= (np.abs(inicios[:, eje] - costura) <= tolerancia) | (np.abs(finales[:, eje] - costura) <= tolerancia)
+    return puntos, desplazamientos, elevaciones, en_costura
+
+
+def _coser_curvas(teselas_curvas):
+    """Arma las líneas de todas las teselas y une por nivel las que comparten extremo en una costura (shapely.line_merge)"""
+    puntos = np.concatenate([t[0] for t in teselas_curvas])
+    inicios = np.cumsum([0] + [len(t[0]) for t in teselas_curvas[:-1]])
+    desplazamientos = np.concatenate([np.zeros(1, dtype=np.int64)]
+                                     + [t[1][1:] + inicio for t, inicio in zip(teselas_curvas, inicios)])
+    elevaciones = np.concatenate([t[2] for t in teselas_curvas])
+    en_costura = np.concatenate([t[3] for t in teselas_curvas])
+    lineas = _armar_lineas(puntos, desplazamientos)
+    if not en_costura.any():
+        return lineas, elevaciones
+
+    cosidas = [lineas[~en_costura]]
+    elevaciones_cosidas = [elevaciones[~en_costura]]
+    lineas, elevaciones = lineas[en_costura], elevaciones[en_costura]
+    for nivel in np.unique(elevaciones):
+        partes = shapely.get_parts(shapely.line_merge(shapely.multilinestrings(lineas[elevaciones == nivel])))
+        cosidas.append(partes)
+        elevaciones_cosidas.append(np.full(len(partes), nivel, dtype=float))
+    return np.concatenate(cosidas), np.concatenate(elevaciones_cosidas)
+
+
+# FUNCIÓN: SUAVIZAR LA ELEVACIÓN DEL MODELO
+def _suavizar(z, sigma):
+    from scipy.ndimage import gaussian_filter
+    validos = ~np.isnan(z)
+    suma = gaussian_filter(np.where(validos, z, 0).astype(np.float64), sigma)
+    peso = gaussian_filter(validos.astype(np.float64), sigma)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        resultado = suma / peso
+    resultado[~validos] = np.nan
+    return resultado
+
+
+def suavizar_elevacion(modelo, sigma=1.0):
+    """Filtro gaussiano que ignora los NaN (convolución normalizada): no contamina el borde de la parcela.
+    En grillas grandes se aplica por teselas con un halo igual al radio del filtro (truncate=4)."""
+    return aplicar_por_teselas(partial(_suavizar, sigma=sigma), [modelo.elevacion], (np.float64,),
+                               halo=int(4.0 * sigma + 0.5))
+
+
+# FUNCIÓN: CURVAS DE NIVEL DE UN MODELO DEM
+def curvas_desde_modelo(modelo, gdf, intervalo):
+    """Curvas (id_curva, elevacion, longitud_m) de un ModeloDEM cada `intervalo` metros, en el CRS de la parcela"""
+    grilla = modelo.grilla
+    reproyectar = gdf.crs is not None and grilla.crs is not None
+    poligono_principal = gdf.to_crs(grilla.crs).iloc[0].geometry if reproyectar else gdf.iloc[0].geometry
+    
+    # Calcular niveles para curvas
+    z_min, z_max = np.nanmin(modelo.elevacion), np.nanmax(modelo.elevacion)
+    niveles = np.arange(np.floor(z_min/intervalo)*intervalo, np.ceil(z_max/intervalo)*intervalo, intervalo)
+    
+    # Curvas reales de cada nivel sobre el DEM suavizado, recortadas a la parcela y con su elevación
+    curvas_lineas, elevaciones = extraer_curvas_nivel(grilla, suavizar_elevacion(modelo), niveles, poligono_principal)
+    
+    if not len(curvas_lineas):
+        return gpd.GeoDataFrame(columns=['id_curva', 'elevacion', 'longitud_m', 'geometry'], crs=gdf.crs)
+    gdf_curvas = gpd.GeoDataFrame({
+        'id_curva': np.arange(1, len(curvas_lineas) + 1),
+        'elevacion': np.round(elevaciones, 2),
+        'longitud_m': shapely.length(curvas_lineas),
+        'geometry': curvas_lineas
+    }, crs=grilla.crs)
+    return gdf_curvas.to_crs(gdf.crs) if reproyectar else gdf_curvas
+
+
+# FUNCIÓN: ¿SE PUEDE DERIVAR UN INTERVALO DE LAS CURVAS BASE?
+def intervalo_derivable(intervalo, intervalo_base=None):
+    """True si el intervalo es múltiplo del intervalo base (sus niveles son un subconjunto)"""
+    intervalo_base = intervalo_base or PARAMETROS_CURVAS_NIVEL['intervalo_base']
+    cociente = intervalo / intervalo_base
+    return cociente >= 1 and bool(np.isclose(cociente, np.round(cociente)))
+
+
+# FUNCIÓN: FILTRAR CURVAS BASE A UN INTERVALO MAYOR
+def filtrar_curvas_intervalo(gdf_curvas, intervalo):
+    """Curvas cuyos niveles son múltiplos del intervalo, renumeradas desde 1"""
+    cociente = gdf_curvas['elevacion'].to_numpy(dtype=float) / intervalo
+    seleccion = gdf_curvas[np.isclose(cociente, np.round(cociente))].reset_index(drop=True)
+    seleccion['id_curva'] = np.arange(1, len(seleccion) + 1)
+    return seleccion
+
+
+# FUNCIÓN PARA CALCULAR CURVAS DE NIVEL
+@medir_etapa('curvas_nivel')
+def calcular_curvas_nivel(gdf, intervalo=5.0, resolucion=10.0, fuente=None):
+    """Calcula curvas de nivel a partir de un DEM sintético o, con `fuente`, de un
+    GeoTIFF / ASCII grid local (ver fuentes_dem.leer_dem_archivo).
+
+    Devuelve (gdf_curvas, modelo): las curvas (id_curva, elevacion, longitud_m) en el
+    CRS de la parcela y un ModeloDEM (float32, recortado a la parcela) en el CRS
+    métrico de su grilla. Los errores (DEM ilegible, parcela fuera del DEM) se propagan:
+    quien llama los informa en lugar de recibir un DEM de reemplazo.
+    """
+    
+    if fuente is not None:
+        grilla, grid_z = leer_dem_archivo(fuente, gdf, resolucion)
+    else:
+        # Generar DEM sintético en metros: ya es una grilla regular, se usa tal cual
+        grilla, grid_z = generar_dem_sintetico(gdf, resolucion)
+    
+    # Extraer polígono principal, en el CRS de la grilla
+    poligono_principal = gdf.to_crs(grilla.crs).iloc[0].geometry if grilla.crs is not None else gdf.iloc[0].geometry
+    
+    # Modelo compacto recortado a la parcela; pendiente y aspecto se derivan al pedirlos
+    # con el tamaño de celda real (puede diferir de la resolución pedida si la parcela es muy chica)
+    modelo = ModeloDEM.desde_parcela(grilla, grid_z, poligono_principal)
+    
+    return curvas_desde_modelo(modelo, gdf, intervalo), modelo
+
+
+# FUNCIÓN: DEM Y CURVAS BASE PARA TODOS LOS INTERVALOS
+def calcular_curvas_base(gdf, resolucion=10.0, fuente=None):
+    """DEM y curvas cada `intervalo_base` metros: cualquier intervalo múltiplo se obtiene con filtrar_curvas_intervalo"""
+    return calcular_curvas_nivel(gdf, PARAMETROS_CURVAS_NIVEL['intervalo_base'], resolucion, fuente)
@@ -4,714 +4,46 @@ import pandas as pd
 import numpy as np
 import tempfile
 import os
-import zipfile
 from datetime import datetime
-import matplotlib.pyplot as plt
-import matplotlib.patches as mpatches
-from matplotlib.colors import LinearSegmentedColormap
-import io
-from shapely.geometry import Polygon, LineString, Point, MultiLineString
-import math
-import folium
-from folium import plugins
-from streamlit_folium import st_folium
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image, PageBreak
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.lib import colors
-from reportlab.pdfgen import canvas
-from reportlab.lib.utils import ImageReader
-import base64
-import fiona
-from scipy.interpolate import griddata
+from shapely.geometry import Polygon
 import warnings
+
+from analizador.parametros import (
+    PARAMETROS_NDWI_SUELO, PARAMETROS_GEOMETRIA, PARAMETROS_CURVAS_NIVEL, PARAMETROS_HIDROLOGIA,
+    CLASIFICACION_PENDIENTES, ORIENTACIONES_LADERA, RECOMENDACIONES_TEXTURA, RECOMENDACIONES_AGROECOLOGICAS, RECOMENDACIONES_PENDIENTES
+)
+from analizador.geometria import (
+    calcular_superficie, buscar_lotes_por_punto, unir_lotes_zonas, dividir_parcela_en_zonas, obtener_crs_metrico
+)
+from analizador.cache import LIMITE_BYTES_DEFECTO, CacheDisco, clave_cache, recordar, recordar_partes
+from analizador.huella import huella_datos, huella_geometria
+from analizador.instrumentacion import Traza, etapa
+from analizador.perfilado import Perfilador, perfilado_habilitado
+from analizador.lectura import leer_parcela
+from analizador.suelo_vectorizado import (
+    analizar_textura_suelo_vectorizado, analizar_ndwi_suelo_vectorizado, calcular_indices_gee_vectorizado
+)
+from analizador.dem import GrillaDEM, ModeloDEM
+from analizador.derivadas import pendiente_grados
+from analizador.fuentes_dem import EXTENSIONES_DEM, directorio_dem_local, huella_archivo, resolver_dem_local
+from analizador.hidrologia import inventario_encharcamiento
+from analizador.topografia import (
+    VERSION_DEM, calcular_estadisticas_pendiente, calcular_estadisticas_orientacion,
+    calcular_estadisticas_curvatura, calcular_curvas_base, curvas_desde_modelo,
+    filtrar_curvas_intervalo, intervalo_derivable
+)
+from analizador.mapas import (
+    crear_mapa_interactivo_esri, crear_mapa_visualizador_parcela, crear_mapa_estatico,
+    crear_mapa_curvas_nivel, crear_mapa_pendientes
+)
+from analizador.informes import generar_informe_pdf, generar_informe_ndwi_pdf
+
 warnings.filterwarnings('ignore')
 
 st.set_page_config(page_title="🌾 Analizador Cultivos Extensivos", layout="wide")
 st.title("🌾 ANALIZADOR CULTIVOS EXTENSIVOS - METODOLOGÍA GEE COMPLETA CON AGROECOLOGÍA")
 st.markdown("---")
 
-# Configurar para restaurar .shx automáticamente
-os.environ['SHAPE_RESTORE_SHX'] = 'YES'
-
-# PARÁMETROS MEJORADOS Y MÁS REALISTAS PARA DIFERENTES CULTIVOS EXTENSIVOS
-PARAMETROS_CULTIVOS = {
-    'MAIZ': {
-        'NITROGENO': {'min': 120, 'max': 200, 'optimo': 160},
-        'FOSFORO': {'min': 30, 'max': 60, 'optimo': 45},
-        'POTASIO': {'min': 80, 'max': 150, 'optimo': 120},
-        'MATERIA_ORGANICA_OPTIMA': 3.0,
-        'HUMEDAD_OPTIMA': 0.25,
-        'pH_OPTIMO': 6.0,
-        'CONDUCTIVIDAD_OPTIMA': 1.0
-    },
-    'TRIGO': {
-        'NITROGENO': {'min': 100, 'max': 180, 'optimo': 140},
-        'FOSFORO': {'min': 25, 'max': 50, 'optimo': 38},
-        'POTASIO': {'min': 60, 'max': 120, 'optimo': 90},
-        'MATERIA_ORGANICA_OPTIMA': 2.5,
-        'HUMEDAD_OPTIMA': 0.22,
-        'pH_OPTIMO': 6.5,
-        'CONDUCTIVIDAD_OPTIMA': 0.8
-    },
-    'CEBADA': {
-        'NITROGENO': {'min': 80, 'max': 150, 'optimo': 115},
-        'FOSFORO': {'min': 20, 'max': 45, 'optimo': 32},
-        'POTASIO': {'min': 50, 'max': 100, 'optimo': 75},
-        'MATERIA_ORGANICA_OPTIMA': 2.2,
-        'HUMEDAD_OPTIMA': 0.20,
-        'pH_OPTIMO': 6.8,
-        'CONDUCTIVIDAD_OPTIMA': 0.7
-    },
-    'GIRASOL': {
-        'NITROGENO': {'min': 60, 'max': 120, 'optimo': 90},
-        'FOSFORO': {'min': 15, 'max': 35, 'optimo': 25},
-        'POTASIO': {'min': 100, 'max': 180, 'optimo': 140},
-        'MATERIA_ORGANICA_OPTIMA': 2.0,
-        'HUMEDAD_OPTIMA': 0.18,
-        'pH_OPTIMO': 6.2,
-        'CONDUCTIVIDAD_OPTIMA': 1.2
-    },
-    'SOJA': {
-        'NITROGENO': {'min': 0, 'max': 20, 'optimo': 10},  # Fijadora de N
-        'FOSFORO': {'min': 25, 'max': 50, 'optimo': 38},
-        'POTASIO': {'min': 80, 'max': 150, 'optimo': 115},
-        'MATERIA_ORGANICA_OPTIMA': 3.0,
-        'HUMEDAD_OPTIMA': 0.25,
-        'pH_OPTIMO': 6.5,
-        'CONDUCTIVIDAD_OPTIMA': 0.9
-    },
-    'COLZA': {
-        'NITROGENO': {'min': 120, 'max': 200, 'optimo': 160},
-        'FOSFORO': {'min': 25, 'max': 50, 'optimo': 38},
-        'POTASIO': {'min': 100, 'max': 180, 'optimo': 140},
-        'MATERIA_ORGANICA_OPTIMA': 3.5,
-        'HUMEDAD_OPTIMA': 0.22,
-        'pH_OPTIMO': 6.8,
-        'CONDUCTIVIDAD_OPTIMA': 1.0
-    },
-    'SORGO': {
-        'NITROGENO': {'min': 70, 'max': 130, 'optimo': 100},
-        'FOSFORO': {'min': 15, 'max': 35, 'optimo': 25},
-        'POTASIO': {'min': 60, 'max': 120, 'optimo': 90},
-        'MATERIA_ORGANICA_OPTIMA': 2.0,
-        'HUMEDAD_OPTIMA': 0.18,
-        'pH_OPTIMO': 6.0,
-        'CONDUCTIVIDAD_OPTIMA': 0.8
-    },
-    'LUPINO': {
-        'NITROGENO': {'min': 0, 'max': 15, 'optimo': 8},  # Fijadora de N
-        'FOSFORO': {'min': 15, 'max': 35, 'optimo': 25},
-        'POTASIO': {'min': 40, 'max': 80, 'optimo': 60},
-        'MATERIA_ORGANICA_OPTIMA': 2.5,
-        'HUMEDAD_OPTIMA': 0.20,
-        'pH_OPTIMO': 5.5,
-        'CONDUCTIVIDAD_OPTIMA': 0.6
-    }
-}
-
-# PARÁMETROS DE TEXTURA DEL SUELO POR CULTIVO - ACTUALIZADOS SEGÚN IMAGEN
-TEXTURA_SUELO_OPTIMA = {
-    'MAIZ': {
-        'textura_optima': 'Franco',
-        'arena_optima': 45,
-        'limo_optima': 35,
-        'arcilla_optima': 20,
-        'densidad_aparente_optima': 1.3,
-        'porosidad_optima': 0.5
-    },
-    'TRIGO': {
-        'textura_optima': 'Franco Arcilloso',
-        'arena_optima': 40,
-        'limo_optima': 30,
-        'arcilla_optima': 30,
-        'densidad_aparente_optima': 1.2,
-        'porosidad_optima': 0.55
-    },
-    'CEBADA': {
-        'textura_optima': 'Franco',
-        'arena_optima': 45,
-        'limo_optima': 35,
-        'arcilla_optima': 20,
-        'densidad_aparente_optima': 1.3,
-        'porosidad_optima': 0.5
-    },
-    'GIRASOL': {
-        'textura_optima': 'Franco Arenoso',
-        'arena_optima': 55,
-        'limo_optima': 25,
-        'arcilla_optima': 20,
-        'densidad_aparente_optima': 1.4,
-        'porosidad_optima': 0.45
-    },
-    'SOJA': {
-        'textura_optima': 'Franco',
-        'arena_optima': 45,
-        'limo_optima': 35,
-        'arcilla_optima': 20,
-        'densidad_aparente_optima': 1.3,
-        'porosidad_optima': 0.5
-    },
-    'COLZA': {
-        'textura_optima': 'Franco Arcilloso',
-        'arena_optima': 40,
-        'limo_optima': 30,
-        'arcilla_optima': 30,
-        'densidad_aparente_optima': 1.2,
-        'porosidad_optima': 0.55
-    },
-    'SORGO': {
-        'textura_optima': 'Franco',
-        'arena_optima': 45,
-        'limo_optima': 35,
-        'arcilla_optima': 20,
-        'densidad_aparente_optima': 1.3,
-        'porosidad_optima': 0.5
-    },
-    'LUPINO': {
-        'textura_optima': 'Franco Arenoso',
-        'arena_optima': 55,
-        'limo_optima': 25,
-        'arcilla_optima': 20,
-        'densidad_aparente_optima': 1.4,
-        'porosidad_optima': 0.45
-    }
-}
-
-# PARÁMETROS PARA CÁLCULO DE NDWI (SOBRE EL SUELO)
-PARAMETROS_NDWI_SUELO = {
-    'MAIZ': {
-        'ndwi_optimo_suelo': 0.15,
-        'ndwi_humedo_suelo': 0.25,
-        'ndwi_seco_suelo': -0.15,
-        'umbral_sequia': -0.1
-    },
-    'TRIGO': {
-        'ndwi_optimo_suelo': 0.12,
-        'ndwi_humedo_suelo': 0.20,
-        'ndwi_seco_suelo': -0.20,
-        'umbral_sequia': -0.15
-    },
-    'CEBADA': {
-        'ndwi_optimo_suelo': 0.10,
-        'ndwi_humedo_suelo': 0.18,
-        'ndwi_seco_suelo': -0.22,
-        'umbral_sequia': -0.18
-    },
-    'GIRASOL': {
-        'ndwi_optimo_suelo': 0.08,
-        'ndwi_humedo_suelo': 0.15,
-        'ndwi_seco_suelo': -0.25,
-        'umbral_sequia': -0.20
-    },
-    'SOJA': {
-        'ndwi_optimo_suelo': 0.15,
-        'ndwi_humedo_suelo': 0.25,
-        'ndwi_seco_suelo': -0.15,
-        'umbral_sequia': -0.1
-    },
-    'COLZA': {
-        'ndwi_optimo_suelo': 0.13,
-        'ndwi_humedo_suelo': 0.22,
-        'ndwi_seco_suelo': -0.18,
-        'umbral_sequia': -0.13
-    },
-    'SORGO': {
-        'ndwi_optimo_suelo': 0.07,
-        'ndwi_humedo_suelo': 0.14,
-        'ndwi_seco_suelo': -0.28,
-        'umbral_sequia': -0.22
-    },
-    'LUPINO': {
-        'ndwi_optimo_suelo': 0.10,
-        'ndwi_humedo_suelo': 0.18,
-        'ndwi_seco_suelo': -0.22,
-        'umbral_sequia': -0.18
-    }
-}
-
-# PARÁMETROS PARA ANÁLISIS DE CURVAS DE NIVEL
-PARAMETROS_CURVAS_NIVEL = {
-    'intervalo_curvas': 5.0,  # metros entre curvas
-    'resolucion_dem': 10.0,   # resolución DEM en metros
-    'min_elevacion': 100,     # elevación mínima en metros
-    'max_elevacion': 500,     # elevación máxima en metros
-    'factor_relieve': 0.5     # factor de relieve (0-1)
-}
-
-# CLASIFICACIÓN DE PENDIENTES
-CLASIFICACION_PENDIENTES = {
-    'PLANA (0-2%)': {'min': 0, 'max': 2, 'color': '#4daf4a', 'factor_erosivo': 0.1},
-    'SUAVE (2-5%)': {'min': 2, 'max': 5, 'color': '#a6d96a', 'factor_erosivo': 0.3},
-    'MODERADA (5-10%)': {'min': 5, 'max': 10, 'color': '#ffffbf', 'factor_erosivo': 0.6},
-    'FUERTE (10-15%)': {'min': 10, 'max': 15, 'color': '#fdae61', 'factor_erosivo': 0.8},
-    'MUY FUERTE (15-25%)': {'min': 15, 'max': 25, 'color': '#f46d43', 'factor_erosivo': 0.9},
-    'EXTREMA (>25%)': {'min': 25, 'max': 100, 'color': '#d73027', 'factor_erosivo': 1.0}
-}
-
-# FUNCIÓN: CLASIFICAR PENDIENTES
-def clasificar_pendiente(pendiente_porcentaje):
-    """Clasifica la pendiente según categorías establecidas"""
-    for categoria, params in CLASIFICACION_PENDIENTES.items():
-        if params['min'] <= pendiente_porcentaje < params['max']:
-            return categoria, params['color']
-    return "EXTREMA (>25%)", CLASIFICACION_PENDIENTES['EXTREMA (>25%)']['color']
-
-# FUNCIÓN PARA CALCULAR ESTADÍSTICAS DE PENDIENTE
-def calcular_estadisticas_pendiente(pendiente_grid):
-    """Calcula estadísticas de pendiente del terreno"""
-    pendiente_flat = pendiente_grid.flatten()
-    pendiente_flat = pendiente_flat[~np.isnan(pendiente_flat)]
-    
-    if len(pendiente_flat) == 0:
-        return {
-            'promedio': 0,
-            'min': 0,
-            'max': 0,
-            'std': 0,
-            'distribucion': {}
-        }
-    
-    stats = {
-        'promedio': float(np.mean(pendiente_flat)),
-        'min': float(np.min(pendiente_flat)),
-        'max': float(np.max(pendiente_flat)),
-        'std': float(np.std(pendiente_flat)),
-        'distribucion': {}
-    }
-    
-    # Calcular distribución por categoría
-    for categoria, params in CLASIFICACION_PENDIENTES.items():
-        mask = (pendiente_flat >= params['min']) & (pendiente_flat < params['max'])
-        stats['distribucion'][categoria] = {
-            'porcentaje': float(np.sum(mask) / len(pendiente_flat) * 100),
-            'area_ha': float(np.sum(mask) * (PARAMETROS_CURVAS_NIVEL['resolucion_dem']**2) / 10000),
-            'color': params['color']
-        }
-    
-    return stats
-
-# CLASIFICACIÓN DE TEXTURAS DEL SUELO - ACTUALIZADA SEGÚN IMAGEN
-CLASIFICACION_TEXTURAS = {
-    'Franco': {'arena_min': 43, 'arena_max': 52, 'limo_min': 28, 'limo_max': 50, 'arcilla_min': 7, 'arcilla_max': 27},
-    'Franco Arcilloso': {'arena_min': 20, 'arena_max': 45, 'limo_min': 15, 'limo_max': 53, 'arcilla_min': 25, 'arcilla_max': 35},
-    'Franco Arenoso': {'arena_min': 50, 'arena_max': 70, 'limo_min': 15, 'limo_max': 35, 'arcilla_min': 5, 'arcilla_max': 20},
-    'Arenoso': {'arena_min': 85, 'arena_max': 100, 'limo_max': 15, 'arcilla_max': 15},
-    'Arcilloso': {'arena_max': 45, 'limo_max': 40, 'arcilla_min': 35}
-}
-
-# FACTORES EDÁFICOS MÁS REALISTAS - ACTUALIZADOS SEGÚN IMAGEN
-FACTORES_SUELO = {
-    'Arcilloso': {'retention': 1.3, 'drainage': 0.7, 'aeration': 0.6, 'workability': 0.5},
-    'Franco Arcilloso': {'retention': 1.2, 'drainage': 0.8, 'aeration': 0.7, 'workability': 0.7},
-    'Franco': {'retention': 1.0, 'drainage': 1.0, 'aeration': 1.0, 'workability': 1.0},
-    'Franco Arenoso': {'retention': 0.8, 'drainage': 1.2, 'aeration': 1.3, 'workability': 1.2},
-    'Arenoso': {'retention': 0.6, 'drainage': 1.4, 'aeration': 1.5, 'workability': 1.4}
-}
-
-# RECOMENDACIONES POR TIPO DE TEXTURA - ACTUALIZADAS SEGÚN IMAGEN
-RECOMENDACIONES_TEXTURA = {
-    'Franco': {
-        'propiedades': [
-            "Equilibrio arena-limo-arcilla",
-            "Buena aireación y drenaje",
-            "CIC Intermedia-alta",
-            "Retención de agua adecuada"
-        ],
-        'limitantes': [
-            "Puede compactarse con maquinaria pesada",
-            "Erosión en pendientes si no hay cobertura"
-        ],
-        'manejo': [
-            "Mantener coberturas vivas o muertas",
-            "Evitar tránsito excesivo de maquinaria",
-            "Fertilización eficiente, sin muchas pérdidas",
-            "Ideal para siembra directa"
-        ]
-    },
-    'Franco Arcilloso': {
-        'propiedades': [
-            "Mayor proporción de arcilla (25–35%)",
-            "Alta retención de agua y nutrientes",
-            "Drenaje natural lento",
-            "Buena fertilidad natural"
-        ],
-        'limitantes': [
-            "Riesgo de encharcamiento",
-            "Compactación fácil",
-            "Menor oxigenación radicular"
-        ],
-        'manejo': [
-            "Implementar drenajes (canales y subdrenes)",
-            "Subsolado previo a siembra",
-            "Incorporar materia orgánica (rastrojos, compost)",
-            "Fertilización fraccionada en lluvias intensas"
-        ]
-    },
-    'Franco Arenoso': {
-        'propiedades': [
-            "Arena 50–70%, arcilla 5-20%",
-            "Buen desarrollo radicular",
-            "Excelente drenaje",
-            "Calentamiento rápido en primavera"
-        ],
-        'limitantes': [
-            "Riesgo de lixiviación de nutrientes",
-            "Estrés hídrico en veranos",
-            "Fertilidad baja-moderada"
-        ],
-        'manejo': [
-            "Uso de coberturas leguminosas",
-            "Aplicar mulching (rastrojos, paja)",
-            "Riego suplementario en sequía",
-            "Fertilización fraccionada y frecuente"
-        ]
-    },
-    'Arenoso': {
-        'propiedades': [
-            "Alto contenido de arena (>85%)",
-            "Excelente drenaje",
-            "Baja retención de agua",
-            "Fácil laboreo"
-        ],
-        'limitantes': [
-            "Baja retención de nutrientes",
-            "Riesgo alto de erosión",
-            "Requiere riego frecuente"
-        ],
-        'manejo': [
-            "Aplicaciones frecuentes de materia orgánica",
-            "Riego por goteo para eficiencia hídrica",
-            "Fertilización fraccionada en pequeñas dosis",
-            "Barreras vivas contra erosión"
-        ]
-    },
-    'Arcilloso': {
-        'propiedades': [
-            "Alto contenido de arcilla (>35%)",
-            "Alta retención de agua y nutrientes",
-            "Estructura densa",
-            "Alta fertilidad potencial"
-        ],
-        'limitantes': [
-            "Drenaje muy lento",
-            "Alta compactación",
-            "Difícil laboreo cuando está húmedo"
-        ],
-        'manejo': [
-            "Añadir materia orgánica para mejorar estructura",
-            "Evitar laboreo en condiciones húmedas",
-            "Implementar sistemas de drenaje profundo",
-            "Cultivos de cobertura para romper compactación"
-        ]
-    }
-}
-
-# PRINCIPIOS AGROECOLÓGICOS - RECOMENDACIONES ESPECÍFICAS PARA CULTIVOS EXTENSIVOS
-RECOMENDACIONES_AGROECOLOGICAS = {
-    'MAIZ': {
-        'COBERTURAS_VIVAS': [
-            "Leguminosas: Vicia villosa, Trifolium repens",
-            "Coberturas mixtas: Centeno y vicia",
-            "Plantas de cobertura baja: Avena strigosa"
-        ],
-        'ABONOS_VERDES': [
-            "Vicia villosa: 30-40 kg/ha antes de la siembra",
-            "Trifolium incarnatum: 15-20 kg/ha",
-            "Guisante forrajero: 60-80 kg/ha"
-        ],
-        'BIOFERTILIZANTES': [
-            "Bocashi: 2-3 ton/ha cada ciclo",
-            "Compost de residuos de cosecha: 1-2 ton/ha",
-            "Biofertilizante líquido: Aplicación foliar en V6"
-        ],
-        'MANEJO_ECOLOGICO': [
-            "Control biológico con trichogramma para plagas",
-            "Uso de trampas de feromonas para gusano elotero",
-            "Rotación con leguminosas"
-        ],
-        'ASOCIACIONES': [
-            "Asociación con frijol para fijación de N",
-            "Asociación con calabaza para cobertura del suelo",
-            "Cercas vivas con especies nativas"
-        ]
-    },
-    'TRIGO': {
-        'COBERTURAS_VIVAS': [
-            "Leguminosas: Trifolium subterraneum",
-            "Coberturas de invierno: Veza común",
-            "Plantas de cobertura: Rye grass anual"
-        ],
-        'ABONOS_VERDES': [
-            "Veza común: 20-30 kg/ha",
-            "Trébol blanco: 5-7 kg/ha",
-            "Habas: 80-100 kg/ha"
-        ],
-        'BIOFERTILIZANTES': [
-            "Compost de paja: 2-3 ton/ha",
-            "Bocashi especial cereales: 1.5-2 ton/ha",
-            "Té de compost aplicado en macollaje"
-        ],
-        'MANEJO_ECOLOGICO': [
-            "Control de enfermedades con bicarbonato y aceites",
-            "Uso de variedades resistentes a royas",
-            "Manejo integrado de plagas con enemigos naturales"
-        ],
-        'ASOCIACIONES': [
-            "Rotación con leguminosas de grano",
-            "Asociación con trébol en entrelineas",
-            "Cultivo en franjas con colza"
-        ]
-    },
-    'CEBADA': {
-        'COBERTURAS_VIVAS': [
-            "Leguminosas: Trifolium pratense",
-            "Coberturas de invierno: Veza vellosa",
-            "Plantas de cobertura: Avena sativa"
-        ],
-        'ABONOS_VERDES': [
-            "Veza vellosa: 25-35 kg/ha",
-            "Trébol rojo: 8-10 kg/ha",
-            "Arveja forrajera: 60-80 kg/ha"
-        ],
-        'BIOFERTILIZANTES': [
-            "Compost de cebada: 2-2.5 ton/ha",
-            "Bocashi cebada: 1-1.5 ton/ha",
-            "Té de compost aplicado en etapa de ahijado"
-        ],
-        'MANEJO_ECOLOGICO': [
-            "Control de malas hierbas con labranza reducida",
-            "Uso de acolchado para conservar humedad",
-            "Manejo integrado de plagas"
-        ],
-        'ASOCIACIONES': [
-            "Rotación con papas o remolacha",
-            "Asociación con leguminosas forrajeras",
-            "Cultivo en franjas con veza"
-        ]
-    },
-    'GIRASOL': {
-        'COBERTURAS_VIVAS': [
-            "Leguminosas: Lupinus albus",
-            "Coberturas de verano: Phaseolus vulgaris",
-            "Plantas de cobertura baja: Coriandro"
-        ],
-        'ABONOS_VERDES': [
-            "Lupino blanco: 40-50 kg/ha",
-            "Frijol común: 30-40 kg/ha",
-            "Crotalaria juncea: 20-25 kg/ha"
-        ],
-        'BIOFERTILIZANTES': [
-            "Compost de cáscara de girasol: 2-3 ton/ha",
-            "Bocashi girasol: 1.5-2 ton/ha",
-            "Biofertilizante líquido a base de algas"
-        ],
-        'MANEJO_ECOLOGICO': [
-            "Control biológico con aves insectívoras",
-            "Uso de trampas amarillas para insectos",
-            "Manejo de enfermedades con extractos de cola de caballo"
-        ],
-        'ASOCIACIONES': [
-            "Asociación con maíz para sombra temprana",
-            "Asociación con soja para fijación de N",
-            "Cultivo en franjas con sorgo"
-        ]
-    },
-    'SOJA': {
-        'COBERTURAS_VIVAS': [
-            "Leguminosas: Arachis pintoi",
-            "Coberturas de verano: Phaseolus lunatus",
-            "Plantas de cobertura: Canavalia ensiformis"
-        ],
-        'ABONOS_VERDES': [
-            "Maní forrajero: 15-20 kg/ha",
-            "Frijol lima: 25-30 kg/ha",
-            "Canavalia: 40-50 kg/ha"
-        ],
-        'BIOFERTILIZANTES': [
-            "Compost de soja: 2-2.5 ton/ha",
-            "Bocashi soja: 1-1.5 ton/ha",
-            "Inoculante de rizobio específico"
-        ],
-        'MANEJO_ECOLOGICO': [
-            "Inoculación con rizobio para fijación de N",
-            "Control de plagas con bacillus thuringiensis",
-            "Manejo de enfermedades con extractos de ajo"
-        ],
-        'ASOCIACIONES': [
-            "Asociación con maíz para uso de espacio",
-            "Asociación con sorgo para sombra",
-            "Cultivo en franjas con girasol"
-        ]
-    },
-    'COLZA': {
-        'COBERTURAS_VIVAS': [
-            "Leguminosas: Trifolium repens",
-            "Coberturas de invierno: Vicia sativa",
-            "Plantas de cobertura: Brassica napus"
-        ],
-        'ABONOS_VERDES': [
-            "Vicia común: 30-40 kg/ha",
-            "Trébol blanco: 5-7 kg/ha",
-            "Nabo forrajero: 10-15 kg/ha"
-        ],
-        'BIOFERTILIZANTES': [
-            "Compost de colza: 2-3 ton/ha",
-            "Bocashi colza: 1.5-2 ton/ha",
-            "Té de compost aplicado en roseta"
-        ],
-        'MANEJO_ECOLOGICO': [
-            "Control de plagas con aceite de neem",
-            "Uso de trampas de feromonas para polillas",
-            "Manejo de enfermedades con bicarbonato"
-        ],
-        'ASOCIACIONES': [
-            "Rotación con cereales de invierno",
-            "Asociación con leguminosas forrajeras",
-            "Cultivo en franjas con trigo"
-        ]
-    },
-    'SORGO': {
-        'COBERTURAS_VIVAS': [
-            "Leguminosas: Cajanus cajan",
-            "Coberturas de verano: Vigna unguiculata",
-            "Plantas de cobertura: Crotalaria ochroleuca"
-        ],
-        'ABONOS_VERDES': [
-            "Guandul: 20-25 kg/ha",
-            "Caupí: 15-20 kg/ha",
-            "Crotalaria: 10-15 kg/ha"
-        ],
-        'BIOFERTILIZANTES': [
-            "Compost de sorgo: 2-2.5 ton/ha",
-            "Bocashi sorgo: 1-1.5 ton/ha",
-            "Biofertilizante líquido a base de melaza"
-        ],
-        'MANEJO_ECOLOGICO': [
-            "Control de plagas con insectos benéficos",
-            "Uso de variedades resistentes a sequía",
-            "Manejo de enfermedades con extractos de propóleo"
-        ],
-        'ASOCIACIONES': [
-            "Asociación con frijol para fijación de N",
-            "Asociación con calabaza para cobertura",
-            "Cultivo en franjas con maíz"
-        ]
-    },
-    'LUPINO': {
-        'COBERTURAS_VIVAS': [
-            "Leguminosas: Lupinus angustifolius",
-            "Coberturas de invierno: Trifolium subterraneum",
-            "Plantas de cobertura: Avena byzantina"
-        ],
-        'ABONOS_VERDES': [
-            "Lupino azul: 40-50 kg/ha",
-            "Trébol subterráneo: 8-10 kg/ha",
-            "Avena bizantina: 30-40 kg/ha"
-        ],
-        'BIOFERTILIZANTES': [
-            "Compost de lupino: 1.5-2 ton/ha",
-            "Bocashi lupino: 1-1.5 ton/ha",
-            "Inoculante de rizobio específico para lupino"
-        ],
-        'MANEJO_ECOLOGICO': [
-            "Inoculación con rizobio específico",
-            "Control de plagas con rotaciones largas",
-            "Manejo de enfermedades con extractos de cola de caballo"
-        ],
-        'ASOCIACIONES': [
-            "Asociación con cereales para aprovechar N",
-            "Asociación con brassicas para rotación",
-            "Cultivo en franjas con avena"
-        ]
-    }
-}
-
-# RECOMENDACIONES PARA MANEJO DE PENDIENTES - CULTIVOS EXTENSIVOS
-RECOMENDACIONES_PENDIENTES = {
-    'PLANA (0-2%)': [
-        "Diseño rectangular de siembra",
-        "Sistemas de riego por pivote central",
-        "Labranza convencional posible",
-        "Maquinaria pesada sin restricciones"
-    ],
-    'SUAVE (2-5%)': [
-        "Diseño en contorno ligero",
-        "Surcos siguiendo curvas de nivel",
-        "Labranza reducida recomendada",
-        "Barreras de cobertura cada 100 metros"
-    ],
-    'MODERADA (5-10%)': [
-        "Diseño en contorno estricto",
-        "Terrazas de base ancha",
-        "Cultivos en franjas",
-        "Barreras de cobertura cada 50 metros"
-    ],
-    'FUERTE (10-15%)': [
-        "Terrazas individuales",
-        "Siembra directa obligatoria",
-        "Cultivo en callejones (alley cropping)",
-        "Barreras de cobertura cada 30 metros"
-    ],
-    'MUY FUERTE (15-25%)': [
-        "Terrazas con muros de piedra",
-        "Sistemas silvopastoriles",
-        "Cultivos permanentes de cobertura",
-        "Evitar labranza, solo siembra directa"
-    ],
-    'EXTREMA (>25%)': [
-        "Forestación o agroforestería densa",
-        "Terrazas estrechas con vegetación permanente",
-        "Sistemas de captación de agua",
-        "No usar maquinaria, solo manual"
-    ]
-}
-
-# FACTORES ESTACIONALES PARA CULTIVOS EXTENSIVOS
-FACTORES_MES = {
-    "ENERO": 0.8, "FEBRERO": 0.9, "MARZO": 1.0, "ABRIL": 1.1,
-    "MAYO": 1.2, "JUNIO": 1.0, "JULIO": 0.9, "AGOSTO": 0.8,
-    "SEPTIEMBRE": 0.9, "OCTUBRE": 1.0, "NOVIEMBRE": 1.1, "DICIEMBRE": 1.0
-}
-
-FACTORES_N_MES = {
-    "ENERO": 1.0, "FEBRERO": 1.1, "MARZO": 1.2, "ABRIL": 1.3,
-    "MAYO": 1.4, "JUNIO": 1.2, "JULIO": 1.0, "AGOSTO": 0.8,
-    "SEPTIEMBRE": 0.9, "OCTUBRE": 1.0, "NOVIEMBRE": 1.1, "DICIEMBRE": 1.0
-}
-
-FACTORES_P_MES = {
-    "ENERO": 1.0, "FEBRERO": 1.0, "MARZO": 1.1, "ABRIL": 1.2,
-    "MAYO": 1.3, "JUNIO": 1.2, "JULIO": 1.1, "AGOSTO": 1.0,
-    "SEPTIEMBRE": 1.0, "OCTUBRE": 1.1, "NOVIEMBRE": 1.2, "DICIEMBRE": 1.1
-}
-
-FACTORES_K_MES = {
-    "ENERO": 1.0, "FEBRERO": 1.0, "MARZO": 1.0, "ABRIL": 1.1,
-    "MAYO": 1.2, "JUNIO": 1.3, "JULIO": 1.4, "AGOSTO": 1.3,
-    "SEPTIEMBRE": 1.2, "OCTUBRE": 1.1, "NOVIEMBRE": 1.0, "DICIEMBRE": 1.0
-}
-
-# FACTORES ESTACIONALES PARA NDWI DEL SUELO
-FACTORES_NDWI_MES = {
-    "ENERO": 0.8, "FEBRERO": 0.85, "MARZO": 0.9, "ABRIL": 0.95,
-    "MAYO": 1.0, "JUNIO": 0.95, "JULIO": 0.85, "AGOSTO": 0.8,
-    "SEPTIEMBRE": 0.85, "OCTUBRE": 0.9, "NOVIEMBRE": 0.95, "DICIEMBRE": 0.9
-}
-
-# PALETAS GEE MEJORADAS
-PALETAS_GEE = {
-    'FERTILIDAD': ['#d73027', '#f46d43', '#fdae61', '#fee08b', '#d9ef8b', '#a6d96a', '#66bd63', '#1a9850', '#006837'],
-    'NITROGENO': ['#8c510a', '#bf812d', '#dfc27d', '#f6e8c3', '#c7eae5', '#80cdc1', '#35978f', '#01665e'],
-    'FOSFORO': ['#67001f', '#b2182b', '#d6604d', '#f4a582', '#fddbc7', '#d1e5f0', '#92c5de', '#4393c3', '#2166ac', '#053061'],
-    'POTASIO': ['#4d004b', '#810f7c', '#8c6bb1', '#8c96c6', '#9ebcda', '#bfd3e6', '#e0ecf4', '#edf8fb'],
-    'TEXTURA': ['#8c510a', '#d8b365', '#f6e8c3', '#c7eae5', '#5ab4ac', '#01665e'],
-    'NDWI_SUELO': ['#8b0000', '#ff4500', '#ffa500', '#ffff00', '#adff2f', '#32cd32', '#006400'],
-    'ELEVACION': ['#006837', '#1a9850', '#66bd63', '#a6d96a', '#d9ef8b', '#ffffbf', '#fee08b', '#fdae61', '#f46d43', '#d73027'],
-    'PENDIENTE': ['#4daf4a', '#a6d96a', '#ffffbf', '#fdae61', '#f46d43', '#d73027']
-}
-
 # Inicializar session_state
 if 'analisis_completado' not in st.session_state:
     st.session_state.analisis_completado = False
@@ -731,6 +63,47 @@ if 'curvas_nivel' not in st.session_state:
     st.session_state.curvas_nivel = None
 if 'dem_data' not in st.session_state:
     st.session_state.dem_data = None
+if 'parametros_curvas' not in st.session_state:
+    st.session_state.parametros_curvas = None
+if 'error_dem' not in st.session_state:
+    st.session_state.error_dem = None
+if 'reporte_geometria' not in st.session_state:
+    st.session_state.reporte_geometria = None
+if 'lote_seleccionado' not in st.session_state:
+    st.session_state.lote_seleccionado = 0
+if 'traza' not in st.session_state:
+    st.session_state.traza = Traza()
+if 'perfilador' not in st.session_state:
+    st.session_state.perfilador = None
+    st.session_state.perfil_corridas = 0
+    st.session_state.ultimo_perfil = None
+
+# FUNCIÓN PARA GUARDAR UN DEM SUBIDO
+def guardar_dem_subido(archivos):
+    """Guarda los archivos subidos (DEM y .prj opcional) en <tmp>/analizador_dem con un nombre
+    derivado de su contenido, para leerlos por ventanas y cachear por archivo; devuelve la ruta del DEM.
+
+    El contenido se hashea una vez por subida (file_id del uploader), no en cada rerun, y el
+    directorio tiene el mismo presupuesto LRU que la caché de resultados."""
+    import hashlib
+    dem = next((a for a in archivos if os.path.splitext(a.name)[1].lower() in EXTENSIONES_DEM), None)
+    if dem is None:
+        return None
+    huellas = st.session_state.setdefault('huellas_dem_subido', {})
+    if dem.file_id not in huellas:
+        huellas.clear()  # solo se recuerda la subida vigente
+        huellas[dem.file_id] = hashlib.sha256(dem.getbuffer()).hexdigest()[:32]
+    base = huellas[dem.file_id]
+    limite = int(os.environ.get('ANALIZADOR_CACHE_MAX_BYTES', LIMITE_BYTES_DEFECTO)) or LIMITE_BYTES_DEFECTO
+    cache = CacheDisco(os.path.join(tempfile.gettempdir(), 'analizador_dem'), limite)
+    ruta_dem = None
+    for archivo in archivos:
+        extension = os.path.splitext(archivo.name)[1].lower()
+        ruta = cache.guardar_archivo(base + extension, archivo.getbuffer())
+        if archivo is dem:
+            ruta_dem = ruta
+    return ruta_dem
+
 
 # Sidebar
 with st.sidebar:
@@ -756,15 +129,49 @@ with st.sidebar:
     st.subheader("🎯 División de Parcela")
     n_divisiones = st.slider("Número de zonas de manejo:", min_value=16, max_value=32, value=24)
     
-    # Configuración adicional para curvas de nivel
+    # Configuración adicional para curvas de nivel (en los demás análisis, la pestaña de curvas usa los valores por defecto)
+    intervalo_curvas = PARAMETROS_CURVAS_NIVEL['intervalo_curvas']
+    resolucion_dem = PARAMETROS_CURVAS_NIVEL['resolucion_dem']
+    ruta_dem = None
     if analisis_tipo == "ANÁLISIS DE CURVAS DE NIVEL (LIDAR/DEM)":
         st.subheader("🏔️ Configuración Curvas de Nivel")
-        intervalo_curvas = st.slider("Intervalo entre curvas (metros):", 1.0, 20.0, 5.0, 1.0)
-        resolucion_dem = st.slider("Resolución DEM (metros):", 5.0, 50.0, 10.0, 5.0)
+        intervalo_curvas = st.slider("Intervalo entre curvas (metros):", 1.0, 20.0, intervalo_curvas, 1.0)
+        resolucion_dem = st.slider("Resolución DEM (metros):", 1.0, 50.0, resolucion_dem, 1.0)
+        fuente_dem = st.radio("Fuente del DEM:", ["Sintético", "Archivo (GeoTIFF / ASCII grid / LiDAR LAS o XYZ)"])
+        if fuente_dem != "Sintético":
+            archivos_dem = st.file_uploader("Subir DEM o nube de puntos (.tif, .asc, .las, .xyz y su .prj)",
+                                            type=['tif', 'tiff', 'asc', 'las', 'xyz', 'txt', 'prj'],
+                                            accept_multiple_files=True)
+            # Mosaicos del servidor: solo para administradores y dentro del directorio configurado
+            directorio_mosaicos = directorio_dem_local()
+            ruta_local_dem = ""
+            if directorio_mosaicos is not None:
+                ruta_local_dem = st.text_input("...o mosaico grande del servidor (ruta dentro del directorio de DEMs):", "")
+            if archivos_dem:
+                ruta_dem = guardar_dem_subido(archivos_dem)
+            elif ruta_local_dem.strip():
+                ruta_dem = resolver_dem_local(ruta_local_dem.strip(), directorio_mosaicos)
+                if ruta_dem is None:
+                    st.error("❌ El mosaico indicado no está disponible")
+            if ruta_dem is None:
+                st.info("Sin archivo de DEM se usa el DEM sintético")
     
     st.subheader("📤 Subir Parcela")
-    uploaded_file = st.file_uploader("Subir ZIP con shapefile o archivo KML de tu parcela", type=['zip', 'kml'])
-    
+    uploaded_file = st.file_uploader("Subir ZIP con shapefile o archivo KML/KMZ de tu parcela", type=['zip', 'kml', 'kmz'])
+
+    # Filtros para KML/KMZ con muchos placemarks
+    with st.expander("🔎 Filtrar placemarks KML/KMZ"):
+        texto_filtro_nombres = st.text_input("Nombre contiene (separar con comas):", "")
+        texto_filtro_carpetas = st.text_input("Carpeta contiene (separar con comas):", "")
+    filtro_nombres = [t for t in texto_filtro_nombres.split(',') if t.strip()]
+    filtro_carpetas = [t for t in texto_filtro_carpetas.split(',') if t.strip()]
+
+    # Simplificación de contornos con muchos vértices (p. ej. relevamientos RTK)
+    tolerancia_simplificacion = st.slider(
+        "Simplificar contorno (metros, 0 = desactivado):", 0.0, 10.0,
+        PARAMETROS_GEOMETRIA['tolerancia_simplificacion_m'], 0.5
+    )
+
     # Botón para resetear la aplicación
     if st.button("🔄 Reiniciar Análisis"):
         st.session_state.analisis_completado = False
@@ -776,2529 +183,301 @@ with st.sidebar:
         st.session_state.analisis_textura = None
         st.session_state.curvas_nivel = None
         st.session_state.dem_data = None
+        st.session_state.parametros_curvas = None
+        st.session_state.error_dem = None
+        st.session_state.reporte_geometria = None
+        st.session_state.lote_seleccionado = 0
         st.rerun()
 
-# FUNCIÓN: CLASIFICAR TEXTURA DEL SUELO - ACTUALIZADA SEGÚN IMAGEN
-def clasificar_textura_suelo(arena, limo, arcilla):
-    """Clasifica la textura del suelo según los rangos de la imagen"""
-    try:
-        # Normalizar porcentajes a 100%
-        total = arena + limo + arcilla
-        if total == 0:
-            return "NO_DETERMINADA"
-        
-        arena_norm = (arena / total) * 100
-        limo_norm = (limo / total) * 100
-        arcilla_norm = (arcilla / total) * 100
-        
-        # Clasificación según los rangos de la imagen
-        if arcilla_norm >= 35:
-            return "Arcilloso"
-        elif arcilla_norm >= 25 and arcilla_norm <= 35 and arena_norm >= 20 and arena_norm <= 45:
-            return "Franco Arcilloso"
-        elif arena_norm >= 50 and arena_norm <= 70 and arcilla_norm >= 5 and arcilla_norm <= 20:
-            return "Franco Arenoso"
-        elif arcilla_norm >= 7 and arcilla_norm <= 27 and arena_norm >= 43 and arena_norm <= 52:
-            return "Franco"
-        elif arena_norm >= 85:
-            return "Arenoso"
-        else:
-            return "Franco"  # Por defecto
-        
-    except Exception as e:
-        return "NO_DETERMINADA"
 
-# FUNCIÓN: CALCULAR PROPIEDADES FÍSICAS DEL SUELO - ACTUALIZADA SEGÚN IMAGEN
-def calcular_propiedades_fisicas_suelo(textura, materia_organica):
-    """Calcula propiedades físicas del suelo basadas en textura y MO"""
-    propiedades = {
-        'capacidad_campo': 0.0,
-        'punto_marchitez': 0.0,
-        'agua_disponible': 0.0,
-        'densidad_aparente': 0.0,
-        'porosidad': 0.0,
-        'conductividad_hidraulica': 0.0,
-        'aireacion': 0.0,
-        'drenaje': 0.0
-    }
-    
-    # Valores base según textura (mm/m) - AJUSTADOS SEGÚN IMAGEN
-    base_propiedades = {
-        'Arcilloso': {'cc': 380, 'pm': 220, 'da': 1.35, 'porosidad': 0.45, 'kh': 0.1, 'aireacion': 0.6, 'drenaje': 0.3},
-        'Franco Arcilloso': {'cc': 320, 'pm': 160, 'da': 1.25, 'porosidad': 0.53, 'kh': 0.5, 'aireacion': 0.7, 'drenaje': 0.6},
-        'Franco': {'cc': 280, 'pm': 120, 'da': 1.2, 'porosidad': 0.55, 'kh': 1.5, 'aireacion': 1.0, 'drenaje': 1.0},
-        'Franco Arenoso': {'cc': 200, 'pm': 80, 'da': 1.4, 'porosidad': 0.47, 'kh': 5.0, 'aireacion': 1.4, 'drenaje': 1.3},
-        'Arenoso': {'cc': 150, 'pm': 60, 'da': 1.5, 'porosidad': 0.43, 'kh': 10.0, 'aireacion': 1.5, 'drenaje': 1.5}
-    }
-    
-    if textura in base_propiedades:
-        base = base_propiedades[textura]
-        
-        # Ajustar por materia orgánica (cada 1% de MO mejora propiedades)
-        factor_mo = 1.0 + (materia_organica * 0.05)
-        
-        propiedades['capacidad_campo'] = base['cc'] * factor_mo
-        propiedades['punto_marchitez'] = base['pm'] * factor_mo
-        propiedades['agua_disponible'] = (base['cc'] - base['pm']) * factor_mo
-        propiedades['densidad_aparente'] = base['da'] / factor_mo
-        propiedades['porosidad'] = min(0.65, base['porosidad'] * factor_mo)
-        propiedades['conductividad_hidraulica'] = base['kh'] * factor_mo
-        propiedades['aireacion'] = min(1.0, base['aireacion'] * factor_mo)
-        propiedades['drenaje'] = min(2.0, base['drenaje'] * factor_mo)
-    
-    return propiedades
+# PARÁMETROS DE LA CACHÉ DE RESULTADOS (COMPARTIDA ENTRE SESIONES)
+PARAMETROS_CACHE = {
+    'ttl_segundos': 3600,
+    'max_entradas': 64
+}
 
-# FUNCIÓN: EVALUAR ADECUACIÓN DE TEXTURA - ACTUALIZADA
-def evaluar_adecuacion_textura(textura_actual, cultivo):
-    """Evalúa qué tan adecuada es la textura para el cultivo específico"""
-    textura_optima = TEXTURA_SUELO_OPTIMA[cultivo]['textura_optima']
-    
-    if textura_actual == textura_optima:
-        return "ÓPTIMA", 1.0
-    elif textura_actual == "NO_DETERMINADA":
-        return "NO_DETERMINADA", 0
-    
-    # Matriz de compatibilidad basada en propiedades similares
-    compatibilidad = {
-        'Franco': {'Franco Arcilloso': 0.8, 'Franco Arenoso': 0.7, 'Arcilloso': 0.4, 'Arenoso': 0.6},
-        'Franco Arcilloso': {'Franco': 0.8, 'Franco Arenoso': 0.6, 'Arcilloso': 0.9, 'Arenoso': 0.4},
-        'Franco Arenoso': {'Franco': 0.7, 'Franco Arcilloso': 0.6, 'Arcilloso': 0.5, 'Arenoso': 0.8},
-        'Arcilloso': {'Franco': 0.4, 'Franco Arcilloso': 0.9, 'Franco Arenoso': 0.5, 'Arenoso': 0.2},
-        'Arenoso': {'Franco': 0.6, 'Franco Arcilloso': 0.4, 'Franco Arenoso': 0.8, 'Arcilloso': 0.2}
-    }
-    
-    if textura_actual in compatibilidad and textura_optima in compatibilidad[textura_actual]:
-        puntaje = compatibilidad[textura_actual][textura_optima]
-        if puntaje >= 0.8:
-            return "MUY ADECUADA", puntaje
-        elif puntaje >= 0.6:
-            return "ADECUADA", puntaje
-        elif puntaje >= 0.4:
-            return "MODERADA", puntaje
-        else:
-            return "LIMITANTE", puntaje
-    
-    return "LIMITANTE", 0.3
 
-# FUNCIÓN MEJORADA PARA CALCULAR SUPERFICIE - VERSIÓN CORREGIDA
-def calcular_superficie(gdf):
-    """Calcula superficie en hectáreas con manejo robusto de CRS - VERSIÓN CORREGIDA"""
-    try:
-        if gdf is None or gdf.empty or gdf.geometry.isnull().all():
-            return 0.0
-            
-        # Verificar si el CRS es geográfico (grados)
-        if gdf.crs and gdf.crs.is_geographic:
-            # Convertir a un CRS proyectado para cálculo de área precisa
-            try:
-                # Usar UTM adecuado (aquí se usa un CRS común para zonas agrícolas)
-                gdf_proj = gdf.to_crs('EPSG:32630')  # WGS 84 / UTM zone 30N (Europa, África)
-                area_m2 = gdf_proj.geometry.area.sum()  # SUMAR todas las áreas
-            except:
-                # Fallback: conversión aproximada (1 grado ≈ 111km en ecuador)
-                area_m2 = gdf.geometry.area.sum() * 111000 * 111000
-        else:
-            # Asumir que ya está en metros
-            area_m2 = gdf.geometry.area.sum()  # SUMAR todas las áreas
-            
-        return area_m2 / 10000  # Convertir a hectáreas
-        
-    except Exception as e:
-        # Fallback simple
-        try:
-            return gdf.geometry.area.sum() / 10000
-        except:
-            return 0.0  # Valor por defecto
+# FUNCIONES CON CACHÉ PARA LOS MOTORES DE ANÁLISIS
+# La clave es la huella de la geometría más los parámetros; los argumentos con prefijo
+# "_" no se usan para calcular el hash (Streamlit los excluye), así no se serializa el gdf.
+# Debajo de st.cache_data (memoria del proceso) está la caché en disco compartida entre réplicas.
+@st.cache_data(ttl=PARAMETROS_CACHE['ttl_segundos'], max_entries=PARAMETROS_CACHE['max_entradas'], show_spinner=False)
+def _zonas_cacheadas(huella, n_zonas, _gdf):
+    return recordar(clave_cache('zonas', huella, n_zonas), 'parquet',
+                    lambda: dividir_parcela_en_zonas(_gdf, n_zonas))
 
-# FUNCIÓN MEJORADA PARA CREAR MAPA INTERACTIVO CON ESRI SATELITE
-def crear_mapa_interactivo_esri(gdf, titulo, columna_valor=None, analisis_tipo=None, nutriente=None):
-    """Crea mapa interactivo con base ESRI Satélite - MEJORADO"""
-    
-    # Obtener centro y bounds del GeoDataFrame
-    centroid = gdf.geometry.centroid.iloc[0]
-    bounds = gdf.total_bounds
-    
-    # Crear mapa centrado con ESRI Satélite por defecto
-    m = folium.Map(
-        location=[centroid.y, centroid.x],
-        zoom_start=15,
-        tiles='https://server.arcgisonline.com/ArcGIS/rest/services/World_Imagery/MapServer/tile/{z}/{y}/{x}',
-        attr='Esri',
-        name='Esri Satélite'
-    )
-    
-    # Añadir otras bases como opciones
-    folium.TileLayer(
-        tiles='https://server.arcgisonline.com/ArcGIS/rest/services/World_Street_Map/MapServer/tile/{z}/{y}/{x}',
-        attr='Esri',
-        name='Esri Calles',
-        overlay=False
-    ).add_to(m)
-    
-    folium.TileLayer(
-        tiles='OpenStreetMap',
-        name='OpenStreetMap',
-        overlay=False
-    ).add_to(m)
-    
-    # Añadir capa de relieve
-    folium.TileLayer(
-        tiles='https://server.arcgisonline.com/ArcGIS/rest/services/World_Shaded_Relief/MapServer/tile/{z}/{y}/{x}',
-        attr='Esri',
-        name='Relieve',
-        overlay=False
-    ).add_to(m)
 
-    # CONFIGURAR RANGOS MEJORADOS
-    if columna_valor and analisis_tipo:
-        if analisis_tipo == "FERTILIDAD ACTUAL":
-            vmin, vmax = 0, 1
-            colores = PALETAS_GEE['FERTILIDAD']
-            unidad = "Índice"
-        elif analisis_tipo == "ANÁLISIS DE TEXTURA":
-            # Mapa categórico para texturas
-            colores_textura = {
-                'Franco': '#c7eae5',
-                'Franco Arcilloso': '#5ab4ac',
-                'Franco Arenoso': '#f6e8c3',
-                'Arenoso': '#d8b365',
-                'Arcilloso': '#01665e',
-                'NO_DETERMINADA': '#999999'
-            }
-            unidad = "Textura"
-        elif analisis_tipo == "ANÁLISIS NDWI SUELO":
-            vmin, vmax = -1, 1
-            colores = PALETAS_GEE['NDWI_SUELO']
-            unidad = "Índice"
-        elif analisis_tipo == "ANÁLISIS DE CURVAS DE NIVEL (LIDAR/DEM)":
-            # Para curvas de nivel, usar paleta de elevación
-            vmin, vmax = gdf[columna_valor].min(), gdf[columna_valor].max()
-            colores = PALETAS_GEE['ELEVACION']
-            unidad = "m"
-        else:
-            # RANGOS MÁS REALISTAS PARA RECOMENDACIONES
-            if nutriente == "NITRÓGENO":
-                vmin, vmax = 0, 250
-                colores = PALETAS_GEE['NITROGENO']
-                unidad = "kg/ha N"
-            elif nutriente == "FÓSFORO":
-                vmin, vmax = 0, 120
-                colores = PALETAS_GEE['FOSFORO']
-                unidad = "kg/ha P₂O₅"
-            else:  # POTASIO
-                vmin, vmax = 0, 200
-                colores = PALETAS_GEE['POTASIO']
-                unidad = "kg/ha K₂O"
-        
-        # Función para obtener color
-        def obtener_color(valor, vmin, vmax, colores):
-            if vmax == vmin:
-                return colores[len(colores)//2]
-            valor_norm = (valor - vmin) / (vmax - vmin)
-            valor_norm = max(0, min(1, valor_norm))
-            idx = int(valor_norm * (len(colores) - 1))
-            return colores[idx]
-        
-        # Añadir cada polígono con estilo mejorado
-        for idx, row in gdf.iterrows():
-            if analisis_tipo == "ANÁLISIS DE TEXTURA":
-                # Manejo especial para textura (valores categóricos)
-                textura = row[columna_valor]
-                color = colores_textura.get(textura, '#999999')
-                valor_display = textura
-            else:
-                # Manejo para valores numéricos
-                valor = row[columna_valor]
-                color = obtener_color(valor, vmin, vmax, colores)
-                if analisis_tipo in ["FERTILIDAD ACTUAL", "ANÁLISIS NDWI SUELO"]:
-                    valor_display = f"{valor:.3f}"
-                elif analisis_tipo == "ANÁLISIS DE CURVAS DE NIVEL (LIDAR/DEM)":
-                    valor_display = f"{valor:.1f}"
-                else:
-                    valor_display = f"{valor:.1f}"
-            
-            # Popup más informativo
-            if analisis_tipo == "FERTILIDAD ACTUAL":
-                popup_text = f"""
-                <div style="font-family: Arial; font-size: 12px;">
-                    <h4>Zona {row['id_zona']}</h4>
-                    <b>Índice Fertilidad:</b> {valor_display}<br>
-                    <b>Área:</b> {row.get('area_ha', 0):.2f} ha<br>
-                    <b>Categoría:</b> {row.get('categoria', 'N/A')}<br>
-                    <b>Prioridad:</b> {row.get('prioridad', 'N/A')}<br>
-                    <hr>
-                    <b>N:</b> {row.get('nitrogeno', 0):.1f} kg/ha<br>
-                    <b>P:</b> {row.get('fosforo', 0):.1f} kg/ha<br>
-                    <b>K:</b> {row.get('potasio', 0):.1f} kg/ha<br>
-                    <b>MO:</b> {row.get('materia_organica', 0):.1f}%<br>
-                    <b>NDVI:</b> {row.get('ndvi', 0):.3f}
-                </div>
-                """
-            elif analisis_tipo == "ANÁLISIS DE TEXTURA":
-                popup_text = f"""
-                <div style="font-family: Arial; font-size: 12px;">
-                    <h4>Zona {row['id_zona']}</h4>
-                    <b>Textura:</b> {valor_display}<br>
-                    <b>Adecuación:</b> {row.get('adecuacion_textura', 0):.1%}<br>
-                    <b>Área:</b> {row.get('area_ha', 0):.2f} ha<br>
-                    <hr>
-                    <b>Arena:</b> {row.get('arena', 0):.1f}%<br>
-                    <b>Limo:</b> {row.get('limo', 0):.1f}%<br>
-                    <b>Arcilla:</b> {row.get('arcilla', 0):.1f}%<br>
-                    <b>Capacidad Campo:</b> {row.get('capacidad_campo', 0):.1f} mm/m<br>
-                    <b>Agua Disponible:</b> {row.get('agua_disponible', 0):.1f} mm/m
-                </div>
-                """
-            elif analisis_tipo == "ANÁLISIS NDWI SUELO":
-                popup_text = f"""
-                <div style="font-family: Arial; font-size: 12px;">
-                    <h4>Zona {row['id_zona']}</h4>
-                    <b>NDWI Suelo:</b> {valor_display}<br>
-                    <b>Estado Humedad:</b> {row.get('estado_humedad_suelo', 'N/A')}<br>
-                    <b>Riesgo Sequía:</b> {row.get('riesgo_sequia', 'N/A')}<br>
-                    <b>Recomendación Riego:</b> {row.get('recomendacion_riego', 'N/A')}<br>
-                    <hr>
-                    <b>Área:</b> {row.get('area_ha', 0):.2f} ha<br>
-                    <b>Déficit Humedad:</b> {row.get('deficit_humedad', 0):.3f}<br>
-                    <b>Humedad:</b> {row.get('humedad', 0):.1%}<br>
-                    <b>NDVI:</b> {row.get('ndvi', 0):.3f}
-                </div>
-                """
-            elif analisis_tipo == "ANÁLISIS DE CURVAS DE NIVEL (LIDAR/DEM)":
-                popup_text = f"""
-                <div style="font-family: Arial; font-size: 12px;">
-                    <h4>Curva {row['id_curva']}</h4>
-                    <b>Elevación:</b> {valor_display} m<br>
-                    <b>Longitud:</b> {row.get('longitud_m', 0):.1f} m<br>
-                    <hr>
-                    <b>Tipo:</b> Curva de nivel<br>
-                    <b>Intervalo:</b> {PARAMETROS_CURVAS_NIVEL['intervalo_curvas']} m
-                </div>
-                """
-            else:
-                popup_text = f"""
-                <div style="font-family: Arial; font-size: 12px;">
-                    <h4>Zona {row['id_zona']}</h4>
-                    <b>Recomendación {nutriente}:</b> {valor_display} {unidad}<br>
-                    <b>Área:</b> {row.get('area_ha', 0):.2f} ha<br>
-                    <b>Categoría Fertilidad:</b> {row.get('categoria', 'N/A')}<br>
-                    <b>Prioridad:</b> {row.get('prioridad', 'N/A')}<br>
-                    <hr>
-                    <b>N Actual:</b> {row.get('nitrogeno', 0):.1f} kg/ha<br>
-                    <b>P Actual:</b> {row.get('fosforo', 0):.1f} kg/ha<br>
-                    <b>K Actual:</b> {row.get('potasio', 0):.1f} kg/ha<br>
-                    <b>Déficit:</b> {row.get('deficit_npk', 0):.1f} kg/ha
-                </div>
-                """
-            
-            # Estilo mejorado para los polígonos
-            folium.GeoJson(
-                row.geometry.__geo_interface__,
-                style_function=lambda x, color=color: {
-                    'fillColor': color,
-                    'color': 'black',
-                    'weight': 2,
-                    'fillOpacity': 0.7,
-                    'opacity': 0.9
-                },
-                popup=folium.Popup(popup_text, max_width=300),
-                tooltip=f"Zona {row['id_zona']}: {valor_display}"
-            ).add_to(m)
-            
-            # Marcador con número de zona mejorado
-            if analisis_tipo != "ANÁLISIS DE CURVAS DE NIVEL (LIDAR/DEM)":
-                centroid = row.geometry.centroid
-                folium.Marker(
-                    [centroid.y, centroid.x],
-                    icon=folium.DivIcon(
-                        html=f'''
-                        <div style="
-                            background-color: white; 
-                            border: 2px solid black; 
-                            border-radius: 50%; 
-                            width: 28px; 
-                            height: 28px; 
-                            display: flex; 
-                            align-items: center; 
-                            justify-content: center; 
-                            font-weight: bold; 
-                            font-size: 11px;
-                            color: black;
-                        ">{row["id_zona"]}</div>
-                        '''
-                    ),
-                    tooltip=f"Zona {row['id_zona']} - Click para detalles"
-                ).add_to(m)
-    else:
-        # Mapa simple del polígono original
-        for idx, row in gdf.iterrows():
-            folium.GeoJson(
-                row.geometry.__geo_interface__,
-                style_function=lambda x: {
-                    'fillColor': '#1f77b4',
-                    'color': '#2ca02c',
-                    'weight': 3,
-                    'fillOpacity': 0.5,
-                    'opacity': 0.8
-                },
-                popup=folium.Popup(
-                    f"<b>Polígono {idx + 1}</b><br>Área: {calcular_superficie(gdf.iloc[[idx]]):.2f} ha", 
-                    max_width=300
-                ),
-            ).add_to(m)
-    
-    # Ajustar bounds del mapa
-    m.fit_bounds([[bounds[1], bounds[0]], [bounds[3], bounds[2]]])
-    
-    # Añadir controles mejorados
-    folium.LayerControl().add_to(m)
-    plugins.MeasureControl(position='bottomleft', primary_length_unit='meters').add_to(m)
-    plugins.MiniMap(toggle_display=True, position='bottomright').add_to(m)
-    plugins.Fullscreen(position='topright').add_to(m)
-    
-    # Añadir leyenda mejorada
-    if columna_valor and analisis_tipo:
-        legend_html = f'''
-        <div style="
-            position: fixed; 
-            top: 10px; 
-            right: 10px; 
-            width: 250px; 
-            height: auto; 
-            background-color: white; 
-            border: 2px solid grey; 
-            z-index: 9999; 
-            font-size: 12px; 
-            padding: 10px; 
-            border-radius: 5px;
-            font-family: Arial;
-        ">
-            <h4 style="margin:0 0 10px 0; text-align:center; color: #333;">{titulo}</h4>
-            <div style="margin-bottom: 10px;">
-                <strong>Escala de Valores ({unidad}):</strong>
-            </div>
-        '''
-        
-        if analisis_tipo == "FERTILIDAD ACTUAL":
-            steps = 8
-            for i in range(steps):
-                value = i / (steps - 1)
-                color_idx = int((i / (steps - 1)) * (len(PALETAS_GEE['FERTILIDAD']) - 1))
-                color = PALETAS_GEE['FERTILIDAD'][color_idx]
-                categoria = ["Muy Baja", "Baja", "Media-Baja", "Media", "Media-Alta", "Alta", "Muy Alta"][min(i, 6)] if i < 7 else "Óptima"
-                legend_html += f'<div style="margin:2px 0;"><span style="background:{color}; width:20px; height:15px; display:inline-block; margin-right:5px; border:1px solid #000;"></span> {value:.1f} ({categoria})</div>'
-        elif analisis_tipo == "ANÁLISIS DE TEXTURA":
-            # Leyenda categórica para texturas
-            colores_textura = {
-                'Franco': '#c7eae5',
-                'Franco Arcilloso': '#5ab4ac',
-                'Franco Arenoso': '#f6e8c3',
-                'Arenoso': '#d8b365',
-                'Arcilloso': '#01665e'
-            }
-            for textura, color in colores_textura.items():
-                legend_html += f'<div style="margin:2px 0;"><span style="background:{color}; width:20px; height:15px; display:inline-block; margin-right:5px; border:1px solid #000;"></span> {textura}</div>'
-        elif analisis_tipo == "ANÁLISIS NDWI SUELO":
-            steps = 7
-            values = [-1.0, -0.5, -0.1, 0.0, 0.1, 0.2, 1.0]
-            labels = ["Muy Seco", "Seco", "Moderado", "Óptimo", "Húmedo", "Muy Húmedo", "Saturado"]
-            for i in range(steps):
-                value = values[i]
-                color_idx = int((i / (steps - 1)) * (len(PALETAS_GEE['NDWI_SUELO']) - 1))
-                color = PALETAS_GEE['NDWI_SUELO'][color_idx]
-                legend_html += f'<div style="margin:2px 0;"><span style="background:{color}; width:20px; height:15px; display:inline-block; margin-right:5px; border:1px solid #000;"></span> {value:.1f} ({labels[i]})</div>'
-        elif analisis_tipo == "ANÁLISIS DE CURVAS DE NIVEL (LIDAR/DEM)":
-            steps = 6
-            for i in range(steps):
-                value = vmin + (i / (steps - 1)) * (vmax - vmin)
-                color_idx = int((i / (steps - 1)) * (len(colores) - 1))
-                color = colores[color_idx]
-                legend_html += f'<div style="margin:2px 0;"><span style="background:{color}; width:20px; height:15px; display:inline-block; margin-right:5px; border:1px solid #000;"></span> {value:.0f} m</div>'
-        else:
-            steps = 6
-            for i in range(steps):
-                value = vmin + (i / (steps - 1)) * (vmax - vmin)
-                color_idx = int((i / (steps - 1)) * (len(colores) - 1))
-                color = colores[color_idx]
-                intensidad = ["Muy Baja", "Baja", "Media", "Alta", "Muy Alta", "Máxima"][i]
-                legend_html += f'<div style="margin:2px 0;"><span style="background:{color}; width:20px; height:15px; display:inline-block; margin-right:5px; border:1px solid #000;"></span> {value:.0f} ({intensidad})</div>'
-        
-        legend_html += '''
-            <div style="margin-top: 10px; font-size: 10px; color: #666;">
-                💡 Click en las zonas para detalles
-            </div>
-        </div>
-        '''
-        m.get_root().html.add_child(folium.Element(legend_html))
-    
-    return m
+@st.cache_data(ttl=PARAMETROS_CACHE['ttl_segundos'], max_entries=PARAMETROS_CACHE['max_entradas'], show_spinner=False)
+def _textura_cacheada(huella, cultivo, mes_analisis, _gdf):
+    return recordar(clave_cache('textura', huella, cultivo, mes_analisis), 'parquet',
+                    lambda: analizar_textura_suelo_vectorizado(_gdf, cultivo, mes_analisis))
 
-# FUNCIÓN PARA CREAR MAPA VISUALIZADOR DE PARCELA
-def crear_mapa_visualizador_parcela(gdf):
-    """Crea mapa interactivo para visualizar la parcela original con ESRI Satélite"""
-    
-    # Obtener centro y bounds
-    centroid = gdf.geometry.centroid.iloc[0]
-    bounds = gdf.total_bounds
-    
-    # Crear mapa con ESRI Satélite por defecto
-    m = folium.Map(
-        location=[centroid.y, centroid.x],
-        zoom_start=14,
-        tiles='https://server.arcgisonline.com/ArcGIS/rest/services/World_Imagery/MapServer/tile/{z}/{y}/{x}',
-        attr='Esri',
-        name='Esri Satélite'
-    )
-    
-    # Añadir otras bases
-    folium.TileLayer(
-        tiles='https://server.arcgisonline.com/ArcGIS/rest/services/World_Street_Map/MapServer/tile/{z}/{y}/{x}',
-        attr='Esri',
-        name='Esri Calles',
-        overlay=False
-    ).add_to(m)
-    
-    folium.TileLayer(
-        tiles='OpenStreetMap',
-        name='OpenStreetMap',
-        overlay=False
-    ).add_to(m)
-    
-    # Añadir polígonos de la parcela
-    for idx, row in gdf.iterrows():
-        area_ha = calcular_superficie(gdf.iloc[[idx]])
-        
-        folium.GeoJson(
-            row.geometry.__geo_interface__,
-            style_function=lambda x: {
-                'fillColor': '#1f77b4',
-                'color': '#2ca02c',
-                'weight': 3,
-                'fillOpacity': 0.4,
-                'opacity': 0.8
-            },
-            popup=folium.Popup(
-                f"<b>Parcela {idx + 1}</b><br>"
-                f"<b>Área:</b> {area_ha:.2f} ha<br>"
-                f"<b>Coordenadas:</b> {centroid.y:.4f}, {centroid.x:.4f}",
-                max_width=300
-            ),
-            tooltip=f"Parcela {idx + 1} - {area_ha:.2f} ha"
-        ).add_to(m)
-    
-    # Ajustar bounds
-    m.fit_bounds([[bounds[1], bounds[0]], [bounds[3], bounds[2]]])
-    
-    # Añadir controles
-    folium.LayerControl().add_to(m)
-    plugins.MeasureControl(position='bottomleft').add_to(m)
-    plugins.MiniMap(toggle_display=True).add_to(m)
-    plugins.Fullscreen(position='topright').add_to(m)
-    
-    # Añadir leyenda
-    legend_html = '''
-    <div style="position: fixed; 
-                top: 10px; right: 10px; width: 200px; height: auto; 
-                background-color: white; border:2px solid grey; z-index:9999; 
-                font-size:14px; padding: 10px">
-    <p><b>🌱 Visualizador de Parcela</b></p>
-    <p><b>Leyenda:</b></p>
-    <p><i style="background:#1f77b4; width:20px; height:20px; display:inline-block; margin-right:5px; opacity:0.4;"></i> Área de la parcela</p>
-    <p><i style="background:#2ca02c; width:20px; height:20px; display:inline-block; margin_right:5px; opacity:0.8;"></i> Borde de la parcela</p>
-    </div>
-    '''
-    m.get_root().html.add_child(folium.Element(legend_html))
-    
-    return m
 
-# FUNCIÓN PARA CREAR MAPA ESTÁTICO
-def crear_mapa_estatico(gdf, titulo, columna_valor=None, analisis_tipo=None, nutriente=None):
-    """Crea mapa estático con matplotlib"""
-    try:
-        fig, ax = plt.subplots(1, 1, figsize=(12, 8))
-        
-        # CONFIGURACIÓN UNIFICADA CON EL MAPA INTERACTIVO
-        if columna_valor and analisis_tipo:
-            if analisis_tipo == "FERTILIDAD ACTUAL":
-                cmap = LinearSegmentedColormap.from_list('fertilidad_gee', PALETAS_GEE['FERTILIDAD'])
-                vmin, vmax = 0, 1
-            elif analisis_tipo == "ANÁLISIS DE TEXTURA":
-                # Mapa categórico para texturas
-                colores_textura = {
-                    'Franco': '#c7eae5',
-                    'Franco Arcilloso': '#5ab4ac',
-                    'Franco Arenoso': '#f6e8c3',
-                    'Arenoso': '#d8b365',
-                    'Arcilloso': '#01665e',
-                    'NO_DETERMINADA': '#999999'
-                }
-            elif analisis_tipo == "ANÁLISIS NDWI SUELO":
-                cmap = LinearSegmentedColormap.from_list('ndwi_suelo_gee', PALETAS_GEE['NDWI_SUELO'])
-                vmin, vmax = -1, 1
-            elif analisis_tipo == "ANÁLISIS DE CURVAS DE NIVEL (LIDAR/DEM)":
-                cmap = LinearSegmentedColormap.from_list('elevacion_gee', PALETAS_GEE['ELEVACION'])
-                vmin, vmax = gdf[columna_valor].min(), gdf[columna_valor].max()
-            else:
-                # USAR EXACTAMENTE LOS MISMOS RANGOS QUE EL MAPA INTERACTIVO
-                if nutriente == "NITRÓGENO":
-                    cmap = LinearSegmentedColormap.from_list('nitrogeno_gee', PALETAS_GEE['NITROGENO'])
-                    vmin, vmax = 0, 250
-                elif nutriente == "FÓSFORO":
-                    cmap = LinearSegmentedColormap.from_list('fosforo_gee', PALETAS_GEE['FOSFORO'])
-                    vmin, vmax = 0, 120
-                else:  # POTASIO
-                    cmap = LinearSegmentedColormap.from_list('potasio_gee', PALETAS_GEE['POTASIO'])
-                    vmin, vmax = 0, 200
-            
-            # Plotear cada polígono con color según valor
-            for idx, row in gdf.iterrows():
-                if analisis_tipo == "ANÁLISIS DE TEXTURA":
-                    # Manejo especial para textura
-                    textura = row[columna_valor]
-                    color = colores_textura.get(textura, '#999999')
-                else:
-                    valor = row[columna_valor]
-                    valor_norm = (valor - vmin) / (vmax - vmin)
-                    valor_norm = max(0, min(1, valor_norm))
-                    color = cmap(valor_norm)
-                
-                # Plot del polígono
-                gdf.iloc[[idx]].plot(ax=ax, color=color, edgecolor='black', linewidth=1)
-                
-                # Etiqueta con valor
-                centroid = row.geometry.centroid
-                if analisis_tipo == "FERTILIDAD ACTUAL":
-                    texto_valor = f"{row[columna_valor]:.3f}"
-                elif analisis_tipo == "ANÁLISIS DE TEXTURA":
-                    texto_valor = row[columna_valor]
-                elif analisis_tipo == "ANÁLISIS NDWI SUELO":
-                    texto_valor = f"{row[columna_valor]:.3f}"
-                elif analisis_tipo == "ANÁLISIS DE CURVAS DE NIVEL (LIDAR/DEM)":
-                    texto_valor = f"{row[columna_valor]:.0f}"
-                else:
-                    texto_valor = f"{row[columna_valor]:.0f} kg"
-                
-                ax.annotate(f"Z{row['id_zona']}\n{texto_valor}", 
-                           (centroid.x, centroid.y), 
-                           xytext=(3, 3), textcoords="offset points", 
-                           fontsize=6, color='black', weight='bold',
-                           bbox=dict(boxstyle="round,pad=0.2", facecolor='white', alpha=0.8),
-                           ha='center', va='center')
-        else:
-            # Mapa simple del polígono original
-            gdf.plot(ax=ax, color='lightblue', edgecolor='black', linewidth=2, alpha=0.7)
-        
-        # Configuración del mapa
-        ax.set_title(f'🗺️ {titulo}', fontsize=14, fontweight='bold', pad=15)
-        ax.set_xlabel('Longitud')
-        ax.set_ylabel('Latitud')
-        ax.grid(True, alpha=0.3)
-        
-        # BARRA DE COLORES UNIFICADA
-        if columna_valor and analisis_tipo and analisis_tipo != "ANÁLISIS DE TEXTURA":
-            sm = plt.cm.ScalarMappable(cmap=cmap, norm=plt.Normalize(vmin=vmin, vmax=vmax))
-            sm.set_array([])
-            cbar = plt.colorbar(sm, ax=ax, shrink=0.8)
-            
-            # Etiquetas de barra unificadas
-            if analisis_tipo == "FERTILIDAD ACTUAL":
-                cbar.set_label('Índice NPK Actual (0-1)', fontsize=10)
-                cbar.set_ticks([0, 0.2, 0.4, 0.6, 0.8, 1.0])
-                cbar.set_ticklabels(['0.0 (Muy Baja)', '0.2', '0.4 (Media)', '0.6', '0.8', '1.0 (Muy Alta)'])
-            elif analisis_tipo == "ANÁLISIS NDWI SUELO":
-                cbar.set_label('NDWI Suelo (-1 a 1)', fontsize=10)
-                cbar.set_ticks([-1, -0.5, -0.1, 0, 0.1, 0.2, 1])
-                cbar.set_ticklabels(['-1 (Muy Seco)', '-0.5', '-0.1', '0', '0.1', '0.2', '1 (Saturado)'])
-            elif analisis_tipo == "ANÁLISIS DE CURVAS DE NIVEL (LIDAR/DEM)":
-                cbar.set_label('Elevación (metros)', fontsize=10)
-                cbar.set_ticks([vmin, (vmin+vmax)/2, vmax])
-                cbar.set_ticklabels([f'{vmin:.0f} m', f'{(vmin+vmax)/2:.0f} m', f'{vmax:.0f} m'])
-            else:
-                cbar.set_label(f'Recomendación {nutriente} (kg/ha)', fontsize=10)
-                if nutriente == "NITRÓGENO":
-                    cbar.set_ticks([0, 50, 100, 150, 200, 250])
-                    cbar.set_ticklabels(['0', '50', '100', '150', '200', '250 kg/ha'])
-                elif nutriente == "FÓSFORO":
-                    cbar.set_ticks([0, 24, 48, 72, 96, 120])
-                    cbar.set_ticklabels(['0', '24', '48', '72', '96', '120 kg/ha'])
-                else:  # POTASIO
-                    cbar.set_ticks([0, 40, 80, 120, 160, 200])
-                    cbar.set_ticklabels(['0', '40', '80', '120', '160', '200 kg/ha'])
-        
-        plt.tight_layout()
-        
-        # Convertir a imagen
-        buf = io.BytesIO()
-        plt.savefig(buf, format='png', dpi=150, bbox_inches='tight')
-        buf.seek(0)
-        plt.close()
-        
-        return buf
-        
-    except Exception as e:
-        st.error(f"Error creando mapa estático: {str(e)}")
-        return None
+@st.cache_data(ttl=PARAMETROS_CACHE['ttl_segundos'], max_entries=PARAMETROS_CACHE['max_entradas'], show_spinner=False)
+def _ndwi_cacheado(huella, cultivo, mes_analisis, _gdf):
+    return recordar(clave_cache('ndwi', huella, cultivo, mes_analisis), 'parquet',
+                    lambda: analizar_ndwi_suelo_vectorizado(_gdf, cultivo, mes_analisis))
 
-# FUNCIÓN PARA MOSTRAR RECOMENDACIONES AGROECOLÓGICAS Y DE TEXTURA
-def mostrar_recomendaciones_agroecologicas(cultivo, categoria, area_ha, analisis_tipo, nutriente=None, textura_data=None):
-    """Muestra recomendaciones agroecológicas específicas"""
-    
-    st.markdown("### 🌿 RECOMENDACIONES ESPECÍFICAS")
-    
-    if analisis_tipo == "ANÁLISIS DE TEXTURA" and textura_data:
-        textura_predominante = textura_data.get('textura_predominante', 'Franco')
-        adecuacion_promedio = textura_data.get('adecuacion_promedio', 0.5)
-        
-        # Mostrar información detallada de la textura según imagen
-        st.markdown(f"#### 🏗️ **{textura_predominante.upper()}**")
-        
-        if textura_predominante in RECOMENDACIONES_TEXTURA:
-            info_textura = RECOMENDACIONES_TEXTURA[textura_predominante]
-            
-            col1, col2, col3 = st.columns(3)
-            
-            with col1:
-                st.markdown("**✅ PROPIEDADES FÍSICAS**")
-                for prop in info_textura['propiedades']:
-                    st.markdown(f"• {prop}")
-            
-            with col2:
-                st.markdown("**⚠️ LIMITANTES**")
-                for lim in info_textura['limitantes']:
-                    st.markdown(f"• {lim}")
-            
-            with col3:
-                st.markdown("**🛠️ MANEJO RECOMENDADO**")
-                for man in info_textura['manejo']:
-                    st.markdown(f"• {man}")
-            
-            # Evaluación de adecuación
-            st.markdown("#### 📊 EVALUACIÓN DE ADECUACIÓN")
-            if adecuacion_promedio >= 0.8:
-                st.success(f"**ADECUACIÓN: ÓPTIMA** ({adecuacion_promedio:.1%}) - Textura ideal para {cultivo.replace('_', ' ').title()}")
-            elif adecuacion_promedio >= 0.6:
-                st.warning(f"**ADECUACIÓN: MODERADA** ({adecuacion_promedio:.1%}) - Requiere ajustes en manejo")
-            else:
-                st.error(f"**ADECUACIÓN: LIMITANTE** ({adecuacion_promedio:.1%}) - Necesita mejoras significativas")
-    else:
-        # Enfoque tradicional basado en fertilidad
-        if categoria in ["MUY BAJA", "BAJA"]:
-            enfoque = "🚨 **ENFOQUE: RECUPERACIÓN Y REGENERACIÓN**"
-            intensidad = "Alta"
-        elif categoria in ["MEDIA"]:
-            enfoque = "✅ **ENFOQUE: MANTENIMIENTO Y MEJORA**"
-            intensidad = "Media"
-        else:
-            enfoque = "🌟 **ENFOQUE: CONSERVACIÓN Y OPTIMIZACIÓN**"
-            intensidad = "Baja"
-        
-        st.success(f"{enfoque} - Intensidad: {intensidad}")
-    
-    # Obtener recomendaciones específicas del cultivo
-    recomendaciones = RECOMENDACIONES_AGROECOLOGICAS.get(cultivo, {})
-    
-    # Mostrar por categorías
-    st.markdown("#### 🌱 PRÁCTICAS AGROECOLÓGICAS")
-    
-    col1, col2 = st.columns(2)
-    
-    with col1:
-        with st.expander("**COBERTURAS VIVAS**", expanded=True):
-            for rec in recomendaciones.get('COBERTURAS_VIVAS', []):
-                st.markdown(f"• {rec}")
-    
-    with col2:
-        with st.expander("**ABONOS VERDES**", expanded=True):
-            for rec in recomendaciones.get('ABONOS_VERDES', []):
-                st.markdown(f"• {rec}")
-    
-    col3, col4 = st.columns(2)
-    
-    with col3:
-        with st.expander("**BIOFERTILIZANTES**", expanded=True):
-            for rec in recomendaciones.get('BIOFERTILIZANTES', []):
-                st.markdown(f"• {rec}")
-    
-    with col4:
-        with st.expander("**MANEJO ECOLÓGICO**", expanded=True):
-            for rec in recomendaciones.get('MANEJO_ECOLOGICO', []):
-                st.markdown(f"• {rec}")
-    
-    with st.expander("**ASOCIACIONES Y DIVERSIFICACIÓN**", expanded=True):
-        for rec in recomendaciones.get('ASOCIACIONES', []):
-            st.markdown(f"• {rec}")
-    
-    # PLAN DE IMPLEMENTACIÓN
-    st.markdown("### 📅 PLAN DE IMPLEMENTACIÓN")
-    
-    timeline_col1, timeline_col2, timeline_col3 = st.columns(3)
-    
-    with timeline_col1:
-        st.markdown("**🏁 INMEDIATO (0-15 días)**")
-        st.markdown("""
-        • Preparación del terreno
-        • Siembra de abonos verdes
-        • Aplicación de biofertilizantes
-        • Instalación de trampas
-        """)
-    
-    with timeline_col2:
-        st.markdown("**📈 CORTO PLAZO (1-3 meses)**")
-        st.markdown("""
-        • Establecimiento coberturas
-        • Monitoreo inicial
-        • Ajustes de manejo
-        • Podas de formación
-        """)
-    
-    with timeline_col3:
-        st.markdown("**🎯 MEDIANO PLAZO (3-12 meses)**")
-        st.markdown("""
-        • Evaluación de resultados
-        • Diversificación
-        • Optimización del sistema
-        • Réplica en otras zonas
-        """)
-
-# FUNCIÓN MEJORADA PARA DIVIDIR PARCELA EN ZONAS
-def dividir_parcela_en_zonas(gdf, n_zonas):
-    """Divide la parcela en zonas de manejo con manejo robusto de errores"""
-    try:
-        if len(gdf) == 0:
-            return gdf
-        
-        # Usar el primer polígono como parcela principal
-        parcela_principal = gdf.iloc[0].geometry
-        
-        # Verificar que la geometría sea válida
-        if not parcela_principal.is_valid:
-            parcela_principal = parcela_principal.buffer(0)  # Reparar geometría
-        
-        bounds = parcela_principal.bounds
-        if len(bounds) < 4:
-            st.error("No se pueden obtener los límites de la parcela")
-            return gdf
-            
-        minx, miny, maxx, maxy = bounds
-        
-        # Verificar que los bounds sean válidos
-        if minx >= maxx or miny >= maxy:
-            st.error("Límites de parcela inválidos")
-            return gdf
-        
-        sub_poligonos = []
-        
-        # Cuadrícula regular
-        n_cols = math.ceil(math.sqrt(n_zonas))
-        n_rows = math.ceil(n_zonas / n_cols)
-        
-        width = (maxx - minx) / n_cols
-        height = (maxy - miny) / n_rows
-        
-        # Asegurar un tamaño mínimo de celda
-        if width < 0.0001 or height < 0.0001:  # ~11m en grados decimales
-            st.warning("Las celdas son muy pequeñas, ajustando número de zonas")
-            n_zonas = min(n_zonas, 16)
-            n_cols = math.ceil(math.sqrt(n_zonas))
-            n_rows = math.ceil(n_zonas / n_cols)
-            width = (maxx - minx) / n_cols
-            height = (maxy - miny) / n_rows
-        
-        for i in range(n_rows):
-            for j in range(n_cols):
-                if len(sub_poligonos) >= n_zonas:
-                    break
-                    
-                cell_minx = minx + (j * width)
-                cell_maxx = minx + ((j + 1) * width)
-                cell_miny = miny + (i * height)
-                cell_maxy = miny + ((i + 1) * height)
-                
-                # Crear celda con verificación de validez
-                try:
-                    cell_poly = Polygon([
-                        (cell_minx, cell_miny),
-                        (cell_maxx, cell_miny),
-                        (cell_maxx, cell_maxy),
-                        (cell_minx, cell_maxy)
-                    ])
-                    
-                    if cell_poly.is_valid:
-                        intersection = parcela_principal.intersection(cell_poly)
-                        if not intersection.is_empty and intersection.area > 0:
-                            # Simplificar geometría si es necesario
-                            if intersection.geom_type == 'MultiPolygon':
-                                # Tomar el polígono más grande
-                                largest = max(intersection.geoms, key=lambda p: p.area)
-                                sub_poligonos.append(largest)
-                            else:
-                                sub_poligonos.append(intersection)
-                except Exception as e:
-                    continue  # Saltar celdas problemáticas
-        
-        if sub_poligonos:
-            nuevo_gdf = gpd.GeoDataFrame({
-                'id_zona': range(1, len(sub_poligonos) + 1),
-                'geometry': sub_poligonos
-            }, crs=gdf.crs)
-            return nuevo_gdf
-        else:
-            st.warning("No se pudieron crear zonas, retornando parcela original")
-            return gdf
-            
-    except Exception as e:
-        st.error(f"Error dividiendo parcela: {str(e)}")
-        return gdf
-
-# FUNCIÓN: ANÁLISIS DE TEXTURA DEL SUELO
-def analizar_textura_suelo(gdf, cultivo, mes_analisis):
-    """Realiza análisis completo de textura del suelo"""
-    
-    params_textura = TEXTURA_SUELO_OPTIMA[cultivo]
-    zonas_gdf = gdf.copy()
-    
-    # Inicializar columnas para textura
-    zonas_gdf['area_ha'] = 0.0
-    zonas_gdf['arena'] = 0.0
-    zonas_gdf['limo'] = 0.0
-    zonas_gdf['arcilla'] = 0.0
-    zonas_gdf['textura_suelo'] = "NO_DETERMINADA"
-    zonas_gdf['adecuacion_textura'] = 0.0
-    zonas_gdf['categoria_adecuacion'] = "NO_DETERMINADA"
-    zonas_gdf['capacidad_campo'] = 0.0
-    zonas_gdf['punto_marchitez'] = 0.0
-    zonas_gdf['agua_disponible'] = 0.0
-    zonas_gdf['densidad_aparente'] = 0.0
-    zonas_gdf['porosidad'] = 0.0
-    zonas_gdf['conductividad_hidraulica'] = 0.0
-    zonas_gdf['aireacion'] = 0.0
-    zonas_gdf['drenaje'] = 0.0
-    
-    for idx, row in zonas_gdf.iterrows():
-        try:
-            # Calcular área
-            area_ha = calcular_superficie(zonas_gdf.iloc[[idx]])
-            
-            # Obtener centroide
-            if hasattr(row.geometry, 'centroid'):
-                centroid = row.geometry.centroid
-            else:
-                centroid = row.geometry.representative_point()
-            
-            # Semilla para reproducibilidad
-            seed_value = abs(hash(f"{centroid.x:.6f}_{centroid.y:.6f}_{cultivo}_textura")) % (2**32)
-            rng = np.random.RandomState(seed_value)
-            
-            # Normalizar coordenadas para variabilidad espacial
-            lat_norm = (centroid.y + 90) / 180 if centroid.y else 0.5
-            lon_norm = (centroid.x + 180) / 360 if centroid.x else 0.5
-            
-            # SIMULAR COMPOSICIÓN GRANULOMÉTRICA SEGÚN IMAGEN
-            variabilidad_local = 0.15 + 0.7 * (lat_norm * lon_norm)
-            
-            # Valores óptimos para el cultivo
-            arena_optima = params_textura['arena_optima']
-            limo_optima = params_textura['limo_optima']
-            arcilla_optima = params_textura['arcilla_optima']
-            
-            # Simular composición basada en textura óptima del cultivo
-            base_arena = arena_optima
-            base_limo = limo_optima
-            base_arcilla = arcilla_optima
-            
-            # Ajustar según variabilidad local
-            arena = max(5, min(95, rng.normal(
-                base_arena * (0.8 + 0.4 * variabilidad_local),
-                base_arena * 0.15
-            )))
-            
-            limo = max(5, min(95, rng.normal(
-                base_limo * (0.7 + 0.6 * variabilidad_local),
-                base_limo * 0.2
-            )))
-            
-            arcilla = max(5, min(95, rng.normal(
-                base_arcilla * (0.75 + 0.5 * variabilidad_local),
-                base_arcilla * 0.15
-            )))
-            
-            # Normalizar a 100%
-            total = arena + limo + arcilla
-            arena = (arena / total) * 100
-            limo = (limo / total) * 100
-            arcilla = (arcilla / total) * 100
-            
-            # Clasificar textura según imagen
-            textura = clasificar_textura_suelo(arena, limo, arcilla)
-            
-            # Evaluar adecuación para el cultivo
-            categoria_adecuacion, puntaje_adecuacion = evaluar_adecuacion_textura(textura, cultivo)
-            
-            # Simular materia orgánica para propiedades físicas
-            materia_organica = max(1.0, min(8.0, rng.normal(3.0, 1.0)))
-            
-            # Calcular propiedades físicas
-            propiedades_fisicas = calcular_propiedades_fisicas_suelo(textura, materia_organica)
-            
-            # Asignar valores al GeoDataFrame
-            zonas_gdf.loc[idx, 'area_ha'] = area_ha
-            zonas_gdf.loc[idx, 'arena'] = arena
-            zonas_gdf.loc[idx, 'limo'] = limo
-            zonas_gdf.loc[idx, 'arcilla'] = arcilla
-            zonas_gdf.loc[idx, 'textura_suelo'] = textura
-            zonas_gdf.loc[idx, 'adecuacion_textura'] = puntaje_adecuacion
-            zonas_gdf.loc[idx, 'categoria_adecuacion'] = categoria_adecuacion
-            zonas_gdf.loc[idx, 'capacidad_campo'] = propiedades_fisicas['capacidad_campo']
-            zonas_gdf.loc[idx, 'punto_marchitez'] = propiedades_fisicas['punto_marchitez']
-            zonas_gdf.loc[idx, 'agua_disponible'] = propiedades_fisicas['agua_disponible']
-            zonas_gdf.loc[idx, 'densidad_aparente'] = propiedades_fisicas['densidad_aparente']
-            zonas_gdf.loc[idx, 'porosidad'] = propiedades_fisicas['porosidad']
-            zonas_gdf.loc[idx, 'conductividad_hidraulica'] = propiedades_fisicas['conductividad_hidraulica']
-            zonas_gdf.loc[idx, 'aireacion'] = propiedades_fisicas['aireacion']
-            zonas_gdf.loc[idx, 'drenaje'] = propiedades_fisicas['drenaje']
-            
-        except Exception as e:
-            # Valores por defecto en caso de error
-            zonas_gdf.loc[idx, 'area_ha'] = calcular_superficie(zonas_gdf.iloc[[idx]])
-            zonas_gdf.loc[idx, 'arena'] = params_textura['arena_optima']
-            zonas_gdf.loc[idx, 'limo'] = params_textura['limo_optima']
-            zonas_gdf.loc[idx, 'arcilla'] = params_textura['arcilla_optima']
-            zonas_gdf.loc[idx, 'textura_suelo'] = params_textura['textura_optima']
-            zonas_gdf.loc[idx, 'adecuacion_textura'] = 1.0
-            zonas_gdf.loc[idx, 'categoria_adecuacion'] = "ÓPTIMA"
-            
-            # Propiedades físicas por defecto
-            propiedades_default = calcular_propiedades_fisicas_suelo(params_textura['textura_optima'], 3.0)
-            for prop, valor in propiedades_default.items():
-                zonas_gdf.loc[idx, prop] = valor
-    
-    return zonas_gdf
 
-# FUNCIÓN ESPECÍFICA PARA ANÁLISIS DE NDWI DEL SUELO
-def analizar_ndwi_suelo(gdf, cultivo, mes_analisis):
-    """Realiza análisis específico del NDWI del suelo (contenido de agua en el suelo)"""
-    
-    params_ndwi = PARAMETROS_NDWI_SUELO[cultivo]
-    zonas_gdf = gdf.copy()
-    
-    # Inicializar columnas específicas para NDWI del suelo
-    zonas_gdf['ndwi_suelo'] = 0.0
-    zonas_gdf['estado_humedad_suelo'] = "MEDIO"
-    zonas_gdf['deficit_humedad'] = 0.0
-    zonas_gdf['recomendacion_riego'] = "NINGUNA"
-    zonas_gdf['riesgo_sequia'] = "BAJO"
-    
-    factor_ndwi_mes = FACTORES_NDWI_MES[mes_analisis]
-    
-    for idx, row in zonas_gdf.iterrows():
-        try:
-            # Calcular área
-            area_ha = calcular_superficie(zonas_gdf.iloc[[idx]])
-            
-            # Obtener centroide
-            if hasattr(row.geometry, 'centroid'):
-                centroid = row.geometry.centroid
-            else:
-                centroid = row.geometry.representative_point()
-            
-            # Semilla para reproducibilidad
-            seed_value = abs(hash(f"{centroid.x:.6f}_{centroid.y:.6f}_{cultivo}_ndwi")) % (2**32)
-            rng = np.random.RandomState(seed_value)
-            
-            # Normalizar coordenadas
-            lat_norm = (centroid.y + 90) / 180 if centroid.y else 0.5
-            lon_norm = (centroid.x + 180) / 360 if centroid.x else 0.5
-            
-            # Variabilidad espacial
-            variabilidad_local = 0.3 + 0.5 * (lat_norm * lon_norm)
-            
-            # CÁLCULO DETALLADO DE NDWI DEL SUELO
-            # Usar fórmula específica para suelo: (NIR - SWIR) / (NIR + SWIR)
-            # Donde SWIR es sensible al contenido de agua en el suelo
-            
-            # Valor base según cultivo
-            base_ndwi = params_ndwi['ndwi_optimo_suelo']
-            
-            # Simular variaciones basadas en factores:
-            # 1. Topografía (pendiente afecta retención de agua)
-            variacion_topografia = rng.normal(0, 0.1) * (1 - variabilidad_local)
-            
-            # 2. Textura del suelo (si está disponible)
-            # Para simulación, usar variabilidad local
-            variacion_textura = variabilidad_local * 0.15
-            
-            # 3. Profundidad efectiva del suelo
-            variacion_profundidad = rng.random() * 0.1
-            
-            # Calcular NDWI del suelo
-            ndwi_suelo = (
-                base_ndwi + 
-                variacion_topografia + 
-                variacion_textura + 
-                variacion_profundidad
-            )
-            
-            # Aplicar factor estacional
-            ndwi_suelo *= factor_ndwi_mes
-            
-            # Agregar variabilidad aleatoria
-            ndwi_suelo += rng.normal(0, 0.03)
-            
-            # Limitar valores
-            ndwi_suelo = max(-1.0, min(1.0, ndwi_suelo))
-            
-            # Calcular déficit de humedad (cuánto falta para el óptimo)
-            deficit_humedad = max(0, params_ndwi['ndwi_optimo_suelo'] - ndwi_suelo)
-            
-            # Clasificar estado de humedad
-            if ndwi_suelo >= params_ndwi['ndwi_humedo_suelo']:
-                estado_humedad = "MUY HÚMEDO"
-                recomendacion_riego = "REDUCIR RIEGO"
-                riesgo_sequia = "NULO"
-            elif ndwi_suelo >= params_ndwi['ndwi_optimo_suelo']:
-                estado_humedad = "ÓPTIMO"
-                recomendacion_riego = "MANTENER"
-                riesgo_sequia = "BAJO"
-            elif ndwi_suelo >= params_ndwi['umbral_sequia']:
-                estado_humedad = "MODERADO"
-                recomendacion_riego = "RIEGO MODERADO"
-                riesgo_sequia = "MODERADO"
-            elif ndwi_suelo >= params_ndwi['ndwi_seco_suelo']:
-                estado_humedad = "SECO"
-                recomendacion_riego = "RIEGO URGENTE"
-                riesgo_sequia = "ALTO"
-            else:
-                estado_humedad = "MUY SECO"
-                recomendacion_riego = "RIEGO INTENSIVO"
-                riesgo_sequia = "CRÍTICO"
-            
-            # Asignar valores
-            zonas_gdf.loc[idx, 'area_ha'] = area_ha
-            zonas_gdf.loc[idx, 'ndwi_suelo'] = ndwi_suelo
-            zonas_gdf.loc[idx, 'estado_humedad_suelo'] = estado_humedad
-            zonas_gdf.loc[idx, 'deficit_humedad'] = deficit_humedad
-            zonas_gdf.loc[idx, 'recomendacion_riego'] = recomendacion_riego
-            zonas_gdf.loc[idx, 'riesgo_sequia'] = riesgo_sequia
-            
-        except Exception as e:
-            # Valores por defecto
-            zonas_gdf.loc[idx, 'area_ha'] = calcular_superficie(zonas_gdf.iloc[[idx]])
-            zonas_gdf.loc[idx, 'ndwi_suelo'] = params_ndwi['ndwi_optimo_suelo']
-            zonas_gdf.loc[idx, 'estado_humedad_suelo'] = "ÓPTIMO"
-            zonas_gdf.loc[idx, 'deficit_humedad'] = 0.0
-            zonas_gdf.loc[idx, 'recomendacion_riego'] = "MANTENER"
-            zonas_gdf.loc[idx, 'riesgo_sequia'] = "BAJO"
-    
-    return zonas_gdf
+@st.cache_data(ttl=PARAMETROS_CACHE['ttl_segundos'], max_entries=PARAMETROS_CACHE['max_entradas'], show_spinner=False)
+def _indices_cacheados(huella, cultivo, mes_analisis, analisis_tipo, nutriente, _gdf):
+    return recordar(clave_cache('indices', huella, cultivo, mes_analisis, analisis_tipo, nutriente), 'parquet',
+                    lambda: calcular_indices_gee_vectorizado(_gdf, cultivo, mes_analisis, analisis_tipo, nutriente))
 
-# FUNCIÓN CORREGIDA PARA ANÁLISIS DE FERTILIDAD CON CÁLCULOS NPK PRECISOS Y NDWI DEL SUELO
-def calcular_indices_gee(gdf, cultivo, mes_analisis, analisis_tipo, nutriente):
-    """Calcula índices GEE mejorados con cálculos NPK más precisos y NDWI del suelo"""
-    
-    params = PARAMETROS_CULTIVOS[cultivo]
-    params_ndwi = PARAMETROS_NDWI_SUELO[cultivo]
-    zonas_gdf = gdf.copy()
-    
-    # FACTORES ESTACIONALES MEJORADOS
-    factor_mes = FACTORES_MES[mes_analisis]
-    factor_n_mes = FACTORES_N_MES[mes_analisis]
-    factor_p_mes = FACTORES_P_MES[mes_analisis]
-    factor_k_mes = FACTORES_K_MES[mes_analisis]
-    factor_ndwi_mes = FACTORES_NDWI_MES[mes_analisis]
-    
-    # Inicializar columnas adicionales (AGREGAR NDWI_SUELO)
-    zonas_gdf['area_ha'] = 0.0
-    zonas_gdf['nitrogeno'] = 0.0
-    zonas_gdf['fosforo'] = 0.0
-    zonas_gdf['potasio'] = 0.0
-    zonas_gdf['materia_organica'] = 0.0
-    zonas_gdf['humedad'] = 0.0
-    zonas_gdf['ph'] = 0.0
-    zonas_gdf['conductividad'] = 0.0
-    zonas_gdf['ndvi'] = 0.0
-    zonas_gdf['ndwi_suelo'] = 0.0  # NUEVO: NDWI para el suelo
-    zonas_gdf['estado_humedad_suelo'] = "MEDIO"  # NUEVO: Estado de humedad
-    zonas_gdf['indice_fertilidad'] = 0.0
-    zonas_gdf['categoria'] = "MEDIA"
-    zonas_gdf['recomendacion_npk'] = 0.0
-    zonas_gdf['deficit_npk'] = 0.0
-    zonas_gdf['prioridad'] = "MEDIA"
-    
-    for idx, row in zonas_gdf.iterrows():
-        try:
-            # Calcular área
-            area_ha = calcular_superficie(zonas_gdf.iloc[[idx]])
-            
-            # Obtener centroide
-            if hasattr(row.geometry, 'centroid'):
-                centroid = row.geometry.centroid
-            else:
-                centroid = row.geometry.representative_point()
-            
-            # Semilla más estable para reproducibilidad
-            seed_value = abs(hash(f"{centroid.x:.6f}_{centroid.y:.6f}_{cultivo}")) % (2**32)
-            rng = np.random.RandomState(seed_value)
-            
-            # Normalizar coordenadas para variabilidad espacial más realista
-            lat_norm = (centroid.y + 90) / 180 if centroid.y else 0.5
-            lon_norm = (centroid.x + 180) / 360 if centroid.x else 0.5
-            
-            # SIMULACIÓN MÁS REALISTA DE PARÁMETROS DEL SUELO
-            n_optimo = params['NITROGENO']['optimo']
-            p_optimo = params['FOSFORO']['optimo']
-            k_optimo = params['POTASIO']['optimo']
-            
-            # Variabilidad espacial más pronunciada
-            variabilidad_local = 0.2 + 0.6 * (lat_norm * lon_norm)  # Mayor correlación espacial
-            
-            # Simular valores con distribución normal más realista (niveles más bajos para generar déficit)
-            nitrogeno = max(0, rng.normal(
-                n_optimo * (0.6 + 0.3 * variabilidad_local),  # REDUCIDO: 0.6 en lugar de 0.8
-                n_optimo * 0.2
-            ))
-            
-            fosforo = max(0, rng.normal(
-                p_optimo * (0.5 + 0.4 * variabilidad_local),  # REDUCIDO: 0.5 en lugar de 0.7
-                p_optimo * 0.25
-            ))
-            
-            potasio = max(0, rng.normal(
-                k_optimo * (0.55 + 0.35 * variabilidad_local),  # REDUCIDO: 0.55 en lugar de 0.75
-                k_optimo * 0.22
-            ))
-            
-            # Aplicar factores estacionales mejorados
-            nitrogeno *= factor_n_mes * (0.8 + 0.3 * rng.random())
-            fosforo *= factor_p_mes * (0.8 + 0.3 * rng.random())
-            potasio *= factor_k_mes * (0.8 + 0.3 * rng.random())
-            
-            # Parámetros adicionales del suelo simulados
-            materia_organica = max(1.0, min(8.0, rng.normal(
-                params['MATERIA_ORGANICA_OPTIMA'] * 0.7,  # REDUCIDO
-                1.0
-            )))
-            
-            humedad = max(0.1, min(0.8, rng.normal(
-                params['HUMEDAD_OPTIMA'],
-                0.1
-            )))
-            
-            ph = max(4.0, min(8.0, rng.normal(
-                params['pH_OPTIMO'],
-                0.5
-            )))
-            
-            conductividad = max(0.1, min(3.0, rng.normal(
-                params['CONDUCTIVIDAD_OPTIMA'],
-                0.3
-            )))
-            
-            # NDVI con correlación con fertilidad
-            base_ndvi = 0.3 + 0.5 * variabilidad_local
-            ndvi = max(0.1, min(0.95, rng.normal(base_ndvi, 0.1)))
-            
-            # CÁLCULO DE NDWI DEL SUELO - NUEVO
-            # NDWI para suelo se calcula con bandas SWIR (Short Wave Infrared)
-            # Fórmula: (SWIR1 - SWIR2) / (SWIR1 + SWIR2) para suelo
-            # O para Sentinel-2: (B8A - B11) / (B8A + B11)
-            
-            # Base para NDWI del suelo basada en humedad y textura
-            base_ndwi_suelo = params_ndwi['ndwi_optimo_suelo']
-            
-            # Ajustar por humedad del suelo
-            ajuste_humedad = (humedad - 0.3) * 0.5  # Ajuste basado en humedad
-            
-            # Ajustar por materia orgánica (la MO retiene agua)
-            ajuste_mo = materia_organica * 0.02
-            
-            # Ajustar por textura (asumimos que tenemos información de textura)
-            # Para simulación, usamos variabilidad espacial
-            ajuste_textura = variabilidad_local * 0.1
-            
-            # Cálculo del NDWI del suelo
-            ndwi_suelo = base_ndwi_suelo + ajuste_humedad + ajuste_mo + ajuste_textura
-            
-            # Aplicar factor estacional
-            ndwi_suelo *= factor_ndwi_mes
-            
-            # Agregar variabilidad aleatoria
-            ndwi_suelo += rng.normal(0, 0.05)
-            
-            # Limitar valores entre -1 y 1 (rango válido para NDWI)
-            ndwi_suelo = max(-1.0, min(1.0, ndwi_suelo))
-            
-            # Clasificar estado de humedad del suelo basado en NDWI
-            if ndwi_suelo >= params_ndwi['ndwi_humedo_suelo']:
-                estado_humedad = "MUY HÚMEDO"
-            elif ndwi_suelo >= params_ndwi['ndwi_optimo_suelo']:
-                estado_humedad = "ÓPTIMO"
-            elif ndwi_suelo >= params_ndwi['umbral_sequia']:
-                estado_humedad = "MODERADO"
-            elif ndwi_suelo >= params_ndwi['ndwi_seco_suelo']:
-                estado_humedad = "SECO"
-            else:
-                estado_humedad = "MUY SECO"
-            
-            # CÁLCULO MEJORADO DE ÍNDICE DE FERTILIDAD (INCLUIR NDWI DEL SUELO)
-            n_norm = max(0, min(1, nitrogeno / (n_optimo * 1.5)))  # Normalizado al 150% del óptimo
-            p_norm = max(0, min(1, fosforo / (p_optimo * 1.5)))
-            k_norm = max(0, min(1, potasio / (k_optimo * 1.5)))
-            mo_norm = max(0, min(1, materia_organica / 8.0))
-            ph_norm = max(0, min(1, 1 - abs(ph - params['pH_OPTIMO']) / 2.0))  # Óptimo en centro
-            
-            # Normalizar NDWI del suelo para índice de fertilidad (valores entre 0 y 1)
-            ndwi_suelo_norm = (ndwi_suelo + 1) / 2  # Convertir de [-1,1] a [0,1]
-            
-            # Índice compuesto mejorado - AHORA INCLUYE NDWI DEL SUELO
-            indice_fertilidad = (
-                n_norm * 0.22 +  # Reducido de 0.25
-                p_norm * 0.18 +  # Reducido de 0.20
-                k_norm * 0.18 +  # Reducido de 0.20
-                mo_norm * 0.15 +
-                ph_norm * 0.10 +
-                ndvi * 0.08 +    # Reducido de 0.10
-                ndwi_suelo_norm * 0.09  # NUEVO: Peso del NDWI del suelo
-            ) * factor_mes
-            
-            indice_fertilidad = max(0, min(1, indice_fertilidad))
-            
-            # CATEGORIZACIÓN MEJORADA
-            if indice_fertilidad >= 0.85:
-                categoria = "EXCELENTE"
-                prioridad = "BAJA"
-            elif indice_fertilidad >= 0.70:
-                categoria = "MUY ALTA"
-                prioridad = "MEDIA-BAJA"
-            elif indice_fertilidad >= 0.55:
-                categoria = "ALTA"
-                prioridad = "MEDIA"
-            elif indice_fertilidad >= 0.40:
-                categoria = "MEDIA"
-                prioridad = "MEDIA-ALTA"
-            elif indice_fertilidad >= 0.25:
-                categoria = "BAJA"
-                prioridad = "ALTA"
-            else:
-                categoria = "MUY BAJA"
-                prioridad = "URGENTE"
-            
-            # CÁLCULO CORREGIDO DE RECOMENDACIONES NPK - SIEMPRE CALCULAR
-            if nutriente == "NITRÓGENO":
-                # Cálculo realista de recomendación de Nitrógeno
-                deficit_nitrogeno = max(0, n_optimo - nitrogeno)
-                
-                # Si no hay déficit, aplicar dosis de mantenimiento (30% del óptimo)
-                if deficit_nitrogeno <= 0:
-                    deficit_nitrogeno = n_optimo * 0.3
-                
-                # Factores de ajuste más precisos:
-                factor_eficiencia = 1.4  # 40% de pérdidas por lixiviación/volatilización
-                factor_crecimiento = 1.2  # 20% adicional para crecimiento óptimo
-                factor_materia_organica = max(0.7, 1.0 - (materia_organica / 15.0))  # MO aporta N
-                factor_ndvi = 1.0 + (0.5 - ndvi) * 0.4  # NDVI bajo = más necesidad
-                
-                recomendacion = (deficit_nitrogeno * factor_eficiencia * factor_crecimiento * 
-                               factor_materia_organica * factor_ndvi)
-                
-                # Límites realistas para nitrógeno
-                recomendacion = min(recomendacion, 250)  # Máximo 250 kg/ha
-                recomendacion = max(20, recomendacion)   # Mínimo 20 kg/ha
-                
-                deficit = max(0, n_optimo - nitrogeno)
-                
-            elif nutriente == "FÓSFORO":
-                # Cálculo realista de recomendación de Fósforo
-                deficit_fosforo = max(0, p_optimo - fosforo)
-                
-                # Si no hay déficit, aplicar dosis de mantenimiento (20% del óptimo)
-                if deficit_fosforo <= 0:
-                    deficit_fosforo = p_optimo * 0.2
-                
-                # Factores de ajuste para fósforo
-                factor_eficiencia = 1.6  # Alta fijación en el suelo
-                factor_ph = 1.0
-                if ph < 5.5 or ph > 7.5:  # Fuera del rango óptimo de disponibilidad
-                    factor_ph = 1.3  # 30% más si el pH no es óptimo
-                factor_materia_organica = 1.1  # MO ayuda a la disponibilidad de P
-                
-                recomendacion = (deficit_fosforo * factor_eficiencia * 
-                               factor_ph * factor_materia_organica)
-                
-                # Límites realistas para fósforo
-                recomendacion = min(recomendacion, 120)  # Máximo 120 kg/ha P2O5
-                recomendacion = max(10, recomendacion)   # Mínimo 10 kg/ha
-                
-                deficit = max(0, p_optimo - fosforo)
-                
-            else:  # POTASIO
-                # Cálculo realista de recomendación de Potasio
-                deficit_potasio = max(0, k_optimo - potasio)
-                
-                # Si no hay déficit, aplicar dosis de mantenimiento (15% del óptimo)
-                if deficit_potasio <= 0:
-                    deficit_potasio = k_optimo * 0.15
-                
-                # Factores de ajuste para potasio
-                factor_eficiencia = 1.3  # Moderada lixiviación
-                factor_textura = 1.0
-                if materia_organica < 2.0:  # Suelos arenosos
-                    factor_textura = 1.2  # 20% más en suelos ligeros
-                factor_rendimiento = 1.0 + (0.5 - ndvi) * 0.3  # NDVI bajo = más necesidad
-                
-                recomendacion = (deficit_potasio * factor_eficiencia * 
-                               factor_textura * factor_rendimiento)
-                
-                # Límites realistas para potasio
-                recomendacion = min(recomendacion, 200)  # Máximo 200 kg/ha K2O
-                recomendacion = max(15, recomendacion)   # Mínimo 15 kg/ha
-                
-                deficit = max(0, k_optimo - potasio)
-            
-            # Ajuste final basado en la categoría de fertilidad
-            if categoria in ["MUY BAJA", "BAJA"]:
-                recomendacion *= 1.3  # 30% más en suelos de baja fertilidad
-            elif categoria in ["ALTA", "MUY ALTA", "EXCELENTE"]:
-                recomendacion *= 0.8  # 20% menos en suelos fértiles
-            
-            # Asignar valores al GeoDataFrame
-            zonas_gdf.loc[idx, 'area_ha'] = area_ha
-            zonas_gdf.loc[idx, 'nitrogeno'] = nitrogeno
-            zonas_gdf.loc[idx, 'fosforo'] = fosforo
-            zonas_gdf.loc[idx, 'potasio'] = potasio
-            zonas_gdf.loc[idx, 'materia_organica'] = materia_organica
-            zonas_gdf.loc[idx, 'humedad'] = humedad
-            zonas_gdf.loc[idx, 'ph'] = ph
-            zonas_gdf.loc[idx, 'conductividad'] = conductividad
-            zonas_gdf.loc[idx, 'ndvi'] = ndvi
-            zonas_gdf.loc[idx, 'ndwi_suelo'] = ndwi_suelo  # NUEVO
-            zonas_gdf.loc[idx, 'estado_humedad_suelo'] = estado_humedad  # NUEVO
-            zonas_gdf.loc[idx, 'indice_fertilidad'] = indice_fertilidad
-            zonas_gdf.loc[idx, 'categoria'] = categoria
-            zonas_gdf.loc[idx, 'recomendacion_npk'] = recomendacion
-            zonas_gdf.loc[idx, 'deficit_npk'] = deficit
-            zonas_gdf.loc[idx, 'prioridad'] = prioridad
-            
-        except Exception as e:
-            # Valores por defecto mejorados en caso de error (AGREGAR NDWI_SUELO)
-            zonas_gdf.loc[idx, 'area_ha'] = calcular_superficie(zonas_gdf.iloc[[idx]])
-            zonas_gdf.loc[idx, 'nitrogeno'] = params['NITROGENO']['optimo'] * 0.7
-            zonas_gdf.loc[idx, 'fosforo'] = params['FOSFORO']['optimo'] * 0.6
-            zonas_gdf.loc[idx, 'potasio'] = params['POTASIO']['optimo'] * 0.65
-            zonas_gdf.loc[idx, 'materia_organica'] = params['MATERIA_ORGANICA_OPTIMA'] * 0.7
-            zonas_gdf.loc[idx, 'humedad'] = params['HUMEDAD_OPTIMA']
-            zonas_gdf.loc[idx, 'ph'] = params['pH_OPTIMO']
-            zonas_gdf.loc[idx, 'conductividad'] = params['CONDUCTIVIDAD_OPTIMA']
-            zonas_gdf.loc[idx, 'ndvi'] = 0.5
-            zonas_gdf.loc[idx, 'ndwi_suelo'] = params_ndwi['ndwi_optimo_suelo']  # NUEVO
-            zonas_gdf.loc[idx, 'estado_humedad_suelo'] = "ÓPTIMO"  # NUEVO
-            zonas_gdf.loc[idx, 'indice_fertilidad'] = 0.4
-            zonas_gdf.loc[idx, 'categoria'] = "MEDIA"
-            zonas_gdf.loc[idx, 'recomendacion_npk'] = 50  # Valor por defecto
-            zonas_gdf.loc[idx, 'deficit_npk'] = 20  # Valor por defecto
-            zonas_gdf.loc[idx, 'prioridad'] = "MEDIA"
-    
-    return zonas_gdf
 
-# FUNCIÓN PARA GENERAR DEM SINTÉTICO BASADO EN LIDAR
-def generar_dem_sintetico(gdf, resolucion=10.0):
-    """Genera un DEM sintético basado en datos LiDAR simulados"""
-    
-    # Obtener bounds del polígono
-    bounds = gdf.total_bounds
-    minx, miny, maxx, maxy = bounds
-    
-    # Convertir resolución de metros a grados (aproximadamente)
-    # 1 grado ≈ 111,111 metros en el ecuador
-    resolucion_grados = resolucion / 111111
-    
-    # Crear malla de puntos
-    x = np.arange(minx, maxx, resolucion_grados)
-    y = np.arange(miny, maxy, resolucion_grados)
-    
-    if len(x) < 2 or len(y) < 2:
-        # Si el área es muy pequeña, ajustar resolución
-        resolucion_grados = (maxx - minx) / 10
-        x = np.linspace(minx, maxx, 10)
-        y = np.linspace(miny, maxy, 10)
-    
-    X, Y = np.meshgrid(x, y)
-    
-    # Generar elevaciones sintéticas con patrones realistas
-    # 1. Elevación base
-    elevacion_base = np.random.uniform(100, 300)
-    
-    # 2. Pendiente general (simulando una ladera)
-    slope_x = np.random.uniform(-0.001, 0.001)  # Pendiente en dirección X
-    slope_y = np.random.uniform(-0.001, 0.001)  # Pendiente en dirección Y
-    
-    # 3. Relieve variado (colinas, valles)
-    relief = np.zeros_like(X)
-    
-    # Añadir algunas colinas/valles aleatorios
-    n_hills = np.random.randint(2, 5)
-    for _ in range(n_hills):
-        hill_center_x = np.random.uniform(minx, maxx)
-        hill_center_y = np.random.uniform(miny, maxy)
-        hill_radius = np.random.uniform(0.001, 0.005)
-        hill_height = np.random.uniform(10, 50)
-        
-        # Distancia al centro de la colina
-        dist = np.sqrt((X - hill_center_x)**2 + (Y - hill_center_y)**2)
-        
-        # Función de colina (Gaussiana)
-        relief += hill_height * np.exp(-(dist**2) / (2 * hill_radius**2))
-    
-    # 4. Ruido de alta frecuencia (detalle de LiDAR)
-    noise = np.random.randn(*X.shape) * 2  # Ruido de ±2 metros
-    
-    # Combinar todos los componentes
-    Z = elevacion_base + slope_x * (X - minx) + slope_y * (Y - miny) + relief + noise
-    
-    # Asegurar que no haya valores negativos
-    Z = np.maximum(Z, 50)
-    
-    return X, Y, Z, bounds
+@st.cache_data(ttl=PARAMETROS_CACHE['ttl_segundos'], max_entries=PARAMETROS_CACHE['max_entradas'], show_spinner=False)
+def _curvas_base_cacheadas(huella, resolucion, huella_dem, _gdf, _ruta_dem):
+    # Un DEM por parcela, resolución y fuente (huella_dem: None para el sintético), con sus
+    # curvas cada intervalo_base metros: los demás intervalos se filtran de ellas. Curvas en
+    # Parquet, la georreferencia de la grilla en JSON y la elevación (float32) y la máscara
+    # de la parcela en .npy
+    def calcular():
+        gdf_curvas, modelo = calcular_curvas_base(_gdf, resolucion, _ruta_dem)
+        return gdf_curvas, modelo.grilla.a_dict(), modelo.elevacion, modelo.mascara
+    clave = clave_cache('curvas_base', VERSION_DEM, huella, resolucion, PARAMETROS_CURVAS_NIVEL['intervalo_base'],
+                        huella_dem)
+    gdf_curvas, grilla, elevacion, mascara = recordar_partes(clave, ['parquet', 'json', 'npy', 'npy'], calcular)
+    return gdf_curvas, ModeloDEM(GrillaDEM.desde_dict(grilla), elevacion, mascara)
 
-# FUNCIÓN PARA CALCULAR CURVAS DE NIVEL - VERSIÓN SIMPLIFICADA Y SEGURA
-def calcular_curvas_nivel(gdf, intervalo=5.0, resolucion=10.0):
-    """Calcula curvas de nivel a partir de DEM sintético - VERSIÓN SIMPLIFICADA"""
-    
-    try:
-        # Generar DEM sintético
-        X, Y, Z, bounds = generar_dem_sintetico(gdf, resolucion)
-        
-        # Flatten arrays para interpolación
-        points = np.column_stack([X.flatten(), Y.flatten()])
-        values = Z.flatten()
-        
-        # Crear grid para interpolación
-        grid_x, grid_y = np.mgrid[bounds[0]:bounds[2]:resolucion/111111, bounds[1]:bounds[3]:resolucion/111111]
-        
-        # Interpolar a grid regular
-        grid_z = griddata(points, values, (grid_x, grid_y), method='cubic')
-        
-        # Calcular niveles para curvas
-        z_min, z_max = np.nanmin(grid_z), np.nanmax(grid_z)
-        niveles = np.arange(np.floor(z_min/intervalo)*intervalo, np.ceil(z_max/intervalo)*intervalo, intervalo)
-        
-        # Calcular pendiente (gradiente)
-        dy, dx = np.gradient(grid_z, resolucion, resolucion)
-        pendiente = np.sqrt(dx**2 + dy**2) * 100  # En porcentaje
-        
-        # Calcular aspecto (orientación)
-        aspecto = np.arctan2(dy, dx) * 180 / np.pi
-        aspecto = np.mod(aspecto + 360, 360)  # Ajustar a 0-360 grados
-        
-        # Extraer polígono principal
-        poligono_principal = gdf.iloc[0].geometry
-        
-        # Crear lista para almacenar curvas
-        curvas_lineas = []
-        
-        # MÉTODO SIMPLIFICADO: Crear curvas sintéticas basadas en el relieve
-        # Generar curvas sintéticas basadas en el DEM
-        from scipy.ndimage import gaussian_filter
-        
-        # Suavizar el DEM para curvas más naturales
-        Z_suavizado = gaussian_filter(grid_z, sigma=1)
-        
-        # Crear curvas usando método simplificado
-        curvas_lineas = generar_curvas_directas_simplificado(grid_x, grid_y, Z_suavizado, niveles, poligono_principal)
-        
-        # Crear GeoDataFrame con curvas de nivel
-        if curvas_lineas:
-            gdf_curvas = gpd.GeoDataFrame({
-                'id_curva': range(1, len(curvas_lineas) + 1),
-                'geometry': curvas_lineas
-            }, crs=gdf.crs)
-            
-            # Asignar elevación aproximada
-            for idx in range(len(curvas_lineas)):
-                # Elevación basada en el índice y niveles disponibles
-                if idx < len(niveles):
-                    gdf_curvas.loc[idx, 'elevacion'] = round(niveles[idx], 1)
-                else:
-                    # Interpolar si hay más curvas que niveles
-                    nivel_idx = int((idx / len(curvas_lineas)) * len(niveles))
-                    if nivel_idx < len(niveles):
-                        gdf_curvas.loc[idx, 'elevacion'] = round(niveles[nivel_idx], 1)
-                    else:
-                        gdf_curvas.loc[idx, 'elevacion'] = round(z_min + (idx * intervalo), 1)
-        else:
-            gdf_curvas = gpd.GeoDataFrame(columns=['id_curva', 'elevacion', 'geometry'], crs=gdf.crs)
-        
-        return gdf_curvas, grid_x, grid_y, grid_z, pendiente, aspecto, bounds
-        
-    except Exception as e:
-        # Si ocurre algún error, devolver datos básicos
-        st.warning(f"⚠️ Error al calcular curvas de nivel: {str(e)}")
-        
-        # Generar datos básicos
-        X, Y, Z, bounds = generar_dem_sintetico(gdf, resolucion)
-        
-        # Crear GeoDataFrame vacío
-        gdf_curvas = gpd.GeoDataFrame(columns=['id_curva', 'elevacion', 'geometry'], crs=gdf.crs)
-        
-        # Datos DEM básicos
-        pendiente = np.zeros_like(Z)
-        aspecto = np.zeros_like(Z)
-        
-        return gdf_curvas, X, Y, Z, pendiente, aspecto, bounds
 
+@st.cache_data(ttl=PARAMETROS_CACHE['ttl_segundos'], max_entries=PARAMETROS_CACHE['max_entradas'], show_spinner=False)
+def _mapa_pendientes_cacheado(huella, resolucion, huella_dem, _modelo, _gdf):
+    # Solo depende del DEM: no se redibuja al cambiar el intervalo de las curvas
+    def calcular():
+        buf = crear_mapa_pendientes(_modelo.grilla, _modelo.pendiente, _gdf)
+        return buf.getvalue() if buf is not None else None
+    return recordar(clave_cache('mapa_pendientes', VERSION_DEM, huella, resolucion, huella_dem), 'png', calcular)
 
-def generar_curvas_directas_simplificado(grid_x, grid_y, grid_z, niveles, poligono_principal):
-    """Genera curvas de nivel simplificadas directamente desde el grid"""
-    curvas = []
-    
-    try:
-        # Método simple: crear círculos concéntricos basados en el centro del polígono
-        centro = poligono_principal.centroid
-        bounds = poligono_principal.bounds
-        
-        # Calcular radio máximo
-        ancho = bounds[2] - bounds[0]
-        alto = bounds[3] - bounds[1]
-        radio_max = min(ancho, alto) / 2
-        
-        # Crear curvas concéntricas
-        n_curvas = min(10, len(niveles))
-        for i in range(1, n_curvas + 1):
-            radio = radio_max * (i / n_curvas)
-            
-            # Crear círculo
-            circle = centro.buffer(radio)
-            
-            # Intersectar con el polígono
-            interseccion = poligono_principal.intersection(circle)
-            
-            if interseccion.geom_type == 'LineString':
-                curvas.append(interseccion)
-            elif interseccion.geom_type == 'MultiLineString':
-                for parte in interseccion.geoms:
-                    curvas.append(parte)
-        
-        # Si no se generaron curvas, crear líneas horizontales/verticales simples
-        if not curvas:
-            # Líneas horizontales
-            for i in range(3):
-                y = bounds[1] + (i + 1) * (alto / 4)
-                linea = LineString([(bounds[0], y), (bounds[2], y)])
-                if poligono_principal.intersects(linea):
-                    interseccion = poligono_principal.intersection(linea)
-                    if interseccion.geom_type == 'LineString':
-                        curvas.append(interseccion)
-            
-            # Líneas verticales
-            for i in range(3):
-                x = bounds[0] + (i + 1) * (ancho / 4)
-                linea = LineString([(x, bounds[1]), (x, bounds[3])])
-                if poligono_principal.intersects(linea):
-                    interseccion = poligono_principal.intersection(linea)
-                    if interseccion.geom_type == 'LineString':
-                        curvas.append(interseccion)
-    
-    except Exception as e:
-        # Último recurso: crear una curva simple alrededor del borde
-        if hasattr(poligono_principal, 'exterior'):
-            curvas.append(poligono_principal.exterior)
-    
-    return curvas
 
+@st.cache_data(ttl=PARAMETROS_CACHE['ttl_segundos'], max_entries=PARAMETROS_CACHE['max_entradas'], show_spinner=False)
+def _encharcamiento_cacheado(huella, resolucion, huella_dem, _modelo, _gdf):
+    # Solo depende del DEM: zonas en Parquet y el resumen de todas las depresiones en JSON
+    clave = clave_cache('encharcamiento', VERSION_DEM, huella, resolucion, huella_dem, PARAMETROS_HIDROLOGIA)
+    return recordar_partes(clave, ['parquet', 'json'], lambda: inventario_encharcamiento(_modelo, _gdf))
 
-# FUNCIÓN CORREGIDA PARA CREAR MAPA DE CURVAS DE NIVEL
-def crear_mapa_curvas_nivel(gdf_original, gdf_curvas, dem_data=None):
-    """Crea mapa interactivo con curvas de nivel - VERSIÓN CORREGIDA"""
-    
-    # Verificar si hay datos
-    if gdf_original.empty:
-        # Si no hay datos, crear mapa por defecto
-        m = folium.Map(location=[0, 0], zoom_start=2)
-        return m
-    
-    # Obtener centro y bounds
-    centroid = gdf_original.geometry.centroid.iloc[0]
-    bounds = gdf_original.total_bounds
-    
-    # Crear mapa con ESRI Satélite por defecto
-    m = folium.Map(
-        location=[centroid.y, centroid.x],
-        zoom_start=14,
-        tiles='https://server.arcgisonline.com/ArcGIS/rest/services/World_Imagery/MapServer/tile/{z}/{y}/{x}',
-        attr='Esri',
-        name='Esri Satélite'
-    )
-    
-    # Añadir otras bases
-    folium.TileLayer(
-        tiles='https://server.arcgisonline.com/ArcGIS/rest/services/World_Street_Map/MapServer/tile/{z}/{y}/{x}',
-        attr='Esri',
-        name='Esri Calles',
-        overlay=False
-    ).add_to(m)
-    
-    folium.TileLayer(
-        tiles='OpenStreetMap',
-        name='OpenStreetMap',
-        overlay=False
-    ).add_to(m)
-    
-    # Añadir capa de relieve
-    folium.TileLayer(
-        tiles='https://server.arcgisonline.com/ArcGIS/rest/services/World_Shaded_Relief/MapServer/tile/{z}/{y}/{x}',
-        attr='Esri',
-        name='Relieve',
-        overlay=False
-    ).add_to(m)
-    
-    # CALCULAR ÁREA ANTES DE USAR EN POPUP - VERSIÓN CORREGIDA
-    try:
-        area_parcela = calcular_superficie(gdf_original)
-    except Exception as e:
-        area_parcela = 0.0
-    
-    # Añadir parcela original
-    folium.GeoJson(
-        gdf_original.geometry.__geo_interface__,
-        style_function=lambda x: {
-            'fillColor': '#1f77b4',
-            'color': '#2ca02c',
-            'weight': 3,
-            'fillOpacity': 0.3,
-            'opacity': 0.8
-        },
-        # USAR LA VARIABLE CALCULADA PREVIAMENTE
-        popup=folium.Popup(f"Parcela - Área: {area_parcela:.2f} ha", max_width=300),
-        tooltip="Parcela principal"
-    ).add_to(m)
-    
-    # Añadir curvas de nivel
-    if not gdf_curvas.empty and 'elevacion' in gdf_curvas.columns:
-        for idx, row in gdf_curvas.iterrows():
-            # Determinar color basado en elevación (si tenemos datos DEM)
-            if dem_data is not None:
-                grid_z = dem_data['grid_z']
-                z_min, z_max = np.nanmin(grid_z), np.nanmax(grid_z)
-                
-                # Normalizar elevación para color
-                if z_max > z_min:
-                    norm_elev = (row['elevacion'] - z_min) / (z_max - z_min)
-                else:
-                    norm_elev = 0.5
-                
-                # Usar paleta de elevación
-                colores = PALETAS_GEE['ELEVACION']
-                color_idx = int(norm_elev * (len(colores) - 1))
-                color = colores[color_idx]
-                
-                # Determinar grosor basado en intervalo
-                if row['elevacion'] % 25 == 0:  # Curva maestra cada 25m
-                    weight = 3
-                elif row['elevacion'] % 5 == 0:  # Curva intermedia cada 5m
-                    weight = 2
-                else:
-                    weight = 1
-            else:
-                color = '#00441b'  # Verde oscuro por defecto
-                weight = 1
-            
-            folium.GeoJson(
-                row.geometry.__geo_interface__,
-                style_function=lambda x, color=color, weight=weight: {
-                    'color': color,
-                    'weight': weight,
-                    'fillOpacity': 0,
-                    'opacity': 0.8
-                },
-                popup=folium.Popup(f"Curva de nivel {row['id_curva']}<br>Elevación: {row['elevacion']} m", max_width=200),
-                tooltip=f"Elevación: {row['elevacion']} m"
-            ).add_to(m)
-    
-    # Añadir marcador para punto más alto si hay datos DEM
-    if dem_data is not None:
-        grid_z = dem_data['grid_z']
-        grid_x = dem_data['grid_x']
-        grid_y = dem_data['grid_y']
-        
-        # Encontrar punto más alto
-        if not np.all(np.isnan(grid_z)):
-            idx_max = np.unravel_index(np.nanargmax(grid_z), grid_z.shape)
-            punto_alto = [grid_y[idx_max], grid_x[idx_max]]
-            
-            folium.Marker(
-                punto_alto,
-                icon=folium.DivIcon(
-                    html='<div style="background-color: red; color: white; padding: 5px; border-radius: 50%;">▲</div>'
-                ),
-                popup=f"Punto más alto: {grid_z[idx_max]:.1f} m",
-                tooltip="Punto más alto"
-            ).add_to(m)
-            
-            # Encontrar punto más bajo
-            idx_min = np.unravel_index(np.nanargmin(grid_z), grid_z.shape)
-            punto_bajo = [grid_y[idx_min], grid_x[idx_min]]
-            
-            folium.Marker(
-                punto_bajo,
-                icon=folium.DivIcon(
-                    html='<div style="background-color: blue; color: white; padding: 5px; border-radius: 50%;">▼</div>'
-                ),
-                popup=f"Punto más bajo: {grid_z[idx_min]:.1f} m",
-                tooltip="Punto más bajo"
-            ).add_to(m)
-    
-    # Ajustar bounds
-    m.fit_bounds([[bounds[1], bounds[0]], [bounds[3], bounds[2]]])
-    
-    # Añadir controles
-    folium.LayerControl().add_to(m)
-    plugins.MeasureControl(position='bottomleft', primary_length_unit='meters').add_to(m)
-    plugins.MiniMap(toggle_display=True).add_to(m)
-    plugins.Fullscreen(position='topright').add_to(m)
-    
-    # Añadir leyenda
-    legend_html = '''
-    <div style="position: fixed; 
-                top: 10px; right: 10px; width: 250px; height: auto; 
-                background-color: white; border:2px solid grey; z-index:9999; 
-                font-size:12px; padding: 10px; border-radius:5px;
-                font-family: Arial;">
-        <h4 style="margin:0 0 10px 0; text-align:center;">🏔️ Curvas de Nivel</h4>
-        <p><b>Leyenda:</b></p>
-        <p><i style="background:#1f77b4; width:20px; height:20px; display:inline-block; margin-right:5px; opacity:0.3;"></i> Área de parcela</p>
-        <p><i style="background:#00441b; width:20px; height:2px; display:inline-block; margin-right:5px; opacity:0.8; vertical-align:middle;"></i> Curvas de nivel</p>
-        <p><span style="background:red; color:white; width:20px; height:20px; display:inline-block; margin-right:5px; border-radius:50%; text-align:center; line-height:20px;">▲</span> Punto más alto</p>
-        <p><span style="background:blue; color:white; width:20px; height:20px; display:inline-block; margin-right:5px; border-radius:50%; text-align:center; line-height:20px;">▼</span> Punto más bajo</p>
-        <p style="margin-top:10px; font-size:10px; color:#666;">
-            💡 Curvas más gruesas indican intervalos mayores (cada 25m)
-        </p>
-    </div>
-    '''
-    m.get_root().html.add_child(folium.Element(legend_html))
-    
-    return m
 
-# FUNCIÓN PARA CREAR MAPA DE PENDIENTES
-def crear_mapa_pendientes(grid_x, grid_y, pendiente_grid, gdf_original):
-    """Crea mapa de calor de pendientes"""
-    
-    # Crear figura
-    fig, ax = plt.subplots(1, 1, figsize=(12, 8))
-    
-    # Preparar datos para mapa de calor
-    X = grid_x.flatten()
-    Y = grid_y.flatten()
-    Z = pendiente_grid.flatten()
-    
-    # Crear triangulación para interpolación
-    from matplotlib.tri import Triangulation, LinearTriInterpolator
-    
-    # Crear malla de puntos válidos
-    valid_mask = ~np.isnan(Z)
-    if np.sum(valid_mask) > 0:
-        tri = Triangulation(X[valid_mask], Y[valid_mask])
-        interpolator = LinearTriInterpolator(tri, Z[valid_mask])
-        
-        # Crear grid para visualización
-        xi = np.linspace(X[valid_mask].min(), X[valid_mask].max(), 100)
-        yi = np.linspace(Y[valid_mask].min(), Y[valid_mask].max(), 100)
-        Xi, Yi = np.meshgrid(xi, yi)
-        
-        # Interpolar
-        Zi = interpolator(Xi, Yi)
-        
-        # Crear mapa de calor
-        cmap = LinearSegmentedColormap.from_list('pendiente_cmap', 
-                                                [CLASIFICACION_PENDIENTES[c]['color'] for c in CLASIFICACION_PENDIENTES])
-        
-        heatmap = ax.contourf(Xi, Yi, Zi, levels=20, cmap=cmap, alpha=0.7)
-        
-        # Añadir curvas de nivel de pendiente
-        contours = ax.contour(Xi, Yi, Zi, levels=[2, 5, 10, 15, 25], colors='black', linewidths=0.5, alpha=0.5)
-        ax.clabel(contours, inline=True, fontsize=8, fmt='%1.0f%%')
-    
-    # Añadir parcela
-    gdf_original.plot(ax=ax, color='none', edgecolor='black', linewidth=2)
-    
-    # Configuración
-    ax.set_title('Mapa de Pendientes (%)', fontsize=14, fontweight='bold', pad=15)
-    ax.set_xlabel('Longitud')
-    ax.set_ylabel('Latitud')
-    ax.grid(True, alpha=0.3)
-    
-    # Barra de color
-    if 'heatmap' in locals():
-        cbar = plt.colorbar(heatmap, ax=ax, shrink=0.8)
-        cbar.set_label('Pendiente (%)', fontsize=10)
-    
-    # Leyenda de categorías
-    patches = []
-    for categoria, params in CLASIFICACION_PENDIENTES.items():
-        patches.append(mpatches.Patch(color=params['color'], label=categoria))
-    
-    ax.legend(handles=patches, loc='upper left', fontsize=8, title='Categorías de Pendiente')
-    
-    plt.tight_layout()
-    
-    # Convertir a imagen
-    buf = io.BytesIO()
-    plt.savefig(buf, format='png', dpi=150, bbox_inches='tight')
-    buf.seek(0)
-    plt.close()
-    
-    return buf
+@st.cache_data(ttl=PARAMETROS_CACHE['ttl_segundos'], max_entries=PARAMETROS_CACHE['max_entradas'], show_spinner=False)
+def _mapa_estatico_cacheado(huella, titulo, columna_valor, analisis_tipo, nutriente, _gdf):
+    # `huella` incluye los valores dibujados: otro mes o cultivo con la misma parcela es otro mapa
+    def calcular():
+        buf = crear_mapa_estatico(_gdf, titulo, columna_valor, analisis_tipo, nutriente)
+        return buf.getvalue() if buf is not None else None
+    return recordar(clave_cache('mapa', huella, titulo, columna_valor, analisis_tipo, nutriente), 'png', calcular)
 
-# FUNCIÓN PARA PROCESAR ARCHIVO SUBIDO
-def procesar_archivo(uploaded_file):
-    """Procesa el archivo ZIP con shapefile o archivo KML"""
-    try:
-        with tempfile.TemporaryDirectory() as tmp_dir:
-            # Guardar archivo
-            file_path = os.path.join(tmp_dir, uploaded_file.name)
-            with open(file_path, "wb") as f:
-                f.write(uploaded_file.getvalue())
-            
-            # Verificar tipo de archivo
-            if uploaded_file.name.lower().endswith('.kml'):
-                # Cargar archivo KML
-                gdf = gpd.read_file(file_path, driver='KML')
-            else:
-                # Procesar como ZIP con shapefile
-                with zipfile.ZipFile(file_path, 'r') as zip_ref:
-                    zip_ref.extractall(tmp_dir)
-                
-                # Buscar archivos shapefile o KML
-                shp_files = [f for f in os.listdir(tmp_dir) if f.endswith('.shp')]
-                kml_files = [f for f in os.listdir(tmp_dir) if f.endswith('.kml')]
-                
-                if shp_files:
-                    # Cargar shapefile
-                    shp_path = os.path.join(tmp_dir, shp_files[0])
-                    gdf = gpd.read_file(shp_path)
-                elif kml_files:
-                    # Cargar KML
-                    kml_path = os.path.join(tmp_dir, kml_files[0])
-                    gdf = gpd.read_file(kml_path, driver='KML')
-                else:
-                    st.error("❌ No se encontró archivo .shp o .kml en el ZIP")
-                    return None
-            
-            # Verificar y reparar geometrías
-            if not gdf.is_valid.all():
-                gdf = gdf.make_valid()
-            
-            return gdf
-            
-    except Exception as e:
-        st.error(f"❌ Error procesando archivo: {str(e)}")
-        return None
 
-# FUNCIÓN PARA GENERAR PDF
-def generar_informe_pdf(gdf_analisis, cultivo, analisis_tipo, nutriente, mes_analisis, area_total, gdf_textura=None):
-    """Genera un informe PDF completo con los resultados del análisis"""
-    
-    # Crear buffer para el PDF
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4, topMargin=1*inch)
-    styles = getSampleStyleSheet()
-    
-    # Crear estilos personalizados
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=16,
-        textColor=colors.darkgreen,
-        spaceAfter=30,
-        alignment=1
-    )
-    
-    heading_style = ParagraphStyle(
-        'CustomHeading',
-        parent=styles['Heading2'],
-        fontSize=14,
-        textColor=colors.darkblue,
-        spaceAfter=12,
-        spaceBefore=12
-    )
-    
-    normal_style = styles['Normal']
-    
-    # Contenido del PDF
-    story = []
-    
-    # Título principal
-    story.append(Paragraph("INFORME DE ANÁLISIS AGRÍCOLA", title_style))
-    story.append(Spacer(1, 20))
-    
-    # Información general
-    story.append(Paragraph("INFORMACIÓN GENERAL", heading_style))
-    info_data = [
-        ["Cultivo:", cultivo.replace('_', ' ').title()],
-        ["Tipo de Análisis:", analisis_tipo],
-        ["Mes de Análisis:", mes_analisis],
-        ["Área Total:", f"{area_total:.2f} ha"],
-        ["Fecha de Generación:", datetime.now().strftime("%d/%m/%Y %H:%M")]
-    ]
-    
-    if analisis_tipo == "RECOMENDACIONES NPK":
-        info_data.insert(2, ["Nutriente Analizado:", nutriente])
-    
-    info_table = Table(info_data, colWidths=[2*inch, 3*inch])
-    info_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.white),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black)
-    ]))
-    story.append(info_table)
-    story.append(Spacer(1, 20))
-    
-    # Estadísticas resumen
-    story.append(Paragraph("ESTADÍSTICAS DEL ANÁLISIS", heading_style))
-    
-    if analisis_tipo == "FERTILIDAD ACTUAL":
-        stats_data = [
-            ["Estadística", "Valor"],
-            ["Índice Fertilidad Promedio", f"{gdf_analisis['indice_fertilidad'].mean():.3f}"],
-            ["Nitrógeno Promedio (kg/ha)", f"{gdf_analisis['nitrogeno'].mean():.1f}"],
-            ["Fósforo Promedio (kg/ha)", f"{gdf_analisis['fosforo'].mean():.1f}"],
-            ["Potasio Promedio (kg/ha)", f"{gdf_analisis['potasio'].mean():.1f}"],
-            ["Materia Orgánica Promedio (%)", f"{gdf_analisis['materia_organica'].mean():.1f}"],
-            ["NDVI Promedio", f"{gdf_analisis['ndvi'].mean():.3f}"],
-            ["NDWI Suelo Promedio", f"{gdf_analisis['ndwi_suelo'].mean():.3f}" if 'ndwi_suelo' in gdf_analisis.columns else "N/A"]
-        ]
-    elif analisis_tipo == "ANÁLISIS DE TEXTURA" and gdf_textura is not None:
-        stats_data = [
-            ["Estadística", "Valor"],
-            ["Textura Predominante", gdf_textura['textura_suelo'].mode()[0] if len(gdf_textura) > 0 else "N/A"],
-            ["Adecuación Promedio", f"{gdf_textura['adecuacion_textura'].mean():.1%}"],
-            ["Arena Promedio (%)", f"{gdf_textura['arena'].mean():.1f}"],
-            ["Limo Promedio (%)", f"{gdf_textura['limo'].mean():.1f}"],
-            ["Arcilla Promedio (%)", f"{gdf_textura['arcilla'].mean():.1f}"],
-            ["Agua Disponible Promedio (mm/m)", f"{gdf_textura['agua_disponible'].mean():.0f}"]
-        ]
-    elif analisis_tipo == "ANÁLISIS NDWI SUELO":
-        stats_data = [
-            ["Estadística", "Valor"],
-            ["NDWI Suelo Promedio", f"{gdf_analisis['ndwi_suelo'].mean():.3f}"],
-            ["Estado Humedad Predominante", gdf_analisis['estado_humedad_suelo'].mode()[0] if len(gdf_analisis) > 0 else "N/A"],
-            ["Déficit Humedad Promedio", f"{gdf_analisis['deficit_humedad'].mean():.3f}"],
-            ["Zonas con Riesgo Sequía", f"{len(gdf_analisis[gdf_analisis['riesgo_sequia'].isin(['ALTO', 'CRÍTICO'])])}/{len(gdf_analisis)}"]
-        ]
-    elif analisis_tipo == "ANÁLISIS DE CURVAS DE NIVEL (LIDAR/DEM)":
-        stats_data = [
-            ["Estadística", "Valor"],
-            ["Número de Curvas", f"{len(gdf_analisis)}"],
-            ["Elevación Promedio (m)", f"{gdf_analisis['elevacion'].mean():.1f}"],
-            ["Elevación Mínima (m)", f"{gdf_analisis['elevacion'].min():.1f}"],
-            ["Elevación Máxima (m)", f"{gdf_analisis['elevacion'].max():.1f}"],
-            ["Rango de Elevación (m)", f"{gdf_analisis['elevacion'].max() - gdf_analisis['elevacion'].min():.1f}"]
-        ]
-    else:
-        avg_rec = gdf_analisis['recomendacion_npk'].mean()
-        total_rec = (gdf_analisis['recomendacion_npk'] * gdf_analisis['area_ha']).sum()
-        stats_data = [
-            ["Estadística", "Valor"],
-            [f"Recomendación {nutriente} Promedio (kg/ha)", f"{avg_rec:.1f}"],
-            [f"Total {nutriente} Requerido (kg)", f"{total_rec:.1f}"],
-            ["Nitrógeno Promedio (kg/ha)", f"{gdf_analisis['nitrogeno'].mean():.1f}"],
-            ["Fósforo Promedio (kg/ha)", f"{gdf_analisis['fosforo'].mean():.1f}"],
-            ["Potasio Promedio (kg/ha)", f"{gdf_analisis['potasio'].mean():.1f}"]
-        ]
-    
-    stats_table = Table(stats_data, colWidths=[3*inch, 2*inch])
-    stats_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.darkblue),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.white),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black)
-    ]))
-    story.append(stats_table)
-    story.append(Spacer(1, 20))
-    
-    # Mapa estático
-    story.append(PageBreak())
-    story.append(Paragraph("MAPA DE ANÁLISIS", heading_style))
-    
-    # Generar mapa estático para el PDF
-    if analisis_tipo == "FERTILIDAD ACTUAL":
-        titulo_mapa = f"Fertilidad Actual - {cultivo.replace('_', ' ').title()}"
-        columna_visualizar = 'indice_fertilidad'
-    elif analisis_tipo == "ANÁLISIS DE TEXTURA" and gdf_textura is not None:
-        titulo_mapa = f"Textura del Suelo - {cultivo.replace('_', ' ').title()}"
-        columna_visualizar = 'textura_suelo'
-        gdf_analisis = gdf_textura
-    elif analisis_tipo == "ANÁLISIS NDWI SUELO":
-        titulo_mapa = f"NDWI del Suelo - {cultivo.replace('_', ' ').title()}"
-        columna_visualizar = 'ndwi_suelo'
-    elif analisis_tipo == "ANÁLISIS DE CURVAS DE NIVEL (LIDAR/DEM)":
-        titulo_mapa = f"Curvas de Nivel - {cultivo.replace('_', ' ').title()}"
-        columna_visualizar = 'elevacion'
-    else:
-        titulo_mapa = f"Recomendación {nutriente} - {cultivo.replace('_', ' ').title()}"
-        columna_visualizar = 'recomendacion_npk'
-    
-    mapa_buffer = crear_mapa_estatico(
-        gdf_analisis, titulo_mapa, columna_visualizar, analisis_tipo, nutriente
-    )
-    
-    if mapa_buffer:
-        try:
-            # Convertir a imagen para PDF
-            mapa_buffer.seek(0)
-            img = Image(mapa_buffer, width=6*inch, height=4*inch)
-            story.append(img)
-            story.append(Spacer(1, 10))
-            story.append(Paragraph(f"Figura 1: {titulo_mapa}", normal_style))
-        except Exception as e:
-            story.append(Paragraph("Error al generar el mapa para el PDF", normal_style))
-    
-    story.append(Spacer(1, 20))
-    
-    # Tabla de resultados por zona (primeras 10 zonas)
-    story.append(Paragraph("RESULTADOS POR ZONA (PRIMERAS 10 ZONAS)", heading_style))
-    
-    # Preparar datos para tabla
-    if analisis_tipo == "ANÁLISIS DE TEXTURA" and gdf_textura is not None:
-        columnas_tabla = ['id_zona', 'area_ha', 'textura_suelo', 'adecuacion_textura', 'arena', 'limo', 'arcilla']
-        df_tabla = gdf_textura[columnas_tabla].head(10).copy()
-    elif analisis_tipo == "ANÁLISIS NDWI SUELO":
-        columnas_tabla = ['id_zona', 'area_ha', 'ndwi_suelo', 'estado_humedad_suelo', 'deficit_humedad', 'recomendacion_riego', 'riesgo_sequia']
-        df_tabla = gdf_analisis[columnas_tabla].head(10).copy()
-    elif analisis_tipo == "ANÁLISIS DE CURVAS DE NIVEL (LIDAR/DEM)":
-        columnas_tabla = ['id_curva', 'elevacion']
-        if 'longitud_m' in gdf_analisis.columns:
-            columnas_tabla.append('longitud_m')
-        df_tabla = gdf_analisis[columnas_tabla].head(10).copy()
-    else:
-        columnas_tabla = ['id_zona', 'area_ha', 'categoria', 'prioridad']
-        if analisis_tipo == "FERTILIDAD ACTUAL":
-            columnas_tabla.extend(['indice_fertilidad', 'nitrogeno', 'fosforo', 'potasio', 'materia_organica'])
-        else:
-            columnas_tabla.extend(['recomendacion_npk', 'deficit_npk', 'nitrogeno', 'fosforo', 'potasio'])
-        
-        df_tabla = gdf_analisis[columnas_tabla].head(10).copy()
-    
-    # Redondear valores
-    if 'area_ha' in df_tabla.columns:
-        df_tabla['area_ha'] = df_tabla['area_ha'].round(3)
-    if analisis_tipo == "FERTILIDAD ACTUAL":
-        df_tabla['indice_fertilidad'] = df_tabla['indice_fertilidad'].round(3)
-    elif analisis_tipo == "ANÁLISIS DE TEXTURA":
-        df_tabla['adecuacion_textura'] = df_tabla['adecuacion_textura'].round(3)
-        df_tabla['arena'] = df_tabla['arena'].round(1)
-        df_tabla['limo'] = df_tabla['limo'].round(1)
-        df_tabla['arcilla'] = df_tabla['arcilla'].round(1)
-    elif analisis_tipo == "ANÁLISIS NDWI SUELO":
-        df_tabla['ndwi_suelo'] = df_tabla['ndwi_suelo'].round(3)
-        df_tabla['deficit_humedad'] = df_tabla['deficit_humedad'].round(3)
-    elif analisis_tipo == "ANÁLISIS DE CURVAS DE NIVEL (LIDAR/DEM)":
-        df_tabla['elevacion'] = df_tabla['elevacion'].round(1)
-        if 'longitud_m' in df_tabla.columns:
-            df_tabla['longitud_m'] = df_tabla['longitud_m'].round(1)
-    else:
-        df_tabla['recomendacion_npk'] = df_tabla['recomendacion_npk'].round(1)
-        df_tabla['deficit_npk'] = df_tabla['deficit_npk'].round(1)
-    
-    if 'nitrogeno' in df_tabla.columns:
-        df_tabla['nitrogeno'] = df_tabla['nitrogeno'].round(1)
-    if 'fosforo' in df_tabla.columns:
-        df_tabla['fosforo'] = df_tabla['fosforo'].round(1)
-    if 'potasio' in df_tabla.columns:
-        df_tabla['potasio'] = df_tabla['potasio'].round(1)
-    if 'materia_organica' in df_tabla.columns:
-        df_tabla['materia_organica'] = df_tabla['materia_organica'].round(1)
-    
-    # Convertir a lista para la tabla
-    table_data = [df_tabla.columns.tolist()]
-    for _, row in df_tabla.iterrows():
-        table_data.append(row.tolist())
-    
-    # Crear tabla
-    zona_table = Table(table_data, colWidths=[0.5*inch] + [0.7*inch] * (len(columnas_tabla)-1))
-    zona_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.darkblue),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 7),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.white),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.lightgrey])
-    ]))
-    story.append(zona_table)
-    
-    if len(gdf_analisis) > 10:
-        story.append(Spacer(1, 5))
-        story.append(Paragraph(f"* Mostrando 10 de {len(gdf_analisis)} zonas totales. Consulte el archivo CSV para todos los datos.", 
-                             ParagraphStyle('Small', parent=normal_style, fontSize=8)))
-    
-    story.append(Spacer(1, 20))
+@st.cache_data(ttl=PARAMETROS_CACHE['ttl_segundos'], max_entries=PARAMETROS_CACHE['max_entradas'], show_spinner=False)
+def _informe_cacheado(huella, huella_textura, cultivo, analisis_tipo, nutriente, mes_analisis, area_total, _gdf, _gdf_textura):
+    def calcular():
+        buf = generar_informe_pdf(_gdf, cultivo, analisis_tipo, nutriente, mes_analisis, area_total, _gdf_textura)
+        return buf.getvalue() if buf is not None else None
+    clave = clave_cache('informe', huella, huella_textura, cultivo, analisis_tipo, nutriente, mes_analisis, area_total)
+    return recordar(clave, 'pdf', calcular)
+
+
+@st.cache_data(ttl=PARAMETROS_CACHE['ttl_segundos'], max_entries=PARAMETROS_CACHE['max_entradas'], show_spinner=False)
+def _informe_ndwi_cacheado(huella, cultivo, mes_analisis, area_total, _gdf):
+    def calcular():
+        buf = generar_informe_ndwi_pdf(_gdf, cultivo, mes_analisis, area_total)
+        return buf.getvalue() if buf is not None else None
+    return recordar(clave_cache('informe_ndwi', huella, cultivo, mes_analisis, area_total), 'pdf', calcular)
+
+
+def dividir_zonas_cache(gdf, n_zonas):
+    """Divide la parcela en zonas reutilizando resultados previos para la misma geometría"""
+    return _zonas_cacheadas(huella_geometria(gdf), n_zonas, gdf)
+
+
+def analizar_textura_cache(gdf_zonas, cultivo, mes_analisis):
+    """Análisis de textura con caché por zonas, cultivo y mes"""
+    return _textura_cacheada(huella_geometria(gdf_zonas), cultivo, mes_analisis, gdf_zonas)
+
+
+def analizar_ndwi_cache(gdf_zonas, cultivo, mes_analisis):
+    """Análisis de NDWI del suelo con caché por zonas, cultivo y mes"""
+    return _ndwi_cacheado(huella_geometria(gdf_zonas), cultivo, mes_analisis, gdf_zonas)
+
+
+def calcular_indices_cache(gdf_zonas, cultivo, mes_analisis, analisis_tipo, nutriente):
+    """Índices de fertilidad/NPK con caché por zonas y parámetros de análisis"""
+    return _indices_cacheados(huella_geometria(gdf_zonas), cultivo, mes_analisis, analisis_tipo, nutriente, gdf_zonas)
+
+
+def calcular_curvas_cache(gdf, intervalo, resolucion, ruta_dem=None):
+    """DEM y curvas de nivel con caché por parcela, resolución y archivo DEM; cambiar el intervalo no regenera el DEM"""
+    huella_dem = huella_archivo(ruta_dem) if ruta_dem else None
+    gdf_base, modelo = _curvas_base_cacheadas(huella_geometria(gdf), resolucion, huella_dem, gdf, ruta_dem)
+    if intervalo_derivable(intervalo):
+        return filtrar_curvas_intervalo(gdf_base, intervalo), modelo
+    # Intervalo que no es múltiplo del base: se trazan sus curvas sobre el mismo DEM
+    return curvas_desde_modelo(modelo, gdf, intervalo), modelo
+
+
+def crear_mapa_estatico_cache(gdf, titulo, columna_valor=None, analisis_tipo=None, nutriente=None):
+    """Mapa estático en PNG (bytes) con caché"""
+    return _mapa_estatico_cacheado(huella_datos(gdf, [columna_valor]), titulo, columna_valor, analisis_tipo, nutriente, gdf)
+
+
+def generar_informe_cache(gdf, cultivo, analisis_tipo, nutriente, mes_analisis, area_total, gdf_textura=None):
+    """Informe PDF (bytes) con caché"""
+    huella_textura = huella_geometria(gdf_textura) if gdf_textura is not None else None
+    return _informe_cacheado(
+        huella_geometria(gdf), huella_textura, cultivo, analisis_tipo, nutriente, mes_analisis,
+        float(area_total), gdf, gdf_textura
+    )
+
+
+def generar_informe_ndwi_cache(gdf, cultivo, mes_analisis, area_total):
+    """Informe PDF de NDWI (bytes) con caché"""
+    return _informe_ndwi_cacheado(huella_geometria(gdf), cultivo, mes_analisis, float(area_total), gdf)
+
+
+# FUNCIÓN PARA MOSTRAR RECOMENDACIONES AGROECOLÓGICAS Y DE TEXTURA
+def mostrar_recomendaciones_agroecologicas(cultivo, categoria, area_ha, analisis_tipo, nutriente=None, textura_data=None):
+    """Muestra recomendaciones agroecológicas específicas"""
     
-    # Recomendaciones
-    story.append(PageBreak())
-    story.append(Paragraph("RECOMENDACIONES", heading_style))
+    st.markdown("### 🌿 RECOMENDACIONES ESPECÍFICAS")
     
-    if analisis_tipo == "ANÁLISIS DE TEXTURA" and gdf_textura is not None:
-        textura_predominante = gdf_textura['textura_suelo'].mode()[0] if len(gdf_textura) > 0 else "Franco"
-        adecuacion_promedio = gdf_textura['adecuacion_textura'].mean()
-        
-        if adecuacion_promedio >= 0.8:
-            enfoque = "ENFOQUE: MANTENIMIENTO - Textura adecuada"
-        elif adecuacion_promedio >= 0.6:
-            enfoque = "ENFOQUE: MEJORA MODERADA - Ajustes menores necesarios"
-        else:
-            enfoque = "ENFOQUE: MEJORA INTEGRAL - Enmiendas requeridas"
+    if analisis_tipo == "ANÁLISIS DE TEXTURA" and textura_data:
+        textura_predominante = textura_data.get('textura_predominante', 'Franco')
+        adecuacion_promedio = textura_data.get('adecuacion_promedio', 0.5)
         
-        story.append(Paragraph(f"<b>Enfoque Principal:</b> {enfoque}", normal_style))
-        story.append(Spacer(1, 10))
+        # Mostrar información detallada de la textura según imagen
+        st.markdown(f"#### 🏗️ **{textura_predominante.upper()}**")
         
-        # Recomendaciones específicas de textura
         if textura_predominante in RECOMENDACIONES_TEXTURA:
             info_textura = RECOMENDACIONES_TEXTURA[textura_predominante]
-            story.append(Paragraph(f"<b>Propiedades de {textura_predominante}:</b>", normal_style))
-            for prop in info_textura['propiedades'][:3]:
-                story.append(Paragraph(f"• {prop}", normal_style))
             
-            story.append(Spacer(1, 5))
-            story.append(Paragraph(f"<b>Manejo Recomendado:</b>", normal_style))
-            for man in info_textura['manejo'][:3]:
-                story.append(Paragraph(f"• {man}", normal_style))
-    elif analisis_tipo == "ANÁLISIS NDWI SUELO":
-        avg_ndwi = gdf_analisis['ndwi_suelo'].mean() if not gdf_analisis.empty else 0
-        
-        if avg_ndwi >= 0.15:
-            enfoque = "ENFOQUE: CONSERVACIÓN - Humedad óptima detectada"
-            recomendaciones = [
-                "Mantener frecuencia actual de riego",
-                "Implementar coberturas vivas para conservar humedad",
-                "Monitorear semanalmente con sensores de humedad"
-            ]
-        elif avg_ndwi >= 0.0:
-            enfoque = "ENFOQUE: AJUSTE MODERADO - Humedad moderada"
-            recomendaciones = [
-                "Incrementar riego en 15-20%",
-                "Aplicar mulching (cobertura seca) entre plantas",
-                "Programar riegos en horas de menor evaporación"
-            ]
-        else:
-            enfoque = "ENFOQUE: INTERVENCIÓN URGENTE - Déficit de humedad"
-            recomendaciones = [
-                "Riego intensivo inmediato (30-40% más)",
-                "Implementar riego por goteo o aspersión",
-                "Aplicar polímeros retenedores de agua en raíces"
-            ]
-        
-        story.append(Paragraph(f"<b>Enfoque Principal:</b> {enfoque}", normal_style))
-        story.append(Spacer(1, 10))
-        
-        for rec in recomendaciones:
-            story.append(Paragraph(f"• {rec}", normal_style))
-    elif analisis_tipo == "ANÁLISIS DE CURVAS DE NIVEL (LIDAR/DEM)":
-        # Para curvas de nivel
-        elevacion_promedio = gdf_analisis['elevacion'].mean() if not gdf_analisis.empty else 0
-        rango_elevacion = gdf_analisis['elevacion'].max() - gdf_analisis['elevacion'].min() if not gdf_analisis.empty else 0
-        
-        if rango_elevacion < 20:
-            enfoque = "ENFOQUE: TERRENO PLANO - Manejo convencional"
-            recomendaciones = [
-                "Diseño rectangular de plantación",
-                "Sistemas de riego por gravedad",
-                "Labranza convencional posible",
-                "Maquinaria pesada sin restricciones"
-            ]
-        elif rango_elevacion < 50:
-            enfoque = "ENFOQUE: LADERA SUAVE - Diseño en contorno"
-            recomendaciones = [
-                "Diseño en contorno ligero",
-                "Surcos siguiendo curvas de nivel",
-                "Labranza reducida recomendada",
-                "Barreras vivas cada 50 metros"
-            ]
-        else:
-            enfoque = "ENFOQUE: LADERA PRONUNCIADA - Terrazas y bancales"
-            recomendaciones = [
-                "Terrazas de base ancha",
-                "Cultivos en franjas",
-                "Barreras vivas cada 30 metros",
-                "Sistemas de drenaje en contorno"
-            ]
-        
-        story.append(Paragraph(f"<b>Enfoque Principal:</b> {enfoque}", normal_style))
-        story.append(Spacer(1, 10))
-        
-        for rec in recomendaciones:
-            story.append(Paragraph(f"• {rec}", normal_style))
+            col1, col2, col3 = st.columns(3)
+            
+            with col1:
+                st.markdown("**✅ PROPIEDADES FÍSICAS**")
+                for prop in info_textura['propiedades']:
+                    st.markdown(f"• {prop}")
+            
+            with col2:
+                st.markdown("**⚠️ LIMITANTES**")
+                for lim in info_textura['limitantes']:
+                    st.markdown(f"• {lim}")
+            
+            with col3:
+                st.markdown("**🛠️ MANEJO RECOMENDADO**")
+                for man in info_textura['manejo']:
+                    st.markdown(f"• {man}")
+            
+            # Evaluación de adecuación
+            st.markdown("#### 📊 EVALUACIÓN DE ADECUACIÓN")
+            if adecuacion_promedio >= 0.8:
+                st.success(f"**ADECUACIÓN: ÓPTIMA** ({adecuacion_promedio:.1%}) - Textura ideal para {cultivo.replace('_', ' ').title()}")
+            elif adecuacion_promedio >= 0.6:
+                st.warning(f"**ADECUACIÓN: MODERADA** ({adecuacion_promedio:.1%}) - Requiere ajustes en manejo")
+            else:
+                st.error(f"**ADECUACIÓN: LIMITANTE** ({adecuacion_promedio:.1%}) - Necesita mejoras significativas")
     else:
-        categoria_promedio = gdf_analisis['categoria'].mode()[0] if len(gdf_analisis) > 0 else "MEDIA"
-        
-        # Determinar enfoque
-        if categoria_promedio in ["MUY BAJA", "BAJA"]:
-            enfoque = "ENFOQUE: RECUPERACIÓN Y REGENERACIÓN - Intensidad: Alta"
-        elif categoria_promedio in ["MEDIA"]:
-            enfoque = "ENFOQUE: MANTENIMIENTO Y MEJORA - Intensidad: Media"
+        # Enfoque tradicional basado en fertilidad
+        if categoria in ["MUY BAJA", "BAJA"]:
+            enfoque = "🚨 **ENFOQUE: RECUPERACIÓN Y REGENERACIÓN**"
+            intensidad = "Alta"
+        elif categoria in ["MEDIA"]:
+            enfoque = "✅ **ENFOQUE: MANTENIMIENTO Y MEJORA**"
+            intensidad = "Media"
         else:
-            enfoque = "ENFOQUE: CONSERVACIÓN Y OPTIMIZACIÓN - Intensidad: Baja"
-        
-        story.append(Paragraph(f"<b>Enfoque Principal:</b> {enfoque}", normal_style))
-        story.append(Spacer(1, 10))
-        
-        # Recomendaciones específicas del cultivo
-        recomendaciones = RECOMENDACIONES_AGROECOLOGICAS.get(cultivo, {})
+            enfoque = "🌟 **ENFOQUE: CONSERVACIÓN Y OPTIMIZACIÓN**"
+            intensidad = "Baja"
         
-        for categoria_rec, items in recomendaciones.items():
-            story.append(Paragraph(f"<b>{categoria_rec.replace('_', ' ').title()}:</b>", normal_style))
-            for item in items[:2]:
-                story.append(Paragraph(f"• {item}", normal_style))
-            story.append(Spacer(1, 5))
-    
-    # Pie de página
-    story.append(Spacer(1, 20))
-    story.append(Paragraph("INFORMACIÓN ADICIONAL", heading_style))
-    story.append(Paragraph("Este informe fue generado automáticamente por el Sistema de Análisis Agrícola GEE.", normal_style))
-    
-    # Generar PDF
-    doc.build(story)
-    buffer.seek(0)
-    
-    return buffer
-
-# FUNCIÓN PARA GENERAR INFORME PDF ESPECÍFICO DE NDWI
-def generar_informe_ndwi_pdf(gdf_ndwi, cultivo, mes_analisis, area_total):
-    """Genera un informe PDF específico para análisis de NDWI del suelo"""
-    
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4, topMargin=1*inch)
-    styles = getSampleStyleSheet()
-    
-    # Estilos personalizados
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=16,
-        textColor=colors.darkblue,
-        spaceAfter=30,
-        alignment=1
-    )
-    
-    heading_style = ParagraphStyle(
-        'CustomHeading',
-        parent=styles['Heading2'],
-        fontSize=14,
-        textColor=colors.HexColor('#0066cc'),
-        spaceAfter=12,
-        spaceBefore=12
-    )
-    
-    normal_style = styles['Normal']
-    
-    story = []
-    
-    # Título principal
-    story.append(Paragraph("INFORME DE ANÁLISIS NDWI DEL SUELO", title_style))
-    story.append(Spacer(1, 20))
-    
-    # Información general
-    story.append(Paragraph("INFORMACIÓN GENERAL", heading_style))
-    info_data = [
-        ["Cultivo:", cultivo.replace('_', ' ').title()],
-        ["Análisis:", "NDWI del Suelo (Contenido de Agua)"],
-        ["Mes de Análisis:", mes_analisis],
-        ["Área Total:", f"{area_total:.2f} ha"],
-        ["Fecha de Generación:", datetime.now().strftime("%d/%m/%Y %H:%M")]
-    ]
-    
-    info_table = Table(info_data, colWidths=[2*inch, 3*inch])
-    info_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#e6f2ff')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.darkblue),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.white),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black)
-    ]))
-    story.append(info_table)
-    story.append(Spacer(1, 20))
-    
-    # Estadísticas NDWI
-    story.append(Paragraph("ESTADÍSTICAS DEL NDWI DEL SUELO", heading_style))
-    
-    if not gdf_ndwi.empty:
-        stats_data = [
-            ["Estadística", "Valor"],
-            ["NDWI Suelo Promedio", f"{gdf_ndwi['ndwi_suelo'].mean():.3f}"],
-            ["Estado Humedad Predominante", gdf_ndwi['estado_humedad_suelo'].mode()[0] if len(gdf_ndwi) > 0 else "N/A"],
-            ["Déficit Humedad Promedio", f"{gdf_ndwi['deficit_humedad'].mean():.3f}"],
-            ["Zonas con Riesgo Sequía", f"{len(gdf_ndwi[gdf_ndwi['riesgo_sequia'].isin(['ALTO', 'CRÍTICO'])])}/{len(gdf_ndwi)}"],
-            ["Recomendación Riego Predominante", gdf_ndwi['recomendacion_riego'].mode()[0] if len(gdf_ndwi) > 0 else "N/A"]
-        ]
-    else:
-        stats_data = [["Estadística", "Valor"], ["Sin datos disponibles", "N/A"]]
-    
-    stats_table = Table(stats_data, colWidths=[3*inch, 2*inch])
-    stats_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#0066cc')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.white),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black)
-    ]))
-    story.append(stats_table)
-    story.append(Spacer(1, 20))
-    
-    # Interpretación de valores NDWI
-    story.append(Paragraph("INTERPRETACIÓN DE VALORES NDWI", heading_style))
-    
-    interpretacion_data = [
-        ["Rango NDWI", "Estado del Suelo", "Interpretación", "Acción Recomendada"],
-        ["0.2 a 1.0", "Muy Húmedo", "Contenido de agua excesivo", "Reducir riego, mejorar drenaje"],
-        ["0.1 a 0.2", "Óptimo", "Humedad ideal para cultivo", "Mantener prácticas actuales"],
-        ["0.0 a 0.1", "Moderado", "Humedad aceptable", "Monitorear, riego ligero si es necesario"],
-        ["-0.1 a 0.0", "Seco", "Déficit de humedad", "Incrementar riego en 20-30%"],
-        ["-1.0 a -0.1", "Muy Seco", "Riesgo de sequía", "Riego urgente, medidas de conservación"]
-    ]
-    
-    interpretacion_table = Table(interpretacion_data, colWidths=[1*inch, 1.2*inch, 2*inch, 2*inch])
-    interpretacion_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#3399ff')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-        ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 8),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.white),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f0f8ff')])
-    ]))
-    story.append(interpretacion_table)
-    story.append(Spacer(1, 20))
+        st.success(f"{enfoque} - Intensidad: {intensidad}")
     
-    # Recomendaciones generales
-    story.append(PageBreak())
-    story.append(Paragraph("RECOMENDACIONES DE MANEJO DE AGUA", heading_style))
+    # Obtener recomendaciones específicas del cultivo
+    recomendaciones = RECOMENDACIONES_AGROECOLOGICAS.get(cultivo, {})
     
-    # Determinar recomendaciones basadas en promedio NDWI
-    avg_ndwi = gdf_ndwi['ndwi_suelo'].mean() if not gdf_ndwi.empty else 0
+    # Mostrar por categorías
+    st.markdown("#### 🌱 PRÁCTICAS AGROECOLÓGICAS")
     
-    if avg_ndwi >= 0.15:
-        enfoque = "ENFOQUE: CONSERVACIÓN - Humedad óptima detectada"
-        recomendaciones = [
-            "Mantener frecuencia actual de riego",
-            "Implementar coberturas vivas para conservar humedad",
-            "Monitorear semanalmente con sensores de humedad",
-            "Considerar riego deficitario controlado en épocas lluviosas"
-        ]
-    elif avg_ndwi >= 0.0:
-        enfoque = "ENFOQUE: AJUSTE MODERADO - Humedad moderada"
-        recomendaciones = [
-            "Incrementar riego en 15-20%",
-            "Aplicar mulching (cobertura seca) entre plantas",
-            "Programar riegos en horas de menor evaporación",
-            "Considerar riego por goteo para mayor eficiencia"
-        ]
-    else:
-        enfoque = "ENFOQUE: INTERVENCIÓN URGENTE - Déficit de humedad"
-        recomendaciones = [
-            "Riego intensivo inmediato (30-40% más)",
-            "Implementar riego por goteo o aspersión",
-            "Aplicar polímeros retenedores de agua en raíces",
-            "Reducir labranza para conservar humedad residual",
-            "Considerar cultivos de cobertura para sombrear suelo"
-        ]
+    col1, col2 = st.columns(2)
     
-    story.append(Paragraph(f"<b>Enfoque Principal:</b> {enfoque}", normal_style))
-    story.append(Spacer(1, 10))
+    with col1:
+        with st.expander("**COBERTURAS VIVAS**", expanded=True):
+            for rec in recomendaciones.get('COBERTURAS_VIVAS', []):
+                st.markdown(f"• {rec}")
     
-    for rec in recomendaciones:
-        story.append(Paragraph(f"• {rec}", normal_style))
+    with col2:
+        with st.expander("**ABONOS VERDES**", expanded=True):
+            for rec in recomendaciones.get('ABONOS_VERDES', []):
+                st.markdown(f"• {rec}")
     
-    story.append(Spacer(1, 20))
+    col3, col4 = st.columns(2)
     
-    # Tabla de resultados por zona (primeras 10)
-    story.append(Paragraph("RESULTADOS POR ZONA (PRIMERAS 10 ZONAS)", heading_style))
+    with col3:
+        with st.expander("**BIOFERTILIZANTES**", expanded=True):
+            for rec in recomendaciones.get('BIOFERTILIZANTES', []):
+                st.markdown(f"• {rec}")
     
-    if not gdf_ndwi.empty:
-        columnas_tabla = ['id_zona', 'ndwi_suelo', 'estado_humedad_suelo', 'deficit_humedad', 'recomendacion_riego', 'riesgo_sequia']
-        
-        # Verificar que las columnas existan
-        columnas_existentes = [col for col in columnas_tabla if col in gdf_ndwi.columns]
-        df_tabla = gdf_ndwi[columnas_existentes].head(10).copy()
-        
-        # Redondear valores
-        if 'ndwi_suelo' in df_tabla.columns:
-            df_tabla['ndwi_suelo'] = df_tabla['ndwi_suelo'].round(3)
-        if 'deficit_humedad' in df_tabla.columns:
-            df_tabla['deficit_humedad'] = df_tabla['deficit_humedad'].round(3)
-        
-        # Convertir a lista para tabla
-        table_data = [df_tabla.columns.tolist()]
-        for _, row in df_tabla.iterrows():
-            table_data.append(row.tolist())
-        
-        # Crear tabla
-        zona_table = Table(table_data, colWidths=[0.6*inch] * len(columnas_existentes))
-        zona_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#3399ff')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 7),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.white),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f0f8ff')])
-        ]))
-        story.append(zona_table)
-        
-        if len(gdf_ndwi) > 10:
-            story.append(Spacer(1, 5))
-            story.append(Paragraph(f"* Mostrando 10 de {len(gdf_ndwi)} zonas totales", 
-                                 ParagraphStyle('Small', parent=normal_style, fontSize=8)))
-    else:
-        story.append(Paragraph("No hay datos disponibles para mostrar", normal_style))
+    with col4:
+        with st.expander("**MANEJO ECOLÓGICO**", expanded=True):
+            for rec in recomendaciones.get('MANEJO_ECOLOGICO', []):
+                st.markdown(f"• {rec}")
     
-    # Información técnica
-    story.append(Spacer(1, 20))
-    story.append(Paragraph("INFORMACIÓN TÉCNICA", heading_style))
+    with st.expander("**ASOCIACIONES Y DIVERSIFICACIÓN**", expanded=True):
+        for rec in recomendaciones.get('ASOCIACIONES', []):
+            st.markdown(f"• {rec}")
     
-    info_tecnica = [
-        "Método: NDWI (Normalized Difference Water Index) del Suelo",
-        "Fórmula: (SWIR1 - SWIR2) / (SWIR1 + SWIR2)",
-        "Bandas Sentinel-2: B8A (NIR) y B11 (SWIR)",
-        "Rango válido: -1.0 a 1.0",
-        "Interpretación: Valores positivos indican mayor contenido de agua",
-        "Resolución espacial: 20m (Sentinel-2)",
-        "Actualización: Datos actualizados cada 5 días"
-    ]
+    # PLAN DE IMPLEMENTACIÓN
+    st.markdown("### 📅 PLAN DE IMPLEMENTACIÓN")
     
-    for info in info_tecnica:
-        story.append(Paragraph(f"• {info}", normal_style))
+    timeline_col1, timeline_col2, timeline_col3 = st.columns(3)
     
-    # Pie de página
-    story.append(Spacer(1, 30))
-    story.append(Paragraph("INFORME GENERADO AUTOMÁTICAMENTE - SISTEMA DE ANÁLISIS GEE", 
-                         ParagraphStyle('Footer', parent=normal_style, fontSize=8, alignment=1)))
+    with timeline_col1:
+        st.markdown("**🏁 INMEDIATO (0-15 días)**")
+        st.markdown("""
+        • Preparación del terreno
+        • Siembra de abonos verdes
+        • Aplicación de biofertilizantes
+        • Instalación de trampas
+        """)
     
-    # Generar PDF
-    doc.build(story)
-    buffer.seek(0)
+    with timeline_col2:
+        st.markdown("**📈 CORTO PLAZO (1-3 meses)**")
+        st.markdown("""
+        • Establecimiento coberturas
+        • Monitoreo inicial
+        • Ajustes de manejo
+        • Podas de formación
+        """)
     
-    return buffer
+    with timeline_col3:
+        st.markdown("**🎯 MEDIANO PLAZO (3-12 meses)**")
+        st.markdown("""
+        • Evaluación de resultados
+        • Diversificación
+        • Optimización del sistema
+        • Réplica en otras zonas
+        """)
+
+
+# FUNCIÓN PARA PROCESAR ARCHIVO SUBIDO
+def procesar_archivo(uploaded_file, filtro_nombres=None, filtro_carpetas=None, tolerancia_simplificacion_m=0.0):
+    """Procesa el archivo ZIP con shapefile o archivo KML/KMZ y devuelve (gdf, reporte de geometría)"""
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            # Guardar archivo
+            file_path = os.path.join(tmp_dir, uploaded_file.name)
+            with open(file_path, "wb") as f:
+                f.write(uploaded_file.getvalue())
+
+            return leer_parcela(file_path, filtro_nombres, filtro_carpetas, tolerancia_simplificacion_m)
+
+    except ValueError as e:
+        st.error(f"❌ {str(e)}")
+        return None, None
+    except Exception as e:
+        st.error(f"❌ Error procesando archivo: {str(e)}")
+        return None, None
+
 
 # FUNCIÓN PARA MOSTRAR RESULTADOS DE TEXTURA
 def mostrar_resultados_textura():
     """Muestra los resultados del análisis de textura"""
+    import matplotlib.pyplot as plt
+    from streamlit_folium import st_folium
     if st.session_state.analisis_textura is None:
         st.warning("No hay datos de análisis de textura disponibles")
         return
@@ -3456,7 +635,7 @@ def mostrar_resultados_textura():
         # Descargar PDF
         if st.button("📄 Generar Informe PDF", type="primary", key="pdf_textura"):
             with st.spinner("🔄 Generando informe PDF..."):
-                pdf_buffer = generar_informe_pdf(
+                pdf_buffer = generar_informe_cache(
                     gdf_textura, cultivo, "ANÁLISIS DE TEXTURA", "", mes_analisis, area_total, gdf_textura
                 )
                 
@@ -3470,12 +649,13 @@ def mostrar_resultados_textura():
 # FUNCIÓN PARA MOSTRAR RESULTADOS DE NDWI DEL SUELO
 def mostrar_resultados_ndwi_suelo():
     """Muestra los resultados del análisis de NDWI del suelo"""
+    from streamlit_folium import st_folium
     
     # Ejecutar análisis de NDWI del suelo si no está en session_state
     if st.session_state.gdf_analisis is None or 'ndwi_suelo' not in st.session_state.gdf_analisis.columns:
         with st.spinner("💧 Analizando NDWI del suelo..."):
             if st.session_state.gdf_zonas is not None:
-                gdf_ndwi = analizar_ndwi_suelo(st.session_state.gdf_zonas, cultivo, mes_analisis)
+                gdf_ndwi = analizar_ndwi_cache(st.session_state.gdf_zonas, cultivo, mes_analisis)
                 st.session_state.gdf_analisis = gdf_ndwi
             else:
                 st.error("No hay datos de zonas disponibles")
@@ -3699,7 +879,7 @@ def mostrar_resultados_ndwi_suelo():
         if st.button("📄 Generar Informe NDWI PDF", type="primary", key="pdf_ndwi"):
             with st.spinner("🔄 Generando informe PDF..."):
                 # Crear informe específico para NDWI
-                pdf_buffer = generar_informe_ndwi_pdf(gdf_ndwi, cultivo, mes_analisis, area_total)
+                pdf_buffer = generar_informe_ndwi_cache(gdf_ndwi, cultivo, mes_analisis, area_total)
                 
                 st.download_button(
                     label="📥 Descargar Informe PDF",
@@ -3711,9 +891,20 @@ def mostrar_resultados_ndwi_suelo():
 # FUNCIÓN PARA MOSTRAR RESULTADOS DE CURVAS DE NIVEL
 def mostrar_resultados_curvas_nivel():
     """Muestra resultados del análisis de curvas de nivel"""
+    import matplotlib.pyplot as plt
+    from streamlit_folium import st_folium
+    
+    # Si cambiaron los sliders, la fuente del DEM o el lote seleccionado, se rederivan las curvas (el DEM sale de la caché)
+    gdf_lote = gdf_lote_seleccionado()
+    if (st.session_state.parametros_curvas is not None
+            and st.session_state.parametros_curvas != (intervalo_curvas, resolucion_dem, ruta_dem, huella_geometria(gdf_lote))):
+        ejecutar_analisis_curvas_nivel(gdf_lote, intervalo_curvas, resolucion_dem, ruta_dem)
     
     if st.session_state.curvas_nivel is None or st.session_state.dem_data is None:
-        st.warning("No hay datos de curvas de nivel disponibles")
+        if st.session_state.error_dem:
+            st.error(f"❌ No se pudo obtener el DEM: {st.session_state.error_dem}")
+        else:
+            st.warning("No hay datos de curvas de nivel disponibles")
         return
     
     gdf_curvas = st.session_state.curvas_nivel
@@ -3753,12 +944,18 @@ def mostrar_resultados_curvas_nivel():
     # Estadísticas principales
     st.subheader("📊 Estadísticas Topográficas")
     
-    # Extraer datos del DEM
-    grid_z = dem_data['grid_z']
-    pendiente_grid = dem_data['pendiente_grid']
+    # Extraer datos del DEM (nodos dentro de la parcela): las derivadas se calculan una
+    # sola vez y las comparten el mapa de pendientes, el riesgo de erosión y las recomendaciones
+    pendiente_grid = dem_data.pendiente
+    area_celda = dem_data.grilla.area_celda_m2
+    stats_pendiente = calcular_estadisticas_pendiente(pendiente_grid, area_celda)
+    stats_orientacion = calcular_estadisticas_orientacion(dem_data.aspecto, pendiente_grid, area_celda)
+    stats_curvatura = calcular_estadisticas_curvatura(
+        dem_data.curvatura_perfil, dem_data.curvatura_plano, pendiente_grid, area_celda
+    )
     
     # Calcular estadísticas
-    elevaciones = grid_z.flatten()
+    elevaciones = dem_data.elevacion[dem_data.mascara]
     elevaciones = elevaciones[~np.isnan(elevaciones)]
     
     if len(elevaciones) > 0:
@@ -3770,17 +967,25 @@ def mostrar_resultados_curvas_nivel():
             rango_elevacion = np.max(elevaciones) - np.min(elevaciones)
             st.metric("📏 Rango de Elevación", f"{rango_elevacion:.1f} m")
         with col3:
-            stats_pendiente = calcular_estadisticas_pendiente(pendiente_grid)
-            st.metric("📐 Pendiente Promedio", f"{stats_pendiente['promedio']:.1f}%")
+            st.metric("📐 Pendiente Promedio", f"{stats_pendiente['promedio']:.1f}% ({stats_pendiente['promedio_grados']:.1f}°)")
         with col4:
             num_curvas = len(gdf_curvas) if not gdf_curvas.empty else 0
             st.metric("🔄 Número de Curvas", f"{num_curvas}")
+        grilla = dem_data.grilla
+        st.caption(f"💾 DEM {grilla.filas}×{grilla.columnas} nodos de {grilla.tamano_x:g} m · "
+                   f"{dem_data.nbytes / 1e6:.1f} MB en memoria")
+    
+    # Depresiones rellenadas del DEM: capa del mapa y sección propia
+    zonas_agua, resumen_agua = _encharcamiento_cacheado(
+        huella_geometria(gdf_lote), st.session_state.parametros_curvas[1],
+        huella_archivo(ruta_dem) if ruta_dem else None, dem_data, gdf_lote
+    )
     
     # Mapa interactivo de curvas de nivel
     st.subheader("🗺️ Mapa de Curvas de Nivel")
     
     if not gdf_curvas.empty:
-        mapa_curvas = crear_mapa_curvas_nivel(st.session_state.gdf_original, gdf_curvas, dem_data)
+        mapa_curvas = crear_mapa_curvas_nivel(gdf_lote, gdf_curvas, dem_data, zonas_agua)
         st_folium(mapa_curvas, width=800, height=500)
     else:
         st.warning("No se pudieron generar curvas de nivel para esta parcela")
@@ -3788,7 +993,7 @@ def mostrar_resultados_curvas_nivel():
     # Distribución de pendientes
     st.subheader("📈 Distribución de Pendientes")
     
-    if 'pendiente_grid' in dem_data:
+    if pendiente_grid is not None:
         # Crear gráfico de distribución
         fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(14, 5))
         
@@ -3824,15 +1029,53 @@ def mostrar_resultados_curvas_nivel():
         plt.tight_layout()
         st.pyplot(fig)
     
+    # Orientación (aspecto) y forma de las laderas (curvaturas)
+    st.subheader("🧭 Orientación y Forma de las Laderas")
+    
+    if stats_orientacion['predominante'] is not None:
+        col1, col2 = st.columns([1, 1])
+        with col1:
+            # Rosa de orientaciones: área por sector, con el norte arriba
+            fig = plt.figure(figsize=(5, 5))
+            ax = fig.add_subplot(projection='polar')
+            ax.set_theta_zero_location('N')
+            ax.set_theta_direction(-1)
+            codigos = list(ORIENTACIONES_LADERA)
+            ax.bar(np.radians([ORIENTACIONES_LADERA[c]['azimut'] for c in codigos]),
+                   [stats_orientacion['distribucion'][c]['porcentaje'] for c in codigos],
+                   width=np.radians(45), color=[ORIENTACIONES_LADERA[c]['color'] for c in codigos],
+                   edgecolor='black', alpha=0.8)
+            ax.set_xticks(np.radians([ORIENTACIONES_LADERA[c]['azimut'] for c in codigos]))
+            ax.set_xticklabels(codigos)
+            ax.set_title('Orientación de Laderas (% del área)')
+            st.pyplot(fig)
+        
+        with col2:
+            predominante = stats_orientacion['predominante']
+            st.metric("🧭 Orientación Predominante",
+                      f"{ORIENTACIONES_LADERA[predominante]['nombre']} ({stats_orientacion['distribucion'][predominante]['porcentaje']:.0f}%)")
+            # En el hemisferio sur reciben más radiación las laderas que miran al norte
+            _, lat = dem_data.grilla.coordenadas_geograficas(dem_data.grilla.filas / 2, dem_data.grilla.columnas / 2)
+            solana = ['NO', 'N', 'NE'] if float(lat) < 0 else ['SE', 'S', 'SO']
+            area_solana = sum(stats_orientacion['distribucion'][c]['area_ha'] for c in solana)
+            st.metric("☀️ Laderas de Solana", f"{area_solana:.2f} ha")
+            st.metric("⛰️ Laderas Convexas (perfil)", f"{stats_curvatura['convexa_ha']:.2f} ha",
+                      f"{stats_curvatura['convexa_pct']:.0f}%", delta_color="off")
+            st.metric("🥣 Laderas Cóncavas (perfil)", f"{stats_curvatura['concava_ha']:.2f} ha",
+                      f"{stats_curvatura['concava_pct']:.0f}%", delta_color="off")
+            st.caption(f"Sin orientación (pendiente < {PARAMETROS_CURVAS_NIVEL['pendiente_min_orientacion']:g}%): "
+                       f"{stats_orientacion['plana_ha']:.2f} ha. En las convexas el escurrimiento se acelera; "
+                       "en las cóncavas frena y deposita sedimento.")
+    else:
+        st.info("El terreno es plano: las laderas no tienen una orientación definida")
+    
     # Mapa de pendientes estático
     st.subheader("🗺️ Mapa de Pendientes (Heatmap)")
     
-    if all(key in dem_data for key in ['grid_x', 'grid_y', 'pendiente_grid']):
-        mapa_pendientes = crear_mapa_pendientes(
-            dem_data['grid_x'], 
-            dem_data['grid_y'], 
-            dem_data['pendiente_grid'], 
-            st.session_state.gdf_original
+    if pendiente_grid is not None:
+        mapa_pendientes = _mapa_pendientes_cacheado(
+            huella_geometria(gdf_lote), st.session_state.parametros_curvas[1],
+            huella_archivo(ruta_dem) if ruta_dem else None, dem_data, gdf_lote
         )
         if mapa_pendientes:
             st.image(mapa_pendientes, caption='Mapa de Pendientes', use_column_width=True)
@@ -3840,7 +1083,7 @@ def mostrar_resultados_curvas_nivel():
     # Análisis de riesgo de erosión
     st.subheader("⚠️ Análisis de Riesgo de Erosión")
     
-    if 'pendiente_grid' in dem_data and stats_pendiente['distribucion']:
+    if pendiente_grid is not None and stats_pendiente['distribucion']:
         # Calcular factor de riesgo de erosión
         riesgo_total = 0
         for categoria, data in stats_pendiente['distribucion'].items():
@@ -3849,7 +1092,7 @@ def mostrar_resultados_curvas_nivel():
         
         riesgo_promedio = riesgo_total / 100
         
-        col1, col2, col3 = st.columns(3)
+        col1, col2, col3, col4 = st.columns(4)
         with col1:
             if riesgo_promedio < 0.3:
                 st.success("✅ **RIESGO BAJO**")
@@ -3870,11 +1113,40 @@ def mostrar_resultados_curvas_nivel():
             area_manejable = sum(data['area_ha'] for cat, data in stats_pendiente['distribucion'].items() 
                                if cat in ['PLANA (0-2%)', 'SUAVE (2-5%)', 'MODERADA (5-10%)'])
             st.metric("Área Manejable (<10%)", f"{area_manejable:.2f} ha")
+        
+        with col4:
+            # Laderas convergentes (curvatura de plano negativa): el agua se junta y forma cárcavas
+            st.metric("Escurrimiento Concentrado", f"{stats_curvatura['convergente_ha']:.2f} ha",
+                      f"{stats_curvatura['convergente_pct']:.0f}%", delta_color="off")
+    
+    # Zonas de encharcamiento (depresiones del DEM rellenadas hasta su cota de desborde)
+    st.subheader("💧 Zonas de Encharcamiento")
+    
+    if resumen_agua['zonas'] > 0:
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("Zonas", f"{resumen_agua['zonas']}")
+        with col2:
+            st.metric("Área Encharcable", f"{resumen_agua['area_ha']:.2f} ha")
+        with col3:
+            st.metric("Volumen Retenido", f"{resumen_agua['volumen_m3']:,.0f} m³")
+        with col4:
+            st.metric("Profundidad Máxima", f"{resumen_agua['profundidad_max_m']:.2f} m")
+        
+        st.dataframe(zonas_agua.drop(columns='geometry').rename(columns={
+            'id_zona': 'Zona', 'area_ha': 'Área (ha)', 'profundidad_max_m': 'Prof. máx. (m)',
+            'volumen_m3': 'Volumen (m³)', 'cota_desborde_m': 'Cota desborde (m)'
+        }), hide_index=True)
+        st.caption(f"Depresiones de más de {PARAMETROS_HIDROLOGIA['profundidad_min_m']:g} m de profundidad y "
+                   f"{PARAMETROS_HIDROLOGIA['area_min_m2']:g} m² (capa \"💧 Zonas de encharcamiento\" del mapa). "
+                   "El agua se acumula hasta la cota de desborde y luego escurre hacia el borde del lote.")
+    else:
+        st.success("✅ Sin depresiones que retengan agua: el lote drena hacia sus bordes")
     
     # RECOMENDACIONES ESPECÍFICAS
     st.markdown("### 💡 RECOMENDACIONES DE MANEJO POR PENDIENTE")
     
-    if 'distribucion' in stats_pendiente:
+    if stats_pendiente['distribucion']:
         # Determinar categoría predominante
         cat_predominante = max(stats_pendiente['distribucion'].items(), key=lambda x: x[1]['porcentaje'])[0]
         
@@ -3883,6 +1155,16 @@ def mostrar_resultados_curvas_nivel():
             for rec in RECOMENDACIONES_PENDIENTES[cat_predominante]:
                 st.markdown(f"• {rec}")
         
+        if stats_curvatura['convergente_ha'] > 0:
+            st.markdown(f"• Escurrimiento concentrado en {stats_curvatura['convergente_ha']:.2f} ha "
+                        f"({stats_curvatura['convergente_pct']:.0f}%): desagües empastados y cultivos de "
+                        "cobertura en las vías de agua para prevenir cárcavas")
+        
+        if resumen_agua['zonas'] > 0:
+            st.markdown(f"• {resumen_agua['zonas']} zonas de encharcamiento ({resumen_agua['area_ha']:.2f} ha, "
+                        f"{resumen_agua['volumen_m3']:,.0f} m³): drenajes superficiales desde la cota de desborde "
+                        "o manejo diferenciado con cultivos tolerantes al anegamiento")
+        
         # Recomendaciones específicas por cultivo
         st.markdown(f"#### 🌱 Recomendaciones Específicas para {cultivo.replace('_', ' ').title()}")
         
@@ -3953,9 +1235,9 @@ def mostrar_resultados_curvas_nivel():
     st.subheader("📋 Tabla de Curvas de Nivel")
     
     if not gdf_curvas.empty and 'elevacion' in gdf_curvas.columns:
-        # Calcular longitud de cada curva
-        gdf_curvas_proj = gdf_curvas.to_crs('EPSG:3116')  # Proyectar para cálculo de longitud
-        gdf_curvas['longitud_m'] = gdf_curvas_proj.geometry.length
+        # Longitud de cada curva (calculada en metros al extraerla)
+        if 'longitud_m' not in gdf_curvas.columns:
+            gdf_curvas['longitud_m'] = gdf_curvas.to_crs(obtener_crs_metrico(gdf_curvas)).geometry.length
         
         # Crear DataFrame para visualización
         df_curvas = gdf_curvas[['id_curva', 'elevacion', 'longitud_m']].copy()
@@ -4009,26 +1291,23 @@ def mostrar_resultados_curvas_nivel():
     
     with col2:
         # Descargar datos DEM como CSV
-        if dem_data and 'grid_z' in dem_data:
-            # Crear DataFrame con puntos muestreados
-            sample_points = []
-            grid_x = dem_data['grid_x']
-            grid_y = dem_data['grid_y']
-            grid_z = dem_data['grid_z']
-            
-            # Muestrear cada 5 puntos
-            for i in range(0, grid_x.shape[0], 5):
-                for j in range(0, grid_x.shape[1], 5):
-                    if not np.isnan(grid_z[i, j]):
-                        sample_points.append({
-                            'lat': grid_y[i, j],
-                            'lon': grid_x[i, j],
-                            'elevacion_m': grid_z[i, j],
-                            'pendiente_%': dem_data['pendiente_grid'][i, j] if 'pendiente_grid' in dem_data else None
-                        })
-            
-            if sample_points:
-                df_dem = pd.DataFrame(sample_points)
+        if dem_data is not None:
+            # Crear DataFrame con puntos muestreados (cada 5 nodos), en lat/lon
+            grid_z = dem_data.elevacion
+            filas, columnas = np.mgrid[0:grid_z.shape[0]:5, 0:grid_z.shape[1]:5]
+            validos = dem_data.mascara[filas, columnas] & ~np.isnan(grid_z[filas, columnas])
+            filas, columnas = filas[validos], columnas[validos]
+            lon, lat = dem_data.grilla.coordenadas_geograficas(filas, columnas)
+            
+            if len(filas):
+                df_dem = pd.DataFrame({
+                    'lat': lat,
+                    'lon': lon,
+                    'elevacion_m': grid_z[filas, columnas],
+                    'pendiente_%': dem_data.pendiente[filas, columnas],
+                    'pendiente_grados': pendiente_grados(dem_data.pendiente[filas, columnas]),
+                    'aspecto_grados': dem_data.aspecto[filas, columnas]
+                })
                 csv = df_dem.to_csv(index=False)
                 st.download_button(
                     label="📊 Descargar Muestras DEM (CSV)",
@@ -4041,7 +1320,7 @@ def mostrar_resultados_curvas_nivel():
         # Generar informe PDF
         if st.button("📄 Generar Informe Curvas PDF", type="primary", key="pdf_curvas"):
             with st.spinner("🔄 Generando informe PDF..."):
-                pdf_buffer = generar_informe_pdf(
+                pdf_buffer = generar_informe_cache(
                     gdf_curvas, cultivo, "ANÁLISIS DE CURVAS DE NIVEL (LIDAR/DEM)", None, mes_analisis, area_total, None
                 )
                 
@@ -4052,32 +1331,45 @@ def mostrar_resultados_curvas_nivel():
                     mime="application/pdf"
                 )
 
+    # Estadísticas, mapas y CSV ya usaron las derivadas: se sueltan para que el DEM guardado
+    # en la sesión no retenga cuatro grillas más entre recargas (se recalculan si se piden)
+    dem_data.liberar_derivadas()
+
+# FUNCIÓN: LOTE SELECCIONADO
+def gdf_lote_seleccionado():
+    """Geometría del lote seleccionado en el mapa (el mismo que se divide en zonas)"""
+    gdf_original = st.session_state.gdf_original
+    lote = st.session_state.lote_seleccionado if len(gdf_original) > 1 else 0
+    return gdf_original.iloc[[lote]].reset_index(drop=True)
+
 # FUNCIÓN PARA EJECUTAR ANÁLISIS DE CURVAS DE NIVEL
-def ejecutar_analisis_curvas_nivel(gdf_original, intervalo=5.0, resolucion=10.0):
-    """Ejecuta el análisis completo de curvas de nivel"""
+def ejecutar_analisis_curvas_nivel(gdf_lote, intervalo=5.0, resolucion=10.0, ruta_dem=None):
+    """Ejecuta el análisis completo de curvas de nivel sobre un lote"""
     
-    with st.spinner("🔄 Generando modelo digital de elevación (DEM)..."):
-        # Calcular curvas de nivel
-        gdf_curvas, grid_x, grid_y, grid_z, pendiente_grid, aspecto_grid, bounds = calcular_curvas_nivel(
-            gdf_original, intervalo, resolucion
-        )
+    st.session_state.parametros_curvas = (intervalo, resolucion, ruta_dem, huella_geometria(gdf_lote))
+    st.session_state.error_dem = None
+    try:
+        with st.spinner("🔄 Generando modelo digital de elevación (DEM)..."):
+            # Calcular curvas de nivel
+            gdf_curvas, modelo = calcular_curvas_cache(gdf_lote, intervalo, resolucion, ruta_dem)
+    except Exception as e:
+        # DEM de archivo ilegible, que no cubre el lote o que no se pudo generar
+        st.session_state.curvas_nivel = None
+        st.session_state.dem_data = None
+        st.session_state.error_dem = str(e)
+        st.error(f"❌ No se pudo obtener el DEM: {e}")
+        return None
     
-    # Guardar en session_state
+    # Guardar en session_state el modelo compacto (float32, sin mallas de coordenadas)
     st.session_state.curvas_nivel = gdf_curvas
-    st.session_state.dem_data = {
-        'grid_x': grid_x,
-        'grid_y': grid_y,
-        'grid_z': grid_z,
-        'pendiente_grid': pendiente_grid,
-        'aspecto_grid': aspecto_grid,
-        'bounds': bounds
-    }
+    st.session_state.dem_data = modelo
     
     return gdf_curvas
 
 # FUNCIÓN PARA MOSTRAR RESULTADOS PRINCIPALES
 def mostrar_resultados_principales():
     """Muestra los resultados del análisis principal (solo para fertilidad o recomendaciones NPK)"""
+    from streamlit_folium import st_folium
     gdf_analisis = st.session_state.gdf_analisis
     area_total = st.session_state.area_total
 
@@ -4167,7 +1459,7 @@ def mostrar_resultados_principales():
     st_folium(mapa_analisis, width=800, height=500)
     # MAPA ESTÁTICO PARA DESCARGA
     st.markdown("### 📄 Mapa para Reporte")
-    mapa_estatico = crear_mapa_estatico(
+    mapa_estatico = crear_mapa_estatico_cache(
         gdf_analisis, titulo_mapa, columna_visualizar, analisis_tipo, nutriente
     )
     if mapa_estatico:
@@ -4227,7 +1519,7 @@ def mostrar_resultados_principales():
         # Descargar PDF
         if st.button("📄 Generar Informe PDF", type="primary", key="pdf_principal"):
             with st.spinner("🔄 Generando informe PDF..."):
-                pdf_buffer = generar_informe_pdf(
+                pdf_buffer = generar_informe_cache(
                     gdf_analisis, cultivo, analisis_tipo, nutriente, mes_analisis, area_total, st.session_state.analisis_textura
                 )
                 st.download_button(
@@ -4255,9 +1547,14 @@ def main():
     # Procesar archivo subido si existe
     if uploaded_file is not None and not st.session_state.analisis_completado:
         with st.spinner("🔄 Procesando archivo..."):
-            gdf_original = procesar_archivo(uploaded_file)
+            gdf_original, reporte_geometria = procesar_archivo(
+                uploaded_file, filtro_nombres, filtro_carpetas, tolerancia_simplificacion
+            )
             if gdf_original is not None:
                 st.session_state.gdf_original = gdf_original
+                st.session_state.reporte_geometria = reporte_geometria
+                if st.session_state.lote_seleccionado >= len(gdf_original):
+                    st.session_state.lote_seleccionado = 0
                 st.session_state.datos_demo = False
 
     # Cargar datos de demostración si se solicita
@@ -4302,7 +1599,7 @@ def main():
                     mostrar_resultados_ndwi_suelo()
                 elif st.session_state.gdf_zonas is not None:
                     with st.spinner("💧 Analizando NDWI del suelo..."):
-                        gdf_ndwi = analizar_ndwi_suelo(st.session_state.gdf_zonas, cultivo, mes_analisis)
+                        gdf_ndwi = analizar_ndwi_cache(st.session_state.gdf_zonas, cultivo, mes_analisis)
                         st.session_state.gdf_analisis = gdf_ndwi
                         mostrar_resultados_ndwi_suelo()
                 else:
@@ -4314,12 +1611,9 @@ def main():
                     mostrar_resultados_curvas_nivel()
                 elif st.session_state.gdf_original is not None:
                     with st.spinner("🏔️ Generando curvas de nivel desde LiDAR/DEM..."):
-                        # Obtener parámetros del sidebar
-                        intervalo = intervalo_curvas if 'intervalo_curvas' in locals() else 5.0
-                        resolucion = resolucion_dem if 'resolucion_dem' in locals() else 10.0
-                        
-                        gdf_curvas = ejecutar_analisis_curvas_nivel(
-                            st.session_state.gdf_original, intervalo, resolucion
+                        # Parámetros del sidebar
+                        ejecutar_analisis_curvas_nivel(
+                            gdf_lote_seleccionado(), intervalo_curvas, resolucion_dem, ruta_dem
                         )
                         mostrar_resultados_curvas_nivel()
                 else:
@@ -4360,6 +1654,7 @@ def mostrar_modo_demo():
 
 def mostrar_configuracion_parcela():
     """Muestra la configuración de la parcela antes del análisis"""
+    from streamlit_folium import st_folium
     gdf_original = st.session_state.gdf_original
     
     # Mostrar información de la parcela
@@ -4379,13 +1674,39 @@ def mostrar_configuracion_parcela():
         st.metric("🔢 Número de Polígonos", num_poligonos)
     with col3:
         st.metric("🌱 Cultivo", cultivo.replace('_', ' ').title())
-    
+
+    # Reporte de preparación de geometrías
+    reporte = st.session_state.reporte_geometria
+    if reporte is not None and not st.session_state.datos_demo:
+        col_v1, col_v2, col_v3 = st.columns(3)
+        with col_v1:
+            st.metric("📍 Vértices Originales", f"{reporte['vertices_antes']:,}")
+        with col_v2:
+            st.metric("✂️ Vértices Tras Preparación", f"{reporte['vertices_despues']:,}",
+                      delta=reporte['vertices_despues'] - reporte['vertices_antes'], delta_color="off")
+        with col_v3:
+            st.metric("🩹 Geometrías Reparadas", reporte['geometrias_reparadas'])
+        if reporte.get('lotes_duplicados'):
+            st.warning(f"⚠️ Se descartaron {reporte['lotes_duplicados']} lotes repetidos (misma geometría)")
+
     # VISUALIZADOR DE PARCELA ORIGINAL
     st.markdown("### 🗺️ Visualizador de Parcela")
     
     # Crear y mostrar mapa interactivo
     mapa_parcela = crear_mapa_visualizador_parcela(gdf_original)
-    st_folium(mapa_parcela, width=800, height=500)
+    salida_mapa = st_folium(mapa_parcela, width=800, height=500)
+
+    # SELECCIÓN DE LOTE CON CLICK (archivos con varios polígonos)
+    if num_poligonos > 1:
+        click = (salida_mapa or {}).get('last_clicked')
+        if click:
+            # El click llega en grados: se lleva al CRS de la parcela antes de consultar el índice
+            lotes = buscar_lotes_por_punto(gdf_original, click['lng'], click['lat'], crs_punto='EPSG:4326')
+            if len(lotes) > 0:
+                st.session_state.lote_seleccionado = int(lotes[0])
+        lote = st.session_state.lote_seleccionado
+        st.info(f"🖱️ Lote seleccionado: **Parcela {lote + 1}** de {num_poligonos} "
+                f"({calcular_superficie(gdf_original.iloc[[lote]]):.2f} ha). Haga click en el mapa para cambiarlo.")
     
     # DIVIDIR PARCELA EN ZONAS
     st.markdown("### 📊 División en Zonas de Manejo")
@@ -4393,44 +1714,153 @@ def mostrar_configuracion_parcela():
     
     # Botón para ejecutar análisis
     if st.button("🚀 Ejecutar Análisis GEE Completo", type="primary"):
-        with st.spinner("🔄 Dividiendo parcela en zonas..."):
-            gdf_zonas = dividir_parcela_en_zonas(gdf_original, n_divisiones)
-            st.session_state.gdf_zonas = gdf_zonas
-        
-        with st.spinner("🔬 Realizando análisis GEE..."):
-            # Calcular índices según tipo de análisis
-            if analisis_tipo == "ANÁLISIS DE TEXTURA":
-                gdf_analisis = analizar_textura_suelo(gdf_zonas, cultivo, mes_analisis)
-                st.session_state.analisis_textura = gdf_analisis
-                st.session_state.gdf_analisis = gdf_analisis
-            elif analisis_tipo == "ANÁLISIS NDWI SUELO":
-                gdf_analisis = analizar_ndwi_suelo(gdf_zonas, cultivo, mes_analisis)
-                st.session_state.gdf_analisis = gdf_analisis
-            elif analisis_tipo == "ANÁLISIS DE CURVAS DE NIVEL (LIDAR/DEM)":
-                # Para curvas de nivel usamos la parcela original, no las zonas
-                # Obtener parámetros del sidebar
-                intervalo = intervalo_curvas if 'intervalo_curvas' in locals() else 5.0
-                resolucion = resolucion_dem if 'resolucion_dem' in locals() else 10.0
-                
-                gdf_analisis = ejecutar_analisis_curvas_nivel(gdf_original, intervalo, resolucion)
-                st.session_state.gdf_analisis = gdf_analisis
-            else:
-                gdf_analisis = calcular_indices_gee(
-                    gdf_zonas, cultivo, mes_analisis, analisis_tipo, nutriente
-                )
-                st.session_state.gdf_analisis = gdf_analisis
+        if perfilado_habilitado() and st.session_state.get('perfil_armado'):
+            iniciar_perfilado()
+        with etapa('analisis_completo', analisis_tipo=analisis_tipo, cultivo=cultivo, zonas=n_divisiones):
+            with st.spinner("🔄 Dividiendo parcela en zonas..."):
+                gdf_zonas = dividir_zonas_cache(gdf_lote_seleccionado(), n_divisiones)
+                gdf_zonas = unir_lotes_zonas(gdf_original, gdf_zonas)
+                st.session_state.gdf_zonas = gdf_zonas
+        
+            with st.spinner("🔬 Realizando análisis GEE..."):
+                # Calcular índices según tipo de análisis
+                if analisis_tipo == "ANÁLISIS DE TEXTURA":
+                    gdf_analisis = analizar_textura_cache(gdf_zonas, cultivo, mes_analisis)
+                    st.session_state.analisis_textura = gdf_analisis
+                    st.session_state.gdf_analisis = gdf_analisis
+                elif analisis_tipo == "ANÁLISIS NDWI SUELO":
+                    gdf_analisis = analizar_ndwi_cache(gdf_zonas, cultivo, mes_analisis)
+                    st.session_state.gdf_analisis = gdf_analisis
+                elif analisis_tipo == "ANÁLISIS DE CURVAS DE NIVEL (LIDAR/DEM)":
+                    # Para curvas de nivel usamos el lote seleccionado entero, no sus zonas
+                    # Parámetros del sidebar
+                    gdf_analisis = ejecutar_analisis_curvas_nivel(
+                        gdf_lote_seleccionado(), intervalo_curvas, resolucion_dem, ruta_dem
+                    )
+                    st.session_state.gdf_analisis = gdf_analisis
+                else:
+                    gdf_analisis = calcular_indices_cache(
+                        gdf_zonas, cultivo, mes_analisis, analisis_tipo, nutriente
+                    )
+                    st.session_state.gdf_analisis = gdf_analisis
             
-            # Siempre ejecutar análisis de textura también (excepto cuando ya es análisis de textura)
-            if analisis_tipo != "ANÁLISIS DE TEXTURA" and analisis_tipo != "ANÁLISIS DE CURVAS DE NIVEL (LIDAR/DEM)":
-                with st.spinner("🏗️ Realizando análisis de textura..."):
-                    gdf_textura = analizar_textura_suelo(gdf_zonas, cultivo, mes_analisis)
-                    st.session_state.analisis_textura = gdf_textura
+                # Siempre ejecutar análisis de textura también (excepto cuando ya es análisis de textura)
+                if analisis_tipo != "ANÁLISIS DE TEXTURA" and analisis_tipo != "ANÁLISIS DE CURVAS DE NIVEL (LIDAR/DEM)":
+                    with st.spinner("🏗️ Realizando análisis de textura..."):
+                        gdf_textura = analizar_textura_cache(gdf_zonas, cultivo, mes_analisis)
+                        st.session_state.analisis_textura = gdf_textura
             
-            st.session_state.area_total = area_total
-            st.session_state.analisis_completado = True
+                st.session_state.area_total = area_total
+                st.session_state.analisis_completado = True
         
         st.rerun()
 
+# PANEL DE DEPURACIÓN CON TIEMPOS POR ETAPA
+def mostrar_panel_traza():
+    """Muestra en el sidebar la traza de tiempos de la sesión y permite descargarla en JSON"""
+    traza = st.session_state.traza
+    with st.sidebar.expander("🐞 Tiempos por Etapa (depuración)"):
+        traza.memoria = st.checkbox(
+            "🧠 Perfil de memoria (tracemalloc)", value=traza.memoria,
+            help="Registra pico y memoria retenida por etapa y los sitios que más asignan. "
+                 "Hace el análisis más lento; se aplica desde la próxima ejecución."
+        )
+        if not traza.etapas:
+            st.caption("Todavía no se registraron etapas en esta sesión")
+            return
+
+        df_etapas = pd.DataFrame(traza.etapas)
+        df_etapas['etapa'] = ['  ' * n + e for n, e in zip(df_etapas['nivel'], df_etapas['etapa'])]
+        columnas = ['corrida', 'etapa', 'segundos', 'cpu_segundos', 'rss_pico_mb', 'rss_pico_aumento_mb']
+        if 'memoria' in df_etapas:
+            memoria = df_etapas['memoria'].apply(lambda m: m if isinstance(m, dict) else {})
+            df_etapas['memoria_pico_mb'] = memoria.apply(lambda m: m.get('pico_mb'))
+            df_etapas['memoria_retenida_mb'] = memoria.apply(lambda m: m.get('retenida_mb'))
+            columnas += ['memoria_pico_mb', 'memoria_retenida_mb']
+        st.markdown("**Últimas etapas**")
+        st.dataframe(df_etapas[columnas].tail(30), hide_index=True)
+
+        if 'memoria' in df_etapas:
+            sitios = [
+                {'etapa': e['etapa'], **sitio}
+                for e in traza.etapas[-30:] if e.get('memoria') for sitio in e['memoria']['sitios']
+            ]
+            if sitios:
+                st.markdown("**Sitios que más memoria retuvieron**")
+                df_sitios = pd.DataFrame(sitios).sort_values('retenida_kb', ascending=False).head(15)
+                df_sitios['archivo'] = df_sitios['archivo'].apply(os.path.basename)
+                st.dataframe(df_sitios, hide_index=True)
+
+        st.markdown("**Totales por etapa**")
+        df_resumen = pd.DataFrame.from_dict(traza.resumen(), orient='index').sort_values('segundos', ascending=False)
+        st.dataframe(df_resumen.round(3))
+
+        st.download_button(
+            label="📥 Descargar Traza JSON",
+            data=traza.a_json(),
+            file_name=f"traza_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+            mime="application/json"
+        )
+        if st.button("🧹 Limpiar Traza"):
+            traza.limpiar()
+            st.rerun()
+
+# PERFILADO DE CPU BAJO DEMANDA (SOLO ADMINISTRADORES)
+def iniciar_perfilado():
+    """Empieza a perfilar: abarca esta ejecución y la siguiente, que muestra los resultados"""
+    st.session_state.perfil_armado = False
+    st.session_state.perfilador = Perfilador('analisis')
+    st.session_state.perfil_corridas = 0
+    st.session_state.perfilador.reanudar()
+
+
+def cerrar_perfilado():
+    """Pausa el perfil al terminar la ejecución del clic y lo guarda al terminar la de resultados"""
+    perfilador = st.session_state.perfilador
+    if perfilador is None:
+        return
+    st.session_state.perfil_corridas += 1
+    if st.session_state.perfil_corridas < 2:
+        perfilador.pausar()
+        return
+    try:
+        rutas = perfilador.guardar()
+        st.session_state.ultimo_perfil = {'rutas': rutas, 'resumen': perfilador.resumen()}
+    except Exception as e:
+        st.sidebar.error(f"❌ No se pudo guardar el perfil: {str(e)}")
+    st.session_state.perfilador = None
+
+
+def mostrar_panel_perfilado():
+    """Interruptor para perfilar el próximo análisis y descarga del último perfil"""
+    if not perfilado_habilitado():
+        return
+    with st.sidebar.expander("⏱️ Perfilado de CPU (administración)"):
+        st.checkbox("Perfilar la próxima ejecución del análisis", key='perfil_armado',
+                    help="Guarda un .pstats (cProfile) y un .folded (pilas para flamegraph) del próximo clic en Ejecutar")
+        if st.session_state.perfilador is not None:
+            st.caption("⏺️ Capturando el perfil del análisis en curso...")
+
+        ultimo = st.session_state.ultimo_perfil
+        if not ultimo:
+            return
+        st.caption(f"Último perfil: {os.path.basename(ultimo['rutas']['pstats'])}")
+        st.dataframe(pd.DataFrame(ultimo['resumen']), hide_index=True)
+        for formato, etiqueta in [('pstats', "📥 Descargar .pstats"), ('folded', "📥 Descargar pilas .folded")]:
+            ruta = ultimo['rutas'][formato]
+            if os.path.exists(ruta):
+                with open(ruta, 'rb') as f:
+                    st.download_button(label=etiqueta, data=f.read(), file_name=os.path.basename(ruta),
+                                       mime="application/octet-stream", key=f"descargar_perfil_{formato}")
+
 # EJECUTAR APLICACIÓN
 if __name__ == "__main__":
-    main()
+    if st.session_state.perfilador is not None:
+        st.session_state.perfilador.reanudar()
+    try:
+        with st.session_state.traza.activar():
+            main()
+    finally:
+        cerrar_perfilado()
+    mostrar_panel_traza()
+    mostrar_panel_perfilado()
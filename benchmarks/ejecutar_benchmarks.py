@@ -0,0 +1,249 @@
+"""Benchmarks de los motores de análisis por cantidad de zonas y complejidad de la parcela.
+
+Dos barridos:
+  * zonas: parcela de referencia (convexa, 1000 vértices) dividida en 16, 256, 4096 y 65536 zonas
+  * complejidad: cada forma de parcela con 10 a 100.000 vértices, a 256 zonas
+
+Los resultados se guardan en JSON y, si existe una línea base, se comparan con ella
+para marcar regresiones. Antes de medir se verifica que los analizadores vectorizados
+den los mismos resultados que los fila por fila (benchmarks/equivalencia_suelo.py).
+
+Uso:
+    python benchmarks/ejecutar_benchmarks.py                 # barrido completo
+    python benchmarks/ejecutar_benchmarks.py --rapido        # 16 y 256 zonas, 10 y 1000 vértices
+    python benchmarks/ejecutar_benchmarks.py --guardar-linea-base
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from analizador.geometria import calcular_superficie, dividir_parcela_en_zonas  # noqa: E402
+from analizador.informes import generar_informe_pdf  # noqa: E402
+from analizador.mapas import crear_mapa_interactivo_esri, crear_mapa_estatico  # noqa: E402
+from analizador.suelo import analizar_textura_suelo, analizar_ndwi_suelo, calcular_indices_gee  # noqa: E402
+from analizador.suelo_vectorizado import (  # noqa: E402
+    analizar_textura_suelo_vectorizado, analizar_ndwi_suelo_vectorizado, calcular_indices_gee_vectorizado
+)
+from analizador.topografia import calcular_curvas_nivel  # noqa: E402
+
+from equivalencia_suelo import imprimir_informes, verificar_equivalencia  # noqa: E402
+from parcelas_sinteticas import FORMAS_PARCELA, generar_parcela  # noqa: E402
+
+DIRECTORIO = os.path.dirname(os.path.abspath(__file__))
+LINEA_BASE_DEFECTO = os.path.join(DIRECTORIO, 'linea_base.json')
+SALIDA_DEFECTO = os.path.join(DIRECTORIO, 'resultados', 'ultimo.json')
+
+ZONAS_BENCHMARK = [16, 256, 4096, 65536]
+VERTICES_BENCHMARK = [10, 1000, 10000, 100000]
+ZONAS_COMPLEJIDAD = 256
+PARCELA_REFERENCIA = ('convexa', 1000)
+
+CULTIVO = 'MAIZ'
+MES = 'MARZO'
+TIPO = 'FERTILIDAD ACTUAL'
+NUTRIENTE = 'NITRÓGENO'
+
+
+def _mapa_interactivo(c):
+    # Se incluye el render a HTML: es lo que paga st_folium al mostrar el mapa
+    mapa = crear_mapa_interactivo_esri(c['indices'], 'Benchmark', 'indice_fertilidad', TIPO, NUTRIENTE)
+    return mapa.get_root().render()
+
+
+# MOTORES MEDIDOS: (función sobre el contexto, depende de la cantidad de zonas)
+MOTORES = {
+    'dividir_parcela_en_zonas': (lambda c: dividir_parcela_en_zonas(c['parcela'], c['n_zonas']), True),
+    'calcular_indices_gee': (lambda c: calcular_indices_gee(c['zonas'], CULTIVO, MES, TIPO, NUTRIENTE), True),
+    'analizar_textura_suelo': (lambda c: analizar_textura_suelo(c['zonas'], CULTIVO, MES), True),
+    'analizar_ndwi_suelo': (lambda c: analizar_ndwi_suelo(c['zonas'], CULTIVO, MES), True),
+    'calcular_indices_gee_vectorizado': (lambda c: calcular_indices_gee_vectorizado(c['zonas'], CULTIVO, MES, TIPO, NUTRIENTE), True),
+    'analizar_textura_suelo_vectorizado': (lambda c: analizar_textura_suelo_vectorizado(c['zonas'], CULTIVO, MES), True),
+    'analizar_ndwi_suelo_vectorizado': (lambda c: analizar_ndwi_suelo_vectorizado(c['zonas'], CULTIVO, MES), True),
+    'calcular_curvas_nivel': (lambda c: calcular_curvas_nivel(c['parcela'], 5.0, 10.0), False),
+    'crear_mapa_interactivo_esri': (_mapa_interactivo, True),
+    'crear_mapa_estatico': (lambda c: crear_mapa_estatico(c['indices'], 'Benchmark', 'indice_fertilidad', TIPO, NUTRIENTE), True),
+    'generar_informe_pdf': (lambda c: generar_informe_pdf(c['indices'], CULTIVO, TIPO, NUTRIENTE, MES, c['area'], c['textura']), True),
+}
+
+
+def medir(funcion, contexto, repeticiones):
+    """Ejecuta la función varias veces y devuelve los tiempos en segundos"""
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion(contexto)
+        tiempos.append(time.perf_counter() - inicio)
+    return tiempos
+
+
+def _preparar_contexto(parcela, n_zonas):
+    zonas = dividir_parcela_en_zonas(parcela, n_zonas)
+    return {
+        'parcela': parcela,
+        'n_zonas': n_zonas,
+        'zonas': zonas,
+        'indices': calcular_indices_gee(zonas, CULTIVO, MES, TIPO, NUTRIENTE),
+        'textura': analizar_textura_suelo(zonas, CULTIVO, MES),
+        'area': calcular_superficie(parcela),
+    }
+
+
+def _clave(resultado):
+    return f"{resultado['motor']}|{resultado['forma']}|{resultado['vertices']}|{resultado['zonas']}"
+
+
+def ejecutar(casos, motores, repeticiones, limite_segundos):
+    """Corre los casos [(forma, vertices, zonas)] y devuelve la lista de resultados"""
+    resultados = []
+    excedidos = set()
+    parcelas = {}
+    sin_zonas_hechos = set()
+
+    for forma, vertices, n_zonas in casos:
+        clave_parcela = (forma, vertices)
+        if clave_parcela not in parcelas:
+            parcelas[clave_parcela] = generar_parcela(forma, vertices)
+        parcela = parcelas[clave_parcela]
+
+        pendientes = [
+            m for m in motores
+            if not (not MOTORES[m][1] and clave_parcela + (m,) in sin_zonas_hechos)
+        ]
+        if not pendientes:
+            continue
+
+        print(f"▶ {forma} · {vertices} vértices · {n_zonas} zonas")
+        contexto = _preparar_contexto(parcela, n_zonas)
+        for motor in pendientes:
+            funcion, depende_de_zonas = MOTORES[motor]
+            zonas_resultado = n_zonas if depende_de_zonas else None
+            if not depende_de_zonas:
+                sin_zonas_hechos.add(clave_parcela + (motor,))
+
+            resultado = {'motor': motor, 'forma': forma, 'vertices': vertices, 'zonas': zonas_resultado,
+                         'zonas_reales': len(contexto['zonas']) if depende_de_zonas else None}
+            # Si el mismo motor ya superó el límite con menos zonas o vértices, no insistir
+            if (motor, forma) in excedidos:
+                resultado['omitido'] = f"superó {limite_segundos:.0f} s en un caso más chico"
+                resultados.append(resultado)
+                print(f"    {motor:36s} omitido")
+                continue
+
+            tiempos = medir(funcion, contexto, repeticiones)
+            resultado.update({
+                'segundos_min': round(min(tiempos), 6),
+                'segundos_mediana': round(statistics.median(tiempos), 6),
+                'repeticiones': repeticiones,
+            })
+            resultados.append(resultado)
+            print(f"    {motor:36s} {resultado['segundos_min']:10.4f} s")
+            if min(tiempos) > limite_segundos:
+                excedidos.add((motor, forma))
+    return resultados
+
+
+def comparar(resultados, linea_base, umbral, piso_segundos):
+    """Compara contra la línea base; devuelve la lista de regresiones"""
+    base = {_clave(r): r for r in linea_base.get('resultados', []) if 'segundos_min' in r}
+    regresiones = []
+    print("\nComparación con la línea base (actual / base):")
+    for r in resultados:
+        anterior = base.get(_clave(r))
+        if anterior is None or 'segundos_min' not in r:
+            continue
+        razon = r['segundos_min'] / anterior['segundos_min'] if anterior['segundos_min'] > 0 else float('inf')
+        r['razon_linea_base'] = round(razon, 3)
+        marca = ''
+        if razon > umbral and r['segundos_min'] - anterior['segundos_min'] > piso_segundos:
+            marca = '  ❌ REGRESIÓN'
+            regresiones.append(r)
+        elif razon < 1.0 / umbral:
+            marca = '  ✅ mejora'
+        print(f"  {_clave(r):60s} {anterior['segundos_min']:9.4f} → {r['segundos_min']:9.4f} s  x{razon:6.2f}{marca}")
+    return regresiones
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks de los motores de análisis")
+    parser.add_argument('--zonas', type=int, nargs='+', default=ZONAS_BENCHMARK)
+    parser.add_argument('--vertices', type=int, nargs='+', default=VERTICES_BENCHMARK)
+    parser.add_argument('--formas', nargs='+', choices=FORMAS_PARCELA, default=FORMAS_PARCELA)
+    parser.add_argument('--motores', nargs='+', choices=list(MOTORES), default=list(MOTORES))
+    parser.add_argument('--zonas-complejidad', type=int, default=ZONAS_COMPLEJIDAD,
+                        help="Cantidad de zonas del barrido de complejidad")
+    parser.add_argument('--repeticiones', type=int, default=3)
+    parser.add_argument('--limite-segundos', type=float, default=120.0,
+                        help="Si un motor supera este tiempo, se omiten sus casos más grandes")
+    parser.add_argument('--rapido', action='store_true', help="Solo 16 y 256 zonas, 10 y 1000 vértices a 16 zonas, 1 repetición")
+    parser.add_argument('--salida', default=SALIDA_DEFECTO)
+    parser.add_argument('--linea-base', default=LINEA_BASE_DEFECTO)
+    parser.add_argument('--guardar-linea-base', action='store_true', help="Guardar estos resultados como nueva línea base")
+    parser.add_argument('--umbral-regresion', type=float, default=1.25, help="Razón actual/base que cuenta como regresión")
+    parser.add_argument('--sin-equivalencia', action='store_true',
+                        help="No verificar que los analizadores vectorizados den lo mismo que los fila por fila")
+    parser.add_argument('--piso-segundos', type=float, default=0.05, help="Diferencias menores se consideran ruido")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.ERROR)
+    if args.rapido:
+        args.zonas = [z for z in args.zonas if z <= 256]
+        args.vertices = [v for v in args.vertices if v <= 1000]
+        args.zonas_complejidad = 16
+        args.repeticiones = 1
+
+    forma_ref, vertices_ref = PARCELA_REFERENCIA
+    casos = [(forma_ref, vertices_ref, z) for z in args.zonas]
+    casos += [(f, v, args.zonas_complejidad) for f in args.formas for v in args.vertices
+              if (f, v, args.zonas_complejidad) not in casos]
+
+    fallas_equivalencia = []
+    if not args.sin_equivalencia:
+        print("Verificando equivalencia de los analizadores vectorizados...")
+        fallas_equivalencia = imprimir_informes(verificar_equivalencia([z for z in args.zonas if z <= 4096]))
+
+    inicio = time.perf_counter()
+    resultados = ejecutar(casos, args.motores, args.repeticiones, args.limite_segundos)
+
+    reporte = {
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'cpus': os.cpu_count(),
+        'segundos_totales': round(time.perf_counter() - inicio, 2),
+        'resultados': resultados,
+    }
+    if not args.sin_equivalencia:
+        reporte['equivalencia'] = {'comparaciones_con_diferencias': len(fallas_equivalencia),
+                                   'errores': [f"{i['analizador']}|{i['zonas']}|{i['cultivo']}: {'; '.join(i['errores'])}"
+                                               for i in fallas_equivalencia]}
+
+    regresiones = []
+    if os.path.exists(args.linea_base) and not args.guardar_linea_base:
+        with open(args.linea_base, 'r', encoding='utf-8') as f:
+            regresiones = comparar(resultados, json.load(f), args.umbral_regresion, args.piso_segundos)
+        reporte['regresiones'] = [_clave(r) for r in regresiones]
+
+    destino = args.linea_base if args.guardar_linea_base else args.salida
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    with open(destino, 'w', encoding='utf-8') as f:
+        json.dump(reporte, f, ensure_ascii=False, indent=2)
+    print(f"\nResultados guardados en {destino}")
+
+    if regresiones:
+        print(f"❌ {len(regresiones)} regresiones respecto de la línea base")
+    if fallas_equivalencia:
+        print(f"❌ {len(fallas_equivalencia)} comparaciones de equivalencia con diferencias")
+    return 1 if regresiones or fallas_equivalencia else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
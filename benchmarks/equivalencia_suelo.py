@@ -0,0 +1,169 @@
+"""Equivalencia entre los analizadores fila por fila y sus versiones vectorizadas.
+
+Corre calcular_indices_gee, analizar_textura_suelo y analizar_ndwi_suelo junto con
+sus versiones de analizador/suelo_vectorizado.py sobre las mismas zonas sintéticas y
+compara todas las columnas: las numéricas dentro de una tolerancia y las categóricas
+de forma exacta. Informa el error máximo por columna y termina con código 1 si algo difiere.
+
+Uso:
+    python benchmarks/equivalencia_suelo.py
+    python benchmarks/equivalencia_suelo.py --zonas 16 256 4096 --salida equivalencia.json
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from analizador.geometria import dividir_parcela_en_zonas  # noqa: E402
+from analizador.suelo import analizar_textura_suelo, analizar_ndwi_suelo, calcular_indices_gee  # noqa: E402
+from analizador.suelo_vectorizado import (  # noqa: E402
+    analizar_textura_suelo_vectorizado, analizar_ndwi_suelo_vectorizado, calcular_indices_gee_vectorizado
+)
+
+from parcelas_sinteticas import generar_parcela  # noqa: E402
+
+TOLERANCIA_RELATIVA = 1e-9
+TOLERANCIA_ABSOLUTA = 1e-9
+
+# (cultivo, mes, tipo de análisis, nutriente): cubre las tres ramas de recomendación NPK
+CASOS_EQUIVALENCIA = [
+    ('MAIZ', 'MARZO', 'FERTILIDAD ACTUAL', 'NITRÓGENO'),
+    ('SOJA', 'ENERO', 'RECOMENDACIONES NPK', 'FÓSFORO'),
+    ('TRIGO', 'JULIO', 'RECOMENDACIONES NPK', 'POTASIO'),
+    ('GIRASOL', 'OCTUBRE', 'FERTILIDAD ACTUAL', 'NITRÓGENO'),
+]
+
+# Pares (nombre, fila por fila, vectorizado) con la firma (zonas, cultivo, mes, tipo, nutriente)
+PARES_ANALIZADORES = [
+    ('calcular_indices_gee',
+     lambda g, c, m, t, n: calcular_indices_gee(g, c, m, t, n),
+     lambda g, c, m, t, n: calcular_indices_gee_vectorizado(g, c, m, t, n)),
+    ('analizar_textura_suelo',
+     lambda g, c, m, t, n: analizar_textura_suelo(g, c, m),
+     lambda g, c, m, t, n: analizar_textura_suelo_vectorizado(g, c, m)),
+    ('analizar_ndwi_suelo',
+     lambda g, c, m, t, n: analizar_ndwi_suelo(g, c, m),
+     lambda g, c, m, t, n: analizar_ndwi_suelo_vectorizado(g, c, m)),
+]
+
+
+def comparar_columnas(referencia, candidato):
+    """Diferencias por columna entre dos GeoDataFrames de la misma forma"""
+    informe = {'columnas': {}, 'errores': []}
+    if list(referencia.columns) != list(candidato.columns):
+        informe['errores'].append(f"columnas distintas: {list(referencia.columns)} vs {list(candidato.columns)}")
+        return informe
+    if len(referencia) != len(candidato):
+        informe['errores'].append(f"filas distintas: {len(referencia)} vs {len(candidato)}")
+        return informe
+
+    for columna in referencia.columns:
+        a = referencia[columna]
+        b = candidato[columna]
+        if columna == referencia.geometry.name:
+            ambas_nulas = a.isna().to_numpy() & b.isna().to_numpy()
+            iguales = bool((a.geom_equals_exact(b, tolerance=0).to_numpy() | ambas_nulas).all())
+            informe['columnas'][columna] = {'tipo': 'geometria', 'iguales': iguales}
+            if not iguales:
+                informe['errores'].append(f"{columna}: geometrías distintas")
+        elif pd.api.types.is_numeric_dtype(a) and pd.api.types.is_numeric_dtype(b):
+            x = a.to_numpy(dtype=float)
+            y = b.to_numpy(dtype=float)
+            error = np.abs(x - y)
+            error_max = float(np.nanmax(error)) if len(error) else 0.0
+            dentro = np.isclose(x, y, rtol=TOLERANCIA_RELATIVA, atol=TOLERANCIA_ABSOLUTA, equal_nan=True)
+            informe['columnas'][columna] = {'tipo': 'numerica', 'error_max': error_max,
+                                            'fuera_de_tolerancia': int((~dentro).sum())}
+            if not dentro.all():
+                informe['errores'].append(f"{columna}: {int((~dentro).sum())} valores fuera de tolerancia "
+                                          f"(error máximo {error_max:.3g})")
+        else:
+            distintos = int((a.astype(str).to_numpy() != b.astype(str).to_numpy()).sum())
+            informe['columnas'][columna] = {'tipo': 'categorica', 'distintos': distintos}
+            if distintos:
+                informe['errores'].append(f"{columna}: {distintos} categorías distintas")
+    return informe
+
+
+def zonas_de_prueba(n_zonas, forma='concava', vertices=1000):
+    """Zonas sintéticas con una fila sin geometría al final para cubrir los valores por defecto"""
+    zonas = dividir_parcela_en_zonas(generar_parcela(forma, vertices), n_zonas)
+    vacia = zonas.iloc[[0]].copy()
+    vacia['id_zona'] = len(zonas) + 1
+    vacia[vacia.geometry.name] = None
+    return pd.concat([zonas, vacia], ignore_index=True)
+
+
+def verificar_equivalencia(lista_zonas, casos=CASOS_EQUIVALENCIA):
+    """Corre todos los pares sobre todas las combinaciones; devuelve la lista de informes"""
+    informes = []
+    for n_zonas in lista_zonas:
+        zonas = zonas_de_prueba(n_zonas)
+        for cultivo, mes, tipo, nutriente in casos:
+            for nombre, fila_por_fila, vectorizado in PARES_ANALIZADORES:
+                informe = comparar_columnas(
+                    fila_por_fila(zonas, cultivo, mes, tipo, nutriente),
+                    vectorizado(zonas, cultivo, mes, tipo, nutriente),
+                )
+                informe.update({'analizador': nombre, 'zonas': len(zonas), 'cultivo': cultivo,
+                                'mes': mes, 'nutriente': nutriente})
+                informes.append(informe)
+    return informes
+
+
+def imprimir_informes(informes):
+    """Error máximo por analizador y columna sobre todos los casos"""
+    maximos = {}
+    for informe in informes:
+        for columna, datos in informe['columnas'].items():
+            clave = (informe['analizador'], columna)
+            if datos['tipo'] == 'numerica':
+                maximos[clave] = max(maximos.get(clave, 0.0), datos['error_max'])
+            elif datos['tipo'] == 'categorica':
+                maximos[clave] = maximos.get(clave, 0) + datos['distintos']
+    analizador_actual = None
+    for (analizador, columna), valor in maximos.items():
+        if analizador != analizador_actual:
+            print(f"\n{analizador}")
+            analizador_actual = analizador
+        detalle = f"error máx {valor:.3g}" if isinstance(valor, float) else f"{valor} distintas"
+        print(f"    {columna:28s} {detalle}")
+
+    fallas = [i for i in informes if i['errores']]
+    for informe in fallas:
+        print(f"❌ {informe['analizador']} · {informe['zonas']} zonas · {informe['cultivo']} {informe['mes']} "
+              f"{informe['nutriente']}: {'; '.join(informe['errores'])}")
+    return fallas
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Equivalencia de los analizadores vectorizados")
+    parser.add_argument('--zonas', type=int, nargs='+', default=[16, 256])
+    parser.add_argument('--salida', default=None, help="Guardar los informes completos en JSON")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.ERROR)
+    informes = verificar_equivalencia(args.zonas)
+    fallas = imprimir_informes(informes)
+
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            json.dump(informes, f, ensure_ascii=False, indent=2)
+
+    if fallas:
+        print(f"\n❌ {len(fallas)} de {len(informes)} comparaciones con diferencias")
+        return 1
+    print(f"\n✅ {len(informes)} comparaciones equivalentes")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
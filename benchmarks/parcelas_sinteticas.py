@@ -0,0 +1,74 @@
+"""Generador de parcelas sintéticas para benchmarks.
+
+Formas disponibles: convexa, concava, con_huecos y multiparte, con cualquier
+cantidad de vértices (de 10 a 100.000 o más). Las parcelas se ubican en la
+zona pampeana y se devuelven como GeoDataFrame en EPSG:4326.
+"""
+import math
+
+import geopandas as gpd
+import numpy as np
+from shapely.geometry import MultiPolygon, Polygon
+
+FORMAS_PARCELA = ['convexa', 'concava', 'con_huecos', 'multiparte']
+
+CENTRO_DEFECTO = (-60.5, -33.5)
+
+# ~6,5 km de lado: admite 64k zonas sin bajar del tamaño mínimo de celda (~11 m)
+EXTENSION_DEFECTO_GRADOS = 0.06
+
+
+def _anillo(cx, cy, radio, n_vertices, amplitud=0.0, lobulos=5, rng=None, fase=0.0):
+    """Anillo cerrado de n vértices; con amplitud > 0 la forma es estrellada (cóncava)"""
+    n_vertices = max(int(n_vertices), 3)
+    angulos = np.linspace(0.0, 2.0 * math.pi, n_vertices, endpoint=False) + fase
+    radios = radio * (1.0 + amplitud * np.sin(lobulos * angulos))
+    if rng is not None:
+        # Ruido pequeño para que los vértices no sean perfectamente regulares (como un relevamiento)
+        radios = radios * (1.0 + rng.normal(0.0, 0.002, n_vertices))
+    x = cx + radios * np.cos(angulos)
+    y = cy + radios * np.sin(angulos)
+    return np.column_stack([x, y])
+
+
+# FUNCIÓN PARA GENERAR UNA PARCELA SINTÉTICA
+def generar_parcela(forma='convexa', n_vertices=1000, centro=CENTRO_DEFECTO,
+                    extension_grados=EXTENSION_DEFECTO_GRADOS, semilla=0):
+    """Devuelve un GeoDataFrame de una fila con la parcela pedida (n_vertices en total aproximado)"""
+    if forma not in FORMAS_PARCELA:
+        raise ValueError(f"Forma desconocida: {forma}. Opciones: {', '.join(FORMAS_PARCELA)}")
+
+    rng = np.random.default_rng(semilla)
+    cx, cy = centro
+    radio = extension_grados / 2.0
+
+    if forma == 'convexa':
+        geometria = Polygon(_anillo(cx, cy, radio, n_vertices, rng=rng))
+    elif forma == 'concava':
+        geometria = Polygon(_anillo(cx, cy, radio, n_vertices, amplitud=0.35, lobulos=5, rng=rng))
+    elif forma == 'con_huecos':
+        # 80% de los vértices en el borde exterior, el resto repartido en 4 huecos (bajos, lagunas)
+        n_huecos = 4
+        n_exterior = max(int(n_vertices * 0.8), 3)
+        n_hueco = max((n_vertices - n_exterior) // n_huecos, 3)
+        huecos = []
+        for k in range(n_huecos):
+            ang = 2.0 * math.pi * k / n_huecos
+            huecos.append(_anillo(cx + 0.45 * radio * math.cos(ang), cy + 0.45 * radio * math.sin(ang),
+                                  0.12 * radio, n_hueco, rng=rng)[::-1])
+        geometria = Polygon(_anillo(cx, cy, radio, n_exterior, rng=rng), huecos)
+    else:
+        # Cuatro lotes separados por caminos, cada uno con una parte de los vértices
+        n_partes = 4
+        partes = []
+        for k in range(n_partes):
+            dx = (-1 if k % 2 == 0 else 1) * radio / 2.0
+            dy = (-1 if k < 2 else 1) * radio / 2.0
+            partes.append(Polygon(_anillo(cx + dx, cy + dy, radio * 0.45, n_vertices // n_partes,
+                                          amplitud=0.1, lobulos=3, rng=rng, fase=k)))
+        geometria = MultiPolygon(partes)
+
+    gdf = gpd.GeoDataFrame({'nombre': [f"{forma}_{n_vertices}"]}, geometry=[geometria], crs="EPSG:4326")
+    if not gdf.geometry.iloc[0].is_valid:
+        gdf['geometry'] = gdf.geometry.make_valid()
+    return gdf
@@ -0,0 +1,91 @@
+"""Mide el tiempo de importación del núcleo con `python -X importtime`.
+
+Falla (código de salida 1) si la importación supera el presupuesto o si quedan
+cargados módulos pesados que deberían importarse solo al generar mapas o PDF.
+
+Uso:
+    python benchmarks/tiempo_importacion.py [--presupuesto-ms 800] [--repeticiones 3]
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Módulos que no deben cargarse al importar el núcleo
+MODULOS_DIFERIDOS = ['reportlab', 'folium', 'branca', 'matplotlib', 'scipy.interpolate', 'fiona', 'rasterio', 'streamlit']
+
+PATRON_LINEA = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+
+def medir_importacion(modulo):
+    """Importa el módulo en un intérprete nuevo y devuelve (total_ms, filas, módulos cargados)"""
+    codigo = f"import {modulo}, sys, json; print(json.dumps(sorted(sys.modules)))"
+    proceso = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', codigo],
+        cwd=RAIZ, capture_output=True, text=True, check=True
+    )
+    filas = []
+    total_us = 0
+    for linea in proceso.stderr.splitlines():
+        coincidencia = PATRON_LINEA.match(linea)
+        if not coincidencia:
+            continue
+        propio, acumulado, sangria, nombre = coincidencia.groups()
+        filas.append({'modulo': nombre, 'propio_ms': int(propio) / 1000, 'acumulado_ms': int(acumulado) / 1000})
+        # Las importaciones de primer nivel tienen un solo espacio de sangría
+        if len(sangria) == 1:
+            total_us += int(acumulado)
+    cargados = json.loads(proceso.stdout.strip().splitlines()[-1])
+    return total_us / 1000, filas, cargados
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--modulo', default='analizador')
+    parser.add_argument('--presupuesto-ms', type=float,
+                        default=float(os.environ.get('PRESUPUESTO_IMPORTACION_MS', 800)))
+    parser.add_argument('--repeticiones', type=int, default=3)
+    parser.add_argument('--top', type=int, default=15, help="Módulos más lentos a listar")
+    parser.add_argument('--salida', help="Archivo JSON donde guardar el reporte")
+    args = parser.parse_args(argv)
+
+    # Se toma la mejor de varias corridas para no medir la caché de disco fría
+    mediciones = [medir_importacion(args.modulo) for _ in range(args.repeticiones)]
+    total_ms, filas, cargados = min(mediciones, key=lambda m: m[0])
+
+    diferidos_cargados = [
+        m for m in MODULOS_DIFERIDOS
+        if any(c == m or c.startswith(m + '.') for c in cargados)
+    ]
+    reporte = {
+        'modulo': args.modulo,
+        'total_ms': round(total_ms, 1),
+        'presupuesto_ms': args.presupuesto_ms,
+        'corridas_ms': [round(m[0], 1) for m in mediciones],
+        'diferidos_cargados': diferidos_cargados,
+        'mas_lentos': sorted(filas, key=lambda f: f['propio_ms'], reverse=True)[:args.top],
+    }
+
+    print(f"Importación de {args.modulo}: {total_ms:.1f} ms (presupuesto {args.presupuesto_ms:.0f} ms)")
+    for fila in reporte['mas_lentos']:
+        print(f"  {fila['propio_ms']:8.1f} ms  {fila['modulo']}")
+    if args.salida:
+        with open(args.salida, 'w') as f:
+            json.dump(reporte, f, indent=2)
+
+    ok = True
+    if total_ms > args.presupuesto_ms:
+        print(f"❌ Se superó el presupuesto de importación en {total_ms - args.presupuesto_ms:.1f} ms")
+        ok = False
+    if diferidos_cargados:
+        print(f"❌ Módulos que deberían importarse de forma diferida: {', '.join(diferidos_cargados)}")
+        ok = False
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,39 @@
+"""Archivos con nombre propio (DEMs subidos) en la caché en disco con presupuesto LRU"""
+import os
+import time
+
+from analizador.cache import CacheDisco
+
+
+def test_guardar_archivo_conserva_nombre_y_no_reescribe(tmp_path):
+    cache = CacheDisco(str(tmp_path), limite_bytes=1000)
+    ruta = cache.guardar_archivo('abc.tif', b'x' * 10)
+    assert ruta == os.path.join(str(tmp_path), 'abc.tif')
+    # Ya guardado: no se vuelve a escribir, solo se registra el acceso
+    assert cache.guardar_archivo('abc.tif', b'otro contenido') == ruta
+    with open(ruta, 'rb') as f:
+        assert f.read() == b'x' * 10
+    assert cache.bytes_usados() == 10
+
+
+def test_guardar_archivo_desaloja_los_menos_usados(tmp_path):
+    cache = CacheDisco(str(tmp_path), limite_bytes=250)
+    for nombre in ('a.tif', 'b.tif', 'c.tif'):
+        cache.guardar_archivo(nombre, b'x' * 100)
+        time.sleep(0.01)
+    assert sorted(os.listdir(tmp_path)) == ['.bloqueo', 'b.tif', 'c.tif', 'indice.json']
+    # Volver a usar b lo deja como el más reciente: el próximo desalojo se lleva a c
+    cache.guardar_archivo('b.tif', b'x' * 100)
+    time.sleep(0.01)
+    cache.guardar_archivo('d.prj', b'x' * 100)
+    assert not os.path.exists(tmp_path / 'c.tif')
+    assert os.path.exists(tmp_path / 'b.tif') and os.path.exists(tmp_path / 'd.prj')
+    assert cache.bytes_usados() <= 250
+
+
+def test_archivo_mayor_que_el_presupuesto_se_conserva(tmp_path):
+    cache = CacheDisco(str(tmp_path), limite_bytes=50)
+    cache.guardar_archivo('viejo.tif', b'x' * 40)
+    ruta = cache.guardar_archivo('mosaico.tif', b'x' * 500)
+    assert os.path.exists(ruta)
+    assert not os.path.exists(tmp_path / 'viejo.tif')
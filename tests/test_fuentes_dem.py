@@ -0,0 +1,214 @@
+"""Lectura con ventana de GeoTIFF (tiras, teselas, BigTIFF) y ESRI ASCII sin rasterio"""
+import os
+import struct
+
+import geopandas as gpd
+import numpy as np
+import pytest
+from shapely.geometry import box
+
+from analizador.fuentes_dem import (
+    _leer_ventana_ascii, _leer_ventana_tiff_memmap, _ventana_pixeles, directorio_dem_local, leer_dem_archivo,
+    resolver_dem_local
+)
+
+EPSG = 32720
+X0, Y_SUP, CELDA = 500000.0, 6200000.0, 10.0
+ALTO, ANCHO = 45, 70
+NODATA = -9999.0
+
+
+def _dem_prueba():
+    # Plano inclinado conocido en los centros de píxel, con un bloque sin datos
+    cx = X0 + (np.arange(ANCHO) + 0.5) * CELDA
+    cy = Y_SUP - (np.arange(ALTO) + 0.5) * CELDA
+    z = (100 + 0.02 * (cx[None, :] - X0) - 0.01 * (cy[:, None] - Y_SUP)).astype(np.float32)
+    z[20:24, 30:35] = NODATA
+    return z
+
+
+def _escribir_tiff(ruta, z, grande=False, filas_tira=None, tesela=None):
+    """GeoTIFF mínimo sin compresión, float32 little-endian: en tiras o teselas, TIFF o BigTIFF"""
+    alto, ancho = z.shape
+    cabecera = 16 if grande else 8
+    bloques = []
+    if tesela:
+        for tf in range(-(-alto // tesela)):
+            for tc in range(-(-ancho // tesela)):
+                bloque = np.zeros((tesela, tesela), dtype='<f4')
+                parte = z[tf * tesela:(tf + 1) * tesela, tc * tesela:(tc + 1) * tesela]
+                bloque[:parte.shape[0], :parte.shape[1]] = parte
+                bloques.append(bloque.tobytes())
+    else:
+        bloques = [z[i:i + filas_tira].astype('<f4').tobytes() for i in range(0, alto, filas_tira)]
+    offsets = list(np.cumsum([cabecera] + [len(b) for b in bloques[:-1]]))
+    conteos = [len(b) for b in bloques]
+    cuerpo = b''.join(bloques)
+
+    tipo_offset = 16 if grande else 4
+    etiquetas = [
+        (256, 4, [ancho]), (257, 4, [alto]), (258, 3, [32]), (259, 3, [1]), (262, 3, [1]),
+        (277, 3, [1]), (339, 3, [3]),
+        (33550, 12, [CELDA, CELDA, 0.0]), (33922, 12, [0.0, 0.0, 0.0, X0, Y_SUP, 0.0]),
+        (34735, 3, [1, 1, 0, 2, 1024, 0, 1, 1, 3072, 0, 1, EPSG]),
+        (42113, 2, str(int(NODATA))),
+    ]
+    if tesela:
+        etiquetas += [(322, 3, [tesela]), (323, 3, [tesela]), (324, tipo_offset, offsets), (325, 4, conteos)]
+    else:
+        etiquetas += [(273, tipo_offset, offsets), (278, 4, [filas_tira]), (279, 4, conteos)]
+    etiquetas.sort()
+
+    codigos = {3: 'H', 4: 'I', 12: 'd', 16: 'Q'}
+    tam_valor = 8 if grande else 4
+    tam_entrada = 20 if grande else 12
+    ifd = cabecera + len(cuerpo)
+    extra_inicio = ifd + (8 if grande else 2) + tam_entrada * len(etiquetas) + (8 if grande else 4)
+    entradas, extra = b'', b''
+    for etiqueta, tipo, valores in etiquetas:
+        if tipo == 2:
+            crudo, n = valores.encode() + b'\x00', len(valores) + 1
+        else:
+            crudo, n = struct.pack('<' + codigos[tipo] * len(valores), *valores), len(valores)
+        if grande:
+            entradas += struct.pack('<HHQ', etiqueta, tipo, n)
+        else:
+            entradas += struct.pack('<HHI', etiqueta, tipo, n)
+        if len(crudo) <= tam_valor:
+            entradas += crudo.ljust(tam_valor, b'\x00')
+        else:
+            entradas += struct.pack('<Q' if grande else '<I', extra_inicio + len(extra))
+            extra += crudo
+
+    with open(ruta, 'wb') as f:
+        if grande:
+            f.write(b'II' + struct.pack('<HHHQ', 43, 8, 0, ifd))
+        else:
+            f.write(b'II' + struct.pack('<HI', 42, ifd))
+        f.write(cuerpo)
+        f.write(struct.pack('<Q' if grande else '<H', len(etiquetas)) + entradas)
+        f.write(struct.pack('<Q' if grande else '<I', 0) + extra)
+
+
+def _escribir_asc(ruta, z, valores_por_linea=None):
+    with open(ruta, 'w') as f:
+        f.write(f"ncols {z.shape[1]}\nnrows {z.shape[0]}\nxllcorner {X0}\nyllcorner {Y_SUP - z.shape[0] * CELDA}\n"
+                f"cellsize {CELDA}\nNODATA_value {int(NODATA)}\n")
+        for fila in z:
+            valores = [f"{v:.4f}" for v in fila]
+            paso = valores_por_linea or len(valores)
+            for i in range(0, len(valores), paso):
+                f.write(' '.join(valores[i:i + paso]) + '\n')
+    with open(str(ruta)[:-4] + '.prj', 'w') as f:
+        from pyproj import CRS
+        f.write(CRS.from_epsg(EPSG).to_wkt('WKT1_ESRI'))
+
+
+def _esperado(z, f0, f1, c0, c1):
+    ventana = z[f0:f1, c0:c1].astype(np.float32)
+    ventana[ventana == NODATA] = np.nan
+    return ventana
+
+
+# Límites (x, y) que caen en las filas 12-31 y columnas 18-49, cruzando tiras, teselas y el bloque sin datos
+LIMITES = (X0 + 18 * CELDA + 1, Y_SUP - 32 * CELDA + 1, X0 + 50 * CELDA - 1, Y_SUP - 12 * CELDA - 1)
+
+
+@pytest.mark.parametrize('grande, filas_tira, tesela', [
+    (False, 7, None),
+    (False, ALTO, None),
+    (False, None, 16),
+    (True, 7, None),
+    (True, None, 16),
+])
+def test_ventana_geotiff_igual_a_numpy(tmp_path, grande, filas_tira, tesela):
+    z = _dem_prueba()
+    ruta = tmp_path / 'dem.tif'
+    _escribir_tiff(ruta, z, grande=grande, filas_tira=filas_tira, tesela=tesela)
+
+    ventana, transformada, crs = _leer_ventana_tiff_memmap(str(ruta), lambda _crs: LIMITES, 0)
+
+    assert crs.to_epsg() == EPSG
+    np.testing.assert_array_equal(ventana, _esperado(z, 12, 32, 18, 50))
+    assert transformada == (X0 + 18 * CELDA, CELDA, 0.0, Y_SUP - 12 * CELDA, 0.0, -CELDA)
+    assert np.isnan(ventana).sum() == 4 * 5
+
+
+def test_ventana_geotiff_con_margen_se_recorta_al_raster(tmp_path):
+    z = _dem_prueba()
+    ruta = tmp_path / 'dem.tif'
+    _escribir_tiff(ruta, z, tesela=16)
+    ventana, _, _ = _leer_ventana_tiff_memmap(str(ruta), lambda _crs: (X0 + 1, Y_SUP - 5 * CELDA, X0 + 3 * CELDA, Y_SUP - 1), 2)
+    np.testing.assert_array_equal(ventana, _esperado(z, 0, 7, 0, 5))
+
+
+@pytest.mark.parametrize('valores_por_linea', [None, 9])
+def test_ventana_ascii_igual_a_numpy(tmp_path, valores_por_linea):
+    z = _dem_prueba()
+    ruta = tmp_path / 'dem.asc'
+    _escribir_asc(ruta, z, valores_por_linea)
+
+    ventana, transformada, crs = _leer_ventana_ascii(str(ruta), lambda _crs: LIMITES, 0)
+
+    assert crs.to_epsg() == EPSG
+    np.testing.assert_allclose(ventana, _esperado(z, 12, 32, 18, 50), atol=1e-4)
+    assert transformada[0] == X0 + 18 * CELDA and transformada[3] == Y_SUP - 12 * CELDA
+
+
+def test_ventana_fuera_del_raster():
+    with pytest.raises(ValueError):
+        _ventana_pixeles((0, 0, 10, 10), (X0, CELDA, 0.0, Y_SUP, 0.0, -CELDA), ALTO, ANCHO, 0)
+
+
+def test_transformada_rotada_se_rechaza():
+    with pytest.raises(ValueError, match="rotada"):
+        _ventana_pixeles(LIMITES, (X0, CELDA, 0.5, Y_SUP, 0.0, -CELDA), ALTO, ANCHO, 0)
+    with pytest.raises(ValueError, match="rotada"):
+        _ventana_pixeles(LIMITES, (X0, CELDA, 0.0, Y_SUP, -0.5, -CELDA), ALTO, ANCHO, 0)
+
+
+@pytest.mark.parametrize('nombre', ['dem.tif', 'dem.asc'])
+def test_dem_remuestreado_reproduce_el_plano(tmp_path, nombre):
+    z = _dem_prueba()
+    ruta = tmp_path / nombre
+    if nombre.endswith('.tif'):
+        _escribir_tiff(ruta, z, grande=True, tesela=16)
+    else:
+        _escribir_asc(ruta, z)
+    # Parcela lejos del bloque sin datos: el bilineal reproduce el plano
+    parcela = gpd.GeoDataFrame(geometry=[box(X0 + 100, Y_SUP - 160, X0 + 260, Y_SUP - 60)], crs=EPSG).to_crs(4326)
+
+    grilla, Z = leer_dem_archivo(str(ruta), parcela, 10.0)
+
+    assert grilla.crs is not None and grilla.crs.to_epsg() == EPSG
+    x, y = grilla.ejes()
+    esperado = 100 + 0.02 * (x[None, :] - X0) - 0.01 * (y[:, None] - Y_SUP)
+    assert not np.isnan(Z).any()
+    np.testing.assert_allclose(Z, esperado, atol=1e-3)
+
+
+def test_mosaicos_locales_solo_para_administradores(tmp_path, monkeypatch):
+    monkeypatch.setenv('ANALIZADOR_DEM_DIR', str(tmp_path))
+    monkeypatch.delenv('ANALIZADOR_DEM_LOCAL_ADMIN', raising=False)
+    assert directorio_dem_local() is None
+    monkeypatch.setenv('ANALIZADOR_DEM_LOCAL_ADMIN', '1')
+    assert directorio_dem_local() == os.path.realpath(tmp_path)
+
+
+def test_ruta_local_queda_en_el_directorio(tmp_path):
+    directorio = tmp_path / 'dems'
+    (directorio / 'provincia').mkdir(parents=True)
+    (directorio / 'provincia' / 'mosaico.tif').write_bytes(b'II')
+    (tmp_path / 'secreto.tif').write_bytes(b'II')
+    (directorio / 'notas.txt.bak').write_bytes(b'')
+    os.symlink(tmp_path / 'secreto.tif', directorio / 'enlace.tif')
+    base = os.path.realpath(directorio)
+
+    esperado = os.path.join(base, 'provincia', 'mosaico.tif')
+    assert resolver_dem_local('provincia/mosaico.tif', base) == esperado
+    assert resolver_dem_local(esperado, base) == esperado
+    assert resolver_dem_local('../secreto.tif', base) is None
+    assert resolver_dem_local(str(tmp_path / 'secreto.tif'), base) is None
+    assert resolver_dem_local('enlace.tif', base) is None
+    assert resolver_dem_local('notas.txt.bak', base) is None
+    assert resolver_dem_local('no_existe.tif', base) is None
@@ -0,0 +1,46 @@
+"""Búsqueda de lotes por click y ajuste de precisión sobre parcelas en CRS geográfico y proyectado"""
+import geopandas as gpd
+import numpy as np
+import pytest
+import shapely
+from shapely.geometry import Polygon, box
+
+from analizador.geometria import buscar_lotes_por_punto, preparar_geometrias
+
+
+def _lotes_utm():
+    # Dos lotes de 1 km en UTM 20S (EPSG:32720), uno al lado del otro
+    return gpd.GeoDataFrame(geometry=[box(500000, 6200000, 501000, 6201000),
+                                      box(501000, 6200000, 502000, 6201000)], crs=32720)
+
+
+def test_click_en_grados_sobre_parcela_proyectada():
+    lotes = _lotes_utm()
+    centros = lotes.geometry.centroid.to_crs(4326)
+    for i, centro in enumerate(centros):
+        assert list(buscar_lotes_por_punto(lotes, centro.x, centro.y, crs_punto='EPSG:4326')) == [i]
+    # Sin reproyectar, lon/lat no cae en ningún lote en metros
+    assert len(buscar_lotes_por_punto(lotes, centros.iloc[0].x, centros.iloc[0].y)) == 0
+
+
+def test_click_en_grados_sobre_parcela_en_grados():
+    lotes = _lotes_utm().to_crs(4326)
+    centro = lotes.geometry.iloc[1].representative_point()
+    assert list(buscar_lotes_por_punto(lotes, centro.x, centro.y, crs_punto='EPSG:4326')) == [1]
+
+
+def test_click_fuera_de_los_lotes():
+    lotes = _lotes_utm()
+    assert len(buscar_lotes_por_punto(lotes, -60.0, -10.0, crs_punto='EPSG:4326')) == 0
+
+
+@pytest.mark.parametrize('epsg, grilla', [(32720, 0.01), (4326, 0.01 / 111320.0)])
+def test_ajuste_de_precision_en_el_crs_de_salida(epsg, grilla):
+    lote = Polygon([(-60.123456789, -33.1), (-60.11, -33.1000000001), (-60.11, -33.09), (-60.1234567, -33.09)])
+    lotes = gpd.GeoDataFrame(geometry=[lote], crs=4326).to_crs(epsg)
+
+    preparado, _ = preparar_geometrias(lotes, precision_m=0.01, tolerancia_m=0.5)
+
+    assert preparado.crs == lotes.crs and preparado.geometry.is_valid.all()
+    celdas = shapely.get_coordinates(preparado.geometry.to_numpy()) / grilla
+    np.testing.assert_allclose(celdas, np.round(celdas), rtol=0, atol=1e-6)
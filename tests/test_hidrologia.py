@@ -0,0 +1,134 @@
+"""Relleno de depresiones e inventario de encharcamiento sobre grillas con pozos conocidos"""
+import heapq
+
+import numpy as np
+import pytest
+from pyproj import CRS
+from shapely.geometry import Point
+
+from analizador.dem import GrillaDEM, ModeloDEM
+from analizador.hidrologia import inventario_encharcamiento, rellenar_depresiones
+from analizador.parametros import PARAMETROS_HIDROLOGIA
+
+CELDA = 10.0
+
+
+def _pozo():
+    """Llano a 10 m con un anillo a 12 m (desborde a 11 m en un nodo) alrededor de un pozo
+    de 3x3 nodos a 9 m con el centro a 8 m: se llena hasta 11 m, 19 m·celda de volumen"""
+    z = np.full((9, 9), 10.0)
+    z[2:7, 2:7] = 12.0
+    z[2, 4] = 11.0
+    z[3:6, 3:6] = 9.0
+    z[4, 4] = 8.0
+    return z
+
+
+def _priority_flood(z, validos):
+    """Priority-flood de referencia (Barnes et al., 2014) con 8 vecinos, en Python puro"""
+    filas, columnas = z.shape
+    relleno = np.where(validos, z, np.nan)
+    visto = ~validos
+    cola = []
+    for i in range(filas):
+        for j in range(columnas):
+            if not validos[i, j]:
+                continue
+            vecinos = validos[max(i - 1, 0):i + 2, max(j - 1, 0):j + 2]
+            if i in (0, filas - 1) or j in (0, columnas - 1) or not vecinos.all():
+                heapq.heappush(cola, (relleno[i, j], i, j))
+                visto[i, j] = True
+    while cola:
+        h, i, j = heapq.heappop(cola)
+        for a in range(max(i - 1, 0), min(i + 2, filas)):
+            for b in range(max(j - 1, 0), min(j + 2, columnas)):
+                if not visto[a, b]:
+                    visto[a, b] = True
+                    relleno[a, b] = max(relleno[a, b], h)
+                    heapq.heappush(cola, (relleno[a, b], a, b))
+    return relleno
+
+
+def test_pozo_conocido():
+    z = _pozo()
+    relleno, profundidad = rellenar_depresiones(z)
+
+    esperado = np.zeros_like(z)
+    esperado[3:6, 3:6] = 2.0
+    esperado[4, 4] = 3.0
+    np.testing.assert_allclose(profundidad, esperado, atol=1e-5)
+    np.testing.assert_allclose(relleno, np.maximum(z, np.where(esperado > 0, 11.0, z)), atol=1e-5)
+    assert relleno.dtype == np.float32
+
+
+def test_inventario_del_pozo(monkeypatch):
+    # Sin suavizado: el pozo se mide tal cual
+    monkeypatch.setitem(PARAMETROS_HIDROLOGIA, 'suavizado_sigma', 0)
+    grilla = GrillaDEM(500000.0, 6200000.0, CELDA, CELDA, 9, 9, CRS.from_epsg(32720))
+    modelo = ModeloDEM(grilla, _pozo())
+
+    zonas, resumen = inventario_encharcamiento(modelo, area_min_m2=0)
+
+    assert resumen['depresiones'] == 1 and resumen['zonas'] == 1
+    assert resumen['volumen_m3'] == pytest.approx(19 * CELDA * CELDA, rel=1e-5)
+    assert resumen['area_ha'] == pytest.approx(9 * CELDA * CELDA / 10000)
+    assert resumen['profundidad_max_m'] == pytest.approx(3.0)
+    zona = zonas.iloc[0]
+    assert zona['cota_desborde_m'] == pytest.approx(11.0)
+    assert zona['volumen_m3'] == pytest.approx(1900.0)
+    # El polígono rodea los 9 nodos del pozo y está centrado en el nodo más hondo
+    centro_x, centro_y = grilla.celda_a_mundo(np.array([4]), np.array([4]))
+    centro = Point(centro_x[0], centro_y[0])
+    esquinas = grilla.celda_a_mundo(np.array([3, 3, 5, 5]), np.array([3, 5, 3, 5]))
+    assert all(zona.geometry.contains(Point(x, y)) for x, y in zip(*esquinas))
+    assert zona.geometry.centroid.distance(centro) < 1e-6
+
+
+def test_umbrales_descartan_el_pozo(monkeypatch):
+    monkeypatch.setitem(PARAMETROS_HIDROLOGIA, 'suavizado_sigma', 0)
+    grilla = GrillaDEM(0.0, 0.0, CELDA, CELDA, 9, 9, None)
+    zonas, resumen = inventario_encharcamiento(ModeloDEM(grilla, _pozo()), profundidad_min=5.0, area_min_m2=0)
+    assert resumen['depresiones'] == 1 and resumen['zonas'] == 0 and zonas.empty
+
+
+def test_hueco_nan_en_el_anillo_desagota_el_pozo():
+    # Un nodo sin dato en el anillo es una salida: los nodos del pozo que lo tocan desagotan
+    # a 9 m y solo el centro (8 m) se llena hasta ellos
+    z = _pozo()
+    z[4, 2] = np.nan
+    relleno, profundidad = rellenar_depresiones(z)
+    assert np.isnan(relleno[4, 2]) and np.isnan(profundidad[4, 2])
+    esperado = np.zeros_like(z)
+    esperado[4, 4] = 1.0
+    esperado[4, 2] = np.nan
+    np.testing.assert_allclose(profundidad, esperado, atol=1e-5, equal_nan=True)
+
+
+def test_mascara_excluye_nodos():
+    z = _pozo()
+    mascara = np.ones(z.shape, dtype=bool)
+    mascara[:, 7:] = False
+    relleno, profundidad = rellenar_depresiones(z, mascara)
+    assert np.isnan(relleno[:, 7:]).all() and np.isnan(profundidad[:, 7:]).all()
+    # El anillo sigue cerrado dentro de la máscara: el pozo se llena igual
+    assert profundidad[4, 4] == pytest.approx(3.0)
+    assert float(np.nansum(profundidad)) == pytest.approx(19.0)
+
+
+@pytest.mark.parametrize('semilla', range(6))
+def test_igual_a_priority_flood(semilla):
+    rng = np.random.default_rng(semilla)
+    filas, columnas = rng.integers(5, 40, 2)
+    z = rng.normal(0, 1, (filas, columnas)).cumsum(axis=0) + rng.normal(0, 1, (filas, columnas))
+    # Huecos sin dato y una máscara que deja afuera una esquina
+    z[rng.random((filas, columnas)) < 0.05] = np.nan
+    mascara = np.ones((filas, columnas), dtype=bool)
+    mascara[:filas // 3, :columnas // 3] = False
+
+    relleno, profundidad = rellenar_depresiones(z, mascara)
+
+    validos = mascara & ~np.isnan(z)
+    esperado = _priority_flood(z, validos)
+    np.testing.assert_allclose(relleno, esperado, atol=1e-4, equal_nan=True)
+    np.testing.assert_allclose(profundidad[validos], (esperado - z)[validos], atol=1e-4)
+    assert np.isnan(profundidad[~validos]).all()
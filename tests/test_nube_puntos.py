@@ -0,0 +1,142 @@
+"""Rasterización de nubes LAS 1.2 / 1.4 y XYZ en la grilla del DEM"""
+import struct
+
+import numpy as np
+import pytest
+from pyproj import CRS
+
+from analizador.dem import GrillaDEM
+from analizador.nube_puntos import rasterizar_nube_puntos
+
+EPSG = 32720
+X0, Y0, CELDA = 500000.0, 6200000.0, 10.0
+FILAS, COLUMNAS = 8, 11
+HUECO = (3, 4)  # nodo sin puntos: se rellena desde los vecinos
+
+
+def _grilla():
+    return GrillaDEM(X0, Y0, CELDA, CELDA, FILAS, COLUMNAS, CRS.from_epsg(EPSG))
+
+
+def _nube():
+    """Tres puntos de suelo (clase 2) y dos de vegetación (clase 5, más altos) cerca de cada nodo.
+
+    Devuelve x, y, z, clase y la media de suelo y el mínimo esperados por nodo."""
+    rng = np.random.default_rng(7)
+    xs, ys, zs, clases = [], [], [], []
+    media = np.full((FILAS, COLUMNAS), np.nan)
+    minimo = np.full((FILAS, COLUMNAS), np.nan)
+    for f in range(FILAS):
+        for c in range(COLUMNAS):
+            if (f, c) == HUECO:
+                continue
+            suelo = np.round(100 + 0.5 * f - 0.3 * c + rng.uniform(-0.2, 0.2, 3), 3)
+            vegetacion = np.round(suelo[:2] + rng.uniform(1, 3, 2), 3)
+            z = np.concatenate([suelo, vegetacion])
+            desvio = np.round(rng.uniform(-3, 3, (5, 2)), 3)
+            xs.append(X0 + c * CELDA + desvio[:, 0])
+            ys.append(Y0 + f * CELDA + desvio[:, 1])
+            zs.append(z)
+            clases.append([2, 2, 2, 5, 5])
+            media[f, c] = suelo.mean()
+            minimo[f, c] = z.min()
+    return (np.concatenate(xs), np.concatenate(ys), np.concatenate(zs),
+            np.concatenate(clases).astype(np.uint8), media, minimo)
+
+
+def _escribir_las(ruta, x, y, z, clase, version, epsg=EPSG):
+    """LAS mínimo: formato de punto 1 (1.2, clase en los 5 bits bajos del byte 15) o 6 (1.4, byte 16)"""
+    formato = 6 if version >= (1, 4) else 1
+    tam_registro = 30 if formato == 6 else 28
+    tam_encabezado = 375 if version >= (1, 4) else 227
+    claves = struct.pack('<12H', 1, 1, 0, 2, 1024, 0, 1, 1, 3072, 0, 1, epsg)
+    vlr = struct.pack('<H16sHH32s', 0, b'LASF_Projection', 34735, len(claves), b'') + claves
+    escala, desplazamiento = (0.001, 0.001, 0.001), (X0 - 100, Y0 - 100, 0.0)
+
+    encabezado = bytearray(tam_encabezado)
+    encabezado[0:4] = b'LASF'
+    encabezado[24:26] = bytes(version)
+    struct.pack_into('<H', encabezado, 94, tam_encabezado)
+    struct.pack_into('<II', encabezado, 96, tam_encabezado + len(vlr), 1)
+    struct.pack_into('<BH', encabezado, 104, formato, tam_registro)
+    # En 1.4 el contador heredado de 32 bits queda en 0 y vale el de 64 bits
+    struct.pack_into('<I', encabezado, 107, 0 if formato == 6 else len(x))
+    struct.pack_into('<3d', encabezado, 131, *escala)
+    struct.pack_into('<3d', encabezado, 155, *desplazamiento)
+    struct.pack_into('<6d', encabezado, 179, x.max(), x.min(), y.max(), y.min(), z.max(), z.min())
+    if formato == 6:
+        struct.pack_into('<Q', encabezado, 247, len(x))
+
+    dtype = np.dtype({'names': ['x', 'y', 'z', 'clase'], 'formats': ['<i4', '<i4', '<i4', 'u1'],
+                      'offsets': [0, 4, 8, 16 if formato == 6 else 15], 'itemsize': tam_registro})
+    registros = np.zeros(len(x), dtype=dtype)
+    registros['x'] = np.rint((x - desplazamiento[0]) / escala[0])
+    registros['y'] = np.rint((y - desplazamiento[1]) / escala[1])
+    registros['z'] = np.rint((z - desplazamiento[2]) / escala[2])
+    # En formato 1 los bits altos del byte de clase son banderas (sintético, clave, retenido)
+    registros['clase'] = clase if formato == 6 else clase | 0x20
+    with open(ruta, 'wb') as f:
+        f.write(bytes(encabezado) + vlr + registros.tobytes())
+
+
+def _comprobar(elevacion, esperado):
+    assert elevacion.dtype == np.float32 and elevacion.shape == (FILAS, COLUMNAS)
+    con_puntos = ~np.isnan(esperado)
+    np.testing.assert_allclose(elevacion[con_puntos], esperado[con_puntos], atol=1e-4)
+    # El hueco se rellena por distancia inversa: queda entre los valores de sus vecinos
+    f, c = HUECO
+    vecinos = esperado[f - 1:f + 2, c - 1:c + 2]
+    assert np.nanmin(vecinos) <= elevacion[f, c] <= np.nanmax(vecinos)
+
+
+@pytest.mark.parametrize('version', [(1, 2), (1, 4)])
+@pytest.mark.parametrize('puntos_por_bloque', [None, 7])
+def test_las_media_de_puntos_de_suelo(tmp_path, version, puntos_por_bloque):
+    x, y, z, clase, media, _ = _nube()
+    ruta = tmp_path / 'nube.las'
+    _escribir_las(ruta, x, y, z, clase, version)
+
+    elevacion = rasterizar_nube_puntos(str(ruta), _grilla(), puntos_por_bloque=puntos_por_bloque)
+
+    _comprobar(elevacion, media)
+
+
+def test_las_sin_clasificar_usa_el_minimo(tmp_path):
+    x, y, z, clase, _, minimo = _nube()
+    ruta = tmp_path / 'nube.las'
+    _escribir_las(ruta, x, y, z, np.ones_like(clase), (1, 4))
+
+    _comprobar(rasterizar_nube_puntos(str(ruta), _grilla()), minimo)
+
+
+@pytest.mark.parametrize('separador, encabezado', [(' ', ''), (',', 'x,y,z,intensidad\n')])
+def test_xyz_minimo_por_celda(tmp_path, separador, encabezado):
+    x, y, z, _, _, minimo = _nube()
+    ruta = tmp_path / 'nube.xyz'
+    with open(ruta, 'w') as f:
+        f.write(encabezado)
+        for xi, yi, zi in zip(x, y, z):
+            f.write(separador.join([f"{xi:.3f}", f"{yi:.3f}", f"{zi:.3f}", "17"]) + '\n')
+
+    elevacion = rasterizar_nube_puntos(str(ruta), _grilla(), CRS.from_epsg(EPSG), puntos_por_bloque=13)
+
+    _comprobar(elevacion, minimo)
+
+
+def test_laz_comprimido_se_rechaza(tmp_path):
+    x, y, z, clase, _, _ = _nube()
+    ruta = tmp_path / 'nube.las'
+    _escribir_las(ruta, x, y, z, clase, (1, 2))
+    with open(ruta, 'r+b') as f:
+        f.seek(104)
+        f.write(bytes([1 | 0x80]))
+    with pytest.raises(ValueError, match="LAZ"):
+        rasterizar_nube_puntos(str(ruta), _grilla())
+
+
+def test_nube_fuera_de_la_grilla(tmp_path):
+    x, y, z, clase, _, _ = _nube()
+    ruta = tmp_path / 'nube.las'
+    _escribir_las(ruta, x + 10_000, y, z, clase, (1, 2))
+    with pytest.raises(ValueError):
+        rasterizar_nube_puntos(str(ruta), _grilla())